@@ -0,0 +1,435 @@
+"""Append-only binary capture files.
+
+Layout (little endian)::
+
+    file header   magic "PFCAP\\0\\r\\n", version u16, header size u16, index_every u32, created ns i64
+    record        kind u8, direction u8, channel id u16, length u32, timestamp ns i64, payload
+
+Record kinds: ``DATA`` (raw bytes of one frame/chunk), ``CHANNEL`` (channel id -> UTF-8 name),
+``INDEX`` and ``TRAILER``. Timestamps are wall-clock nanoseconds (converted from
+``perf_counter_ns`` readings with the process clock anchor), so files from different runs
+share one time base.
+
+Every ``index_every`` data records the writer appends an ``INDEX`` block: a sync marker,
+the offset of the previous index block, one entry per segment (min/max timestamp, offset
+of the first record, record count) and the channel table. ``close`` writes one last
+index holding every segment plus a ``TRAILER`` pointing at it. ``CaptureFileReader`` maps
+the file with ``mmap`` and loads only the index: from the trailer, or after a crash by
+searching backwards for the last sync marker and following the chain; records after the
+last index are scanned once. Seeking to a timestamp is a bisect over segments followed by a
+scan of at most one segment.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from infra.common.chunk import clock_anchor
+
+MAGIC = b"PFCAP\x00\r\n"
+VERSION = 1
+INDEX_SYNC = b"PFIDX\x00\xff\xa5"
+TRAILER_MAGIC = b"PFEND\x00\r\n"
+
+KIND_DATA = 1
+KIND_CHANNEL = 2
+KIND_INDEX = 3
+KIND_TRAILER = 4
+
+_FILE_HEADER = struct.Struct("<8sHHIq")
+_RECORD = struct.Struct("<BBHIq")
+_INDEX_HEAD = struct.Struct("<8sqII")
+_SEGMENT = struct.Struct("<qqqq")
+_CHANNEL = struct.Struct("<HH")
+_TRAILER = struct.Struct("<qq8s")
+_TRAILER_SIZE = _RECORD.size + _TRAILER.size
+
+_DIRECTIONS = ("RX", "TX")
+_DEFAULT_INDEX_EVERY = 1024
+_DEFAULT_MAX_PENDING_BYTES = 64 * 1024 * 1024
+_FLUSH_SEC = 0.2
+_STOP = None
+
+
+class CaptureFileError(Exception):
+    pass
+
+
+class CaptureFileEntry(NamedTuple):
+    t_ns: int
+    channel: str
+    direction: str
+    data: bytes
+
+    @property
+    def timestamp(self) -> float:
+        return self.t_ns / 1e9
+
+
+def _direction_code(direction: str) -> int:
+    try:
+        return _DIRECTIONS.index(direction.upper())
+    except ValueError:
+        return 0
+
+
+class CaptureFileWriter:
+    """Background writer: ``append`` only enqueues, a worker thread owns the file."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        index_every: int = _DEFAULT_INDEX_EVERY,
+        max_pending_bytes: int = _DEFAULT_MAX_PENDING_BYTES,
+    ) -> None:
+        self.path = Path(path)
+        self._index_every = max(1, int(index_every))
+        self._max_pending = max(1, int(max_pending_bytes))
+        self._queue: "queue.Queue[Optional[Tuple[int, str, str, bytes]]]" = queue.Queue()
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        self._dropped = 0
+        self._written = 0
+        self._error: Optional[Exception] = None
+        self._closed = False
+        anchor_wall, anchor_perf = clock_anchor()
+        self._wall_offset = anchor_wall - anchor_perf
+        if self.path.parent:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("wb")
+        self._offset = 0
+        self._write(_FILE_HEADER.pack(MAGIC, VERSION, _FILE_HEADER.size, self._index_every, time.time_ns()))
+        self._channels: Dict[str, int] = {}
+        self._segments: List[Tuple[int, int, int, int]] = []
+        self._segment: Optional[List[int]] = None
+        self._last_index = -1
+        self._worker = threading.Thread(target=self._run, name="capture-file-writer", daemon=True)
+        self._worker.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def error(self) -> Optional[Exception]:
+        return self._error
+
+    def append(self, t_ns: int, channel: str, direction: str, data: bytes) -> bool:
+        """Queue one record; ``t_ns`` is a ``perf_counter_ns`` reading (``Chunk.t_ns``)."""
+        if self._closed or self._error is not None:
+            return False
+        size = len(data)
+        with self._pending_lock:
+            if self._pending_bytes + size > self._max_pending:
+                self._dropped += 1
+                return False
+            self._pending_bytes += size
+        self._queue.put((t_ns + self._wall_offset, channel, direction, bytes(data)))
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _run(self) -> None:
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=_FLUSH_SEC if dirty else None)
+            except queue.Empty:
+                self._flush()
+                dirty = False
+                continue
+            if item is _STOP:
+                break
+            if self._error is not None:
+                continue
+            t_ns, channel, direction, data = item
+            with self._pending_lock:
+                self._pending_bytes -= len(data)
+            try:
+                self._write_data(t_ns, channel, direction, data)
+                dirty = True
+            except Exception as exc:
+                self._error = exc
+                print(f"[WARN] CaptureFileWriter: {self.path}: {exc}")
+        try:
+            if self._error is None:
+                self._finish()
+        except Exception as exc:
+            self._error = exc
+            print(f"[WARN] CaptureFileWriter: {self.path}: {exc}")
+        finally:
+            self._fh.close()
+
+    def _write(self, blob: bytes) -> None:
+        self._fh.write(blob)
+        self._offset += len(blob)
+
+    def _flush(self) -> None:
+        try:
+            self._fh.flush()
+        except Exception as exc:
+            self._error = exc
+
+    def _write_data(self, t_ns: int, channel: str, direction: str, data: bytes) -> None:
+        channel_id = self._channels.get(channel)
+        if channel_id is None:
+            channel_id = self._channels[channel] = len(self._channels)
+            name = channel.encode("utf-8")
+            self._write(_RECORD.pack(KIND_CHANNEL, 0, channel_id, len(name), 0) + name)
+        if self._segment is None:
+            self._segment = [t_ns, t_ns, self._offset, 0]
+        segment = self._segment
+        self._write(_RECORD.pack(KIND_DATA, _direction_code(direction), channel_id, len(data), t_ns))
+        self._write(data)
+        segment[0] = min(segment[0], t_ns)
+        segment[1] = max(segment[1], t_ns)
+        segment[3] += 1
+        self._written += 1
+        if segment[3] >= self._index_every:
+            self._close_segment()
+            self._write_index([self._segments[-1]], self._last_index)
+
+    def _close_segment(self) -> None:
+        if self._segment is not None and self._segment[3]:
+            self._segments.append(tuple(self._segment))  # type: ignore[arg-type]
+        self._segment = None
+
+    def _write_index(self, segments: List[Tuple[int, int, int, int]], prev: int) -> int:
+        parts = [_INDEX_HEAD.pack(INDEX_SYNC, prev, len(segments), len(self._channels))]
+        parts.extend(_SEGMENT.pack(*segment) for segment in segments)
+        for name, channel_id in self._channels.items():
+            raw = name.encode("utf-8")
+            parts.append(_CHANNEL.pack(channel_id, len(raw)) + raw)
+        payload = b"".join(parts)
+        offset = self._offset
+        self._write(_RECORD.pack(KIND_INDEX, 0, 0, len(payload), 0) + payload)
+        self._last_index = offset
+        return offset
+
+    def _finish(self) -> None:
+        self._close_segment()
+        # Consolidated index: every segment in one block, no chain to follow.
+        index_offset = self._write_index(self._segments, -1)
+        trailer = _TRAILER.pack(index_offset, self._written, TRAILER_MAGIC)
+        self._write(_RECORD.pack(KIND_TRAILER, 0, 0, len(trailer), 0) + trailer)
+        self._fh.flush()
+
+
+class CaptureFileReader:
+    """Memory-mapped reader; only index blocks are parsed on open."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        self._fh = self.path.open("rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        if size < _FILE_HEADER.size:
+            self._fh.close()
+            raise CaptureFileError(f"not a capture file: {self.path}")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._size = size
+        magic, version, header_size, index_every, created_ns = _FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise CaptureFileError(f"unsupported capture file: {self.path}")
+        self._data_start = header_size
+        self.index_every = index_every
+        self.created_ns = created_ns
+        self.complete = False
+        self._channels: Dict[int, str] = {}
+        self._t_min = array("q")
+        self._t_max = array("q")
+        self._offsets = array("q")
+        self._counts = array("q")
+        self._load_index()
+        # Running max of t_max / suffix min of t_min make range bounds exact even when
+        # interleaved channels arrive slightly out of order.
+        self._max_prefix = array("q", self._t_max)
+        for i in range(1, len(self._max_prefix)):
+            self._max_prefix[i] = max(self._max_prefix[i], self._max_prefix[i - 1])
+        self._min_suffix = array("q", self._t_min)
+        for i in range(len(self._min_suffix) - 2, -1, -1):
+            self._min_suffix[i] = min(self._min_suffix[i], self._min_suffix[i + 1])
+
+    def __enter__(self) -> "CaptureFileReader":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(sum(self._counts))
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        self._fh.close()
+
+    @property
+    def channels(self) -> List[str]:
+        return [self._channels[key] for key in sorted(self._channels)]
+
+    @property
+    def first_ns(self) -> Optional[int]:
+        return min(self._t_min) if self._t_min else None
+
+    @property
+    def last_ns(self) -> Optional[int]:
+        return self._max_prefix[-1] if self._max_prefix else None
+
+    def seek(self, t_ns: int) -> int:
+        """File offset of the segment holding the first record with timestamp >= ``t_ns``."""
+        pos = bisect_left(self._max_prefix, t_ns)
+        if pos >= len(self._offsets):
+            return self._size
+        return self._offsets[pos]
+
+    def records(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        channel: Optional[str] = None,
+    ) -> Iterator[CaptureFileEntry]:
+        """Data records in file order with ``start_ns <= t_ns < end_ns``."""
+        first = 0 if start_ns is None else bisect_left(self._max_prefix, start_ns)
+        for seg in range(first, len(self._offsets)):
+            if end_ns is not None and self._min_suffix[seg] >= end_ns:
+                return
+            for entry in self._segment_records(seg):
+                if start_ns is not None and entry.t_ns < start_ns:
+                    continue
+                if end_ns is not None and entry.t_ns >= end_ns:
+                    continue
+                if channel is not None and entry.channel != channel:
+                    continue
+                yield entry
+
+    def _segment_records(self, seg: int) -> Iterator[CaptureFileEntry]:
+        mm = self._mm
+        offset = self._offsets[seg]
+        remaining = self._counts[seg]
+        while remaining > 0 and offset + _RECORD.size <= self._size:
+            kind, direction, channel_id, length, t_ns = _RECORD.unpack_from(mm, offset)
+            body = offset + _RECORD.size
+            offset = body + length
+            if kind != KIND_DATA:
+                continue
+            remaining -= 1
+            yield CaptureFileEntry(
+                t_ns,
+                self._channels.get(channel_id, str(channel_id)),
+                _DIRECTIONS[direction] if direction < len(_DIRECTIONS) else "RX",
+                mm[body:offset],
+            )
+
+    def _load_index(self) -> None:
+        index_offset = self._trailer_index()
+        self.complete = index_offset is not None
+        if index_offset is None:
+            index_offset = self._find_last_index()
+        blocks: List[List[Tuple[int, int, int, int]]] = []
+        tail_start = self._data_start if index_offset is None else index_offset
+        offset = index_offset
+        while offset is not None and offset >= 0:
+            offset, block_segments = self._read_index(offset)
+            blocks.append(block_segments)
+        for t_min, t_max, seg_offset, count in (segment for block in reversed(blocks) for segment in block):
+            self._t_min.append(t_min)
+            self._t_max.append(t_max)
+            self._offsets.append(seg_offset)
+            self._counts.append(count)
+        if not self.complete:
+            self._scan_tail(tail_start)
+
+    def _trailer_index(self) -> Optional[int]:
+        if self._size < self._data_start + _TRAILER_SIZE:
+            return None
+        base = self._size - _TRAILER_SIZE
+        kind, _d, _c, length, _t = _RECORD.unpack_from(self._mm, base)
+        if kind != KIND_TRAILER or length != _TRAILER.size:
+            return None
+        index_offset, _count, magic = _TRAILER.unpack_from(self._mm, base + _RECORD.size)
+        if magic != TRAILER_MAGIC:
+            return None
+        return index_offset
+
+    def _find_last_index(self) -> Optional[int]:
+        end = self._size
+        while True:
+            pos = self._mm.rfind(INDEX_SYNC, self._data_start, end)
+            if pos < 0:
+                return None
+            offset = pos - _RECORD.size
+            if self._is_index(offset):
+                return offset
+            end = pos
+
+    def _is_index(self, offset: int) -> bool:
+        if offset < self._data_start or offset + _RECORD.size + _INDEX_HEAD.size > self._size:
+            return False
+        kind, _d, _c, length, _t = _RECORD.unpack_from(self._mm, offset)
+        if kind != KIND_INDEX or offset + _RECORD.size + length > self._size:
+            return False
+        _sync, prev, n_segments, _n_channels = _INDEX_HEAD.unpack_from(self._mm, offset + _RECORD.size)
+        return prev < offset and _INDEX_HEAD.size + n_segments * _SEGMENT.size <= length
+
+    def _read_index(self, offset: int) -> Tuple[int, List[Tuple[int, int, int, int]]]:
+        if not self._is_index(offset):
+            raise CaptureFileError(f"corrupt index block at {offset} in {self.path}")
+        body = offset + _RECORD.size
+        _sync, prev, n_segments, n_channels = _INDEX_HEAD.unpack_from(self._mm, body)
+        pos = body + _INDEX_HEAD.size
+        segments = [_SEGMENT.unpack_from(self._mm, pos + i * _SEGMENT.size) for i in range(n_segments)]
+        pos += n_segments * _SEGMENT.size
+        for _ in range(n_channels):
+            channel_id, length = _CHANNEL.unpack_from(self._mm, pos)
+            pos += _CHANNEL.size
+            self._channels.setdefault(channel_id, bytes(self._mm[pos : pos + length]).decode("utf-8", "replace"))
+            pos += length
+        return prev, segments
+
+    def _scan_tail(self, offset: int) -> None:
+        """Index records written after the last index block (unclean close)."""
+        t_min = t_max = None
+        first = -1
+        count = 0
+        while offset + _RECORD.size <= self._size:
+            kind, _direction, channel_id, length, t_ns = _RECORD.unpack_from(self._mm, offset)
+            body = offset + _RECORD.size
+            if body + length > self._size:
+                break
+            if kind == KIND_CHANNEL:
+                self._channels[channel_id] = bytes(self._mm[body : body + length]).decode("utf-8", "replace")
+            elif kind == KIND_DATA:
+                if first < 0:
+                    first = offset
+                t_min = t_ns if t_min is None else min(t_min, t_ns)
+                t_max = t_ns if t_max is None else max(t_max, t_ns)
+                count += 1
+            elif kind not in (KIND_INDEX, KIND_TRAILER):
+                break
+            offset = body + length
+        if count:
+            self._t_min.append(t_min)  # type: ignore[arg-type]
+            self._t_max.append(t_max)  # type: ignore[arg-type]
+            self._offsets.append(first)
+            self._counts.append(count)
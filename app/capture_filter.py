@@ -0,0 +1,369 @@
+"""Capture filter expressions compiled to Python predicates.
+
+Example::
+
+    proto == "modbus" && func in (3, 4) && !crc_ok && len > 8
+
+Grammar: ``||``/``or``, ``&&``/``and``, ``!``/``not``, parentheses, comparisons
+``== != < <= > >=``, ``in (..)`` / ``not in (..)`` and bare fields (truthiness). Literals are
+integers (decimal or ``0x``), floats, quoted strings and ``true``/``false``; a literal must
+match its field's kind (string, number or boolean) and ``< <= > >=`` need a numeric field.
+
+Fields (evaluated on a ``CaptureRecord``):
+
+``proto``      protocol id; ``proto == "modbus"`` also matches ``modbus_rtu``/``modbus_tcp``
+               and the display name (case-insensitive)
+``name``       protocol display name
+``func``       function code (Modbus RTU/TCP/ASCII), otherwise null
+``len``        frame length in bytes
+``dir``        ``"TX"`` / ``"RX"`` (case-insensitive)
+``channel``    channel name
+``crc_ok``     no ``CRC_INVALID`` error
+``error``      error codes; ``error == "CRC_INVALID"`` tests membership, bare ``error`` = any
+``errors``     number of error codes
+``unknown``    no detector matched
+``confidence`` detector probe score
+``data[i]``    byte ``i`` (negative counts from the end), null when out of range
+
+A comparison against a null field is false, ``!=`` included; ``not in (..)`` matches it.
+The expression is parsed once and turned into the source of one ``lambda r: ...``, compiled
+with ``compile``; evaluating a frame is a single call without tree walking.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.capture_record import CaptureRecord
+
+Predicate = Callable[[CaptureRecord], bool]
+
+
+class CaptureFilterError(ValueError):
+    def __init__(self, message: str, position: int = -1) -> None:
+        super().__init__(message if position < 0 else f"{message} (at {position})")
+        self.position = position
+
+
+def _function_code(record: CaptureRecord) -> Optional[int]:
+    data = record.data
+    protocol = record.protocol_id
+    if protocol == "modbus_rtu" and len(data) >= 2:
+        return data[1]
+    if protocol == "modbus_tcp" and len(data) >= 8:
+        return data[7]
+    if protocol == "modbus_ascii" and len(data) >= 5:
+        try:
+            return int(data[3:5], 16)
+        except ValueError:
+            return None
+    return None
+
+
+def _byte(data: bytes, index: int) -> Optional[int]:
+    try:
+        return data[index]
+    except IndexError:
+        return None
+
+
+def _proto_is(record: CaptureRecord, value: str) -> bool:
+    protocol = record.protocol_id
+    return (
+        protocol == value
+        or protocol.startswith(value + "_")
+        or record.protocol_name.lower() == value.lower()
+    )
+
+
+_RUNTIME: Dict[str, Any] = {
+    "__builtins__": {"len": len},
+    "_func": _function_code,
+    "_byte": _byte,
+    "_proto_is": _proto_is,
+}
+
+# Scalar fields: name -> Python expression over ``r``.
+_FIELDS: Dict[str, str] = {
+    "name": "r.protocol_name",
+    "func": "_func(r)",
+    "len": "len(r.data)",
+    "dir": "r.direction",
+    "channel": "r.channel",
+    "crc_ok": "('CRC_INVALID' not in r.error_codes)",
+    "errors": "len(r.error_codes)",
+    "unknown": "(not r.protocol_id)",
+    "confidence": "r.confidence",
+}
+# Value kind per field; ordering needs a number and literals must match the field's kind.
+_KINDS: Dict[str, str] = {
+    "proto": "str",
+    "name": "str",
+    "dir": "str",
+    "channel": "str",
+    "error": "str",
+    "func": "num",
+    "len": "num",
+    "errors": "num",
+    "confidence": "num",
+    "data": "num",
+    "crc_ok": "bool",
+    "unknown": "bool",
+}
+_NULLABLE = {"func", "data"}
+_UPPER_FIELDS = {"dir"}
+_ORDER_OPS = {"<", "<=", ">", ">="}
+_FLIP = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+_TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<num>0[xX][0-9a-fA-F]+|-?\d+\.\d+|-?\d+)
+      | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>&&|\|\||==|!=|<=|>=|<|>|!|\(|\)|\[|\]|,)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+
+_Token = Tuple[str, Any, int]
+
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens: List[_Token] = []
+    pos = 0
+    while pos < len(text):
+        if text[pos:].strip() == "":
+            break
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise CaptureFilterError(f"unexpected character {text[pos:].lstrip()[:1]!r}", pos)
+        kind = match.lastgroup or ""
+        raw = match.group(kind)
+        start = match.start(kind)
+        if kind == "num":
+            value: Any = int(raw, 16) if raw.lower().startswith("0x") else (float(raw) if "." in raw else int(raw))
+            tokens.append(("lit", value, start))
+        elif kind == "str":
+            try:
+                tokens.append(("lit", ast.literal_eval(raw), start))
+            except (ValueError, SyntaxError):
+                raise CaptureFilterError(f"bad string literal {raw}", start) from None
+        elif kind == "name":
+            lowered = raw.lower()
+            if lowered in {"true", "false"}:
+                tokens.append(("lit", lowered == "true", start))
+            elif lowered in {"and", "or", "not", "in"}:
+                tokens.append(("op", {"and": "&&", "or": "||", "not": "!", "in": "in"}[lowered], start))
+            else:
+                tokens.append(("name", raw, start))
+        else:
+            tokens.append(("op", raw, start))
+        pos = match.end()
+    tokens.append(("end", None, len(text)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser emitting Python source."""
+
+    def __init__(self, text: str) -> None:
+        self._tokens = _tokenize(text)
+        self._pos = 0
+
+    def parse(self) -> str:
+        code = self._or()
+        kind, value, pos = self._peek()
+        if kind != "end":
+            raise CaptureFilterError(f"unexpected {value!r}", pos)
+        return code
+
+    def _peek(self) -> _Token:
+        return self._tokens[self._pos]
+
+    def _take(self) -> _Token:
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _accept(self, op: str) -> bool:
+        kind, value, _pos = self._peek()
+        if kind == "op" and value == op:
+            self._pos += 1
+            return True
+        return False
+
+    def _expect(self, op: str) -> None:
+        if not self._accept(op):
+            _kind, value, pos = self._peek()
+            raise CaptureFilterError(f"expected {op!r}, got {value!r}", pos)
+
+    def _or(self) -> str:
+        parts = [self._and()]
+        while self._accept("||"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else "(" + " or ".join(parts) + ")"
+
+    def _and(self) -> str:
+        parts = [self._not()]
+        while self._accept("&&"):
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else "(" + " and ".join(parts) + ")"
+
+    def _not(self) -> str:
+        if self._accept("!"):
+            return f"(not {self._not()})"
+        return self._comparison()
+
+    def _comparison(self) -> str:
+        if self._accept("("):
+            code = self._or()
+            self._expect(")")
+            return code
+        kind, value, pos = self._peek()
+        if kind == "lit":
+            # literal op field: flip into field op literal.
+            literal = self._take()[1]
+            op = self._operator()
+            if op is None or op in {"in", "not in"}:
+                raise CaptureFilterError("a literal must be compared with a field", pos)
+            field = self._field()
+            return self._compare(field, _FLIP[op], literal, pos)
+        field = self._field()
+        op_pos = self._peek()[2]
+        op = self._operator()
+        if op is None:
+            return self._truth(field)
+        if op in {"in", "not in"}:
+            values = self._tuple()
+            for item in values:
+                self._check_kind(field, op, item, op_pos)
+            if field[0] in {"proto", "error"}:
+                code = " or ".join(self._compare(field, "==", item, op_pos) for item in values) or "False"
+            else:
+                if field[0] in _UPPER_FIELDS:
+                    values = [item.upper() if isinstance(item, str) else item for item in values]
+                code = f"{field[1]} in {tuple(values)!r}"
+            return f"({code})" if op == "in" else f"(not ({code}))"
+        kind, literal, lit_pos = self._take()
+        if kind != "lit":
+            raise CaptureFilterError(f"expected a literal after {op!r}", lit_pos)
+        return self._compare(field, op, literal, op_pos)
+
+    def _operator(self) -> Optional[str]:
+        kind, value, _pos = self._peek()
+        if kind != "op":
+            return None
+        if value in {"==", "!=", "<", "<=", ">", ">=", "in"}:
+            self._pos += 1
+            return value
+        if value == "!" and self._tokens[self._pos + 1][:2] == ("op", "in"):
+            self._pos += 2
+            return "not in"
+        return None
+
+    def _tuple(self) -> List[Any]:
+        self._expect("(")
+        values: List[Any] = []
+        if self._accept(")"):
+            return values
+        while True:
+            kind, value, pos = self._take()
+            if kind != "lit":
+                raise CaptureFilterError(f"expected a literal, got {value!r}", pos)
+            values.append(value)
+            if self._accept(")"):
+                return values
+            self._expect(",")
+
+    def _field(self) -> Tuple[str, str]:
+        kind, name, pos = self._take()
+        if kind != "name":
+            raise CaptureFilterError(f"expected a field, got {name!r}", pos)
+        name = name.lower()
+        if name in {"data", "byte"}:
+            self._expect("[")
+            kind, index, idx_pos = self._take()
+            if kind != "lit" or not isinstance(index, int) or isinstance(index, bool):
+                raise CaptureFilterError("byte index must be an integer", idx_pos)
+            self._expect("]")
+            return "data", f"_byte(r.data, {index})"
+        if name == "proto":
+            return "proto", "r.protocol_id"
+        if name == "error":
+            return "error", "r.error_codes"
+        if name not in _FIELDS:
+            raise CaptureFilterError(f"unknown field {name!r}", pos)
+        return name, _FIELDS[name]
+
+    @staticmethod
+    def _truth(field: Tuple[str, str]) -> str:
+        name, code = field
+        if name == "error":
+            return "(len(r.error_codes) > 0)"
+        if name in _NULLABLE:
+            return f"(({code}) not in (None, 0))"
+        return f"({code})"
+
+    @staticmethod
+    def _check_kind(field: Tuple[str, str], op: str, literal: Any, pos: int) -> None:
+        name = field[0]
+        kind = _KINDS[name]
+        if op in _ORDER_OPS and kind != "num":
+            raise CaptureFilterError(f"{name} does not support {op}", pos)
+        if isinstance(literal, bool):
+            literal_kind = "bool"
+        elif isinstance(literal, str):
+            literal_kind = "str"
+        else:
+            literal_kind = "num"
+        if literal_kind != kind:
+            expected = {"str": "a string", "num": "a number", "bool": "true or false"}[kind]
+            raise CaptureFilterError(f"{name} needs {expected}, got {literal!r}", pos)
+
+    @classmethod
+    def _compare(cls, field: Tuple[str, str], op: str, literal: Any, pos: int) -> str:
+        cls._check_kind(field, op, literal, pos)
+        name, code = field
+        if isinstance(literal, str) and name in _UPPER_FIELDS:
+            literal = literal.upper()
+        if name == "error":
+            if op not in {"==", "!="}:
+                raise CaptureFilterError("error only supports ==, != and in", pos)
+            test = f"({literal!r} in r.error_codes)"
+            return test if op == "==" else f"(not {test})"
+        if name == "proto" and isinstance(literal, str) and op in {"==", "!="}:
+            test = f"_proto_is(r, {literal!r})"
+            return test if op == "==" else f"(not {test})"
+        if name in _NULLABLE and op != "==":
+            return f"((_v := {code}) is not None and _v {op} {literal!r})"
+        return f"({code} {op} {literal!r})"
+
+
+class CaptureFilter:
+    """Compiled filter; ``match(record)`` is the generated predicate itself."""
+
+    __slots__ = ("expression", "source", "match")
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression.strip()
+        if not self.expression:
+            raise CaptureFilterError("empty filter expression")
+        self.source = "lambda r: " + _Parser(self.expression).parse()
+        code = compile(self.source, "<capture filter>", "eval")
+        self.match: Predicate = eval(code, dict(_RUNTIME))  # noqa: S307 - source generated from the parse tree
+
+    def __call__(self, record: CaptureRecord) -> bool:
+        return bool(self.match(record))
+
+    def __repr__(self) -> str:
+        return f"CaptureFilter({self.expression!r})"
+
+
+def compile_filter(expression: Optional[str]) -> Optional[CaptureFilter]:
+    """``None`` for an empty expression (no filtering); raises ``CaptureFilterError``."""
+    if expression is None or not str(expression).strip():
+        return None
+    return CaptureFilter(str(expression))
@@ -0,0 +1,97 @@
+"""Compact capture frame records.
+
+The engine publishes one ``CaptureRecord`` per frame: identity, timing, direction,
+channel, the raw bytes and the classification result. Hex dump, ASCII rendering,
+summary and protocol tree are not stored; ``PacketAnalysisEngine.frame_detail``
+materializes them when the UI opens a frame.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from infra.common.chunk import perf_to_wall
+
+_NO_ERRORS: Tuple[str, ...] = ()
+
+
+class CaptureRecord:
+    __slots__ = (
+        "id",
+        "t_ns",
+        "direction",
+        "channel",
+        "data",
+        "protocol_id",
+        "protocol_name",
+        "confidence",
+        "error_codes",
+        "baud",
+    )
+
+    def __init__(
+        self,
+        frame_id: str,
+        t_ns: int,
+        direction: str,
+        channel: str,
+        data: bytes,
+        protocol_id: str = "",
+        protocol_name: str = "Unknown",
+        confidence: float = 0.0,
+        error_codes: Tuple[str, ...] = _NO_ERRORS,
+        baud: Optional[int] = None,
+    ) -> None:
+        self.id = frame_id
+        self.t_ns = t_ns
+        self.direction = direction
+        self.channel = channel
+        self.data = data
+        self.protocol_id = protocol_id
+        self.protocol_name = protocol_name
+        self.confidence = confidence
+        self.error_codes = error_codes or _NO_ERRORS
+        self.baud = baud
+
+    @property
+    def timestamp(self) -> float:
+        return perf_to_wall(self.t_ns)
+
+    @property
+    def length(self) -> int:
+        return len(self.data)
+
+    @property
+    def unknown(self) -> bool:
+        return not self.protocol_id
+
+    @property
+    def has_errors(self) -> bool:
+        return bool(self.error_codes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON-ready form sent to the UI list (no hex dump / tree)."""
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "timestamp_ns": self.t_ns,
+            "direction": self.direction,
+            "channel": self.channel,
+            "baud": self.baud,
+            "length": len(self.data),
+            "raw_hex": self.data.hex(" ").upper(),
+            "protocol": {
+                "id": self.protocol_id,
+                "name": self.protocol_name,
+                "unknown": self.unknown,
+                "confidence": self.confidence,
+            },
+            "error_codes": list(self.error_codes),
+            "detail": False,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"CaptureRecord(id={self.id!r}, direction={self.direction!r}, channel={self.channel!r}, "
+            f"length={len(self.data)}, protocol={self.protocol_id or 'unknown'!r})"
+        )
@@ -0,0 +1,347 @@
+"""Replay recorded traffic through the event bus.
+
+Sources: binary capture files (``CaptureFileWriter``), ``LoggingChannel`` logs
+(``<ts> <RX|TX|EVT> <HEX>`` lines) and experiment ``events.jsonl`` files (byte payloads of
+channel/bus events). Entries are published as ``comm.rx``/``comm.tx`` (one channel) or
+``proxy.data`` (several channels, or ``topic_mode="proxy"``), so ``PacketAnalysisEngine``,
+``ProtocolLoader`` and plugins see the same events as during the live session.
+
+Sources are streamed, never loaded whole: ``open_replay_source`` returns a ``ReplaySource``
+whose channel set (which picks the topic in ``auto`` mode) comes from the capture file's
+index, or from the single channel of a log. Only plain iterators replayed in ``auto`` mode
+are materialised, since their channels are unknown up front.
+
+Chunks keep the recorded spacing in ``Chunk.t_ns`` regardless of speed, so framing
+decisions match the original capture. ``speed=None`` publishes as fast as the pipeline
+drains (load benchmark); ``speed=1.0`` / ``N`` paces publishing at real time / N times
+real time. ``run`` returns a ``ReplayReport`` with chunk and frame throughput.
+
+    python -m app.capture_replay capture.pfcap --speed max
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+from app.capture_file import MAGIC, CaptureFileReader
+from infra.common.chunk import Chunk, perf_to_wall
+from infra.common.event_bus import EventBus
+
+# In max-speed mode the bus (and engine, when given) is drained every this many chunks,
+# so throughput is bounded by the pipeline instead of by drop-oldest backpressure.
+_MAX_SPEED_BATCH = 256
+_DRAIN_TIMEOUT_SEC = 30.0
+# Session id of replayed comm chunks; announced on comm.connected so the engine maps it to the channel.
+_REPLAY_SESSION = "replay"
+
+
+class ReplayEntry(NamedTuple):
+    t_ns: int
+    channel: str
+    direction: str
+    data: bytes
+
+
+@dataclass
+class ReplayReport:
+    source: str
+    speed: Optional[float]
+    chunks: int = 0
+    bytes: int = 0
+    frames: int = 0
+    dropped_chunks: int = 0
+    elapsed_s: float = 0.0
+    recorded_s: float = 0.0
+    max_lag_ms: float = 0.0
+    chunks_per_sec: float = 0.0
+    frames_per_sec: float = 0.0
+    mb_per_sec: float = 0.0
+    stopped: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ReplaySource:
+    """Re-iterable replay input read lazily, with its channel set known without reading the entries."""
+
+    def __init__(self, entries: Callable[[], Iterator[ReplayEntry]], channels: Callable[[], List[str]]) -> None:
+        self._entries = entries
+        self._channels = channels
+
+    def __iter__(self) -> Iterator[ReplayEntry]:
+        return self._entries()
+
+    def channels(self) -> List[str]:
+        return self._channels()
+
+
+def capture_file_channels(path: str | Path) -> List[str]:
+    """Channel names from the capture file's index (or trailer); no data record is read."""
+    with CaptureFileReader(path) as reader:
+        return reader.channels
+
+
+def iter_capture_file(path: str | Path) -> Iterator[ReplayEntry]:
+    with CaptureFileReader(path) as reader:
+        for entry in reader.records():
+            yield ReplayEntry(entry.t_ns, entry.channel, entry.direction, bytes(entry.data))
+
+
+def _log_channel(path: str | Path, channel: str) -> str:
+    return channel or Path(path).stem
+
+
+def _events_channel(path: str | Path, channel: str) -> str:
+    return channel or Path(path).parent.name or "events"
+
+
+def iter_logging_channel(path: str | Path, channel: str = "") -> Iterator[ReplayEntry]:
+    """``LoggingChannel`` lines: ``<unix seconds> <RX|TX|EVT> <HEX>``; EVT counts as RX."""
+    name = _log_channel(path, channel)
+    with Path(path).open("r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) != 3:
+                continue
+            try:
+                t_ns = int(float(parts[0]) * 1e9)
+                data = bytes.fromhex(parts[2])
+            except ValueError:
+                continue
+            direction = "TX" if parts[1].upper() == "TX" else "RX"
+            if data:
+                yield ReplayEntry(t_ns, name, direction, data)
+
+
+def iter_events_jsonl(path: str | Path, channel: str = "") -> Iterator[ReplayEntry]:
+    """Byte payloads of ``ExperimentRecorder`` events (``{"hex": ...}`` or encoded bytes)."""
+    name = _events_channel(path, channel)
+    with Path(path).open("r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(event, dict) or event.get("type") != "event":
+                continue
+            payload = event.get("payload")
+            raw = payload.get("hex") if isinstance(payload, dict) else None
+            if not raw:
+                continue
+            try:
+                data = bytes.fromhex(str(raw))
+                t_ns = int(float(event.get("ts") or 0) * 1e9)
+            except ValueError:
+                continue
+            if data:
+                yield ReplayEntry(t_ns, name, "RX", data)
+
+
+def open_replay_source(path: str | Path, channel: str = "") -> ReplaySource:
+    """Pick the reader by content: capture-file magic, JSONL, otherwise a LoggingChannel log."""
+    path = Path(path)
+    with path.open("rb") as fh:
+        head = fh.read(len(MAGIC))
+    if head == MAGIC:
+        return ReplaySource(lambda: iter_capture_file(path), lambda: capture_file_channels(path))
+    if path.suffix.lower() == ".jsonl" or head.startswith(b"{"):
+        return ReplaySource(lambda: iter_events_jsonl(path, channel), lambda: [_events_channel(path, channel)])
+    return ReplaySource(lambda: iter_logging_channel(path, channel), lambda: [_log_channel(path, channel)])
+
+
+class CaptureReplayer:
+    def __init__(
+        self,
+        bus: EventBus,
+        entries: Iterable[ReplayEntry],
+        speed: Optional[float] = None,
+        topic_mode: str = "auto",
+        engine: Any = None,
+        baud: Optional[int] = None,
+        control_capture: bool = True,
+        source: str = "",
+    ) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be > 0 (None = as fast as possible)")
+        if topic_mode not in {"auto", "comm", "proxy"}:
+            raise ValueError(f"unknown topic_mode: {topic_mode}")
+        self._bus = bus
+        self._entries = entries
+        self._speed = speed
+        self._topic_mode = topic_mode
+        self._engine = engine
+        self._baud = baud
+        self._control_capture = control_capture
+        self._source = source
+        self._stop = threading.Event()
+        self._frames = 0
+        self._frames_lock = threading.Lock()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> ReplayReport:
+        entries: Iterable[ReplayEntry] = self._entries
+        report = ReplayReport(source=self._source, speed=self._speed)
+        proxy = self._topic_mode == "proxy"
+        if self._topic_mode == "auto":
+            channels = self._channel_set()
+            if channels is None:
+                entries = list(entries)
+                channels = {entry.channel for entry in entries}
+            proxy = len(channels) > 1
+        stream = iter(entries)
+        first = next(stream, None)
+        dropped_before = int(getattr(self._engine, "dropped_chunks", 0) or 0)
+        self._bus.subscribe("capture.frame", self._count_frame)
+        try:
+            self._begin(proxy, first)
+            start_perf = time.perf_counter_ns()
+            first_t = t_min = t_max = first.t_ns if first is not None else 0
+            for i, entry in enumerate(itertools.chain((first,), stream) if first is not None else ()):
+                if self._stop.is_set():
+                    report.stopped = True
+                    break
+                t_min, t_max = min(t_min, entry.t_ns), max(t_max, entry.t_ns)
+                offset_ns = entry.t_ns - first_t
+                if self._speed is not None:
+                    lag = self._pace(start_perf, offset_ns)
+                    report.max_lag_ms = max(report.max_lag_ms, lag / 1e6)
+                elif i and i % _MAX_SPEED_BATCH == 0:
+                    self._drain()
+                self._publish(entry, start_perf + offset_ns, proxy)
+                report.chunks += 1
+                report.bytes += len(entry.data)
+            self._end(proxy, first)
+            self._drain()
+            report.elapsed_s = (time.perf_counter_ns() - start_perf) / 1e9
+        finally:
+            self._bus.unsubscribe("capture.frame", self._count_frame)
+        report.recorded_s = (t_max - t_min) / 1e9
+        report.frames = self._frames
+        report.dropped_chunks = int(getattr(self._engine, "dropped_chunks", 0) or 0) - dropped_before
+        if report.elapsed_s > 0:
+            report.chunks_per_sec = round(report.chunks / report.elapsed_s, 1)
+            report.frames_per_sec = round(report.frames / report.elapsed_s, 1)
+            report.mb_per_sec = round(report.bytes / report.elapsed_s / 1e6, 3)
+        return report
+
+    def _channel_set(self) -> Optional[Set[str]]:
+        """Channels of the source without consuming it; None for a plain iterator."""
+        channels = getattr(self._entries, "channels", None)
+        if callable(channels):
+            return set(channels())
+        if isinstance(self._entries, Sequence):
+            return {entry.channel for entry in self._entries}
+        return None
+
+    def _count_frame(self, _payload: Any) -> None:
+        with self._frames_lock:
+            self._frames += 1
+
+    def _pace(self, start_perf: int, offset_ns: int) -> int:
+        """Sleep until the scaled offset; returns how late (ns) the publish is."""
+        due = start_perf + int(offset_ns / self._speed)  # type: ignore[operator]
+        while not self._stop.is_set():
+            remaining = due - time.perf_counter_ns()
+            if remaining <= 0:
+                return -remaining
+            self._stop.wait(min(remaining / 1e9, 0.05))
+        return 0
+
+    def _drain(self) -> None:
+        self._bus.wait_idle(_DRAIN_TIMEOUT_SEC)
+        if self._engine is not None:
+            self._engine.wait_idle(_DRAIN_TIMEOUT_SEC)
+            self._bus.wait_idle(_DRAIN_TIMEOUT_SEC)
+
+    def _begin(self, proxy: bool, first: Optional[ReplayEntry]) -> None:
+        if self._control_capture:
+            self._bus.publish("capture.control", {"action": "start"})
+        if not proxy and first is not None:
+            self._bus.publish(
+                "comm.connected",
+                {"type": "serial", "port": first.channel, "baud": self._baud, "session_id": _REPLAY_SESSION},
+            )
+        self._bus.wait_idle(_DRAIN_TIMEOUT_SEC)
+
+    def _end(self, proxy: bool, first: Optional[ReplayEntry]) -> None:
+        self._drain()
+        if not proxy and first is not None:
+            # Like CommunicationManager: the per-session topic plus the global one.
+            self._bus.publish(f"comm.disconnected.{_REPLAY_SESSION}", None)
+            self._bus.publish("comm.disconnected", None)
+        if self._control_capture:
+            self._bus.publish("capture.control", {"action": "stop"})
+
+    def _publish(self, entry: ReplayEntry, t_ns: int, proxy: bool) -> None:
+        chunk = Chunk(entry.data, t_ns=t_ns, session_id=_REPLAY_SESSION)
+        if not proxy:
+            self._bus.publish("comm.tx" if entry.direction == "TX" else "comm.rx", chunk)
+            return
+        host = entry.direction == "TX"
+        self._bus.publish(
+            "proxy.data",
+            {
+                "pair_id": "replay",
+                "src": entry.channel,
+                "dst": "",
+                "src_role": "host" if host else "device",
+                "dst_role": "device" if host else "host",
+                "host_port": entry.channel,
+                "device_port": "",
+                "data": chunk,
+                "ts": perf_to_wall(t_ns),
+                "t_ns": t_ns,
+            },
+        )
+
+
+def main(argv=None) -> int:
+    from app.packet_engine import PacketAnalysisEngine
+
+    parser = argparse.ArgumentParser(description="Replay a capture through PacketAnalysisEngine")
+    parser.add_argument("source", help="capture file, LoggingChannel log or events.jsonl")
+    parser.add_argument("--speed", default="max", help="max | 1 | N (times real time)")
+    parser.add_argument("--mode", default="auto", choices=["auto", "comm", "proxy"])
+    parser.add_argument("--baud", type=int, default=None, help="serial baud for t3.5 framing (comm mode)")
+    parser.add_argument("--channel", default="", help="channel name for log/jsonl sources")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    speed = None if str(args.speed).lower() == "max" else float(args.speed)
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus)
+    replayer = CaptureReplayer(
+        bus,
+        open_replay_source(args.source, args.channel),
+        speed=speed,
+        topic_mode=args.mode,
+        engine=engine,
+        baud=args.baud,
+        source=str(args.source),
+    )
+    report = replayer.run()
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(
+            f"{report.chunks} chunks / {report.frames} frames in {report.elapsed_s:.3f}s "
+            f"({report.frames_per_sec:.0f} frames/s, {report.mb_per_sec:.2f} MB/s, "
+            f"dropped={report.dropped_chunks}, max lag={report.max_lag_ms:.1f} ms)"
+        )
+    bus.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
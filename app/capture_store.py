@@ -0,0 +1,271 @@
+"""Bounded in-memory store of capture records.
+
+Records are kept in publish order in a ring limited by a byte budget (raw bytes plus a
+fixed per-record overhead); the oldest records are evicted first. Every record is also
+entered in time-sorted indexes (all frames, channel, direction, protocol, error code), so
+a range query bisects the most selective index instead of scanning the ring.
+
+Indexes are parallel ``array('q')`` columns (timestamp, sequence number). Evicted entries
+are not removed one by one: queries skip sequence numbers below the ring head and an
+index is rebuilt once more than half of it is stale.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.capture_record import CaptureRecord
+
+# Approximate Python cost of one record besides its payload: slotted object, bytes
+# header, id string, id map entry and one entry per index.
+RECORD_OVERHEAD = 320
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+
+_Key = Tuple[str, str]
+_ALL: _Key = ("all", "")
+_ANY_ERROR = "*"
+
+
+class _TimeIndex:
+    __slots__ = ("t", "seq", "live")
+
+    def __init__(self) -> None:
+        self.t = array("q")
+        self.seq = array("q")
+        self.live = 0
+
+    def add(self, t_ns: int, seq: int) -> None:
+        self.live += 1
+        if not self.t or t_ns >= self.t[-1]:
+            self.t.append(t_ns)
+            self.seq.append(seq)
+            return
+        # Streams of different channels/directions interleave slightly out of order.
+        pos = bisect_right(self.t, t_ns)
+        self.t.insert(pos, t_ns)
+        self.seq.insert(pos, seq)
+
+    def span(self, start_ns: Optional[int], end_ns: Optional[int]) -> Tuple[int, int]:
+        lo = 0 if start_ns is None else bisect_left(self.t, start_ns)
+        hi = len(self.t) if end_ns is None else bisect_left(self.t, end_ns)
+        return lo, max(lo, hi)
+
+    def compact(self, first_seq: int) -> None:
+        keep = [i for i, seq in enumerate(self.seq) if seq >= first_seq]
+        self.t = array("q", (self.t[i] for i in keep))
+        self.seq = array("q", (self.seq[i] for i in keep))
+        self.live = len(keep)
+
+
+class CaptureStore:
+    """Ring of ``CaptureRecord`` objects with a byte budget and time/key indexes."""
+
+    def __init__(self, byte_budget: int = DEFAULT_BYTE_BUDGET, max_records: Optional[int] = None) -> None:
+        self._budget = max(RECORD_OVERHEAD, int(byte_budget))
+        self._max_records = max_records
+        self._lock = threading.Lock()
+        self._ring: List[Optional[CaptureRecord]] = []
+        self._head = 0
+        # Sequence number of _ring[0]; sequence numbers never repeat.
+        self._base = 0
+        self._by_id: Dict[str, int] = {}
+        self._indexes: Dict[_Key, _TimeIndex] = {}
+        self._bytes = 0
+        self._evicted = 0
+
+    @property
+    def byte_budget(self) -> int:
+        return self._budget
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def append(self, record: CaptureRecord) -> int:
+        with self._lock:
+            seq = self._base + len(self._ring)
+            self._ring.append(record)
+            self._by_id[record.id] = seq
+            self._bytes += self._cost(record)
+            for key in self._keys(record):
+                index = self._indexes.get(key)
+                if index is None:
+                    index = self._indexes[key] = _TimeIndex()
+                index.add(record.t_ns, seq)
+            self._evict()
+            return seq
+
+    def get(self, frame_id: str) -> Optional[CaptureRecord]:
+        with self._lock:
+            seq = self._by_id.get(frame_id)
+            return None if seq is None else self._ring[seq - self._base]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._base += len(self._ring)
+            self._ring = []
+            self._head = 0
+            self._by_id.clear()
+            self._indexes.clear()
+            self._bytes = 0
+
+    def query(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        channel: Optional[str] = None,
+        direction: Optional[str] = None,
+        protocol: Optional[str] = None,
+        error: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        where: Optional[Callable[[CaptureRecord], Any]] = None,
+    ) -> List[CaptureRecord]:
+        """Records with ``start_ns <= t_ns < end_ns`` matching every given key, in time order.
+
+        ``protocol=""`` selects unclassified frames; ``error="*"`` any frame with errors;
+        ``where`` is an extra predicate (e.g. a compiled ``CaptureFilter``) run on candidates.
+        """
+        out: List[CaptureRecord] = []
+        if limit is not None and limit <= 0:
+            return out
+        skip = max(0, offset)
+        with self._lock:
+            for record in self._scan(start_ns, end_ns, channel, direction, protocol, error, where):
+                if skip:
+                    skip -= 1
+                    continue
+                out.append(record)
+                if limit is not None and len(out) >= limit:
+                    break
+        return out
+
+    def count(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        channel: Optional[str] = None,
+        direction: Optional[str] = None,
+        protocol: Optional[str] = None,
+        error: Optional[str] = None,
+        where: Optional[Callable[[CaptureRecord], Any]] = None,
+    ) -> int:
+        with self._lock:
+            if channel is None and direction is None and protocol is None and error is None and where is None:
+                index = self._indexes.get(_ALL)
+                if index is None:
+                    return 0
+                lo, hi = index.span(start_ns, end_ns)
+                if index.live == len(index.seq):
+                    return hi - lo
+            return sum(1 for _ in self._scan(start_ns, end_ns, channel, direction, protocol, error, where))
+
+    def channels(self) -> List[str]:
+        with self._lock:
+            return sorted(key[1] for key, index in self._indexes.items() if key[0] == "channel" and index.live)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            first = next(iter(self._scan(None, None, None, None, None, None)), None)
+            index = self._indexes.get(_ALL)
+            return {
+                "records": len(self._by_id),
+                "bytes": self._bytes,
+                "byte_budget": self._budget,
+                "evicted": self._evicted,
+                "first_ns": first.t_ns if first is not None else None,
+                "last_ns": index.t[-1] if index is not None and index.t else None,
+            }
+
+    def _scan(
+        self,
+        start_ns: Optional[int],
+        end_ns: Optional[int],
+        channel: Optional[str],
+        direction: Optional[str],
+        protocol: Optional[str],
+        error: Optional[str],
+        where: Optional[Callable[[CaptureRecord], Any]] = None,
+    ) -> Iterable[CaptureRecord]:
+        keys = [_ALL]
+        if channel is not None:
+            keys.append(("channel", channel))
+        if direction is not None:
+            keys.append(("direction", direction.upper()))
+        if protocol is not None:
+            keys.append(("protocol", protocol))
+        if error is not None:
+            keys.append(("error", error))
+        best: Optional[Tuple[_TimeIndex, int, int]] = None
+        for key in keys:
+            index = self._indexes.get(key)
+            if index is None:
+                return
+            lo, hi = index.span(start_ns, end_ns)
+            if best is None or hi - lo < best[2] - best[1]:
+                best = (index, lo, hi)
+        assert best is not None
+        index, lo, hi = best
+        first = self._base + self._head
+        for pos in range(lo, hi):
+            seq = index.seq[pos]
+            if seq < first:
+                continue
+            record = self._ring[seq - self._base]
+            if record is None:
+                continue
+            if channel is not None and record.channel != channel:
+                continue
+            if direction is not None and record.direction != direction.upper():
+                continue
+            if protocol is not None and record.protocol_id != protocol:
+                continue
+            if error is not None and not self._has_error(record, error):
+                continue
+            if where is not None and not where(record):
+                continue
+            yield record
+
+    def _evict(self) -> None:
+        while self._head < len(self._ring) and (
+            self._bytes > self._budget or (self._max_records is not None and len(self._by_id) > self._max_records)
+        ):
+            record = self._ring[self._head]
+            self._ring[self._head] = None
+            self._head += 1
+            self._evicted += 1
+            if record is None:
+                continue
+            self._by_id.pop(record.id, None)
+            self._bytes -= self._cost(record)
+            for key in self._keys(record):
+                index = self._indexes[key]
+                index.live -= 1
+                if index.live == 0:
+                    del self._indexes[key]
+                elif index.live * 2 < len(index.seq):
+                    index.compact(self._base + self._head)
+        if self._head and self._head * 2 >= len(self._ring):
+            del self._ring[: self._head]
+            self._base += self._head
+            self._head = 0
+
+    @staticmethod
+    def _cost(record: CaptureRecord) -> int:
+        return len(record.data) + RECORD_OVERHEAD
+
+    @staticmethod
+    def _keys(record: CaptureRecord) -> List[_Key]:
+        keys = [_ALL, ("channel", record.channel), ("direction", record.direction), ("protocol", record.protocol_id)]
+        if record.error_codes:
+            keys.append(("error", _ANY_ERROR))
+            keys.extend(("error", code) for code in dict.fromkeys(record.error_codes))
+        return keys
+
+    @staticmethod
+    def _has_error(record: CaptureRecord, error: str) -> bool:
+        if error == _ANY_ERROR:
+            return bool(record.error_codes)
+        return error in record.error_codes
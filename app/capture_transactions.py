@@ -0,0 +1,368 @@
+"""Request/response pairing and latency statistics for capture records.
+
+TX records are requests (host -> device), RX records responses. Pairing rules:
+
+- Modbus RTU: unit + function code (exception responses set bit 7); unit 0 is broadcast
+- Modbus TCP: transaction id (unit and function taken from the request)
+- AT: one outstanding command per channel, closed by a final result line
+  (``OK`` / ``ERROR`` / ``+CME ERROR`` / ...); echo and intermediate lines are skipped
+- SCPI: a query (header ending in ``?``) is answered by the next RX frame on the channel
+
+Latency is first byte of the response minus first byte of the request (``t_ns``).
+Requests without an answer within ``timeout_ns`` (judged against later record
+timestamps or ``expire(now_ns)``) count as timeouts.
+
+Each (channel, protocol, device, function) key keeps a ``LatencyHistogram``: sparse
+log-scale buckets (16 per power of two, ~4% resolution), so p50/p95/p99 cost O(buckets)
+and memory does not grow with the number of transactions. ``snapshot`` returns those rows
+plus roll-ups per channel, device and function.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.capture_record import CaptureRecord
+
+DEFAULT_TIMEOUT_NS = 1_000_000_000
+_SUB_BUCKETS = 16
+_MAX_PENDING_PER_KEY = 256
+
+_StatKey = Tuple[str, str, str, str]
+_AT_FINAL_OK = ("OK", "CONNECT")
+_AT_FINAL_ERROR = ("ERROR", "+CME ERROR", "+CMS ERROR", "NO CARRIER", "BUSY", "NO ANSWER", "NO DIALTONE")
+
+
+class LatencyHistogram:
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "errors", "timeouts", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, latency_ns: int) -> None:
+        latency_ns = max(0, int(latency_ns))
+        if self.count == 0 or latency_ns < self.min_ns:
+            self.min_ns = latency_ns
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+        self.count += 1
+        self.total_ns += latency_ns
+        index = int(math.log2(latency_ns) * _SUB_BUCKETS) if latency_ns > 1 else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.count:
+            if self.count == 0 or other.min_ns < self.min_ns:
+                self.min_ns = other.min_ns
+            self.max_ns = max(self.max_ns, other.max_ns)
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.errors += other.errors
+        self.timeouts += other.timeouts
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+
+    def percentile(self, q: float) -> int:
+        """Upper bound of the bucket holding the q-th sample, clamped to [min, max]."""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                upper = int(2 ** ((index + 1) / _SUB_BUCKETS))
+                return min(max(upper, self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(ns: float) -> float:
+            return round(ns / 1e6, 3)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "min_ms": ms(self.min_ns),
+            "max_ms": ms(self.max_ns),
+            "mean_ms": ms(self.total_ns / self.count) if self.count else 0.0,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+        }
+
+
+class Transaction:
+    __slots__ = ("channel", "protocol", "device", "function", "request_id", "response_id", "latency_ns", "ok", "timed_out")
+
+    def __init__(
+        self,
+        channel: str,
+        protocol: str,
+        device: str,
+        function: str,
+        request_id: str,
+        response_id: str = "",
+        latency_ns: int = 0,
+        ok: bool = True,
+        timed_out: bool = False,
+    ) -> None:
+        self.channel = channel
+        self.protocol = protocol
+        self.device = device
+        self.function = function
+        self.request_id = request_id
+        self.response_id = response_id
+        self.latency_ns = latency_ns
+        self.ok = ok
+        self.timed_out = timed_out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "protocol": self.protocol,
+            "device": self.device,
+            "function": self.function,
+            "request_id": self.request_id,
+            "response_id": self.response_id,
+            "latency_ms": round(self.latency_ns / 1e6, 3),
+            "ok": self.ok,
+            "timeout": self.timed_out,
+        }
+
+
+class _Pending:
+    __slots__ = ("t_ns", "record_id", "device", "function")
+
+    def __init__(self, t_ns: int, record_id: str, device: str, function: str) -> None:
+        self.t_ns = t_ns
+        self.record_id = record_id
+        self.device = device
+        self.function = function
+
+
+# Pairing key -> outstanding requests (oldest first).
+_PendingKey = Tuple[str, str, Any]
+
+
+def _text_lines(data: bytes) -> List[str]:
+    text = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def _at_function(line: str) -> str:
+    command = line.split(";")[0].strip().upper()
+    for sep in ("=", "?"):
+        command = command.split(sep)[0]
+    return command or "AT"
+
+
+class TransactionMatcher:
+    """Pairs TX requests with RX responses and aggregates latency per key."""
+
+    def __init__(self, timeout_ns: int = DEFAULT_TIMEOUT_NS) -> None:
+        self.timeout_ns = int(timeout_ns)
+        self._lock = threading.Lock()
+        self._pending: Dict[_PendingKey, Deque[_Pending]] = {}
+        self._stats: Dict[_StatKey, LatencyHistogram] = {}
+        self._transactions = 0
+        self._unmatched = 0
+        self._version = 0
+        self._requests: Dict[str, Callable[[CaptureRecord], Optional[Tuple[Any, str, str]]]] = {
+            "modbus_rtu": self._rtu_request,
+            "modbus_tcp": self._tcp_request,
+            "at_command": self._at_request,
+            "scpi": self._scpi_request,
+        }
+
+    @property
+    def version(self) -> int:
+        """Incremented on every change; lets publishers skip unchanged snapshots."""
+        return self._version
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._stats.clear()
+            self._transactions = 0
+            self._unmatched = 0
+            self._version += 1
+
+    def observe(self, record: CaptureRecord) -> List[Transaction]:
+        """Feed one record; returns completed transactions (including expired requests)."""
+        with self._lock:
+            done = self._expire(record.t_ns)
+            if record.direction == "TX":
+                self._request(record)
+            else:
+                transaction = self._response(record)
+                if transaction is not None:
+                    done.append(transaction)
+            return done
+
+    def expire(self, now_ns: int) -> List[Transaction]:
+        with self._lock:
+            return self._expire(now_ns)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._pending.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = [
+                {"channel": key[0], "protocol": key[1], "device": key[2], "function": key[3], **hist.to_dict()}
+                for key, hist in sorted(self._stats.items())
+            ]
+            total = LatencyHistogram()
+            for hist in self._stats.values():
+                total.merge(hist)
+            return {
+                "transactions": self._transactions,
+                "unmatched_responses": self._unmatched,
+                "pending": sum(len(queue) for queue in self._pending.values()),
+                "timeout_ms": round(self.timeout_ns / 1e6, 3),
+                "total": total.to_dict(),
+                "groups": rows,
+                "by_channel": self._rollup(lambda key: {"channel": key[0]}),
+                "by_device": self._rollup(lambda key: {"channel": key[0], "protocol": key[1], "device": key[2]}),
+                "by_function": self._rollup(lambda key: {"protocol": key[1], "function": key[3]}),
+            }
+
+    def _rollup(self, label: Callable[[_StatKey], Dict[str, str]]) -> List[Dict[str, Any]]:
+        merged: Dict[Tuple[Tuple[str, str], ...], LatencyHistogram] = {}
+        for key, hist in self._stats.items():
+            group = tuple(sorted(label(key).items()))
+            target = merged.get(group)
+            if target is None:
+                target = merged[group] = LatencyHistogram()
+            target.merge(hist)
+        return [{**dict(group), **hist.to_dict()} for group, hist in sorted(merged.items())]
+
+    def _request(self, record: CaptureRecord) -> None:
+        parse = self._requests.get(record.protocol_id)
+        parsed = parse(record) if parse is not None else None
+        if parsed is None:
+            return
+        pair_key, device, function = parsed
+        key = (record.channel, record.protocol_id, pair_key)
+        queue = self._pending.get(key)
+        if queue is None:
+            queue = self._pending[key] = deque()
+        if len(queue) >= _MAX_PENDING_PER_KEY:
+            self._finish_timeout(key, queue.popleft())
+        queue.append(_Pending(record.t_ns, record.id, device, function))
+        self._version += 1
+
+    def _response(self, record: CaptureRecord) -> Optional[Transaction]:
+        protocol = record.protocol_id
+        channel = record.channel
+        if protocol == "modbus_rtu" and len(record.data) >= 2:
+            key = (channel, protocol, (record.data[0], record.data[1] & 0x7F))
+            ok = not (record.data[1] & 0x80) and not record.error_codes
+            return self._complete(key, record, ok)
+        if protocol == "modbus_tcp" and len(record.data) >= 8:
+            key = (channel, protocol, bytes(record.data[0:2]))
+            return self._complete(key, record, not (record.data[7] & 0x80) and not record.error_codes)
+        # Text protocols: replies are often classified differently from the request
+        # (or not at all), so look at what the channel is waiting for.
+        at_key = (channel, "at_command", None)
+        if self._pending.get(at_key):
+            for line in _text_lines(record.data):
+                upper = line.upper()
+                if upper.startswith(_AT_FINAL_OK):
+                    return self._complete(at_key, record, True)
+                if upper.startswith(_AT_FINAL_ERROR):
+                    return self._complete(at_key, record, False)
+            return None
+        scpi_key = (channel, "scpi", None)
+        if self._pending.get(scpi_key):
+            lines = _text_lines(record.data)
+            ok = not (lines and lines[0].startswith("-") and "," in lines[0] and lines[0][1:].split(",")[0].isdigit())
+            return self._complete(scpi_key, record, ok)
+        return None
+
+    def _complete(self, key: _PendingKey, record: CaptureRecord, ok: bool) -> Optional[Transaction]:
+        queue = self._pending.get(key)
+        if not queue:
+            self._unmatched += 1
+            self._version += 1
+            return None
+        pending = queue.popleft()
+        if not queue:
+            del self._pending[key]
+        latency = record.t_ns - pending.t_ns
+        hist = self._histogram(key, pending)
+        hist.add(latency)
+        if not ok:
+            hist.errors += 1
+        self._transactions += 1
+        self._version += 1
+        return Transaction(key[0], key[1], pending.device, pending.function, pending.record_id, record.id, latency, ok)
+
+    def _expire(self, now_ns: int) -> List[Transaction]:
+        done: List[Transaction] = []
+        if not self._pending:
+            return done
+        deadline = now_ns - self.timeout_ns
+        for key in list(self._pending):
+            queue = self._pending[key]
+            while queue and queue[0].t_ns < deadline:
+                done.append(self._finish_timeout(key, queue.popleft()))
+            if not queue:
+                del self._pending[key]
+        return done
+
+    def _finish_timeout(self, key: _PendingKey, pending: _Pending) -> Transaction:
+        self._histogram(key, pending).timeouts += 1
+        self._version += 1
+        return Transaction(key[0], key[1], pending.device, pending.function, pending.record_id, ok=False, timed_out=True)
+
+    def _histogram(self, key: _PendingKey, pending: _Pending) -> LatencyHistogram:
+        stat_key = (key[0], key[1], pending.device, pending.function)
+        hist = self._stats.get(stat_key)
+        if hist is None:
+            hist = self._stats[stat_key] = LatencyHistogram()
+        return hist
+
+    @staticmethod
+    def _rtu_request(record: CaptureRecord) -> Optional[Tuple[Any, str, str]]:
+        data = record.data
+        if len(data) < 4 or data[0] == 0 or data[1] & 0x80 or "CRC_INVALID" in record.error_codes:
+            return None
+        return (data[0], data[1]), str(data[0]), f"0x{data[1]:02X}"
+
+    @staticmethod
+    def _tcp_request(record: CaptureRecord) -> Optional[Tuple[Any, str, str]]:
+        data = record.data
+        if len(data) < 8 or data[7] & 0x80:
+            return None
+        return bytes(data[0:2]), str(data[6]), f"0x{data[7]:02X}"
+
+    @staticmethod
+    def _at_request(record: CaptureRecord) -> Optional[Tuple[Any, str, str]]:
+        lines = _text_lines(record.data)
+        if not lines or not lines[0].upper().startswith("AT"):
+            return None
+        return None, "", _at_function(lines[0])
+
+    @staticmethod
+    def _scpi_request(record: CaptureRecord) -> Optional[Tuple[Any, str, str]]:
+        lines = _text_lines(record.data)
+        if not lines:
+            return None
+        for part in lines[0].split(";"):
+            header = part.strip().split(" ")[0]
+            if header.endswith("?"):
+                return None, "", header.upper()
+        return None
+
@@ -365,6 +365,7 @@ def main() -> None:
         plugin_manager=plugin_manager,
         proxy_manager=proxy_manager,
         proxy_monitor_enabled=proxy_enabled,
+        packet_engine=packet_engine,
     )
     window.show()
     print("ProtoFlow Web UI started")
@@ -1,18 +1,84 @@
 """Packet analysis engine for streaming capture frames.
 
 Subscribes to comm.rx/comm.tx and publishes structured frame data to the bus.
+Frames carry the source timestamp stamped by the reader (``Chunk.t_ns``), not the
+time the engine happened to dequeue them.
+
+Comm chunks are attributed to their session (``Chunk.session_id``): every session has its
+own channel (serial port or TCP address) and baud, so concurrent sessions never share a
+stream, and a connect/disconnect only flushes that session's channel.
+
+Read chunks are not frames: each (channel, direction) stream goes through a
+``StreamReassembler`` that cuts frames by the protocol's length rules, falling back to
+a baud-derived inter-character gap, so one ``capture.frame`` is published per frame.
+The rule follows the configured protocol, not the transport. Modbus TCP channels are cut by
+the MBAP length field (``ModbusTcpRule``): the host side of a Modbus gateway pair (``framing``
+on ``proxy.data``), or any channel without a baud when ``capture.control`` start sets
+``framing: "modbus_tcp"``. Serial channels with a known baud rate (the comm session's, or
+the ``baud`` a proxy pair puts on ``proxy.data`` for bytes crossing its serial line) use
+``RtuFramer`` (t1.5/t3.5 silent intervals). Everything else, including serial-over-TCP and
+text protocols on TCP, uses the RTU length rule with the gap fallback.
+
+Frames are classified by a ``DetectorRegistry``: the built-in Modbus RTU detector plus
+every protocol package under ``protocols/`` that implements ``probe``/``decode``.
+
+Published frames are compact ``CaptureRecord`` objects (raw bytes + classification);
+hex dump, ASCII, summary and protocol tree are rendered by ``frame_detail`` only when
+a frame is opened. Every published record is kept in a byte-budgeted ``CaptureStore``
+that answers time/channel/direction/protocol/error range queries, and optionally
+appended to a binary ``CaptureFileWriter`` (``capture.control`` start with ``record_path``).
+
+An optional compiled ``CaptureFilter`` (``set_filter``) decides which records are published
+as ``capture.frame``; filtered-out frames are still stored and recorded but never cross the
+bus or the UI boundary.
+
+Every record also feeds a ``TransactionMatcher`` (request/response pairing, latency
+histograms); its snapshot is published as ``capture.stats`` at most once per second while
+it changes, and on capture stop.
+
+Framing and classification run on ``workers`` decode shards (``PROTOFLOW_CAPTURE_WORKERS``,
+default 1). Each channel is pinned to one shard (the one with the fewest channels when it is
+first seen), so frames of a channel keep their order while busy channels do not delay the
+others. Every shard has its own bounded queue and framers and reports queue depth and
+decode time in ``decode_stats`` (also the ``decode`` field of ``capture.stats``).
 """
 
 from __future__ import annotations
 
+import itertools
+import os
 import queue
 import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.capture_file import CaptureFileWriter
+from app.capture_filter import CaptureFilter, compile_filter
+from app.capture_record import CaptureRecord
+from app.capture_store import DEFAULT_BYTE_BUDGET, CaptureStore
+from app.capture_transactions import TransactionMatcher
+from infra.common.chunk import Chunk, chunk_time_ns, perf_to_wall, wall_to_perf
+from infra.common.event_bus import BackpressurePolicy, EventBus
+from dsl_runtime.protocol_package import load_protocol_packages
+from infra.protocol.detectors import DetectorRegistry
+from infra.protocol.stream_framer import ModbusRtuRule, ModbusTcpRule, RtuFramer, StreamReassembler, char_gap_ns
+
 
-from infra.common.event_bus import EventBus
-from infra.protocol.protocol_loader import crc16_modbus
+_MAX_PENDING_CHUNKS = 4096
+# Worker wake-up interval while some stream holds a partial frame (gap/timeout flush).
+_FRAMER_POLL_SEC = 0.005
+_IDLE_POLL_SEC = 0.2
+# ``framing`` value selecting MBAP length framing (the Modbus TCP protocol id).
+FRAMING_MODBUS_TCP = "modbus_tcp"
+# Queue marker asking the worker to emit every buffered partial frame.
+_FLUSH = ("", b"", 0, "")
+# Same for the streams of one channel only (marker channel field); queued on that channel's shard.
+_FLUSH_CHANNEL = "FLUSH"
+# Same, then close the capture file of stop ticket ``t_ns`` once every shard has flushed.
+_FLUSH_AND_CLOSE = "STOP"
+_STATS_INTERVAL_SEC = 1.0
 
 
 @dataclass
@@ -22,45 +88,116 @@ class _ChannelInfo:
     baud: Optional[int] = None
     host: Optional[str] = None
     address: Optional[str] = None
+    framing: Optional[str] = None
+
+
+class _DecodeShard:
+    """One decode worker: its own queue, framers (keyed by (channel, direction)) and counters."""
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.queue: "queue.Queue[Tuple[str, bytes, int, str]]" = queue.Queue(maxsize=_MAX_PENDING_CHUNKS)
+        # Owned by this shard's thread only.
+        self.framers: Dict[Tuple[str, str], StreamReassembler] = {}
+        self.channels: List[str] = []
+        self.chunks = 0
+        self.frames = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.decode_ns = 0
+        self.max_decode_ns = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shard": self.index,
+            "channels": list(self.channels),
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "chunks": self.chunks,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "decode_ms": round(self.decode_ns / 1e6, 3),
+            "decode_us_mean": round(self.decode_ns / self.chunks / 1e3, 1) if self.chunks else 0.0,
+            "decode_us_max": round(self.max_decode_ns / 1e3, 1),
+        }
 
 
 class PacketAnalysisEngine:
     """Streaming packet parser that emits capture.frame events."""
 
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(
+        self,
+        bus: EventBus,
+        detectors: Optional[DetectorRegistry] = None,
+        store: Optional[CaptureStore] = None,
+        workers: Optional[int] = None,
+    ) -> None:
         self._bus = bus
-        self._queue: "queue.Queue[Tuple[str, bytes, float, str]]" = queue.Queue()
-        self._channel = _ChannelInfo()
+        self._detectors = detectors if detectors is not None else self._default_detectors()
+        self._store = store if store is not None else CaptureStore(self._default_byte_budget())
+        self._shards = [_DecodeShard(i) for i in range(max(1, workers or self._default_workers()))]
+        self._shard_of: Dict[str, _DecodeShard] = {}
+        self._lock = threading.Lock()
+        # Comm session id ("" for publishers without one) -> its channel info, and the same
+        # infos by channel for the decode shards (baud/framing of the stream being framed).
+        self._sessions: Dict[str, _ChannelInfo] = {}
+        self._channels: Dict[str, _ChannelInfo] = {}
+        self._session_topics: Set[str] = set()
         self._enabled = False
         self._target_channel: Optional[str] = None
-        self._counter = 0
+        # Capture-wide framing for channels that configure none (capture.control start ``framing``).
+        self._framing: Optional[str] = None
+        self._recorder: Optional[CaptureFileWriter] = None
+        self._filter: Optional[CaptureFilter] = None
+        self._filter_failed: Optional[CaptureFilter] = None
+        self._filtered = 0
+        self._transactions = TransactionMatcher()
+        self._stats_signature: Tuple[int, int] = (0, 0)
+        self._stats_published = 0.0
+        self._stats_lock = threading.Lock()
+        # Stop ticket -> writer to close once every shard has flushed the stopped capture,
+        # and how many shards still have to acknowledge the ticket.
+        self._closing: Dict[int, CaptureFileWriter] = {}
+        self._closing_acks: Dict[int, int] = {}
+        self._tickets = itertools.count(1)
+        self._ids = itertools.count(1)
+        self._rule = ModbusRtuRule()
+        self._tcp_rule = ModbusTcpRule()
         self._stop = threading.Event()
-        self._worker = threading.Thread(target=self._run, daemon=True)
-        self._worker.start()
-        self._bus.subscribe("comm.rx", self._on_rx)
-        self._bus.subscribe("comm.tx", self._on_tx)
+        for shard in self._shards:
+            threading.Thread(target=self._run, args=(shard,), daemon=True, name=f"capture-decode-{shard.index}").start()
+        # Overload sheds the oldest chunks; the reassembler resynchronises on the next valid frame.
+        data_policy = BackpressurePolicy.drop_oldest(_MAX_PENDING_CHUNKS)
+        self._bus.subscribe("comm.rx", self._on_rx, policy=data_policy)
+        self._bus.subscribe("comm.tx", self._on_tx, policy=data_policy)
         self._bus.subscribe("comm.connected", self._on_connected)
         self._bus.subscribe("comm.disconnected", self._on_disconnected)
         self._bus.subscribe("capture.control", self._on_control)
-        self._bus.subscribe("proxy.data", self._on_proxy_data)
+        self._bus.subscribe("proxy.data", self._on_proxy_data, policy=data_policy)
 
     def _on_rx(self, payload: Any) -> None:
-        if not self._enabled:
-            return
-        data = self._to_bytes(payload)
-        if data:
-            if self._target_channel and self._channel.channel and self._channel.channel != self._target_channel:
-                return
-            self._queue.put(("RX", data, time.time(), self._channel.channel or ""))
+        self._on_comm("RX", payload)
 
     def _on_tx(self, payload: Any) -> None:
+        self._on_comm("TX", payload)
+
+    def _on_comm(self, direction: str, payload: Any) -> None:
         if not self._enabled:
             return
         data = self._to_bytes(payload)
         if data:
-            if self._target_channel and self._channel.channel and self._channel.channel != self._target_channel:
+            channel = self._comm_channel(payload)
+            if self._target_channel and channel and channel != self._target_channel:
                 return
-            self._queue.put(("TX", data, time.time(), self._channel.channel or ""))
+            self._enqueue((direction, data, chunk_time_ns(payload), channel))
+
+    def _comm_channel(self, payload: Any) -> str:
+        """Channel of a comm chunk: its session's port/address, else the session id itself."""
+        session_id = (payload.session_id if isinstance(payload, Chunk) else None) or ""
+        info = self._sessions.get(session_id)
+        if info is not None and info.channel:
+            return info.channel
+        return session_id
 
     def _on_proxy_data(self, payload: Any) -> None:
         if not self._enabled:
@@ -88,153 +225,484 @@ class PacketAnalysisEngine:
         if self._target_channel:
             channel = self._target_channel
         else:
-            channel = host_port or src
-        ts = float(payload.get("ts") or time.time())
-        self._queue.put((direction, data, ts, channel))
+            # Gateway pairs speak a different protocol on each side and name the wire explicitly.
+            channel = str(payload.get("channel") or "") or host_port or src
+        baud = int(payload.get("baud") or 0) or None
+        framing = str(payload.get("framing") or "") or None
+        if baud or framing:
+            self._note_channel(channel, baud, framing)
+        t_ns = payload.get("t_ns")
+        if t_ns is None:
+            ts = payload.get("ts")
+            t_ns = wall_to_perf(float(ts)) if ts else chunk_time_ns(data)
+        self._enqueue((direction, data, int(t_ns), channel))
+
+    def _note_channel(self, channel: str, baud: Optional[int], framing: Optional[str]) -> None:
+        """Remember the line baud / framing of a proxy channel for its framer and records."""
+        info = self._channels.get(channel)
+        if info is None or info.baud != baud or info.framing != framing:
+            with self._lock:
+                self._channels[channel] = _ChannelInfo(channel=channel, baud=baud, framing=framing)
+
+    @property
+    def dropped_chunks(self) -> int:
+        return sum(shard.dropped for shard in self._shards)
+
+    @property
+    def workers(self) -> int:
+        return len(self._shards)
+
+    def decode_stats(self) -> Dict[str, Any]:
+        """Per-shard queue depth, throughput and decode time."""
+        return {"workers": len(self._shards), "shards": [shard.stats() for shard in self._shards]}
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued chunk/marker has been framed and published."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any(shard.queue.unfinished_tasks for shard in self._shards):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    @property
+    def detectors(self) -> DetectorRegistry:
+        return self._detectors
+
+    @property
+    def store(self) -> CaptureStore:
+        return self._store
+
+    @staticmethod
+    def _default_byte_budget() -> int:
+        raw = os.environ.get("PROTOFLOW_CAPTURE_BUDGET_MB", "")
+        try:
+            return int(float(raw) * 1024 * 1024) if raw else DEFAULT_BYTE_BUDGET
+        except ValueError:
+            print(f"[WARN] PacketAnalysisEngine: invalid PROTOFLOW_CAPTURE_BUDGET_MB={raw!r}")
+            return DEFAULT_BYTE_BUDGET
+
+    @staticmethod
+    def _default_workers() -> int:
+        raw = os.environ.get("PROTOFLOW_CAPTURE_WORKERS", "")
+        try:
+            return int(raw) if raw else 1
+        except ValueError:
+            print(f"[WARN] PacketAnalysisEngine: invalid PROTOFLOW_CAPTURE_WORKERS={raw!r}")
+            return 1
+
+    @staticmethod
+    def _default_detectors() -> DetectorRegistry:
+        registry = DetectorRegistry.with_builtin()
+        raw = os.environ.get("PROTOFLOW_PROTOCOLS_DIR", "protocols")
+        root = Path(raw) if Path(raw).is_absolute() else (Path.cwd() / raw).resolve()
+        try:
+            registry.register_packages(load_protocol_packages(root).packages)
+        except Exception as exc:
+            print(f"[WARN] PacketAnalysisEngine: protocol detectors not loaded from {root}: {exc}")
+        return registry
+
+    def _shard_for(self, channel: str) -> _DecodeShard:
+        shard = self._shard_of.get(channel)
+        if shard is None:
+            with self._lock:
+                shard = self._shard_of.get(channel)
+                if shard is None:
+                    shard = min(self._shards, key=lambda s: len(s.channels))
+                    shard.channels.append(channel)
+                    self._shard_of[channel] = shard
+        return shard
+
+    def _enqueue(self, item: Tuple[str, bytes, int, str]) -> None:
+        """Queue a chunk (or channel flush) on its channel's shard; other markers go to every shard."""
+        if item[0] == _FLUSH_CHANNEL:
+            shard = self._shard_of.get(item[3])
+            if shard is not None:
+                self._put(shard, item)
+            return
+        if not item[1]:
+            for shard in self._shards:
+                self._put(shard, item)
+            return
+        self._put(self._shard_for(item[3]), item)
+
+    @staticmethod
+    def _put(shard: _DecodeShard, item: Tuple[str, bytes, int, str]) -> None:
+        # Bounded like the bus subscription: shed the oldest chunk instead of growing.
+        while True:
+            try:
+                shard.queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    shard.queue.get_nowait()
+                    shard.queue.task_done()
+                    shard.dropped += 1
+                except queue.Empty:
+                    pass
+        depth = shard.queue.qsize()
+        if depth > shard.max_depth:
+            shard.max_depth = depth
 
     def _on_connected(self, payload: Any) -> None:
-        if isinstance(payload, dict):
-            self._channel.port = payload.get("port")
-            self._channel.baud = payload.get("baud")
-            self._channel.host = payload.get("host")
-            self._channel.address = payload.get("address")
-            if payload.get("type") == "serial" and self._channel.port:
-                self._channel.channel = str(self._channel.port)
-            elif payload.get("type") in {"tcp", "tcp-client"}:
-                self._channel.channel = str(self._channel.address or "")
+        if not isinstance(payload, dict):
+            return
+        session_id = str(payload.get("session_id") or "")
+        info = _ChannelInfo(
+            port=payload.get("port"),
+            baud=payload.get("baud"),
+            host=payload.get("host"),
+            address=payload.get("address"),
+        )
+        if payload.get("type") == "serial" and info.port:
+            info.channel = str(info.port)
+        elif payload.get("type") in {"tcp", "tcp-client"}:
+            info.channel = str(info.address or "")
+        info.channel = info.channel or session_id
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            self._sessions[session_id] = info
+            if previous is not None and self._channels.get(previous.channel) is previous:
+                del self._channels[previous.channel]
+            self._channels[info.channel] = info
+            # comm.disconnected carries no payload; the per-session topic says which one went away.
+            topic = f"comm.disconnected.{session_id}" if session_id else ""
+            subscribe = bool(topic) and topic not in self._session_topics
+            if subscribe:
+                self._session_topics.add(topic)
+        if subscribe:
+            self._bus.subscribe(topic, lambda _p, sid=session_id: self._drop_session(sid))
+        # Chunks seen before the announcement were framed under the bare session id.
+        for channel in {session_id, info.channel, previous.channel if previous is not None else ""}:
+            self._enqueue((_FLUSH_CHANNEL, b"", 0, channel))
 
     def _on_disconnected(self, payload: Any) -> None:
-        self._channel = _ChannelInfo()
+        # Sessions with an id are handled by their comm.disconnected.<sid> subscription.
+        session_id = str(payload.get("session_id") or "") if isinstance(payload, dict) else ""
+        self._drop_session(session_id)
+
+    def _drop_session(self, session_id: str) -> None:
+        with self._lock:
+            info = self._sessions.pop(session_id, None)
+            if info is not None and self._channels.get(info.channel) is info:
+                del self._channels[info.channel]
+        self._enqueue((_FLUSH_CHANNEL, b"", 0, info.channel if info is not None else session_id))
 
     def _on_control(self, payload: Any) -> None:
         if not isinstance(payload, dict):
             return
         action = payload.get("action")
         if action == "start":
+            self._transactions.reset()
             self._enabled = True
             channel = payload.get("channel")
             self._target_channel = str(channel) if channel else None
+            self._framing = str(payload.get("framing") or "").lower() or None
+            if "filter" in payload:
+                self._apply_filter(payload.get("filter"))
+            record_path = payload.get("record_path")
+            if record_path:
+                self.start_recording(str(record_path))
         elif action == "stop":
             self._enabled = False
             self._target_channel = None
+            if self._recorder is not None:
+                ticket = next(self._tickets)
+                with self._lock:
+                    self._closing[ticket] = self._recorder
+                    self._closing_acks[ticket] = len(self._shards)
+                self._enqueue((_FLUSH_AND_CLOSE, b"", ticket, ""))
+            else:
+                self._enqueue(_FLUSH)
+        elif action == "filter":
+            self._apply_filter(payload.get("expr"))
+
+    @property
+    def transactions(self) -> TransactionMatcher:
+        return self._transactions
+
+    def transaction_stats(self) -> Dict[str, Any]:
+        """Request/response latency statistics."""
+        return self._transactions.snapshot()
+
+    def capture_stats(self) -> Dict[str, Any]:
+        """Transaction statistics plus ``decode`` shard stats (the ``capture.stats`` payload)."""
+        stats = self._transactions.snapshot()
+        stats["decode"] = self.decode_stats()
+        return stats
+
+    def _publish_stats(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._stats_published < _STATS_INTERVAL_SEC:
+            return
+        # Shards share one publisher; a throttled call just skips when another shard is at it.
+        if not self._stats_lock.acquire(blocking=force):
+            return
+        try:
+            self._transactions.expire(time.perf_counter_ns())
+            signature = (self._transactions.version, sum(shard.chunks for shard in self._shards))
+            if signature == self._stats_signature:
+                return
+            self._stats_signature = signature
+            self._stats_published = now
+            self._bus.publish("capture.stats", self.capture_stats())
+        finally:
+            self._stats_lock.release()
+
+    @property
+    def filter_expression(self) -> str:
+        current = self._filter
+        return current.expression if current is not None else ""
+
+    @property
+    def filtered_frames(self) -> int:
+        return self._filtered
 
-    def _run(self) -> None:
+    def set_filter(self, expression: Optional[str]) -> Optional[CaptureFilter]:
+        """Compile and install a capture filter; empty clears it. Raises ``CaptureFilterError``."""
+        self._filter = compile_filter(expression)
+        return self._filter
+
+    def _apply_filter(self, expression: Any) -> None:
+        try:
+            self.set_filter(str(expression) if expression is not None else None)
+        except ValueError as exc:
+            print(f"[WARN] PacketAnalysisEngine: capture filter rejected: {exc}")
+
+    @property
+    def recorder(self) -> Optional[CaptureFileWriter]:
+        return self._recorder
+
+    def start_recording(self, path: str) -> Optional[CaptureFileWriter]:
+        """Append every published frame to a capture file (replaces any open one)."""
+        current = self._recorder
+        if current is not None and current not in self._closing.values():
+            current.close()
+        try:
+            self._recorder = CaptureFileWriter(path)
+        except OSError as exc:
+            print(f"[WARN] PacketAnalysisEngine: cannot record to {path}: {exc}")
+            self._recorder = None
+        return self._recorder
+
+    def stop_recording(self) -> None:
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def _release_recorder(self, ticket: int) -> None:
+        """Close the writer of a stop ticket once the last shard has flushed into it."""
+        with self._lock:
+            remaining = self._closing_acks.get(ticket, 0) - 1
+            if remaining > 0:
+                self._closing_acks[ticket] = remaining
+                return
+            self._closing_acks.pop(ticket, None)
+            recorder = self._closing.pop(ticket, None)
+            if recorder is not None and self._recorder is recorder:
+                self._recorder = None
+        if recorder is not None:
+            recorder.close()
+
+    def _run(self, shard: _DecodeShard) -> None:
         while not self._stop.is_set():
+            pending = any(framer.pending for framer in shard.framers.values())
             try:
-                direction, data, ts, channel = self._queue.get(timeout=0.2)
+                direction, data, t_ns, channel = shard.queue.get(
+                    timeout=_FRAMER_POLL_SEC if pending else _IDLE_POLL_SEC
+                )
             except queue.Empty:
+                if pending:
+                    try:
+                        shard.frames += self._poll_framers(shard)
+                    except Exception as exc:
+                        print(f"[WARN] PacketAnalysisEngine: frame poll failed: {exc}")
+                self._publish_stats()
                 continue
-            frame = self._build_frame(direction, data, ts, channel)
-            self._bus.publish("capture.frame", frame)
-            self._queue.task_done()
+            try:
+                if data:
+                    self._decode(shard, direction, data, t_ns, channel)
+                else:
+                    shard.frames += self._flush_framers(shard, channel if direction == _FLUSH_CHANNEL else None)
+                    if direction == _FLUSH_AND_CLOSE:
+                        self._release_recorder(t_ns)
+                    self._publish_stats(force=True)
+            except Exception as exc:
+                # One bad chunk costs its frames, not the shard: every channel hashed here keeps decoding.
+                print(f"[WARN] PacketAnalysisEngine: decode failed on {channel or '-'}/{direction}: {exc}")
+            finally:
+                shard.queue.task_done()
 
-    def _build_frame(self, direction: str, data: bytes, ts: float, channel_override: str = "") -> Dict[str, Any]:
-        self._counter += 1
-        hex_bytes = [f"{b:02X}" for b in data]
-        ascii_str = "".join(chr(b) if 32 <= b <= 126 else "." for b in data)
-        ascii_lines = self._split_ascii(ascii_str, 8)
-        protocol_name, protocol_unknown, summary, tree_rows, errors = self._parse_protocol(data)
-        channel = channel_override or self._channel.channel or ""
-        frame_id = f"{direction.lower()}-{int(ts * 1000)}-{self._counter}"
+    def _decode(self, shard: _DecodeShard, direction: str, data: bytes, t_ns: int, channel: str) -> None:
+        started = time.perf_counter_ns()
+        framer = self._framer(shard, channel, direction)
+        frames = 0
+        for frame_data, frame_ns in framer.feed(data, t_ns):
+            self._publish_frame(direction, frame_data, frame_ns, channel)
+            frames += 1
+        # With a backlog the next chunk's source timestamp decides the cut; polling
+        # against the wall clock would split frames that merely waited in the queue.
+        if shard.queue.empty():
+            frames += self._poll_framers(shard)
+        elapsed = time.perf_counter_ns() - started
+        shard.chunks += 1
+        shard.frames += frames
+        shard.decode_ns += elapsed
+        if elapsed > shard.max_decode_ns:
+            shard.max_decode_ns = elapsed
+        self._publish_stats()
+
+    def _framer(self, shard: _DecodeShard, channel: str, direction: str) -> StreamReassembler:
+        key = (channel, direction)
+        framer = shard.framers.get(key)
+        if framer is None:
+            info = self._channels.get(channel)
+            baud = info.baud if info is not None else None
+            framing = info.framing if info is not None else None
+            if framing is None and not baud:
+                framing = self._framing
+            if framing == FRAMING_MODBUS_TCP:
+                framer = StreamReassembler(self._tcp_rule, direction)
+            elif baud:
+                framer = RtuFramer(baud, direction)
+            else:
+                framer = StreamReassembler(self._rule, direction, gap_ns=char_gap_ns(baud))
+            shard.framers[key] = framer
+        return framer
+
+    def _poll_framers(self, shard: _DecodeShard) -> int:
+        now_ns = time.perf_counter_ns()
+        count = 0
+        for (channel, direction), framer in shard.framers.items():
+            if framer.pending:
+                for frame_data, frame_ns in framer.poll(now_ns):
+                    self._publish_frame(direction, frame_data, frame_ns, channel)
+                    count += 1
+        return count
+
+    def _flush_framers(self, shard: _DecodeShard, only_channel: Optional[str] = None) -> int:
+        """Emit buffered partial frames and forget the streams (all, or one channel's on disconnect)."""
+        if only_channel is None:
+            framers, shard.framers = shard.framers, {}
+        else:
+            framers = {key: shard.framers.pop(key) for key in list(shard.framers) if key[0] == only_channel}
+        count = 0
+        for (channel, direction), framer in framers.items():
+            self._detectors.reset_cache(channel)
+            for frame_data, frame_ns in framer.flush():
+                self._publish_frame(direction, frame_data, frame_ns, channel)
+                count += 1
+        return count
+
+    def _publish_frame(self, direction: str, data: bytes, t_ns: int, channel: str) -> None:
+        record = self._build_frame(direction, data, t_ns, channel)
+        self._store.append(record)
+        self._transactions.observe(record)
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.append(t_ns, record.channel, direction, record.data)
+        capture_filter = self._filter
+        if capture_filter is not None and not self._matches(capture_filter, record):
+            with self._lock:
+                self._filtered += 1
+            return
+        self._bus.publish("capture.frame", record)
+
+    def _matches(self, capture_filter: CaptureFilter, record: CaptureRecord) -> bool:
+        """Run the user filter on the decode worker; a raising filter drops the frame (warned once)."""
+        try:
+            return bool(capture_filter.match(record))
+        except Exception as exc:
+            if self._filter_failed is not capture_filter:
+                self._filter_failed = capture_filter
+                print(f"[WARN] PacketAnalysisEngine: capture filter {capture_filter.expression!r} failed: {exc}")
+            return False
+
+    def _build_frame(self, direction: str, data: bytes, t_ns: int, channel: str = "") -> CaptureRecord:
+        counter = next(self._ids)
+        info = self._channels.get(channel)
+        detector, score = self._detectors.detect(data, channel)
+        if detector is None:
+            protocol_id, protocol_name = "", "Unknown"
+            error_codes: Tuple[str, ...] = ("FRAME_TOO_SHORT",) if len(data) < 2 else ()
+        else:
+            protocol_id, protocol_name = detector.id, detector.name
+            error_codes = detector.check(data)
+        frame_id = f"{direction.lower()}-{int(perf_to_wall(t_ns) * 1000)}-{counter}"
+        return CaptureRecord(
+            frame_id,
+            t_ns,
+            direction,
+            channel,
+            bytes(data),
+            protocol_id=protocol_id,
+            protocol_name=protocol_name,
+            confidence=round(score, 2),
+            error_codes=error_codes,
+            baud=info.baud if info is not None else None,
+        )
+
+    def frame_record(self, frame_id: str) -> Optional[CaptureRecord]:
+        return self._store.get(frame_id)
+
+    def query_frames(
+        self, offset: int = 0, limit: Optional[int] = None, where: Optional[str] = None, **filters: Any
+    ) -> Dict[str, Any]:
+        """One page of stored records (compact dicts) matching ``CaptureStore.query`` filters.
+
+        ``where`` is a capture filter expression applied on top of the index filters.
+        """
+        predicate = compile_filter(where)
+        if predicate is not None:
+            filters["where"] = predicate.match
+        records = self._store.query(offset=offset, limit=limit, **filters)
         return {
-            "id": frame_id,
-            "timestamp": ts,
-            "direction": direction,
-            "channel": channel,
-            "baud": self._channel.baud,
-            "length": len(data),
-            "raw_hex": " ".join(hex_bytes),
-            "ascii": ascii_str,
-            "protocol": {
-                "name": protocol_name,
-                "unknown": protocol_unknown,
-                "confidence": 0.9 if not protocol_unknown else 0.2,
-            },
-            "summary": summary,
-            "hex_dump": {
-                "bytes": hex_bytes,
-                "ascii_lines": ascii_lines,
-                "size": len(data),
-            },
-            "tree": tree_rows,
-            "errors": errors,
+            "total": self._store.count(**filters),
+            "offset": max(0, offset),
+            "frames": [record.to_dict() for record in records],
         }
 
-    def _parse_protocol(
-        self, data: bytes
-    ) -> Tuple[str, bool, str, List[Dict[str, str]], List[Dict[str, str]]]:
-        if len(data) < 2:
-            return (
-                "Unknown",
-                True,
-                "Too short",
-                [],
-                [{"code": "FRAME_TOO_SHORT", "message": "Frame length < 2 bytes"}],
-            )
-
-        addr = data[0]
-        func = data[1]
-        summary = f"addr=0x{addr:02X} func=0x{func:02X} len={len(data)}"
-        tree = [
-            {"label": "Address", "raw": f"{addr:02X}", "value": str(addr)},
-            {"label": "Function", "raw": f"{func:02X}", "value": f"0x{func:02X}"},
-        ]
-        errors: List[Dict[str, str]] = []
-
-        if len(data) < 5:
-            errors.append({"code": "FRAME_TOO_SHORT", "message": "Modbus RTU frame length < 5 bytes"})
-            return "Modbus RTU", False, summary, tree, errors
-
-        crc_calc = crc16_modbus(data[:-2])
-        crc_expected = int.from_bytes(data[-2:], "little")
-        crc_ok = crc_calc == crc_expected
-        payload_len = len(data) - 4
-        is_exception = bool(func & 0x80)
-        tree.append(
-            {
-                "label": "PayloadLength",
-                "raw": f"{payload_len:02X}",
-                "value": str(payload_len),
-            }
-        )
-        tree.append(
-            {
-                "label": "CRC16",
-                "raw": " ".join(f"{b:02X}" for b in data[-2:]),
-                "value": "valid" if crc_ok else "invalid",
-            }
-        )
-        tree.append(
+    def frame_detail(self, frame_id: str) -> Optional[Dict[str, Any]]:
+        """Full rendering of a recently published frame: hex dump, ASCII, summary, tree, errors."""
+        record = self.frame_record(frame_id)
+        if record is None:
+            return None
+        return self.render_detail(record)
+
+    def render_detail(self, record: CaptureRecord) -> Dict[str, Any]:
+        data = record.data
+        detector = self._detectors.get(record.protocol_id) if record.protocol_id else None
+        if detector is not None:
+            decoded = detector.decode(data)
+            name, unknown = decoded.name, False
+            summary, tree_rows, errors = decoded.summary, decoded.tree, decoded.errors
+        else:
+            name, unknown, tree_rows = record.protocol_name, True, []
+            if len(data) < 2:
+                summary = "Too short"
+                errors = [{"code": "FRAME_TOO_SHORT", "message": "Frame length < 2 bytes"}]
+            else:
+                summary, errors = f"len={len(data)}", []
+        hex_bytes = [f"{b:02X}" for b in data]
+        ascii_str = "".join(chr(b) if 32 <= b <= 126 else "." for b in data)
+        detail = record.to_dict()
+        detail["protocol"]["name"] = name
+        detail["protocol"]["unknown"] = unknown
+        detail.update(
             {
-                "label": "CRC16(calc)",
-                "raw": f"{crc_calc:04X}",
-                "value": f"0x{crc_calc:04X}",
+                "ascii": ascii_str,
+                "summary": summary,
+                "hex_dump": {
+                    "bytes": hex_bytes,
+                    "ascii_lines": self._split_ascii(ascii_str, 8),
+                    "size": len(data),
+                },
+                "tree": tree_rows,
+                "errors": errors,
+                "detail": True,
             }
         )
-        if not crc_ok:
-            errors.append(
-                {
-                    "code": "CRC_INVALID",
-                    "message": f"expected=0x{crc_expected:04X} calc=0x{crc_calc:04X}",
-                }
-            )
-        if is_exception and payload_len != 1:
-            errors.append(
-                {
-                    "code": "LENGTH_INVALID",
-                    "message": f"exception frame payload length should be 1, got {payload_len}",
-                }
-            )
-        if not is_exception and payload_len <= 0:
-            errors.append(
-                {
-                    "code": "LENGTH_INVALID",
-                    "message": "normal frame payload length should be >= 1",
-                }
-            )
-        if not errors:
-            return "Modbus RTU", False, summary, tree, []
-        return "Modbus RTU", False, summary, tree, errors
+        return detail
 
     @staticmethod
     def _split_ascii(text: str, width: int) -> List[str]:
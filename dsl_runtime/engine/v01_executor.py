@@ -8,11 +8,12 @@ import io
 import os
 import shlex
 import subprocess
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from dsl_runtime.lang.ast_nodes import ScriptAST
-from dsl_runtime.lang.expression import eval_expr
+from dsl_runtime.lang.ast_nodes import RetryPolicy, ScriptAST
+from dsl_runtime.lang.expression import compile_expr, eval_compiled
 from dsl_runtime.engine.channels import build_channels
 from dsl_runtime.engine.context import RuntimeContext
 from dsl_runtime.protocol_package import ProtocolPackageGateway, load_protocol_packages
@@ -28,44 +29,86 @@ _EOL_MAP = {
 
 _TPL_RE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_\.]*)\}")
 
+StepHandler = Callable[[RuntimeContext], None]
 
-def _render_template(value: str, env: Dict[str, Any]) -> str:
-    def repl(match: re.Match[str]) -> str:
-        key = match.group(1)
-        if key in env:
-            return str(env.get(key, ""))
-        if "." in key:
-            try:
-                return str(_lookup_path(env, key))
-            except Exception:
-                return ""
+
+def _lookup_template_key(env: Dict[str, Any], key: str) -> str:
+    if key in env:
         return str(env.get(key, ""))
+    if "." in key:
+        try:
+            return str(_lookup_path(env, key))
+        except Exception:
+            return ""
+    return str(env.get(key, ""))
 
-    return _TPL_RE.sub(repl, value)
 
+class _Template:
+    """A `${var}` template split once into literal/key parts."""
 
-def _build_env(ctx: RuntimeContext, ast: ScriptAST) -> Dict[str, Any]:
-    env: Dict[str, Any] = {}
-    env.update(ctx.vars_snapshot())
-    return env
+    __slots__ = ("text", "parts", "tail")
 
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.parts: List[Tuple[str, str]] = []
+        pos = 0
+        for match in _TPL_RE.finditer(text):
+            self.parts.append((text[pos:match.start()], match.group(1)))
+            pos = match.end()
+        self.tail = text[pos:]
 
-def _render_object(value: Any, env: Dict[str, Any]) -> Any:
+    @property
+    def dynamic(self) -> bool:
+        return bool(self.parts)
+
+    def render(self, env: Dict[str, Any]) -> str:
+        if not self.parts:
+            return self.text
+        out: List[str] = []
+        for literal, key in self.parts:
+            out.append(literal)
+            out.append(_lookup_template_key(env, key))
+        out.append(self.tail)
+        return "".join(out)
+
+
+def _render_template(value: str, env: Dict[str, Any]) -> str:
+    return _Template(value).render(env)
+
+
+def _needs_env(*templates: Optional[_Template]) -> bool:
+    return any(tpl is not None and tpl.dynamic for tpl in templates)
+
+
+def _build_env(ctx: RuntimeContext, needed: bool = True) -> Dict[str, Any]:
+    # vars_snapshot copies every variable; steps whose templates are all static skip it.
+    return ctx.vars_snapshot() if needed else {}
+
+
+def _compile_object(value: Any) -> Any:
     if isinstance(value, str):
-        return _render_template(value, env)
+        return _Template(value)
+    if isinstance(value, list):
+        return [_compile_object(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): _compile_object(v) for k, v in value.items()}
+    return value
+
+
+def _render_object(value: Any, env: Dict[str, Any]) -> Any:
+    if isinstance(value, _Template):
+        return value.render(env)
     if isinstance(value, list):
         return [_render_object(item, env) for item in value]
     if isinstance(value, dict):
-        return {str(k): _render_object(v, env) for k, v in value.items()}
+        return {k: _render_object(v, env) for k, v in value.items()}
     return value
 
 
-def _resolve_protocol_packages_dir(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> Path:
-    env = _build_env(ctx, ast)
+def _resolve_protocol_packages_dir(explicit: Optional[_Template], ctx: RuntimeContext) -> Path:
     script_base = Path(ctx.script_path).resolve().parent if ctx.script_path else Path.cwd()
-    explicit = step.get("packages_dir")
-    if explicit is not None and str(explicit).strip():
-        raw = _render_template(str(explicit), env)
+    if explicit is not None and explicit.text.strip():
+        raw = explicit.render(_build_env(ctx, explicit.dynamic))
         p = Path(raw)
         return p if p.is_absolute() else (script_base / p).resolve()
     env_dir = os.getenv("PROTOFLOW_PROTOCOLS_DIR")
@@ -75,8 +118,8 @@ def _resolve_protocol_packages_dir(step: Dict[str, Any], ast: ScriptAST, ctx: Ru
     return (script_base / "protocols").resolve()
 
 
-def _get_protocol_gateway(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> ProtocolPackageGateway:
-    root = _resolve_protocol_packages_dir(step, ast, ctx)
+def _get_protocol_gateway(explicit: Optional[_Template], ctx: RuntimeContext) -> ProtocolPackageGateway:
+    root = _resolve_protocol_packages_dir(explicit, ctx)
     cache = getattr(ctx, "_protocol_gateway_cache", {})
     key = str(root)
     gateway = cache.get(key)
@@ -100,37 +143,58 @@ def _text_to_bytes(text: str, *, encoding: str, eol: str) -> bytes:
     return text.encode(codec) + tail
 
 
-def _run_send_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
+def _require_session(ast: ScriptAST, message: str = "session is required for v0.1"):
     session = ast.session
     if session is None:
-        raise ValueError("session is required for v0.1")
+        raise ValueError(message)
+    return session
+
 
-    env = _build_env(ctx, ast)
-    encoding = str(step.get("encoding") or session.encoding).lower()
-    eol = str(step.get("eol") or session.eol).lower()
+def _compile_send_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
+    step_encoding = str(step.get("encoding")).lower() if step.get("encoding") else None
+    step_eol = str(step.get("eol")).lower() if step.get("eol") else None
 
     if "hex" in step and step.get("hex") is not None:
-        raw_hex = _render_template(str(step.get("hex")), env)
-        payload = bytes.fromhex(raw_hex.replace(" ", ""))
-    else:
-        if "text" not in step:
-            raise ValueError("send step requires text or hex")
-        text = _render_template(str(step.get("text", "")), env)
+        hex_tpl = _Template(str(step.get("hex")))
+        static_payload = None if hex_tpl.dynamic else bytes.fromhex(hex_tpl.text.replace(" ", ""))
+
+        def run_hex(ctx: RuntimeContext) -> None:
+            _require_session(ast)
+            if static_payload is not None:
+                payload = static_payload
+            else:
+                payload = bytes.fromhex(hex_tpl.render(_build_env(ctx)).replace(" ", ""))
+            ctx.channel_write(payload)
+            ctx.set_var("last_tx_hex", payload.hex().upper())
+
+        return run_hex
+
+    if "text" not in step:
+        raise ValueError("send step requires text or hex")
+    text_tpl = _Template(str(step.get("text", "")))
+
+    def run_text(ctx: RuntimeContext) -> None:
+        session = _require_session(ast)
+        # switch_session may change the session encoding/eol between executions.
+        encoding = step_encoding or str(session.encoding).lower()
+        eol = step_eol or str(session.eol).lower()
+        text = text_tpl.render(_build_env(ctx, text_tpl.dynamic))
         payload = _text_to_bytes(text, encoding=encoding, eol=eol)
+        ctx.channel_write(payload)
+        ctx.set_var("last_tx_hex", payload.hex().upper())
 
-    ctx.channel_write(payload)
-    ctx.set_var("last_tx_hex", payload.hex().upper())
+    return run_text
 
 
-def _match_text(match_cfg: Dict[str, Any], text: str) -> bool:
+def _compile_match(match_cfg: Dict[str, Any]) -> Callable[[str], bool]:
     match_type = str(match_cfg.get("type", "contains")).strip().lower()
     pattern = str(match_cfg.get("pattern", ""))
     if not pattern:
         raise ValueError("expect.match.pattern is required")
     if match_type == "contains":
-        return pattern in text
+        return lambda text: pattern in text
     if match_type == "startswith":
-        return text.startswith(pattern)
+        return lambda text: text.startswith(pattern)
     if match_type == "regex":
         raw_flags = str(match_cfg.get("flags", ""))
         flags = 0
@@ -140,7 +204,8 @@ def _match_text(match_cfg: Dict[str, Any], text: str) -> bool:
             flags |= re.MULTILINE
         if "s" in raw_flags:
             flags |= re.DOTALL
-        return re.search(pattern, text, flags=flags) is not None
+        regex = re.compile(pattern, flags)
+        return lambda text: regex.search(text) is not None
     raise ValueError("expect.match.type must be contains/regex/startswith")
 
 
@@ -151,42 +216,55 @@ def _decode_rx(chunk: bytes, *, encoding: str) -> str:
     return chunk.decode(codec, errors="ignore")
 
 
-def _run_expect_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    session = ast.session
-    if session is None:
-        raise ValueError("session is required for v0.1")
-
+def _compile_expect_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     match_cfg = step.get("match")
     if not isinstance(match_cfg, dict):
         raise ValueError("expect.match is required")
+    matches = _compile_match(match_cfg)
 
     timeout_ms = int(step.get("timeout_ms", ast.defaults.timeout_ms))
     if timeout_ms <= 0:
         raise ValueError("expect.timeout_ms must be > 0")
 
-    encoding = str(step.get("encoding") or session.encoding).lower()
-    per_read_timeout = max(0.01, session.read_timeout_ms / 1000.0)
-    deadline = time.time() + (timeout_ms / 1000.0)
-    rx_buf = bytearray()
-    while time.time() < deadline:
-        remaining = max(0.01, deadline - time.time())
-        chunk = ctx.channel.read(256, timeout=min(per_read_timeout, remaining))
-        if not chunk:
-            continue
-        rx_buf.extend(chunk)
-        text = _decode_rx(bytes(rx_buf), encoding=encoding)
-        if _match_text(match_cfg, text):
-            ctx.set_var("last_rx_text", text)
-            ctx.set_var("last_rx_hex", bytes(rx_buf).hex().upper())
-            captures = step.get("capture")
-            if captures:
-                _apply_capture_rules(text, captures, ast, ctx)
-            return
-
-    raise TimeoutError("expect timeout: match not found")
-
-
-def _apply_capture_rules(text: str, captures: Any, ast: ScriptAST, ctx: RuntimeContext) -> None:
+    step_encoding = str(step.get("encoding")).lower() if step.get("encoding") else None
+    captures = step.get("capture")
+    capture_rules = _compile_capture_rules(captures) if captures else None
+
+    def run(ctx: RuntimeContext) -> None:
+        session = _require_session(ast)
+        encoding = step_encoding or str(session.encoding).lower()
+        per_read_timeout = max(0.01, session.read_timeout_ms / 1000.0)
+        deadline = time.time() + (timeout_ms / 1000.0)
+        rx_buf = bytearray()
+        while time.time() < deadline:
+            remaining = max(0.01, deadline - time.time())
+            chunk = ctx.channel.read(256, timeout=min(per_read_timeout, remaining))
+            if not chunk:
+                continue
+            rx_buf.extend(chunk)
+            text = _decode_rx(bytes(rx_buf), encoding=encoding)
+            if matches(text):
+                ctx.set_var("last_rx_text", text)
+                ctx.set_var("last_rx_hex", bytes(rx_buf).hex().upper())
+                if capture_rules:
+                    _apply_capture_rules(text, capture_rules, ctx)
+                return
+
+        raise TimeoutError("expect timeout: match not found")
+
+    return run
+
+
+@dataclass
+class _CaptureRule:
+    var: str
+    regex: _Template
+    group: int
+    # None when the regex contains ${var} and has to be rendered per execution.
+    compiled: Optional[re.Pattern[str]]
+
+
+def _compile_capture_rules(captures: Any) -> List[_CaptureRule]:
     if isinstance(captures, dict):
         items = [captures]
     elif isinstance(captures, list):
@@ -194,7 +272,7 @@ def _apply_capture_rules(text: str, captures: Any, ast: ScriptAST, ctx: RuntimeC
     else:
         raise ValueError("capture must be a mapping or list")
 
-    env = _build_env(ctx, ast)
+    rules: List[_CaptureRule] = []
     for idx, item in enumerate(items):
         if not isinstance(item, dict):
             raise ValueError(f"capture[{idx}] must be a mapping")
@@ -202,28 +280,51 @@ def _apply_capture_rules(text: str, captures: Any, ast: ScriptAST, ctx: RuntimeC
         regex = item.get("regex")
         if not var_name or not regex:
             raise ValueError(f"capture[{idx}] requires var and regex")
-        pattern = _render_template(str(regex), env)
+        regex_tpl = _Template(str(regex))
         group = int(item.get("group", 1))
-        match = re.search(pattern, text)
+        compiled = None if regex_tpl.dynamic else re.compile(regex_tpl.text)
+        rules.append(_CaptureRule(var=var_name, regex=regex_tpl, group=group, compiled=compiled))
+    return rules
+
+
+def _apply_capture_rules(
+    text: str,
+    rules: List[_CaptureRule],
+    ctx: RuntimeContext,
+    env: Optional[Dict[str, Any]] = None,
+) -> None:
+    if env is None:
+        env = _build_env(ctx, _needs_env(*(rule.regex for rule in rules)))
+    for idx, rule in enumerate(rules):
+        if rule.compiled is not None:
+            match = rule.compiled.search(text)
+        else:
+            match = re.search(rule.regex.render(env), text)
         if match is None:
             raise ValueError(f"capture[{idx}] regex not matched")
         try:
-            value = match.group(group)
+            value = match.group(rule.group)
         except IndexError as exc:
-            raise ValueError(f"capture[{idx}] group index out of range: {group}") from exc
-        ctx.set_var(var_name, value)
-        ctx.set_var("last_capture_var", var_name)
+            raise ValueError(f"capture[{idx}] group index out of range: {rule.group}") from exc
+        ctx.set_var(rule.var, value)
+        ctx.set_var("last_capture_var", rule.var)
         ctx.set_var("last_capture_value", value)
-        env[var_name] = value
+        env[rule.var] = value
+
 
+def _compile_capture_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
+    source_tpl = _Template(str(step.get("source", "${last_rx_text}")))
+    rules = _compile_capture_rules(step)
+    needs_env = _needs_env(source_tpl, *(rule.regex for rule in rules))
 
-def _run_capture_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
-    source_raw = step.get("source", "${last_rx_text}")
-    source_text = _render_template(str(source_raw), env)
-    if not source_text:
-        raise ValueError("capture source is empty")
-    _apply_capture_rules(source_text, step, ast, ctx)
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx, needs_env)
+        source_text = source_tpl.render(env)
+        if not source_text:
+            raise ValueError("capture source is empty")
+        _apply_capture_rules(source_text, rules, ctx, env)
+
+    return run
 
 
 def _parse_kv_text(text: str) -> Dict[str, Any]:
@@ -247,24 +348,27 @@ def _parse_csv_text(text: str) -> Any:
     return rows
 
 
-def _run_parse_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "json": json.loads,
+    "kv": _parse_kv_text,
+    "csv": _parse_csv_text,
+}
+
+
+def _compile_parse_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     fmt = str(step.get("format", "")).strip().lower()
-    if fmt not in {"json", "kv", "csv"}:
+    parser = _PARSERS.get(fmt)
+    if parser is None:
         raise ValueError("parse.format must be json/kv/csv")
-    source_raw = step.get("source", "${last_rx_text}")
-    source_text = _render_template(str(source_raw), env)
+    source_tpl = _Template(str(step.get("source", "${last_rx_text}")))
     save_as = str(step.get("save_as", "parsed")).strip() or "parsed"
 
-    if fmt == "json":
-        parsed = json.loads(source_text)
-    elif fmt == "kv":
-        parsed = _parse_kv_text(source_text)
-    else:
-        parsed = _parse_csv_text(source_text)
+    def run(ctx: RuntimeContext) -> None:
+        parsed = parser(source_tpl.render(_build_env(ctx, source_tpl.dynamic)))
+        ctx.set_var(save_as, parsed)
+        ctx.set_var("last_parsed", parsed)
 
-    ctx.set_var(save_as, parsed)
-    ctx.set_var("last_parsed", parsed)
+    return run
 
 
 def _lookup_path(obj: Any, path: str) -> Any:
@@ -286,46 +390,55 @@ def _lookup_path(obj: Any, path: str) -> Any:
     return current
 
 
-def _run_path_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+def _compile_path_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     source_raw = step.get("source", "${last_parsed}")
-    source_text = _render_template(str(source_raw), env)
-    source_obj: Any = source_text
+    source_tpl = _Template(str(source_raw))
     # Prefer direct object when source points to a runtime variable name.
+    direct_key: Optional[str] = None
     if isinstance(source_raw, str) and source_raw.startswith("${") and source_raw.endswith("}"):
-        key = source_raw[2:-1].strip()
-        vars_map = ctx.vars_snapshot()
-        if key in vars_map:
-            source_obj = vars_map[key]
+        direct_key = source_raw[2:-1].strip()
     path = str(step.get("path", "")).strip()
     if not path:
         raise ValueError("path.path is required")
     save_as = str(step.get("save_as", "")).strip()
     if not save_as:
         raise ValueError("path.save_as is required")
-    value = _lookup_path(source_obj, path)
-    ctx.set_var(save_as, value)
-    ctx.set_var("last_path_value", value)
+    needs_env = direct_key is not None or source_tpl.dynamic
 
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx, needs_env)
+        source_obj: Any = source_tpl.render(env)
+        if direct_key is not None and direct_key in env:
+            source_obj = env[direct_key]
+        value = _lookup_path(source_obj, path)
+        ctx.set_var(save_as, value)
+        ctx.set_var("last_path_value", value)
 
-def _run_measure_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+    return run
+
+
+def _compile_measure_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     metric = str(step.get("metric", "")).strip()
     if not metric:
         raise ValueError("measure.metric is required")
     raw_value = step.get("value")
     if raw_value is None:
         raise ValueError("measure.value is required")
-    value_text = _render_template(str(raw_value), env)
+    value_tpl = _Template(str(raw_value))
     unit = str(step.get("unit", "")).strip()
-    item = {"metric": metric, "value": value_text, "unit": unit, "ts": time.time()}
-    metrics = ctx.vars.get("metrics")
-    if not isinstance(metrics, list):
-        metrics = []
-    metrics.append(item)
-    ctx.set_var("metrics", metrics)
-    ctx.set_var(f"measure.{metric}", value_text)
-    ctx.set_var("last_measure", item)
+
+    def run(ctx: RuntimeContext) -> None:
+        value_text = value_tpl.render(_build_env(ctx, value_tpl.dynamic))
+        item = {"metric": metric, "value": value_text, "unit": unit, "ts": time.time()}
+        metrics = ctx.vars.get("metrics")
+        if not isinstance(metrics, list):
+            metrics = []
+        metrics.append(item)
+        ctx.set_var("metrics", metrics)
+        ctx.set_var(f"measure.{metric}", value_text)
+        ctx.set_var("last_measure", item)
+
+    return run
 
 
 def _to_float(value: Any) -> float:
@@ -334,217 +447,262 @@ def _to_float(value: Any) -> float:
     return float(str(value).strip())
 
 
-def _run_assert_range_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+def _optional_template(value: Any) -> Optional[_Template]:
+    return None if value is None else _Template(str(value))
+
+
+def _compile_assert_range_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     raw_value = step.get("value")
     if raw_value is None:
         raise ValueError("assert_range.value is required")
-    value = _to_float(_render_template(str(raw_value), env))
+    value_tpl = _Template(str(raw_value))
     message = str(step.get("message", "range assert failed"))
 
-    checks = 0
-    min_v = step.get("min")
-    if min_v is not None:
-        checks += 1
-        if value < _to_float(_render_template(str(min_v), env)):
-            raise AssertionError(message)
-
-    max_v = step.get("max")
-    if max_v is not None:
-        checks += 1
-        if value > _to_float(_render_template(str(max_v), env)):
-            raise AssertionError(message)
-
-    abs_err = step.get("abs_err")
-    target = step.get("target")
-    if abs_err is not None:
-        if target is None:
-            raise ValueError("assert_range.target is required when abs_err is set")
-        checks += 1
-        delta = abs(value - _to_float(_render_template(str(target), env)))
-        if delta > _to_float(_render_template(str(abs_err), env)):
-            raise AssertionError(message)
+    min_tpl = _optional_template(step.get("min"))
+    max_tpl = _optional_template(step.get("max"))
+    abs_err_tpl = _optional_template(step.get("abs_err"))
+    target_tpl = _optional_template(step.get("target"))
+    if abs_err_tpl is not None and target_tpl is None:
+        raise ValueError("assert_range.target is required when abs_err is set")
 
     in_set = step.get("in_set")
+    in_set_tpls: Optional[List[_Template]] = None
     if in_set is not None:
         if not isinstance(in_set, list) or not in_set:
             raise ValueError("assert_range.in_set must be a non-empty list")
-        checks += 1
-        candidates = [_to_float(_render_template(str(item), env)) for item in in_set]
-        if value not in candidates:
-            raise AssertionError(message)
+        in_set_tpls = [_Template(str(item)) for item in in_set]
 
-    if checks == 0:
+    if min_tpl is None and max_tpl is None and abs_err_tpl is None and in_set_tpls is None:
         raise ValueError("assert_range requires at least one rule: min/max/abs_err/in_set")
+    needs_env = _needs_env(value_tpl, min_tpl, max_tpl, abs_err_tpl, target_tpl, *(in_set_tpls or []))
+
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx, needs_env)
+        value = _to_float(value_tpl.render(env))
+        if min_tpl is not None and value < _to_float(min_tpl.render(env)):
+            raise AssertionError(message)
+        if max_tpl is not None and value > _to_float(max_tpl.render(env)):
+            raise AssertionError(message)
+        if abs_err_tpl is not None and target_tpl is not None:
+            delta = abs(value - _to_float(target_tpl.render(env)))
+            if delta > _to_float(abs_err_tpl.render(env)):
+                raise AssertionError(message)
+        if in_set_tpls is not None:
+            candidates = [_to_float(tpl.render(env)) for tpl in in_set_tpls]
+            if value not in candidates:
+                raise AssertionError(message)
+
+    return run
 
 
-def _run_exec_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+def _compile_exec_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     command_raw = step.get("command")
     if command_raw is None:
         raise ValueError("exec.command is required")
-    command = _render_template(str(command_raw), env).strip()
-    if not command:
-        raise ValueError("exec.command is empty")
-
+    command_tpl = _Template(str(command_raw))
+    cwd_tpl = _Template(str(step["cwd"])) if "cwd" in step else None
+    timeout_ms = int(step.get("timeout_ms", ast.defaults.timeout_ms))
+    save_stdout_as = str(step.get("save_stdout_as")) if step.get("save_stdout_as") else None
+    save_stderr_as = str(step.get("save_stderr_as")) if step.get("save_stderr_as") else None
+
+    # Security errors are reported when the step runs, after the command itself is checked.
+    denied: Optional[str] = None
+    allow_set: set[str] = set()
+    allow_dir_tpls: List[_Template] = []
+    dirs_invalid = False
     sec_cfg = ast.security.get("exec") if isinstance(ast.security, dict) else None
     if not isinstance(sec_cfg, dict) or not bool(sec_cfg.get("enabled", False)):
-        raise PermissionError("EXEC_NOT_ALLOWED: security.exec.enabled is false")
-
-    allow_commands = sec_cfg.get("allow_commands") or []
-    if not isinstance(allow_commands, list) or not allow_commands:
-        raise PermissionError("EXEC_NOT_ALLOWED: security.exec.allow_commands is empty")
-    allow_set = {str(x).lower() for x in allow_commands}
-
-    argv = shlex.split(command, posix=False)
-    if not argv:
-        raise ValueError("exec.command parse failed")
-    cmd_name = Path(argv[0]).name.lower()
-    if cmd_name not in allow_set:
-        raise PermissionError(f"EXEC_NOT_ALLOWED: command not in allowlist: {cmd_name}")
-
-    cwd = _render_template(str(step.get("cwd", os.getcwd())), env)
-    allow_dirs = sec_cfg.get("cwd_allowlist") or []
-    if not isinstance(allow_dirs, list):
-        raise PermissionError("EXEC_NOT_ALLOWED: security.exec.cwd_allowlist invalid")
-    cwd_resolved = str(Path(cwd).resolve())
-    if allow_dirs:
-        allowed = False
-        for raw in allow_dirs:
-            p = str(Path(_render_template(str(raw), env)).resolve())
-            if cwd_resolved.startswith(p):
-                allowed = True
-                break
-        if not allowed:
-            raise PermissionError("EXEC_NOT_ALLOWED: cwd not in allowlist")
-
-    timeout_ms = int(step.get("timeout_ms", ast.defaults.timeout_ms))
-    proc = subprocess.run(
-        argv,
-        cwd=cwd_resolved,
-        capture_output=True,
-        text=True,
-        timeout=max(1, timeout_ms) / 1000.0,
-        shell=False,
-    )
-
-    stdout = proc.stdout or ""
-    stderr = proc.stderr or ""
-    ctx.set_var("last_exec", {"command": command, "returncode": proc.returncode, "stdout": stdout, "stderr": stderr})
-    ctx.set_var("last_exec_code", proc.returncode)
-    if step.get("save_stdout_as"):
-        ctx.set_var(str(step.get("save_stdout_as")), stdout)
-    if step.get("save_stderr_as"):
-        ctx.set_var(str(step.get("save_stderr_as")), stderr)
-    if proc.returncode != 0:
-        raise RuntimeError(f"EXEC_FAILED: returncode={proc.returncode}")
-
-
-def _is_path_allowed(path: Path, allow_roots: List[str], env: Dict[str, Any]) -> bool:
+        denied = "EXEC_NOT_ALLOWED: security.exec.enabled is false"
+    else:
+        allow_commands = sec_cfg.get("allow_commands") or []
+        if not isinstance(allow_commands, list) or not allow_commands:
+            denied = "EXEC_NOT_ALLOWED: security.exec.allow_commands is empty"
+        else:
+            allow_set = {str(x).lower() for x in allow_commands}
+        allow_dirs = sec_cfg.get("cwd_allowlist") or []
+        if isinstance(allow_dirs, list):
+            allow_dir_tpls = [_Template(str(raw)) for raw in allow_dirs]
+        else:
+            dirs_invalid = True
+
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx)
+        command = command_tpl.render(env).strip()
+        if not command:
+            raise ValueError("exec.command is empty")
+        if denied is not None:
+            raise PermissionError(denied)
+
+        argv = shlex.split(command, posix=False)
+        if not argv:
+            raise ValueError("exec.command parse failed")
+        cmd_name = Path(argv[0]).name.lower()
+        if cmd_name not in allow_set:
+            raise PermissionError(f"EXEC_NOT_ALLOWED: command not in allowlist: {cmd_name}")
+
+        cwd = cwd_tpl.render(env) if cwd_tpl is not None else _render_template(os.getcwd(), env)
+        if dirs_invalid:
+            raise PermissionError("EXEC_NOT_ALLOWED: security.exec.cwd_allowlist invalid")
+        cwd_resolved = str(Path(cwd).resolve())
+        if allow_dir_tpls:
+            allowed = False
+            for tpl in allow_dir_tpls:
+                p = str(Path(tpl.render(env)).resolve())
+                if cwd_resolved.startswith(p):
+                    allowed = True
+                    break
+            if not allowed:
+                raise PermissionError("EXEC_NOT_ALLOWED: cwd not in allowlist")
+
+        proc = subprocess.run(
+            argv,
+            cwd=cwd_resolved,
+            capture_output=True,
+            text=True,
+            timeout=max(1, timeout_ms) / 1000.0,
+            shell=False,
+        )
+
+        stdout = proc.stdout or ""
+        stderr = proc.stderr or ""
+        ctx.set_var("last_exec", {"command": command, "returncode": proc.returncode, "stdout": stdout, "stderr": stderr})
+        ctx.set_var("last_exec_code", proc.returncode)
+        if save_stdout_as:
+            ctx.set_var(save_stdout_as, stdout)
+        if save_stderr_as:
+            ctx.set_var(save_stderr_as, stderr)
+        if proc.returncode != 0:
+            raise RuntimeError(f"EXEC_FAILED: returncode={proc.returncode}")
+
+    return run
+
+
+def _is_path_allowed(path: Path, allow_roots: List[_Template], env: Dict[str, Any]) -> bool:
     if not allow_roots:
         return False
     target = str(path.resolve())
-    for raw in allow_roots:
-        root = str(Path(_render_template(str(raw), env)).resolve())
+    for tpl in allow_roots:
+        root = str(Path(tpl.render(env)).resolve())
         if target.startswith(root):
             return True
     return False
 
 
-def _run_file_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    env = _build_env(ctx, ast)
+def _compile_file_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     op = str(step.get("op", "")).strip().lower()
     if op not in {"read_text", "write_text", "append_text", "exists"}:
         raise ValueError("file.op must be read_text/write_text/append_text/exists")
     raw_path = step.get("path")
     if raw_path is None:
         raise ValueError("file.path is required")
-    path = Path(_render_template(str(raw_path), env)).resolve()
+    path_tpl = _Template(str(raw_path))
+    content_tpl = _Template(str(step.get("content", "")))
+    default_save_as = "file_exists" if op == "exists" else "file_text"
+    save_as = str(step.get("save_as", default_save_as)).strip() or default_save_as
 
     sec_cfg = ast.security.get("file") if isinstance(ast.security, dict) else None
-    allow_roots = []
+    allow_roots: Any = []
     if isinstance(sec_cfg, dict):
         allow_roots = sec_cfg.get("root_allowlist") or []
-    if not isinstance(allow_roots, list):
-        raise PermissionError("FILE_NOT_ALLOWED: security.file.root_allowlist invalid")
-    if not _is_path_allowed(path, allow_roots, env):
-        raise PermissionError("FILE_NOT_ALLOWED: path not in allowlist")
-
-    if op == "write_text":
-        content = _render_template(str(step.get("content", "")), env)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding="utf-8")
-        ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(content.encode("utf-8"))})
-        return
-
-    if op == "append_text":
-        content = _render_template(str(step.get("content", "")), env)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", encoding="utf-8") as f:
-            f.write(content)
-        ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(content.encode("utf-8"))})
-        return
-
-    if op == "exists":
-        save_as = str(step.get("save_as", "file_exists")).strip() or "file_exists"
-        ok = path.exists()
-        ctx.set_var(save_as, ok)
-        ctx.set_var("last_file", {"op": op, "path": str(path), "exists": ok})
-        return
-
-    # read_text
-    text = path.read_text(encoding="utf-8")
-    save_as = str(step.get("save_as", "file_text")).strip() or "file_text"
-    ctx.set_var(save_as, text)
-    ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(text.encode("utf-8"))})
-
-
-def _run_switch_session_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    session = ast.session
-    if session is None:
-        raise ValueError("session is required")
-    env = _build_env(ctx, ast)
-
-    next_port = _render_template(str(step.get("port", session.port)), env).strip()
-    next_baud = int(_render_template(str(step.get("baud", session.baud)), env))
-    next_data_bits = int(_render_template(str(step.get("data_bits", session.data_bits)), env))
-    next_parity = _render_template(str(step.get("parity", session.parity)), env).strip().lower()
-    next_stop_bits = int(_render_template(str(step.get("stop_bits", session.stop_bits)), env))
-    next_encoding = _render_template(str(step.get("encoding", session.encoding)), env).strip().lower()
-    next_eol = _render_template(str(step.get("eol", session.eol)), env).strip().lower()
+    roots_invalid = not isinstance(allow_roots, list)
+    root_tpls = [] if roots_invalid else [_Template(str(raw)) for raw in allow_roots]
+
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx)
+        path = Path(path_tpl.render(env)).resolve()
+        if roots_invalid:
+            raise PermissionError("FILE_NOT_ALLOWED: security.file.root_allowlist invalid")
+        if not _is_path_allowed(path, root_tpls, env):
+            raise PermissionError("FILE_NOT_ALLOWED: path not in allowlist")
+
+        if op == "write_text":
+            content = content_tpl.render(env)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding="utf-8")
+            ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(content.encode("utf-8"))})
+            return
+
+        if op == "append_text":
+            content = content_tpl.render(env)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(content)
+            ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(content.encode("utf-8"))})
+            return
+
+        if op == "exists":
+            ok = path.exists()
+            ctx.set_var(save_as, ok)
+            ctx.set_var("last_file", {"op": op, "path": str(path), "exists": ok})
+            return
+
+        # read_text
+        text = path.read_text(encoding="utf-8")
+        ctx.set_var(save_as, text)
+        ctx.set_var("last_file", {"op": op, "path": str(path), "bytes": len(text.encode("utf-8"))})
+
+    return run
+
+
+_SESSION_FIELDS = ("port", "baud", "data_bits", "parity", "stop_bits", "encoding", "eol")
+
+
+def _compile_switch_session_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
+    # Omitted fields fall back to the session as it is when the step runs.
+    field_tpls = {name: _Template(str(step[name])) if name in step else None for name in _SESSION_FIELDS}
     dry_run = bool(step.get("dry_run", False))
 
-    if not dry_run:
-        channels = build_channels({"default": {"type": "serial", "device": next_port, "baudrate": next_baud}})
-        old = ctx.channel
-        ctx.channel = channels["default"]
-        ctx.channels["default"] = channels["default"]
-        if hasattr(old, "close"):
-            try:
-                old.close()  # type: ignore[attr-defined]
-            except Exception:
-                pass
-
-    session.port = next_port
-    session.baud = next_baud
-    session.data_bits = next_data_bits
-    session.parity = next_parity
-    session.stop_bits = next_stop_bits
-    session.encoding = next_encoding
-    session.eol = next_eol
-    ctx.set_var(
-        "last_session",
-        {
-            "port": next_port,
-            "baud": next_baud,
-            "data_bits": next_data_bits,
-            "parity": next_parity,
-            "stop_bits": next_stop_bits,
-            "encoding": next_encoding,
-            "eol": next_eol,
-            "dry_run": dry_run,
-        },
-    )
+    def run(ctx: RuntimeContext) -> None:
+        session = _require_session(ast, "session is required")
+        env = _build_env(ctx)
+
+        def render(name: str) -> str:
+            tpl = field_tpls[name]
+            if tpl is None:
+                return _render_template(str(getattr(session, name)), env)
+            return tpl.render(env)
+
+        next_port = render("port").strip()
+        next_baud = int(render("baud"))
+        next_data_bits = int(render("data_bits"))
+        next_parity = render("parity").strip().lower()
+        next_stop_bits = int(render("stop_bits"))
+        next_encoding = render("encoding").strip().lower()
+        next_eol = render("eol").strip().lower()
+
+        if not dry_run:
+            channels = build_channels({"default": {"type": "serial", "device": next_port, "baudrate": next_baud}})
+            old = ctx.channel
+            ctx.channel = channels["default"]
+            ctx.channels["default"] = channels["default"]
+            if hasattr(old, "close"):
+                try:
+                    old.close()  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+
+        session.port = next_port
+        session.baud = next_baud
+        session.data_bits = next_data_bits
+        session.parity = next_parity
+        session.stop_bits = next_stop_bits
+        session.encoding = next_encoding
+        session.eol = next_eol
+        ctx.set_var(
+            "last_session",
+            {
+                "port": next_port,
+                "baud": next_baud,
+                "data_bits": next_data_bits,
+                "parity": next_parity,
+                "stop_bits": next_stop_bits,
+                "encoding": next_encoding,
+                "eol": next_eol,
+                "dry_run": dry_run,
+            },
+        )
+
+    return run
 
 
 def _resolve_protocol_method(step_name: str, step: Dict[str, Any]) -> str:
@@ -556,7 +714,8 @@ def _resolve_protocol_method(step_name: str, step: Dict[str, Any]) -> str:
     raise ValueError("protocol step requires method")
 
 
-def _run_protocol_step(step_name: str, step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
+def _compile_protocol_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
+    step_name = str(step.get("name", "")).strip().lower()
     method = _resolve_protocol_method(step_name, step)
     if method not in {"send", "recv", "rpc"}:
         raise ValueError("protocol method must be send/recv/rpc")
@@ -573,111 +732,175 @@ def _run_protocol_step(step_name: str, step: Dict[str, Any], ast: ScriptAST, ctx
         raw_payload = {}
     if not isinstance(raw_payload, dict):
         raise ValueError("protocol payload must be a mapping")
+    payload_tpl = _compile_object(raw_payload)
 
-    env = _build_env(ctx, ast)
-    payload = _render_object(raw_payload, env)
     timeout_ms = int(step.get("timeout_ms", ast.defaults.timeout_ms))
     if timeout_ms <= 0:
         raise ValueError("protocol.timeout_ms must be > 0")
-
-    gateway = _get_protocol_gateway(step, ast, ctx)
-    call_ctx = ProtocolCallContext(
-        channel=ctx.channel,
-        logger=ctx.logger,
-        vars=ctx.vars_snapshot(),
-        timeout_ms=timeout_ms,
-        artifacts={},
-    )
-    result = gateway.call(protocol_id=protocol_id, method=method, ctx=call_ctx, payload=payload)
-    if not result.ok:
-        error = result.error or {}
-        code = error.get("code", "PROTOCOL_CALL_FAILED")
-        message = error.get("message", "protocol call failed")
-        raise RuntimeError(f"{code}: {message}")
-
+    explicit_dir = _optional_template(step.get("packages_dir"))
     save_as = str(step.get("save_as", "last_protocol_result")).strip() or "last_protocol_result"
-    ctx.set_var(save_as, result.data)
-    ctx.set_var(
-        "last_protocol_call",
-        {
-            "protocol": protocol_id,
-            "method": method,
-            "timeout_ms": timeout_ms,
-            "result": result.data,
-        },
-    )
-
-
-def _run_sleep_step(step: Dict[str, Any]) -> None:
+
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx)
+        payload = _render_object(payload_tpl, env)
+        gateway = _get_protocol_gateway(explicit_dir, ctx)
+        call_ctx = ProtocolCallContext(
+            channel=ctx.channel,
+            logger=ctx.logger,
+            vars=ctx.vars_snapshot(),
+            timeout_ms=timeout_ms,
+            artifacts={},
+        )
+        result = gateway.call(protocol_id=protocol_id, method=method, ctx=call_ctx, payload=payload)
+        if not result.ok:
+            error = result.error or {}
+            code = error.get("code", "PROTOCOL_CALL_FAILED")
+            message = error.get("message", "protocol call failed")
+            raise RuntimeError(f"{code}: {message}")
+
+        ctx.set_var(save_as, result.data)
+        ctx.set_var(
+            "last_protocol_call",
+            {
+                "protocol": protocol_id,
+                "method": method,
+                "timeout_ms": timeout_ms,
+                "result": result.data,
+            },
+        )
+
+    return run
+
+
+def _compile_sleep_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     ms = int(step.get("ms", 0))
     if ms < 0:
         raise ValueError("sleep.ms must be >= 0")
-    if ms == 0:
-        return
-    time.sleep(ms / 1000.0)
 
+    def run(ctx: RuntimeContext) -> None:
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    return run
 
-def _eval_assert_expr(expr: str, env: Dict[str, Any]) -> bool:
+
+def _compile_assert_expr(expr: str) -> Any:
     # Reuse existing expression engine by mapping ${var} -> $var.
-    normalized = re.sub(r"\$\{([A-Za-z_][A-Za-z0-9_\.]*)\}", r"$\1", expr)
-    return bool(eval_expr(normalized, env))
+    return compile_expr(_TPL_RE.sub(r"$\1", expr))
+
+
+def _eval_assert_expr(tree: Any, env: Dict[str, Any]) -> bool:
+    return bool(eval_compiled(tree, env))
 
 
-def _assert_clause(clause: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> bool:
+def _compile_assert_clause(clause: Any) -> Callable[[Dict[str, Any]], bool]:
     if not isinstance(clause, dict):
         raise ValueError("assert clause must be a mapping")
-    env = _build_env(ctx, ast)
     if "expr" in clause:
-        return _eval_assert_expr(str(clause.get("expr", "")), env)
+        tree = _compile_assert_expr(str(clause.get("expr", "")))
+        return lambda env: _eval_assert_expr(tree, env)
     if "match" in clause:
         match_cfg = clause.get("match")
         if not isinstance(match_cfg, dict):
             raise ValueError("assert.match must be a mapping")
-        source_raw = clause.get("source", "${last_rx_text}")
-        source_text = _render_template(str(source_raw), env)
-        return _match_text(match_cfg, source_text)
+        matches = _compile_match(match_cfg)
+        source_tpl = _Template(str(clause.get("source", "${last_rx_text}")))
+        return lambda env: matches(source_tpl.render(env))
     raise ValueError("assert clause requires expr or match")
 
 
-def _run_assert_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
+def _compile_assert_clauses(items: List[Any]) -> List[Callable[[Dict[str, Any]], bool]]:
+    """Compile all/any clauses; an ill-formed clause only fails when ``combine`` reaches it."""
+    clauses: List[Callable[[Dict[str, Any]], bool]] = []
+    for item in items:
+        try:
+            clauses.append(_compile_assert_clause(item))
+        except Exception as exc:
+            clauses.append(_failing_clause(exc))
+    return clauses
+
+
+def _failing_clause(exc: Exception) -> Callable[[Dict[str, Any]], bool]:
+    def clause(env: Dict[str, Any]) -> bool:
+        raise exc.with_traceback(None)
+
+    return clause
+
+
+def _compile_assert_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     message = str(step.get("message", "assert failed"))
+    combine: Callable[[Any], bool]
     if "all" in step:
         all_items = step.get("all")
         if not isinstance(all_items, list) or not all_items:
             raise ValueError("assert.all must be a non-empty list")
-        result = all(_assert_clause(item, ast, ctx) for item in all_items)
+        clauses = _compile_assert_clauses(all_items)
+        combine = all
     elif "any" in step:
         any_items = step.get("any")
         if not isinstance(any_items, list) or not any_items:
             raise ValueError("assert.any must be a non-empty list")
-        result = any(_assert_clause(item, ast, ctx) for item in any_items)
+        clauses = _compile_assert_clauses(any_items)
+        combine = any
     else:
-        result = _assert_clause(step, ast, ctx)
-    if not result:
-        raise AssertionError(message)
+        clauses = [_compile_assert_clause(step)]
+        combine = all
+
+    def run(ctx: RuntimeContext) -> None:
+        env = _build_env(ctx)
+        if not combine(clause(env) for clause in clauses):
+            raise AssertionError(message)
+
+    return run
+
+
+def _compile_body(items: List[Any], label: str, ast: ScriptAST) -> List[CompiledStep | str]:
+    """Compile nested steps; a non-mapping entry keeps its error message and fails when reached."""
+    body: List[CompiledStep | str] = []
+    for idx, child in enumerate(items):
+        if isinstance(child, dict):
+            body.append(_compile_step(child, ast))
+        else:
+            body.append(f"{label}[{idx}] must be a mapping")
+    return body
+
+
+def _run_body(body: List[CompiledStep | str], ctx: RuntimeContext) -> None:
+    for child in body:
+        if isinstance(child, str):
+            raise ValueError(child)
+        _run_step_with_reliability(child, ctx)
 
 
-def _run_if_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
+def _compile_if_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     when_expr = str(step.get("when", "")).strip()
     if not when_expr:
         raise ValueError("if.when is required")
-    env = _build_env(ctx, ast)
-    cond = _eval_assert_expr(when_expr, env)
-    branch_key = "then" if cond else "else"
-    branch_steps = step.get(branch_key, [])
-    if branch_steps is None:
-        branch_steps = []
-    if not isinstance(branch_steps, list):
-        raise ValueError(f"if.{branch_key} must be a list")
-    for idx, child in enumerate(branch_steps):
-        if not isinstance(child, dict):
-            raise ValueError(f"if.{branch_key}[{idx}] must be a mapping")
-        _run_step_with_reliability(child, ast, ctx)
-
-
-def _run_loop_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
-    body = step.get("steps")
-    if not isinstance(body, list) or not body:
+    when_tree = _compile_assert_expr(when_expr)
+
+    # An ill-formed branch only fails when it is taken.
+    branches: Dict[bool, List[CompiledStep | str] | str] = {}
+    for cond, branch_key in ((True, "then"), (False, "else")):
+        branch_steps = step.get(branch_key, [])
+        if branch_steps is None:
+            branch_steps = []
+        if isinstance(branch_steps, list):
+            branches[cond] = _compile_body(branch_steps, f"if.{branch_key}", ast)
+        else:
+            branches[cond] = f"if.{branch_key} must be a list"
+
+    def run(ctx: RuntimeContext) -> None:
+        branch = branches[_eval_assert_expr(when_tree, _build_env(ctx))]
+        if isinstance(branch, str):
+            raise ValueError(branch)
+        _run_body(branch, ctx)
+
+    return run
+
+
+def _compile_loop_step(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
+    steps = step.get("steps")
+    if not isinstance(steps, list) or not steps:
         raise ValueError("loop.steps must be a non-empty list")
     times = step.get("times")
     until = step.get("until")
@@ -686,28 +909,28 @@ def _run_loop_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) ->
     max_rounds = int(times) if times is not None else 1000000
     if max_rounds < 0:
         raise ValueError("loop.times must be >= 0")
+    until_tree = _compile_assert_expr(str(until)) if until else None
+    body = _compile_body(steps, "loop.steps", ast)
 
-    rounds = 0
-    while rounds < max_rounds:
-        if until:
-            env = _build_env(ctx, ast)
-            if _eval_assert_expr(str(until), env):
+    def run(ctx: RuntimeContext) -> None:
+        rounds = 0
+        while rounds < max_rounds:
+            if until_tree is not None and _eval_assert_expr(until_tree, _build_env(ctx)):
                 break
-        for idx, child in enumerate(body):
-            if not isinstance(child, dict):
-                raise ValueError(f"loop.steps[{idx}] must be a mapping")
-            _run_step_with_reliability(child, ast, ctx)
-        rounds += 1
-        ctx.set_var("last_loop_round", rounds)
+            _run_body(body, ctx)
+            rounds += 1
+            ctx.set_var("last_loop_round", rounds)
 
+    return run
 
-def _resolve_retry(step: Dict[str, Any], ast: ScriptAST) -> Dict[str, int | str]:
+
+def _resolve_retry(step: Dict[str, Any], ast: ScriptAST) -> RetryPolicy:
     retry_cfg = step.get("retry")
     if retry_cfg is None:
         count = int(ast.defaults.retry.count)
         backoff_ms = int(ast.defaults.retry.backoff_ms)
         strategy = str(ast.defaults.retry.strategy)
-        return {"count": count, "backoff_ms": backoff_ms, "strategy": strategy}
+        return RetryPolicy(count=count, backoff_ms=backoff_ms, strategy=strategy)
     if not isinstance(retry_cfg, dict):
         raise ValueError("step.retry must be a mapping")
     count = int(retry_cfg.get("count", ast.defaults.retry.count))
@@ -719,91 +942,119 @@ def _resolve_retry(step: Dict[str, Any], ast: ScriptAST) -> Dict[str, int | str]
         raise ValueError("step.retry.backoff_ms must be >= 0")
     if strategy not in {"fixed", "exponential"}:
         raise ValueError("step.retry.strategy must be fixed or exponential")
-    return {"count": count, "backoff_ms": backoff_ms, "strategy": strategy}
+    return RetryPolicy(count=count, backoff_ms=backoff_ms, strategy=strategy)
+
+
+_STEP_COMPILERS: Dict[str, Callable[[Dict[str, Any], ScriptAST], StepHandler]] = {
+    "send": _compile_send_step,
+    "expect": _compile_expect_step,
+    "sleep": _compile_sleep_step,
+    "capture": _compile_capture_step,
+    "parse": _compile_parse_step,
+    "path": _compile_path_step,
+    "measure": _compile_measure_step,
+    "assert_range": _compile_assert_range_step,
+    "exec": _compile_exec_step,
+    "file": _compile_file_step,
+    "switch_session": _compile_switch_session_step,
+    "protocol.send": _compile_protocol_step,
+    "protocol.recv": _compile_protocol_step,
+    "protocol.rpc": _compile_protocol_step,
+    "protocol": _compile_protocol_step,
+    "assert": _compile_assert_step,
+    "if": _compile_if_step,
+    "loop": _compile_loop_step,
+}
+
+
+@dataclass
+class CompiledStep:
+    """A step validated once, with its handler bound to precompiled templates/regexes/expressions."""
+
+    raw: Dict[str, Any]
+    run: StepHandler
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    retry_error: Optional[Exception] = None
+    on_fail: List["CompiledStep"] = field(default_factory=list)
+
+
+@dataclass
+class V01Plan:
+    """Execution plan of a v0.1/v0.2 script; reflects the AST as it was when compiled."""
 
+    steps: List[CompiledStep] = field(default_factory=list)
 
-def _dispatch_step(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> None:
+
+def _failing_handler(exc: Exception) -> StepHandler:
+    def run(ctx: RuntimeContext) -> None:
+        raise exc.with_traceback(None)
+
+    return run
+
+
+def _compile_handler(step: Dict[str, Any], ast: ScriptAST) -> StepHandler:
     name = str(step.get("name", "")).strip().lower()
     if not name:
         raise ValueError("step.name is required")
-    if name == "send":
-        _run_send_step(step, ast, ctx)
-        return
-    if name == "expect":
-        _run_expect_step(step, ast, ctx)
-        return
-    if name == "sleep":
-        _run_sleep_step(step)
-        return
-    if name == "capture":
-        _run_capture_step(step, ast, ctx)
-        return
-    if name == "parse":
-        _run_parse_step(step, ast, ctx)
-        return
-    if name == "path":
-        _run_path_step(step, ast, ctx)
-        return
-    if name == "measure":
-        _run_measure_step(step, ast, ctx)
-        return
-    if name == "assert_range":
-        _run_assert_range_step(step, ast, ctx)
-        return
-    if name == "exec":
-        _run_exec_step(step, ast, ctx)
-        return
-    if name == "file":
-        _run_file_step(step, ast, ctx)
-        return
-    if name == "switch_session":
-        _run_switch_session_step(step, ast, ctx)
-        return
-    if name in {"protocol.send", "protocol.recv", "protocol.rpc", "protocol"}:
-        _run_protocol_step(name, step, ast, ctx)
-        return
-    if name == "assert":
-        _run_assert_step(step, ast, ctx)
-        return
-    if name == "if":
-        _run_if_step(step, ast, ctx)
-        return
-    if name == "loop":
-        _run_loop_step(step, ast, ctx)
-        return
-    raise NotImplementedError(f"v0.1 step not implemented yet: {name}")
-
-
-def _run_on_fail(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> int:
+    compiler = _STEP_COMPILERS.get(name)
+    if compiler is None:
+        raise NotImplementedError(f"v0.1 step not implemented yet: {name}")
+    return compiler(step, ast)
+
+
+def _compile_step(step: Dict[str, Any], ast: ScriptAST) -> CompiledStep:
+    # Errors are kept and raised when the step runs, so they still surface at the step
+    # that caused them (with its retry/on_fail and trace) rather than before the script starts.
+    try:
+        handler = _compile_handler(step, ast)
+    except Exception as exc:
+        handler = _failing_handler(exc)
+    compiled = CompiledStep(raw=step, run=handler)
+    try:
+        compiled.retry = _resolve_retry(step, ast)
+    except Exception as exc:
+        compiled.retry_error = exc
+
     hooks = step.get("on_fail")
-    if hooks is None:
-        return 0
-    if not isinstance(hooks, list):
-        raise ValueError("step.on_fail must be a list")
+    if isinstance(hooks, list):
+        for hook in hooks:
+            # A malformed hook list stops the hooks at that entry; the step error is raised either way.
+            if not isinstance(hook, dict):
+                break
+            compiled.on_fail.append(_compile_step(hook, ast))
+    return compiled
+
+
+def compile_v01(ast: ScriptAST) -> V01Plan:
+    """Compile every step of the script once; execute_v01 then only does I/O and evaluation."""
+    return V01Plan(steps=[_compile_step(step, ast) for step in ast.steps])
+
+
+def _run_on_fail(step: CompiledStep, ctx: RuntimeContext) -> int:
     ran = 0
-    for idx, hook in enumerate(hooks):
-        if not isinstance(hook, dict):
-            raise ValueError(f"step.on_fail[{idx}] must be a mapping")
+    for hook in step.on_fail:
         try:
-            _dispatch_step(hook, ast, ctx)
+            hook.run(ctx)
             ran += 1
         except Exception as exc:
             ctx.logger.warning(f"on_fail step ignored due to error: {exc}")
     return ran
 
 
-def _run_step_with_reliability(step: Dict[str, Any], ast: ScriptAST, ctx: RuntimeContext) -> Dict[str, Any]:
-    retry = _resolve_retry(step, ast)
-    count = int(retry["count"])
-    backoff_ms = int(retry["backoff_ms"])
-    strategy = str(retry["strategy"])
+def _run_step_with_reliability(step: CompiledStep, ctx: RuntimeContext) -> Dict[str, Any]:
+    if step.retry_error is not None:
+        raise step.retry_error.with_traceback(None)
+    retry = step.retry
+    count = retry.count
+    backoff_ms = retry.backoff_ms
+    strategy = retry.strategy
     last_error: Exception | None = None
     attempts = 0
 
     for attempt in range(count + 1):
         attempts += 1
         try:
-            _dispatch_step(step, ast, ctx)
+            step.run(ctx)
             return {"attempts": attempts, "retry_count": count, "on_fail_steps": 0}
         except Exception as exc:
             last_error = exc
@@ -815,7 +1066,7 @@ def _run_step_with_reliability(step: Dict[str, Any], ast: ScriptAST, ctx: Runtim
 
     on_fail_steps = 0
     try:
-        on_fail_steps = _run_on_fail(step, ast, ctx)
+        on_fail_steps = _run_on_fail(step, ctx)
     finally:
         if last_error is not None:
             raise last_error
@@ -864,12 +1115,15 @@ def _error_payload(exc: Exception, step_id: str) -> Dict[str, Any]:
     }
 
 
-def execute_v01(ast: ScriptAST, ctx: RuntimeContext) -> Dict[str, Any]:
+def execute_v01(ast: ScriptAST, ctx: RuntimeContext, plan: Optional[V01Plan] = None) -> Dict[str, Any]:
+    if plan is None:
+        plan = compile_v01(ast)
     started_at = time.time()
     traces: List[Dict[str, Any]] = []
     error: Dict[str, Any] | None = None
 
-    for idx, step in enumerate(ast.steps):
+    for idx, compiled in enumerate(plan.steps):
+        step = compiled.raw
         step_id = str(step.get("id") or f"step_{idx + 1}")
         step_name = str(step.get("name") or "")
         t0 = time.time()
@@ -880,7 +1134,7 @@ def execute_v01(ast: ScriptAST, ctx: RuntimeContext) -> Dict[str, Any]:
             "started_at": t0,
         }
         try:
-            reliability = _run_step_with_reliability(step, ast, ctx)
+            reliability = _run_step_with_reliability(compiled, ctx)
             trace["status"] = "ok"
             trace.update(reliability)
         except Exception as exc:
@@ -117,8 +117,14 @@ def _build_vars(env: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
+def compile_expr(expr: str) -> ast.expr:
+    """预解析表达式，返回的语法树可配合 eval_compiled 反复求值。"""
+    return ast.parse(_prepare_expr(expr), mode="eval").body
+
+
+def eval_compiled(tree: ast.expr, env: Dict[str, Any]) -> Any:
+    return SafeEvaluator(_build_vars(env)).visit(tree)
+
+
 def eval_expr(expr: str, env: Dict[str, Any]) -> Any:
-    prepared = _prepare_expr(expr)
-    vars_map = _build_vars(env)
-    evaluator = SafeEvaluator(vars_map)
-    return evaluator.eval(prepared)
+    return eval_compiled(compile_expr(expr), env)
@@ -1,99 +1,188 @@
-"""Communication manager: bridges serial/TCP sessions to unified comm.* events."""
+"""Communication manager: owns serial/TCP sessions and bridges them to unified comm.* events.
+
+Sessions are keyed by session id and may run concurrently (one I/O reactor thread serves
+all of them). Each session publishes on its own topics, which are aliased onto both the
+per-session ``comm.<event>.<session_id>`` topics and the global ``comm.<event>`` topics:
+
+    serial.rx.<sid> / tcp.rx.<sid>  ->  comm.rx.<sid>  ->  comm.rx
+    serial.tx.<sid> / tcp.tx.<sid>  ->  comm.tx.<sid>  ->  comm.tx
+    comm.connected.<sid> / comm.disconnected.<sid> / comm.error.<sid>  ->  comm.<event>
+
+``select_serial``/``select_tcp``/``close``/``send`` keep the single-channel API by acting
+on the current session; ``open_serial``/``open_tcp``/``close_session`` manage the rest.
+"""
 
 from __future__ import annotations
 
-from typing import Any, Optional, Union
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import IoReactor
 from infra.comm.serial_manager import SerialManager
 from infra.comm.tcp_session import TcpSession
 
 SessionType = Union[SerialManager, TcpSession]
 
+_COMM_EVENTS = ("connected", "disconnected", "error")
+
+
+def serial_session_id(port: str) -> str:
+    return f"serial:{port}"
+
+
+def tcp_session_id(host: str, port: int) -> str:
+    return f"tcp:{host}:{port}"
+
 
 class CommunicationManager:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(self, bus: EventBus, reactor: Optional[IoReactor] = None) -> None:
         self._bus = bus
-        self._current_session: Optional[SessionType] = None
-        self._suppress_disconnect_event = False
-
-        # Bridge low-level events to unified communication events.
-        self._bus.subscribe("serial.rx", lambda data: self._bus.publish("comm.rx", data))
-        self._bus.subscribe("tcp.rx", lambda data: self._bus.publish("comm.rx", data))
-        self._bus.subscribe("serial.tx", lambda data: self._bus.publish("comm.tx", data))
-        self._bus.subscribe("tcp.tx", lambda data: self._bus.publish("comm.tx", data))
-        self._bus.subscribe("serial.error", lambda reason: self._bus.publish("comm.error", reason))
-        self._bus.subscribe("tcp.error", lambda reason: self._bus.publish("comm.error", reason))
-        self._bus.subscribe("serial.closed", self._on_serial_closed)
-        self._bus.subscribe("tcp.disconnected", self._on_tcp_disconnected)
-
-        # Serial reconnection path: SerialManager emits serial.opened again after reconnect.
-        self._bus.subscribe("serial.opened", self._on_serial_opened)
+        self._reactor = reactor or IoReactor.shared()
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, SessionType] = {}
+        self._bindings: Dict[str, List[Tuple[str, Callable[[Any], None]]]] = {}
+        self._aliases: Dict[str, List[Tuple[str, str]]] = {}
+        self._current_id: Optional[str] = None
 
         # Protocol outbound frames are sent through current selected session.
         self._bus.subscribe("protocol.tx", self._handle_protocol_tx)
 
+    @property
+    def _current_session(self) -> Optional[SessionType]:
+        session_id = self._current_id
+        return self._sessions.get(session_id) if session_id else None
+
     def select_serial(self, port: str, baud: int) -> None:
-        """Select and open a serial channel."""
-        if isinstance(self._current_session, SerialManager):
-            if (
-                self._current_session.is_open()
-                and self._current_session.port == port
-                and self._current_session.baudrate == baud
-            ):
+        """Select and open a serial channel as the current session."""
+        session = self._current_session
+        if isinstance(session, SerialManager):
+            if session.is_open() and session.port == port and session.baudrate == baud:
                 return
-
         self.close(notify=False)
-        session = SerialManager(self._bus)
-        # Set current session first, so serial.opened callback can publish comm.connected.
-        self._current_session = session
-        if not session.open(port=port, baudrate=baud):
-            self._current_session = None
+        session_id = self.open_serial(port, baud)
+        if session_id:
+            self._current_id = session_id
 
     def select_tcp(self, ip: str, port: int) -> None:
-        """Select and open a TCP channel."""
+        """Select and open a TCP channel as the current session."""
         self.close(notify=False)
-        session = TcpSession(self._bus)
-        session.connect(ip, port)
-        if session.is_connected():
-            self._current_session = session
-            self._bus.publish(
-                "comm.connected",
-                {"type": "tcp", "host": ip, "port": port, "address": f"{ip}:{port}"},
-            )
+        session_id = self.open_tcp(ip, port)
+        if session_id:
+            self._current_id = session_id
+
+    def open_serial(self, port: str, baud: int, session_id: Optional[str] = None) -> Optional[str]:
+        """Open an additional serial session; returns its id, or None on failure."""
+        session_id = session_id or serial_session_id(port)
+        self.close_session(session_id, notify=False)
+        session = SerialManager(self._bus, reactor=self._reactor, session_id=session_id)
+        # Register before opening, so serial.opened can publish comm.connected.
+        self._attach(session_id, session)
+        if self._current_id is None:
+            self._current_id = session_id
+        if not session.open(port=port, baudrate=baud):
+            self._detach(session_id)
+            return None
+        return session_id
+
+    def open_tcp(self, host: str, port: int, session_id: Optional[str] = None) -> Optional[str]:
+        """Open an additional TCP session; returns its id, or None on failure."""
+        session_id = session_id or tcp_session_id(host, port)
+        self.close_session(session_id, notify=False)
+        session = TcpSession(self._bus, reactor=self._reactor, session_id=session_id)
+        self._attach(session_id, session)
+        session.connect(host, port)
+        if not session.is_connected():
+            self._detach(session_id)
+            return None
+        if self._current_id is None:
+            self._current_id = session_id
+        self._bus.publish(
+            f"comm.connected.{session_id}",
+            {"type": "tcp", "host": host, "port": port, "address": f"{host}:{port}", "session_id": session_id},
+        )
+        return session_id
 
     def close(self, notify: bool = True) -> None:
         """Close current session."""
-        if self._current_session:
-            self._suppress_disconnect_event = not notify
-            try:
-                self._current_session.close()
-            except Exception:
-                pass
-            self._current_session = None
-            self._suppress_disconnect_event = False
-
-    def send(self, data: bytes) -> None:
-        """Send bytes through current session."""
-        if not self._current_session:
+        session_id = self._current_id
+        if session_id:
+            self.close_session(session_id, notify=notify)
+
+    def close_session(self, session_id: str, notify: bool = True) -> None:
+        """Close one session by id."""
+        # Detach first: serial.closed / tcp.disconnected are delivered asynchronously and
+        # must not be mistaken for an unsolicited drop.
+        session = self._detach(session_id, keep_aliases=True)
+        if session is None:
+            return
+        try:
+            session.close()
+        except Exception:
+            pass
+        if notify:
+            self._bus.publish(f"comm.disconnected.{session_id}")
+        self._drop_aliases(session_id)
+
+    def close_all(self, notify: bool = True) -> None:
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close_session(session_id, notify=notify)
+
+    def send(self, data: bytes, session_id: Optional[str] = None) -> None:
+        """Send bytes through the given session (default: current session)."""
+        session = self._sessions.get(session_id or self._current_id or "")
+        if not session:
             self._bus.publish("comm.error", "no active session")
             return
         try:
-            self._current_session.send(data)
+            session.send(data)
         except Exception as exc:
             self._bus.publish("comm.error", str(exc))
 
+    def configure_tx(
+        self,
+        session_id: Optional[str] = None,
+        coalesce: bool = True,
+        max_bytes_per_sec: int = 0,
+        frame_gap_sec: float = 0.0,
+    ) -> bool:
+        """Set TX write coalescing, byte-rate cap and inter-frame gap for a session (default: current)."""
+        session = self._sessions.get(session_id or self._current_id or "")
+        if not session:
+            return False
+        session.configure_tx(coalesce=coalesce, max_bytes_per_sec=max_bytes_per_sec, frame_gap_sec=frame_gap_sec)
+        return True
+
     def list_serial_ports(self) -> list[str]:
         """Return available serial ports for UI."""
         return SerialManager.list_ports()
 
-    def get_status(self) -> Optional[dict]:
-        """Return current channel status for UI polling."""
-        session = self._current_session
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Return status of every open session."""
+        with self._lock:
+            items = list(self._sessions.items())
+        result = []
+        for session_id, session in items:
+            status = self._session_status(session)
+            if status:
+                status["session_id"] = session_id
+                status["current"] = session_id == self._current_id
+                result.append(status)
+        return result
+
+    def get_status(self, session_id: Optional[str] = None) -> Optional[dict]:
+        """Return channel status for UI polling (default: current session)."""
+        session = self._sessions.get(session_id or self._current_id or "")
+        return self._session_status(session) if session else None
+
+    @staticmethod
+    def _session_status(session: SessionType) -> Optional[dict]:
         if isinstance(session, SerialManager):
             if not session.is_open():
                 return None
-            return {"type": "serial", "port": session.port, "baud": session.baudrate}
+            return {"type": "serial", "port": session.port, "baud": session.baudrate, "tx": session.tx_stats()}
         if isinstance(session, TcpSession):
             if not session.is_connected():
                 return None
@@ -101,39 +190,73 @@ class CommunicationManager:
             if not endpoint:
                 return None
             host, port = endpoint
-            return {"type": "tcp", "host": host, "port": port, "address": f"{host}:{port}"}
+            return {"type": "tcp", "host": host, "port": port, "address": f"{host}:{port}", "tx": session.tx_stats()}
         return None
 
+    def _attach(self, session_id: str, session: SessionType) -> None:
+        kind = "serial" if isinstance(session, SerialManager) else "tcp"
+        aliases = [
+            (f"{kind}.rx.{session_id}", f"comm.rx.{session_id}"),
+            (f"{kind}.tx.{session_id}", f"comm.tx.{session_id}"),
+            (f"comm.rx.{session_id}", "comm.rx"),
+            (f"comm.tx.{session_id}", "comm.tx"),
+        ]
+        aliases.extend((f"comm.{name}.{session_id}", f"comm.{name}") for name in _COMM_EVENTS)
+        error_topic = f"comm.error.{session_id}"
+        bindings: List[Tuple[str, Callable[[Any], None]]] = [
+            (f"{kind}.error.{session_id}", lambda reason: self._bus.publish(error_topic, reason)),
+        ]
+        if kind == "serial":
+            bindings.append((f"serial.opened.{session_id}", lambda _p: self._on_serial_opened(session_id)))
+            bindings.append((f"serial.closed.{session_id}", lambda _p: self._on_session_dropped(session_id)))
+        else:
+            bindings.append((f"tcp.disconnected.{session_id}", lambda _p: self._on_session_dropped(session_id)))
+        for source, target in aliases:
+            self._bus.alias(source, target)
+        for topic, handler in bindings:
+            self._bus.subscribe(topic, handler)
+        with self._lock:
+            self._sessions[session_id] = session
+            self._bindings[session_id] = bindings
+            self._aliases[session_id] = aliases
+
+    def _detach(self, session_id: str, keep_aliases: bool = False) -> Optional[SessionType]:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            bindings = self._bindings.pop(session_id, [])
+            if self._current_id == session_id:
+                self._current_id = None
+        for topic, handler in bindings:
+            self._bus.unsubscribe(topic, handler)
+        if not keep_aliases:
+            self._drop_aliases(session_id)
+        return session
+
+    def _drop_aliases(self, session_id: str) -> None:
+        with self._lock:
+            aliases = self._aliases.pop(session_id, [])
+        for source, target in aliases:
+            self._bus.unalias(source, target)
+
     def _handle_protocol_tx(self, data: bytes) -> None:
         if not data:
             return
         self.send(data)
 
-    def _on_serial_opened(self, _port: str) -> None:
-        session = self._current_session
-        if not isinstance(session, SerialManager):
-            return
-        if not session.is_open():
+    def _on_serial_opened(self, session_id: str) -> None:
+        session = self._sessions.get(session_id)
+        if not isinstance(session, SerialManager) or not session.is_open():
             return
         self._bus.publish(
-            "comm.connected",
-            {
-                "type": "serial",
-                "port": session.port,
-                "baud": session.baudrate,
-            },
+            f"comm.connected.{session_id}",
+            {"type": "serial", "port": session.port, "baud": session.baudrate, "session_id": session_id},
         )
 
-    def _on_serial_closed(self, _payload: Any = None) -> None:
-        if self._suppress_disconnect_event:
+    def _on_session_dropped(self, session_id: str) -> None:
+        """Unsolicited close (e.g. TCP peer shutdown): report and forget the session."""
+        session = self._sessions.get(session_id)
+        if session is None or self._session_status(session) is not None:
             return
-        session = self._current_session
-        if isinstance(session, SerialManager):
-            self._bus.publish("comm.disconnected")
-
-    def _on_tcp_disconnected(self, _payload: Any = None) -> None:
-        if self._suppress_disconnect_event:
-            return
-        session = self._current_session
-        if isinstance(session, TcpSession):
-            self._bus.publish("comm.disconnected")
+        self._bus.publish(f"comm.disconnected.{session_id}")
+        self._detach(session_id, keep_aliases=True)
+        self._drop_aliases(session_id)
@@ -0,0 +1,224 @@
+"""I/O 反应器：单线程基于 selectors 等待所有已打开串口/套接字的可读事件。
+
+- 取代每个会话一个轮询线程（in_waiting + sleep / socket 超时轮询），数据到达即派发
+- 注册/注销可在任意线程调用，实际操作在反应器线程内执行；注销返回时保证不再回调
+- 回调在反应器线程执行，必须快速返回（读数据、发布事件），不得做阻塞操作
+- 不支持 fileno 的对象（如 Windows 串口）由调用方自行回退到阻塞读线程
+- call_later 提供轻量定时器（发送节拍等），到期回调同样在反应器线程执行
+"""
+
+from __future__ import annotations
+
+import heapq
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+ReadyCallback = Callable[[int], None]
+
+EVENT_READ = selectors.EVENT_READ
+EVENT_WRITE = selectors.EVENT_WRITE
+
+
+def selectable_fileno(fileobj: Any) -> Optional[int]:
+    """返回可交给 selectors 的文件描述符，不支持时返回 None。"""
+    try:
+        fd = fileobj.fileno() if hasattr(fileobj, "fileno") else int(fileobj)
+    except Exception:
+        return None
+    if not isinstance(fd, int) or fd < 0:
+        return None
+    # Windows 的 select 只接受套接字。
+    if sys.platform == "win32" and not isinstance(fileobj, socket.socket):
+        return None
+    return fd
+
+
+class IoReactor:
+    _shared: Optional["IoReactor"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name: str = "IoReactor") -> None:
+        self._name = name
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, EVENT_READ, None)
+        self._callbacks: Dict[int, ReadyCallback] = {}
+        self._calls: Deque[Callable[[], None]] = deque()
+        self._timers: List[Tuple[float, int, Callable[[], None]]] = []
+        self._timer_seq = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @classmethod
+    def shared(cls) -> "IoReactor":
+        """进程级共享反应器，所有会话共用一个线程。"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def in_reactor_thread(self) -> bool:
+        return self._thread is threading.current_thread()
+
+    def register(self, fileobj: Any, callback: ReadyCallback, events: int = EVENT_READ) -> None:
+        """监听 fileobj，就绪时在反应器线程调用 callback(mask)。"""
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+
+        def _op() -> None:
+            self._callbacks[fd] = callback
+            try:
+                self._selector.register(fd, events, None)
+            except KeyError:
+                self._selector.modify(fd, events, None)
+
+        self._ensure_running()
+        self._run_in_loop(_op, wait=True)
+
+    def modify(self, fileobj: Any, events: int) -> None:
+        """修改监听事件（如临时加入 EVENT_WRITE）。"""
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+
+        def _op() -> None:
+            if fd in self._callbacks:
+                self._selector.modify(fd, events, None)
+
+        self._run_in_loop(_op, wait=False)
+
+    def unregister(self, fileobj: Any) -> None:
+        """停止监听；返回后该 fileobj 的回调不会再被调用，可安全关闭。"""
+        try:
+            fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        except Exception:
+            return
+
+        def _op() -> None:
+            if self._callbacks.pop(fd, None) is None:
+                return
+            try:
+                self._selector.unregister(fd)
+            except (KeyError, ValueError):
+                pass
+
+        self._run_in_loop(_op, wait=True)
+
+    def call_soon(self, fn: Callable[[], None]) -> None:
+        """在反应器线程执行 fn（线程安全）。"""
+        self._ensure_running()
+        self._run_in_loop(fn, wait=False)
+
+    def call_later(self, delay: float, fn: Callable[[], None]) -> None:
+        """delay 秒后在反应器线程执行 fn（线程安全）。"""
+        deadline = time.monotonic() + max(0.0, delay)
+        with self._lock:
+            self._timer_seq += 1
+            heapq.heappush(self._timers, (deadline, self._timer_seq, fn))
+        self._ensure_running()
+        if not self.in_reactor_thread():
+            self._wake()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        with self._lock:
+            self._running = False
+            thread = self._thread
+        self._wake()
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, name=self._name, daemon=True)
+            self._thread.start()
+
+    def _run_in_loop(self, fn: Callable[[], None], wait: bool) -> None:
+        if self.in_reactor_thread() or not self._running:
+            fn()
+            return
+        if not wait:
+            self._calls.append(fn)
+            self._wake()
+            return
+        done = threading.Event()
+
+        def _wrapped() -> None:
+            try:
+                fn()
+            finally:
+                done.set()
+
+        self._calls.append(_wrapped)
+        self._wake()
+        done.wait(timeout=2.0)
+
+    def _next_timeout(self) -> float:
+        with self._lock:
+            if not self._timers:
+                return 1.0
+            return min(1.0, max(0.0, self._timers[0][0] - time.monotonic()))
+
+    def _run_timers(self) -> None:
+        now = time.monotonic()
+        due: List[Callable[[], None]] = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers)[2])
+        for fn in due:
+            try:
+                fn()
+            except Exception as exc:
+                self._log(f"[ERROR] timer failed: {exc}")
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # 唤醒缓冲已满说明反应器必然会醒来
+
+    def _loop(self) -> None:
+        while self._running:
+            try:
+                ready = self._selector.select(timeout=self._next_timeout())
+            except OSError:
+                ready = []
+            for key, mask in ready:
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                callback = self._callbacks.get(key.fd)
+                if callback is None:
+                    continue
+                try:
+                    callback(mask)
+                except Exception as exc:
+                    self._log(f"[ERROR] callback failed fd={key.fd}: {exc}")
+            while self._calls:
+                fn = self._calls.popleft()
+                try:
+                    fn()
+                except Exception as exc:
+                    self._log(f"[ERROR] call failed: {exc}")
+            self._run_timers()
+        # 停止后执行残留操作，避免注销方一直等待。
+        while self._calls:
+            try:
+                self._calls.popleft()()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _log(msg: str) -> None:
+        print(f"[IoReactor] {msg}")
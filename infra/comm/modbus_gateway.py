@@ -0,0 +1,104 @@
+"""Modbus TCP ↔ RTU 网关转换：上位机端说 Modbus TCP（MBAP 头），设备端说 Modbus RTU（CRC）。
+
+- to_device：按 MBAP 长度切出完整请求，去掉 MBAP 头、补 CRC 后写往设备；记下事务号等待响应
+- to_host：用 ModbusRtuRule 按功能码与 CRC 切出完整响应，去掉 CRC、按请求顺序补回事务号
+- 广播（单元号 0）不等待响应；CRC 错误或无法识别的字节逐字节丢弃直至重新同步，计入 errors
+- 请求不做流水线：新请求发出时，之前未得到响应（设备超时）的事务作废，不会让后续响应错配事务号
+- 上位机端客户端断开时 reset()：清空两侧缓冲与待响应队列，新客户端从干净状态开始
+
+两个方向分别由各自的转发线程（或同一事件循环）调用，缓冲与待响应队列用锁保护。
+请求按到达顺序直接写往设备，不做串行化排队：一问一答的主站可直接使用，流水线主站需自行等待响应。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from infra.common.utils.checksum import crc16_modbus
+from infra.protocol.stream_framer import NEED_MORE, UNKNOWN, ModbusRtuRule
+
+GATEWAY_MODBUS_TCP_RTU = "modbus_tcp_rtu"
+_MBAP_HEADER = 7
+_MAX_PDU = 253
+
+
+class ModbusTcpRtuGateway:
+    def __init__(self) -> None:
+        self._rule = ModbusRtuRule()
+        self._lock = threading.Lock()
+        self._tcp_buf = bytearray()
+        self._rtu_buf = bytearray()
+        # (事务号, 单元号)，与设备响应配对；不做流水线，至多一项。
+        self._outstanding: Deque[Tuple[bytes, int]] = deque()
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0
+
+    def to_device(self, data: bytes) -> bytes:
+        out = bytearray()
+        with self._lock:
+            buf = self._tcp_buf
+            buf += data
+            while len(buf) >= _MBAP_HEADER:
+                length = int.from_bytes(buf[4:6], "big")
+                if buf[2:4] != b"\x00\x00" or length < 2 or length > _MAX_PDU + 1:
+                    # MBAP 头不合法时无法在 TCP 流中重新定位帧边界，丢弃已缓冲的字节。
+                    self.errors += 1
+                    buf.clear()
+                    break
+                size = 6 + length
+                if len(buf) < size:
+                    break
+                transaction, unit = bytes(buf[0:2]), buf[6]
+                body = bytes(buf[6:size])
+                del buf[:size]
+                out += body + crc16_modbus(body).to_bytes(2, "little")
+                # 新请求发出前残留的设备字节与未得到响应（已超时）的事务都已不可能属于它。
+                self._rtu_buf.clear()
+                self._outstanding.clear()
+                if unit != 0:
+                    self._outstanding.append((transaction, unit))
+                self.requests += 1
+        return bytes(out)
+
+    def to_host(self, data: bytes) -> bytes:
+        out = bytearray()
+        with self._lock:
+            buf = self._rtu_buf
+            buf += data
+            while buf:
+                length = self._rule.frame_length(buf, 0, "RX")
+                if length == NEED_MORE:
+                    break
+                if length == UNKNOWN:
+                    del buf[:1]
+                    self.errors += 1
+                    continue
+                frame = bytes(buf[:length])
+                del buf[:length]
+                if not self._outstanding:
+                    # 没有等待中的请求（主站已放弃或设备主动上报），无法补回事务号。
+                    self.errors += 1
+                    continue
+                transaction, _unit = self._outstanding.popleft()
+                body = frame[:-2]
+                out += transaction + b"\x00\x00" + len(body).to_bytes(2, "big") + body
+                self.responses += 1
+        return bytes(out)
+
+    def reset(self) -> None:
+        """丢弃两侧未处理的字节与待响应事务（上位机端客户端断开）。"""
+        with self._lock:
+            self._tcp_buf.clear()
+            self._rtu_buf.clear()
+            self._outstanding.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "responses": self.responses,
+            "errors": self.errors,
+            "outstanding": len(self._outstanding),
+        }
@@ -0,0 +1,383 @@
+"""代理端点：串口、TCP 客户端与 TCP 监听，供 ProxyForwardManager 的转发会话使用。
+
+端口字段按前缀解析：
+
+- tcp://host:port：连接到服务端（拦截客户端与服务端之间的 TCP 流量时作为设备端）
+- tcp-listen://host:port：在本地端口等待客户端（把串口设备暴露为 TCP 端口，或作为被拦截客户端的连接目标），
+  端口为 0 时由系统分配，实际地址见 describe()
+- 其他：串口名
+
+线程模式使用阻塞 read/write（read 最多等待 0.1 s 以便检查停止标志）；事件循环模式先 set_nonblocking，
+再在 data_fd 上非阻塞 recv_nowait/send_nowait。TCP 监听端点一次服务一个客户端：客户端断开不算会话错误，
+重新等待连接，其间发往该端的数据被丢弃（write 返回 False）。
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import serial
+from serial import SerialException
+
+from infra.comm.io_reactor import selectable_fileno
+
+TCP_PREFIX = "tcp://"
+TCP_LISTEN_PREFIX = "tcp-listen://"
+_READ_SIZE = 65536
+_READ_WAIT_SEC = 0.1
+_CONNECT_TIMEOUT_SEC = 3.0
+
+# 监听端点的客户端连接/断开通知：peer 为 "ip:port"，断开时为 None。
+PeerCallback = Callable[[Optional[str]], None]
+
+
+class EndpointClosed(ConnectionError):
+    """TCP 监听端点的客户端断开；会话丢弃该客户端并重新等待连接。"""
+
+
+def parse_address(spec: str, prefix: str) -> Tuple[str, int]:
+    rest = spec[len(prefix):].strip().rstrip("/")
+    host, sep, port = rest.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"invalid address {spec!r}, expected {prefix}host:port")
+    host = host.strip("[]") or "0.0.0.0"
+    number = int(port)
+    if number > 65535:
+        raise ValueError(f"invalid port in {spec!r}")
+    return host, number
+
+
+def make_endpoint(spec: str, settings: Dict[str, Any], on_peer: Optional[PeerCallback] = None) -> Any:
+    """按端口字段创建端点（尚未打开）；地址格式错误时抛出 ValueError。"""
+    lowered = spec.lower()
+    if lowered.startswith(TCP_LISTEN_PREFIX):
+        return TcpListenEndpoint(spec, *parse_address(spec, TCP_LISTEN_PREFIX), on_peer=on_peer)
+    if lowered.startswith(TCP_PREFIX):
+        return TcpClientEndpoint(spec, *parse_address(spec, TCP_PREFIX))
+    return SerialEndpoint(spec, settings)
+
+
+def _format_peer(address: Any) -> str:
+    try:
+        return f"{address[0]}:{address[1]}"
+    except (TypeError, IndexError):
+        return str(address)
+
+
+class SerialEndpoint:
+    """串口端点：线程模式用阻塞读写，事件循环模式直接在描述符上非阻塞读写。"""
+
+    kind = "serial"
+
+    def __init__(self, port: str, settings: Dict[str, Any]) -> None:
+        self.name = port
+        self._settings = settings
+        self.ser: Optional[serial.Serial] = None
+
+    def open(self) -> None:
+        self.ser = serial.Serial(port=self.name, **self._settings)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "address": self.name, "peer": None}
+
+    def fileno(self) -> Optional[int]:
+        return selectable_fileno(self.ser) if self.ser is not None else None
+
+    def data_fd(self) -> Optional[int]:
+        return self.fileno()
+
+    def listen_fd(self) -> Optional[int]:
+        return None
+
+    def loop_capable(self) -> bool:
+        return self.fileno() is not None
+
+    def set_nonblocking(self) -> None:
+        # pyserial 在 POSIX 上以 O_NONBLOCK 打开，os.read/os.write 不会阻塞。
+        return None
+
+    def read(self) -> bytes:
+        """阻塞读：首字节最多等待端口 timeout，随后取走已到达的全部字节。"""
+        ser = self.ser
+        if ser is None or not ser.is_open:
+            raise SerialException("port closed")
+        data = ser.read(ser.in_waiting or 1)
+        if data and ser.in_waiting:
+            data += ser.read(ser.in_waiting)
+        return data
+
+    def read_ready(self) -> bytes:
+        """select 报告可读后调用；in_waiting 为 0 说明对端挂断，read 会立即抛出异常。"""
+        ser = self.ser
+        if ser is None:
+            raise SerialException("port closed")
+        return ser.read(ser.in_waiting or 1)
+
+    def write(self, data: bytes) -> bool:
+        ser = self.ser
+        if ser is None:
+            raise SerialException("port closed")
+        ser.write(data)
+        return True
+
+    def recv_nowait(self, fd: int) -> bytes:
+        """非阻塞读；暂无数据返回空串，可读却读到 EOF 视为挂断。"""
+        try:
+            data = os.read(fd, _READ_SIZE)
+        except BlockingIOError:
+            return b""
+        if not data:
+            raise SerialException(f"{self.name}: device reports readiness to read but returned no data")
+        return data
+
+    def send_nowait(self, fd: int, data: memoryview) -> int:
+        """非阻塞写，返回实际写出的字节数。"""
+        try:
+            return os.write(fd, data)
+        except BlockingIOError:
+            return 0
+
+    def close(self) -> None:
+        ser, self.ser = self.ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+
+class TcpClientEndpoint:
+    """连接到服务端的 TCP 端点；服务端断开视为会话错误。"""
+
+    kind = "tcp"
+
+    def __init__(self, name: str, host: str, port: int) -> None:
+        self.name = name
+        self._address = (host, port)
+        self.sock: Optional[socket.socket] = None
+
+    def open(self) -> None:
+        sock = socket.create_connection(self._address, timeout=_CONNECT_TIMEOUT_SEC)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(None)
+        self.sock = sock
+
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "address": _format_peer(self._address), "peer": None}
+
+    def fileno(self) -> Optional[int]:
+        sock = self.sock
+        return sock.fileno() if sock is not None else None
+
+    def data_fd(self) -> Optional[int]:
+        return self.fileno()
+
+    def listen_fd(self) -> Optional[int]:
+        return None
+
+    def loop_capable(self) -> bool:
+        return self.sock is not None
+
+    def set_nonblocking(self) -> None:
+        if self.sock is not None:
+            self.sock.setblocking(False)
+
+    def read(self) -> bytes:
+        sock = self._require()
+        if not select.select([sock], [], [], _READ_WAIT_SEC)[0]:
+            return b""
+        return self.read_ready()
+
+    def read_ready(self) -> bytes:
+        data = self._require().recv(_READ_SIZE)
+        if not data:
+            raise ConnectionError(f"{self.name}: connection closed by peer")
+        return data
+
+    def write(self, data: bytes) -> bool:
+        self._require().sendall(data)
+        return True
+
+    def recv_nowait(self, fd: int) -> bytes:
+        try:
+            data = self._require().recv(_READ_SIZE)
+        except BlockingIOError:
+            return b""
+        if not data:
+            raise ConnectionError(f"{self.name}: connection closed by peer")
+        return data
+
+    def send_nowait(self, fd: int, data: memoryview) -> int:
+        try:
+            return self._require().send(data)
+        except BlockingIOError:
+            return 0
+
+    def close(self) -> None:
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _require(self) -> socket.socket:
+        sock = self.sock
+        if sock is None:
+            raise ConnectionError(f"{self.name}: socket closed")
+        return sock
+
+
+class TcpListenEndpoint:
+    """在本地端口等待客户端的 TCP 端点；一次服务一个客户端，断开后重新等待。"""
+
+    kind = "tcp-listen"
+
+    def __init__(self, name: str, host: str, port: int, on_peer: Optional[PeerCallback] = None) -> None:
+        self.name = name
+        self._address = (host, port)
+        self._on_peer = on_peer
+        self._lock = threading.Lock()
+        self._nonblocking = False
+        self.listener: Optional[socket.socket] = None
+        self.client: Optional[socket.socket] = None
+        self.peer: Optional[str] = None
+
+    def open(self) -> None:
+        listener = socket.socket(socket.AF_INET6 if ":" in self._address[0] else socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind(self._address)
+            listener.listen(1)
+        except OSError:
+            listener.close()
+            raise
+        self.listener = listener
+
+    def describe(self) -> Dict[str, Any]:
+        listener = self.listener
+        address = _format_peer(listener.getsockname()) if listener is not None else _format_peer(self._address)
+        return {"kind": self.kind, "address": address, "peer": self.peer}
+
+    def fileno(self) -> Optional[int]:
+        # 描述符随客户端变化，不走固定描述符的 select 线程。
+        return None
+
+    def data_fd(self) -> Optional[int]:
+        client = self.client
+        return client.fileno() if client is not None else None
+
+    def listen_fd(self) -> Optional[int]:
+        listener = self.listener
+        return listener.fileno() if listener is not None else None
+
+    def loop_capable(self) -> bool:
+        return self.listener is not None
+
+    def set_nonblocking(self) -> None:
+        self._nonblocking = True
+        if self.listener is not None:
+            self.listener.setblocking(False)
+
+    def accept(self) -> Optional[str]:
+        """接受一个等待中的客户端，返回其地址；没有等待中的连接时返回 None。"""
+        listener = self.listener
+        if listener is None:
+            raise ConnectionError(f"{self.name}: listener closed")
+        try:
+            client, address = listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return None
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.setblocking(not self._nonblocking)
+        peer = _format_peer(address)
+        with self._lock:
+            old, self.client, self.peer = self.client, client, peer
+        if old is not None:
+            old.close()
+        if self._on_peer is not None:
+            self._on_peer(peer)
+        return peer
+
+    def drop_client(self) -> None:
+        with self._lock:
+            client, self.client, self.peer = self.client, None, None
+        if client is None:
+            return
+        try:
+            client.close()
+        except OSError:
+            pass
+        if self._on_peer is not None:
+            self._on_peer(None)
+
+    def read(self) -> bytes:
+        """等待客户端或读取客户端数据，最多等待 0.1 s；客户端断开时返回空串并重新等待连接。"""
+        client = self.client
+        if client is None:
+            listener = self.listener
+            if listener is None:
+                raise ConnectionError(f"{self.name}: listener closed")
+            if select.select([listener], [], [], _READ_WAIT_SEC)[0]:
+                self.accept()
+            return b""
+        if not select.select([client], [], [], _READ_WAIT_SEC)[0]:
+            return b""
+        try:
+            data = client.recv(_READ_SIZE)
+        except OSError:
+            data = b""
+        if not data:
+            self.drop_client()
+        return data
+
+    def write(self, data: bytes) -> bool:
+        client = self.client
+        if client is None:
+            return False
+        try:
+            client.sendall(data)
+        except OSError:
+            self.drop_client()
+            return False
+        return True
+
+    def recv_nowait(self, fd: int) -> bytes:
+        client = self.client
+        if client is None:
+            raise EndpointClosed(f"{self.name}: client disconnected")
+        try:
+            data = client.recv(_READ_SIZE)
+        except BlockingIOError:
+            return b""
+        except OSError as exc:
+            raise EndpointClosed(f"{self.name}: {exc}") from exc
+        if not data:
+            raise EndpointClosed(f"{self.name}: client disconnected")
+        return data
+
+    def send_nowait(self, fd: int, data: memoryview) -> int:
+        client = self.client
+        if client is None:
+            raise EndpointClosed(f"{self.name}: client disconnected")
+        try:
+            return client.send(data)
+        except BlockingIOError:
+            return 0
+        except OSError as exc:
+            raise EndpointClosed(f"{self.name}: {exc}") from exc
+
+    def close(self) -> None:
+        with self._lock:
+            client, self.client, self.peer = self.client, None, None
+        listener, self.listener = self.listener, None
+        for sock in (client, listener):
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
@@ -1,14 +1,49 @@
+"""代理转发：在上位机端与设备端之间双向转发，并把经过的数据作为 proxy.data 发布。
+
+两端可以是串口、TCP 客户端（tcp://host:port）或 TCP 监听（tcp-listen://host:port），见 proxy_endpoints：
+串口设备可暴露为本地 TCP 端口，TCP 流量也可在客户端与服务端之间拦截。配置 gateway="modbus_tcp_rtu"
+时上位机端按 Modbus TCP、设备端按 Modbus RTU 转换（见 modbus_gateway）。
+
+两种转发引擎（ProxyForwardManager(engine=...) 或 PROTOFLOW_PROXY_ENGINE）：
+
+- threads（默认）：每个会话一个转发线程用 selectors 同时等待两端，数据到达即读取并写到对端；
+  取不到固定的可 select 描述符时（如 Windows 串口、TCP 监听端）每个方向一个线程阻塞读，read 在首字节
+  到达时立即返回，最长等待 0.1 s 以便检查停止标志
+- loop：所有会话由 1 个（或 loops=N / PROTOFLOW_PROXY_LOOPS，"cores" 为 CPU 核数）共享的
+  IoReactor 事件循环服务，不再每对端口占用线程。读写均为非阻塞；对端写不完时暂停读取源端，
+  等对端可写再续写（计为 write stall），字节顺序不变且不阻塞同一循环中的其他会话。
+  TCP 监听端在循环内接受客户端。取不到描述符的会话仍回退到线程
+
+转发路径写完对端后只把数据交给 ProxyTap 的环形缓冲，proxy.data 由 tap 线程发布（网关模式下按两侧线路
+分别发布，负载带 channel；经过串口线路的字节带 baud，供抓包按 t1.5/t3.5 分帧，网关的 Modbus TCP 侧带 framing）；抓包链路过慢时丢弃抓包条目并计数（tap_dropped），不拖慢设备链路。每个方向统计字节数、字节速率、
+最大间隔、write stall 与因 TCP 监听端无客户端而丢弃的字节，由 pair_stats 查询。
+"""
+
 from __future__ import annotations
 
+import os
+import selectors
+import socket
 import threading
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import serial
-from serial import SerialException
 
 from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import EVENT_READ, EVENT_WRITE, IoReactor
+from infra.comm.modbus_gateway import GATEWAY_MODBUS_TCP_RTU, ModbusTcpRtuGateway
+from infra.comm.proxy_endpoints import EndpointClosed, SerialEndpoint, make_endpoint
+from infra.comm.proxy_tap import DEFAULT_TAP_CAPACITY, ProxyTap
+
+ENGINE_THREADS = "threads"
+ENGINE_LOOP = "loop"
+# 线程模式下单次阻塞写超过该时长计为一次 write stall。
+_STALL_NS = 1_000_000
+_RATE_WINDOW_NS = 1_000_000_000
+
+Transform = Callable[[bytes], bytes]
 
 
 _PARITY_MAP = {
@@ -42,6 +77,80 @@ class StartResult:
     error: str = ""
 
 
+class _DirectionStats:
+    """单方向转发统计：字节数、最近一秒窗口的字节速率、相邻数据块最大间隔、write stall。"""
+
+    __slots__ = (
+        "bytes",
+        "chunks",
+        "last_ns",
+        "max_gap_ns",
+        "stalls",
+        "stall_ns",
+        "discarded",
+        "window_start",
+        "window_bytes",
+        "rate",
+    )
+
+    def __init__(self) -> None:
+        self.bytes = 0
+        self.chunks = 0
+        self.last_ns = 0
+        self.max_gap_ns = 0
+        self.stalls = 0
+        self.stall_ns = 0
+        self.discarded = 0
+        self.window_start = time.perf_counter_ns()
+        self.window_bytes = 0
+        self.rate = 0.0
+
+    def on_chunk(self, size: int, t_ns: int) -> None:
+        if self.last_ns and t_ns - self.last_ns > self.max_gap_ns:
+            self.max_gap_ns = t_ns - self.last_ns
+        self.last_ns = t_ns
+        self.bytes += size
+        self.chunks += 1
+        elapsed = t_ns - self.window_start
+        if elapsed >= _RATE_WINDOW_NS:
+            self.rate = self.window_bytes * 1e9 / elapsed
+            self.window_start = t_ns
+            self.window_bytes = 0
+        self.window_bytes += size
+
+    def on_stall(self, stall_ns: int) -> None:
+        self.stalls += 1
+        self.stall_ns += max(0, stall_ns)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max(1, time.perf_counter_ns() - self.window_start)
+        # 首个窗口或当前窗口已超过一个周期（链路空闲）时按当前窗口计算，否则取上一个完整窗口。
+        rate = self.window_bytes * 1e9 / elapsed if elapsed >= _RATE_WINDOW_NS or not self.rate else self.rate
+        return {
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "bytes_per_sec": round(rate, 1),
+            "max_gap_ms": round(self.max_gap_ns / 1e6, 3),
+            "write_stalls": self.stalls,
+            "write_stall_ms": round(self.stall_ns / 1e6, 3),
+            "discarded_bytes": self.discarded,
+        }
+
+
+class _LoopRoute:
+    """事件循环模式下的一个转发方向；pending 为尚未写到对端的字节。"""
+
+    __slots__ = ("index", "src", "dst", "transform", "pending", "stall_started")
+
+    def __init__(self, index: int, src: Any, dst: Any, transform: Optional[Transform]) -> None:
+        self.index = index
+        self.src = src
+        self.dst = dst
+        self.transform = transform
+        self.pending = bytearray()
+        self.stall_started = 0
+
+
 class _ProxySession:
     def __init__(self, bus: EventBus, pair_id: str, config: Dict[str, Any]) -> None:
         self._bus = bus
@@ -56,69 +165,91 @@ class _ProxySession:
         self._flow = str(config.get("flowControl") or "none").strip().lower()
         self._rtscts = self._flow == "rtscts"
         self._xonxoff = self._flow == "xonxoff"
-        self._host_ser: Optional[serial.Serial] = None
-        self._device_ser: Optional[serial.Serial] = None
+        self._gateway_kind = str(config.get("gateway") or "").strip().lower()
+        self._gateway: Optional[ModbusTcpRtuGateway] = None
+        # 下标 0 为 host -> device，1 为 device -> host，与 tap 路由一致。
+        self._transforms: List[Optional[Transform]] = [None, None]
+        self._host: Any = None
+        self._device: Any = None
         self._threads: list[threading.Thread] = []
         self._running = threading.Event()
+        self._wake_w: Optional[socket.socket] = None
+        self._tap_capacity = int(config.get("tapCapacity") or DEFAULT_TAP_CAPACITY)
+        self._tap: Optional[ProxyTap] = None
+        self._stats = [_DirectionStats(), _DirectionStats()]
+        self.engine = ""
+        self.reactor: Optional[IoReactor] = None
+        self._routes: List[_LoopRoute] = []
+        # 事件循环模式下各描述符当前注册的事件，仅在 reactor 线程读写。
+        self._masks: Dict[int, int] = {}
 
-    def start(self) -> StartResult:
+    def start(self, reactor: Optional[IoReactor] = None) -> StartResult:
+        """打开两端并开始转发；给出 reactor 且两端均可 select 时由该事件循环服务。"""
         if not self.host_port or not self.device_port:
             return StartResult(False, "host/device port is required")
         if self.host_port == self.device_port:
             return StartResult(False, "host and device port cannot be the same")
+        if self._gateway_kind and self._gateway_kind != GATEWAY_MODBUS_TCP_RTU:
+            return StartResult(False, f"unsupported gateway: {self._gateway_kind}")
+        settings = {
+            "baudrate": self._baud,
+            "bytesize": self._data_bits,
+            "parity": self._parity,
+            "stopbits": self._stop_bits,
+            "timeout": 0.1,
+            "write_timeout": 0.5,
+            "rtscts": self._rtscts,
+            "xonxoff": self._xonxoff,
+        }
         try:
-            self._host_ser = serial.Serial(
-                port=self.host_port,
-                baudrate=self._baud,
-                bytesize=self._data_bits,
-                parity=self._parity,
-                stopbits=self._stop_bits,
-                timeout=0.1,
-                write_timeout=0.5,
-                rtscts=self._rtscts,
-                xonxoff=self._xonxoff,
-            )
-            self._device_ser = serial.Serial(
-                port=self.device_port,
-                baudrate=self._baud,
-                bytesize=self._data_bits,
-                parity=self._parity,
-                stopbits=self._stop_bits,
-                timeout=0.1,
-                write_timeout=0.5,
-                rtscts=self._rtscts,
-                xonxoff=self._xonxoff,
-            )
+            self._host = make_endpoint(self.host_port, settings, on_peer=lambda peer: self._publish_peer("host", peer))
+            self._device = make_endpoint(self.device_port, settings, on_peer=lambda peer: self._publish_peer("device", peer))
+            self._host.open()
+            self._device.open()
         except Exception as exc:
             self.stop()
             return StartResult(False, str(exc))
+        if self._gateway_kind == GATEWAY_MODBUS_TCP_RTU:
+            self._gateway = ModbusTcpRtuGateway()
+            self._transforms = [self._gateway.to_device, self._gateway.to_host]
 
+        common = {"pair_id": self.pair_id, "host_port": self.host_port, "device_port": self.device_port}
+        to_device = {**common, "src": self.host_port, "dst": self.device_port, "src_role": "host", "dst_role": "device"}
+        to_host = {**common, "src": self.device_port, "dst": self.host_port, "src_role": "device", "dst_role": "host"}
+        host_wire, device_wire = self._wire(self._host), self._wire(self._device)
+        # 非网关转发两侧字节相同：任一端是串口，整条通道都按该串口的波特率分帧。
+        shared_wire = host_wire or device_wire
+        routes = [{**to_device, **shared_wire}, {**to_host, **shared_wire}]
+        if self._gateway is not None:
+            # 网关两侧协议不同：各自作为独立抓包通道，路由 2/3 为转换后写往设备端/上位机端的字节；
+            # 上位机端说 Modbus TCP，抓包按 MBAP 分帧。
+            host_wire = {**host_wire, "framing": "modbus_tcp"}
+            routes = [
+                {**to_device, **host_wire, "channel": self.host_port},
+                {**to_host, **device_wire, "channel": self.device_port},
+                {**to_device, **device_wire, "channel": self.device_port},
+                {**to_host, **host_wire, "channel": self.host_port},
+            ]
+        # 每个转发方向一个生产者：线程模式下两个方向由各自的线程 push。
+        self._tap = ProxyTap(self._bus, routes, capacity=self._tap_capacity, name=f"ProxyTap-{self.pair_id}", producers=2)
         self._running.set()
+        if reactor is not None and self._host.loop_capable() and self._device.loop_capable():
+            self._start_loop(reactor)
+            return StartResult(True)
+        host_fd = self._host.fileno()
+        device_fd = self._device.fileno()
+        if host_fd is not None and device_fd is not None:
+            wake_r, self._wake_w = socket.socketpair()
+            self.engine = "select"
+            self._threads = [
+                threading.Thread(target=self._select_loop, args=(host_fd, device_fd, wake_r), daemon=True),
+            ]
+            self._threads[0].start()
+            return StartResult(True)
+        self.engine = ENGINE_THREADS
         self._threads = [
-            threading.Thread(
-                target=self._relay_loop,
-                args=(
-                    self._host_ser,
-                    self._device_ser,
-                    self.host_port,
-                    self.device_port,
-                    "host",
-                    "device",
-                ),
-                daemon=True,
-            ),
-            threading.Thread(
-                target=self._relay_loop,
-                args=(
-                    self._device_ser,
-                    self._host_ser,
-                    self.device_port,
-                    self.host_port,
-                    "device",
-                    "host",
-                ),
-                daemon=True,
-            ),
+            threading.Thread(target=self._relay_loop, args=(self._host, self._device, 0), daemon=True),
+            threading.Thread(target=self._relay_loop, args=(self._device, self._host, 1), daemon=True),
         ]
         for thread in self._threads:
             thread.start()
@@ -126,79 +257,353 @@ class _ProxySession:
 
     def stop(self) -> None:
         self._running.clear()
+        self._wake()
+        self._detach_loop()
         for thread in self._threads:
             if thread.is_alive():
                 thread.join(timeout=1.0)
         self._threads = []
-        for ser in (self._host_ser, self._device_ser):
-            if ser is not None:
-                try:
-                    ser.close()
-                except Exception:
-                    pass
-        self._host_ser = None
-        self._device_ser = None
-
-    def _relay_loop(
-        self,
-        src: serial.Serial,
-        dst: serial.Serial,
-        src_port: str,
-        dst_port: str,
-        src_role: str,
-        dst_role: str,
-    ) -> None:
+        for endpoint in (self._host, self._device):
+            if endpoint is not None:
+                endpoint.close()
+        wake_w, self._wake_w = self._wake_w, None
+        if wake_w is not None:
+            wake_w.close()
+        if self._tap is not None:
+            self._tap.close()
+
+    def tap_stats(self) -> Dict[str, int]:
+        tap = self._tap
+        if tap is None:
+            return {"tap_pushed": 0, "tap_published": 0, "tap_dropped": 0, "tap_depth": 0, "tap_capacity": self._tap_capacity}
+        return tap.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "engine": self.engine,
+            "running": self._running.is_set(),
+            "host": self._host.describe() if self._host is not None else None,
+            "device": self._device.describe() if self._device is not None else None,
+            "host_to_device": self._stats[0].snapshot(),
+            "device_to_host": self._stats[1].snapshot(),
+            **self.tap_stats(),
+        }
+        if self._gateway is not None:
+            stats["gateway"] = {"kind": self._gateway_kind, **self._gateway.stats()}
+        return stats
+
+    def _wire(self, endpoint: Any) -> Dict[str, Any]:
+        """端点所在线路的抓包字段：串口带波特率，TCP 为空。"""
+        return {"baud": self._baud} if isinstance(endpoint, SerialEndpoint) else {}
+
+    def _publish_peer(self, role: str, peer: Optional[str]) -> None:
+        """TCP 监听端的客户端连接（peer 为地址）或断开（peer 为 None）。"""
+        if peer is None and self._gateway is not None:
+            # 断开客户端的半截请求与未完成事务不能带给下一个客户端。
+            self._gateway.reset()
+        if not self._running.is_set():
+            return
+        self._bus.publish(
+            "proxy.status",
+            {"pair_id": self.pair_id, "status": "running", "error": None, "peer": {"role": role, "address": peer}},
+        )
+
+    def _wake(self) -> None:
+        wake_w = self._wake_w
+        if wake_w is not None:
+            try:
+                wake_w.send(b"\0")
+            except OSError:
+                pass
+
+    def _select_loop(self, host_fd: int, device_fd: int, wake_r: socket.socket) -> None:
+        """单线程等待两端可读；可读即读出并转发，停止时由 wake 套接字唤醒。"""
+        routes = {host_fd: (self._host, self._device, 0), device_fd: (self._device, self._host, 1)}
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(host_fd, selectors.EVENT_READ)
+            selector.register(device_fd, selectors.EVENT_READ)
+            selector.register(wake_r, selectors.EVENT_READ)
+            while self._running.is_set():
+                for key, _mask in selector.select():
+                    route = routes.get(key.fd)
+                    if route is None or not self._running.is_set():
+                        continue
+                    src, dst, index = route
+                    try:
+                        data = src.read_ready()
+                    except Exception as exc:
+                        self._fail(exc)
+                        return
+                    if not self._forward(data, dst, index):
+                        return
+        finally:
+            selector.close()
+            wake_r.close()
+
+    def _forward(self, data: bytes, dst: Any, index: int) -> bool:
+        """阻塞写到对端并交给抓包旁路；出错时发布 proxy.status 并返回 False。"""
+        if not data:
+            return True
+        t_ns = time.perf_counter_ns()
+        stats = self._stats[index]
+        stats.on_chunk(len(data), t_ns)
+        tap = self._tap
+        if tap is not None:
+            tap.push(index, t_ns, data, producer=index)
+        transform = self._transforms[index]
+        out = data
+        if transform is not None:
+            out = transform(data)
+            if not out:
+                return True
+            if tap is not None:
+                tap.push(index + 2, t_ns, out, producer=index)
+        try:
+            delivered = dst.write(out)
+        except Exception as exc:
+            self._fail(exc)
+            return False
+        if not delivered:
+            stats.discarded += len(out)
+            return True
+        elapsed = time.perf_counter_ns() - t_ns
+        if elapsed >= _STALL_NS:
+            stats.on_stall(elapsed)
+        return True
+
+    def _fail(self, exc: Exception) -> None:
+        self._bus.publish(
+            "proxy.status",
+            {
+                "pair_id": self.pair_id,
+                "status": "error",
+                "error": str(exc),
+            },
+        )
+        self._running.clear()
+        self._detach_loop()
+
+    def _relay_loop(self, src: Any, dst: Any, index: int) -> None:
+        """回退路径：阻塞读，首字节到达即返回（最长等待 0.1 s 以便检查停止标志）。"""
         while self._running.is_set():
             try:
-                waiting = src.in_waiting if src.is_open else 0
-                if waiting <= 0:
-                    time.sleep(0.01)
-                    continue
-                data = src.read(waiting)
-                if not data:
-                    continue
-                dst.write(data)
-                self._bus.publish(
-                    "proxy.data",
-                    {
-                        "pair_id": self.pair_id,
-                        "src": src_port,
-                        "dst": dst_port,
-                        "src_role": src_role,
-                        "dst_role": dst_role,
-                        "host_port": self.host_port,
-                        "device_port": self.device_port,
-                        "data": data,
-                        "ts": time.time(),
-                    },
-                )
-            except (SerialException, OSError) as exc:
-                self._bus.publish(
-                    "proxy.status",
-                    {
-                        "pair_id": self.pair_id,
-                        "status": "error",
-                        "error": str(exc),
-                    },
-                )
-                self._running.clear()
+                data = src.read()
             except Exception as exc:
-                self._bus.publish(
-                    "proxy.status",
-                    {
-                        "pair_id": self.pair_id,
-                        "status": "error",
-                        "error": str(exc),
-                    },
-                )
-                self._running.clear()
+                self._fail(exc)
+                return
+            if not self._forward(data, dst, index):
+                return
+
+    # ---- 事件循环模式：除 _start_loop/_detach_loop 外均在 reactor 线程执行 ----
+
+    def _start_loop(self, reactor: IoReactor) -> None:
+        self.engine = ENGINE_LOOP
+        self.reactor = reactor
+        self._host.set_nonblocking()
+        self._device.set_nonblocking()
+        self._routes = [
+            _LoopRoute(0, self._host, self._device, self._transforms[0]),
+            _LoopRoute(1, self._device, self._host, self._transforms[1]),
+        ]
+        done = threading.Event()
+
+        def _op() -> None:
+            try:
+                self._update(self._host)
+                self._update(self._device)
+            finally:
+                done.set()
+
+        reactor.call_soon(_op)
+        done.wait(timeout=2.0)
+
+    def _detach_loop(self) -> None:
+        """注销两端描述符；在 reactor 线程内执行，返回后不会再有该会话的回调。"""
+        reactor = self.reactor
+        if reactor is None:
+            return
+        if reactor.in_reactor_thread():
+            self._unregister_all()
+            return
+        done = threading.Event()
+
+        def _op() -> None:
+            try:
+                self._unregister_all()
+            finally:
+                done.set()
+
+        reactor.call_soon(_op)
+        done.wait(timeout=2.0)
+
+    def _unregister_all(self) -> None:
+        reactor = self.reactor
+        masks, self._masks = self._masks, {}
+        if reactor is not None:
+            for fd in masks:
+                reactor.unregister(fd)
+
+    def _update(self, endpoint: Any) -> None:
+        """按积压情况注册端点：从该端读出的方向没有积压时等可读，写往该端的方向有积压时等可写。"""
+        if self.reactor is None or not self._running.is_set():
+            return
+        fd = endpoint.data_fd()
+        listen_fd = endpoint.listen_fd()
+        if fd is None:
+            # TCP 监听端尚无客户端：只等待连接。
+            if listen_fd is not None:
+                self._set_mask(listen_fd, EVENT_READ, lambda _ready: self._on_accept(endpoint))
+            return
+        if listen_fd is not None:
+            # 一次只服务一个客户端，其余连接留在 backlog 中等当前客户端断开。
+            self._set_mask(listen_fd, 0, None)
+        mask = 0
+        for route in self._routes:
+            if route.src is endpoint and not route.pending:
+                mask |= EVENT_READ
+            if route.dst is endpoint and route.pending:
+                mask |= EVENT_WRITE
+        self._set_mask(fd, mask, lambda ready, fd=fd: self._on_ready(endpoint, fd, ready))
+
+    def _set_mask(self, fd: int, mask: int, callback: Optional[Callable[[int], None]]) -> None:
+        reactor = self.reactor
+        if reactor is None:
+            return
+        current = self._masks.get(fd, 0)
+        if mask == current:
+            return
+        if mask == 0:
+            # selectors 不接受空事件集：两个方向都只等对端时暂时注销。
+            self._masks.pop(fd, None)
+            reactor.unregister(fd)
+        elif current == 0:
+            self._masks[fd] = mask
+            reactor.register(fd, callback, mask)
+        else:
+            self._masks[fd] = mask
+            reactor.modify(fd, mask)
+
+    def _on_accept(self, endpoint: Any) -> None:
+        if not self._running.is_set():
+            return
+        try:
+            peer = endpoint.accept()
+        except Exception as exc:
+            self._fail(exc)
+            return
+        if peer is not None:
+            self._update(endpoint)
+
+    def _on_ready(self, endpoint: Any, fd: int, ready: int) -> None:
+        try:
+            for route in self._routes:
+                # 客户端已断开或会话已停止时，本次就绪事件作废。
+                if not self._running.is_set() or endpoint.data_fd() != fd:
+                    return
+                if ready & EVENT_WRITE and route.dst is endpoint and route.pending:
+                    self._drain(route)
+                elif ready & EVENT_READ and route.src is endpoint and not route.pending:
+                    data = endpoint.recv_nowait(fd)
+                    if data:
+                        self._send(route, data)
+        except EndpointClosed:
+            self._drop_peer(endpoint)
+        except Exception as exc:
+            self._fail(exc)
+
+    def _drop_peer(self, endpoint: Any) -> None:
+        """TCP 监听端的客户端断开：丢弃写往它的积压并重新等待连接，会话继续运行。"""
+        fd = endpoint.data_fd()
+        if fd is not None:
+            self._set_mask(fd, 0, None)
+        endpoint.drop_client()
+        for route in self._routes:
+            if route.dst is endpoint and route.pending:
+                self._stats[route.index].discarded += len(route.pending)
+                route.pending.clear()
+        for route in self._routes:
+            self._update(route.src)
+
+    def _send(self, route: _LoopRoute, data: bytes) -> None:
+        t_ns = time.perf_counter_ns()
+        stats = self._stats[route.index]
+        stats.on_chunk(len(data), t_ns)
+        tap = self._tap
+        if tap is not None:
+            tap.push(route.index, t_ns, data, producer=route.index)
+        out = data
+        if route.transform is not None:
+            out = route.transform(data)
+            if not out:
+                return
+            if tap is not None:
+                tap.push(route.index + 2, t_ns, out, producer=route.index)
+        fd = route.dst.data_fd()
+        if fd is None:
+            stats.discarded += len(out)
+            return
+        try:
+            sent = route.dst.send_nowait(fd, memoryview(out))
+        except EndpointClosed:
+            stats.discarded += len(out)
+            self._drop_peer(route.dst)
+            return
+        if sent < len(out):
+            # 对端写不完：暂停读取源端，等对端可写再续写。
+            route.pending += out[sent:]
+            route.stall_started = t_ns
+            self._update(route.src)
+            self._update(route.dst)
+
+    def _drain(self, route: _LoopRoute) -> None:
+        fd = route.dst.data_fd()
+        if fd is None:
+            return
+        sent = route.dst.send_nowait(fd, memoryview(route.pending))
+        del route.pending[:sent]
+        if route.pending:
+            return
+        self._stats[route.index].on_stall(time.perf_counter_ns() - route.stall_started)
+        self._update(route.dst)
+        self._update(route.src)
 
 
 class ProxyForwardManager:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(self, bus: EventBus, engine: Optional[str] = None, loops: Optional[int] = None) -> None:
         self._bus = bus
         self._lock = threading.RLock()
         self._sessions: Dict[str, _ProxySession] = {}
+        mode = (engine or os.environ.get("PROTOFLOW_PROXY_ENGINE") or ENGINE_THREADS).strip().lower()
+        if mode not in {ENGINE_THREADS, ENGINE_LOOP}:
+            print(f"[WARN] ProxyForwardManager: unknown proxy engine {mode!r}, using {ENGINE_THREADS}")
+            mode = ENGINE_THREADS
+        self.engine = mode
+        self._loop_count = max(1, loops or self._default_loops())
+        self._loops: List[IoReactor] = []
+
+    @staticmethod
+    def _default_loops() -> int:
+        raw = os.environ.get("PROTOFLOW_PROXY_LOOPS", "").strip().lower()
+        if raw == "cores":
+            return os.cpu_count() or 1
+        try:
+            return int(raw) if raw else 1
+        except ValueError:
+            print(f"[WARN] ProxyForwardManager: invalid PROTOFLOW_PROXY_LOOPS={raw!r}")
+            return 1
+
+    def _pick_loop(self) -> Optional[IoReactor]:
+        """事件循环模式下为新会话选择服务会话最少的循环。"""
+        if self.engine != ENGINE_LOOP:
+            return None
+        if not self._loops:
+            self._loops = [IoReactor(name=f"ProxyLoop-{i}") for i in range(self._loop_count)]
+        load = {id(loop): 0 for loop in self._loops}
+        for session in self._sessions.values():
+            if session.reactor is not None and id(session.reactor) in load:
+                load[id(session.reactor)] += 1
+        return min(self._loops, key=lambda loop: load[id(loop)])
 
     def start_pair(self, pair_id: str, config: Dict[str, Any]) -> StartResult:
         if not pair_id:
@@ -208,7 +613,7 @@ class ProxyForwardManager:
             if old is not None:
                 old.stop()
             session = _ProxySession(self._bus, pair_id, config)
-            result = session.start()
+            result = session.start(self._pick_loop())
             if not result.ok:
                 self._bus.publish(
                     "proxy.status",
@@ -224,14 +629,28 @@ class ProxyForwardManager:
             return
         with self._lock:
             session = self._sessions.pop(pair_id, None)
-        if session is not None:
-            session.stop()
-        self._bus.publish("proxy.status", {"pair_id": pair_id, "status": "stopped", "error": None})
+        self._publish_stopped(pair_id, session)
 
     def stop_all(self) -> None:
         with self._lock:
             sessions = list(self._sessions.items())
             self._sessions.clear()
+            loops, self._loops = self._loops, []
         for pair_id, session in sessions:
+            self._publish_stopped(pair_id, session)
+        # 事件循环随下一次 start_pair 按需重建。
+        for loop in loops:
+            loop.stop()
+
+    def pair_stats(self, pair_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """运行中会话的统计：各方向字节数/速率/最大间隔/write stall 与抓包旁路计数，可按 pair_id 过滤。"""
+        with self._lock:
+            sessions = dict(self._sessions)
+        return {pid: session.stats() for pid, session in sessions.items() if pair_id in (None, pid)}
+
+    def _publish_stopped(self, pair_id: str, session: Optional[_ProxySession]) -> None:
+        payload: Dict[str, Any] = {"pair_id": pair_id, "status": "stopped", "error": None}
+        if session is not None:
             session.stop()
-            self._bus.publish("proxy.status", {"pair_id": pair_id, "status": "stopped", "error": None})
+            payload["tap_dropped"] = session.tap_stats()["tap_dropped"]
+        self._bus.publish("proxy.status", payload)
@@ -0,0 +1,189 @@
+"""代理抓包旁路：把转发路径与 proxy.data 发布解耦。
+
+- 转发线程只把 (t_ns, 方向, 数据视图) 放进 SpscRing，不组装字典、不调用 EventBus；每个生产者（转发方向）
+  一个环形缓冲，线程模式下两个方向的转发线程各写各的，不共享游标与计数
+- 独立 tap 线程按时间戳先后取出各缓冲的条目，组装 proxy.data 负载并发布；抓包链路再慢也只会让环形缓冲变满
+- 环形缓冲满时丢弃新条目并计入 dropped，转发不等待、不阻塞
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from infra.common.chunk import perf_to_wall
+from infra.common.event_bus import EventBus
+
+DEFAULT_TAP_CAPACITY = 4096
+# 持续溢出时 [WARN] 日志的最小间隔。
+_WARN_INTERVAL_SEC = 5.0
+
+_TapEntry = Tuple[int, int, Any]
+
+
+class SpscRing:
+    """固定容量的单生产者/单消费者环形缓冲。
+
+    生产者只写 _tail，消费者只写 _head，槽位先写入再推进游标；依赖 GIL 下整数赋值的原子性，
+    无需加锁。满时 push 返回 False，由调用方计数丢弃。
+    """
+
+    __slots__ = ("_slots", "_capacity", "_head", "_tail")
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = max(1, int(capacity))
+        self._slots: List[Any] = [None] * self._capacity
+        self._head = 0
+        self._tail = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def push(self, item: Any) -> bool:
+        tail = self._tail
+        if tail - self._head >= self._capacity:
+            return False
+        self._slots[tail % self._capacity] = item
+        self._tail = tail + 1
+        return True
+
+    def peek(self) -> Optional[Any]:
+        """消费者调用：查看队首条目但不取出。"""
+        head = self._head
+        if head == self._tail:
+            return None
+        return self._slots[head % self._capacity]
+
+    def pop(self) -> Optional[Any]:
+        head = self._head
+        if head == self._tail:
+            return None
+        index = head % self._capacity
+        item = self._slots[index]
+        self._slots[index] = None
+        self._head = head + 1
+        return item
+
+
+class ProxyTap:
+    """一个代理会话的抓包旁路；routes 为各方向 proxy.data 负载中的固定字段。
+
+    producers 为并发调用 push 的线程数，每个生产者独占一个 SpscRing 及其 pushed/dropped 计数。
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        routes: Sequence[Dict[str, Any]],
+        capacity: int = DEFAULT_TAP_CAPACITY,
+        name: str = "ProxyTap",
+        producers: int = 1,
+    ) -> None:
+        self._bus = bus
+        self._routes = [dict(route) for route in routes]
+        self._rings = [SpscRing(capacity) for _ in range(max(1, int(producers)))]
+        self._name = name
+        self._ready = threading.Event()
+        self._running = True
+        # 下标为生产者，只由该生产者线程写。
+        self._pushed = [0] * len(self._rings)
+        self._dropped = [0] * len(self._rings)
+        self.published = 0
+        self._warned_dropped = 0
+        self._warned_at = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pushed(self) -> int:
+        return sum(self._pushed)
+
+    @property
+    def dropped(self) -> int:
+        return sum(self._dropped)
+
+    def push(self, route: int, t_ns: int, data: Any, producer: int = 0) -> bool:
+        """转发线程调用：只入队，满时丢弃并返回 False。data 为 bytes 或只读 memoryview。
+
+        producer 为调用线程的生产者下标，同一下标只能由一个线程使用。
+        """
+        if not self._rings[producer].push((t_ns, route, data)):
+            self._dropped[producer] += 1
+            return False
+        self._pushed[producer] += 1
+        if not self._ready.is_set():
+            self._ready.set()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tap_pushed": self.pushed,
+            "tap_published": self.published,
+            "tap_dropped": self.dropped,
+            "tap_depth": sum(len(ring) for ring in self._rings),
+            "tap_capacity": self._rings[0].capacity,
+        }
+
+    def close(self, timeout: float = 1.0) -> None:
+        """发布已入队的条目后停止 tap 线程。"""
+        self._running = False
+        self._ready.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._pop()
+            if entry is None:
+                if not self._running:
+                    return
+                self._ready.clear()
+                # clear 之后再查一次，避免错过 clear 前入队但未触发 set 的条目。
+                entry = self._pop()
+                if entry is None:
+                    self._ready.wait(timeout=0.5)
+                    self._warn_dropped()
+                    continue
+            self._publish(entry)
+
+    def _pop(self) -> Optional[_TapEntry]:
+        """取出各生产者队首中时间戳最早的条目，两个方向交错时仍按转发先后发布。"""
+        if len(self._rings) == 1:
+            return self._rings[0].pop()
+        oldest: Optional[SpscRing] = None
+        oldest_ns = 0
+        for ring in self._rings:
+            head = ring.peek()
+            if head is not None and (oldest is None or head[0] < oldest_ns):
+                oldest, oldest_ns = ring, head[0]
+        return oldest.pop() if oldest is not None else None
+
+    def _publish(self, entry: _TapEntry) -> None:
+        t_ns, route, data = entry
+        payload = dict(self._routes[route])
+        payload["data"] = bytes(data)
+        payload["ts"] = perf_to_wall(t_ns)
+        payload["t_ns"] = t_ns
+        try:
+            self._bus.publish("proxy.data", payload)
+        except Exception as exc:
+            print(f"[WARN] {self._name}: publish failed: {exc}")
+        self.published += 1
+        if self.dropped != self._warned_dropped:
+            self._warn_dropped()
+
+    def _warn_dropped(self) -> None:
+        dropped = self.dropped
+        if dropped == self._warned_dropped:
+            return
+        now = time.monotonic()
+        if now - self._warned_at < _WARN_INTERVAL_SEC:
+            return
+        print(f"[WARN] {self._name}: tap buffer overrun, {dropped - self._warned_dropped} chunks dropped (total {dropped})")
+        self._warned_dropped = dropped
+        self._warned_at = now
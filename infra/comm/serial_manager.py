@@ -1,27 +1,58 @@
-"""串口管理：负责数据收发，与 EventBus 解耦，不包含协议解析。"""
+"""串口管理：负责数据收发，与 EventBus 解耦，不包含协议解析。
+
+接收由共享 IoReactor 监听串口文件描述符，数据到达即读取并发布；
+无法取得可 select 的描述符时（如 Windows）回退为独立线程阻塞读。
+发送经 TxQueue 入队即返回，由反应器在可写时写出（可合并、限速、帧间隔）。
+rx/tx 负载为 Chunk（bytes 子类），在读取/写出时刻打上 perf_counter_ns 源时间戳。
+"""
 
 from __future__ import annotations
 
 import threading
 import time
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 import serial
 from serial import SerialException
 from serial.tools import list_ports
 
+from infra.common.chunk import Chunk
 from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import EVENT_READ, EVENT_WRITE, IoReactor, selectable_fileno
+from infra.comm.tx_queue import TxQueue
+
+# 关闭前等待发送队列写空的最长时间。
+_CLOSE_FLUSH_SEC = 0.5
 
 
 class SerialManager:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(
+        self,
+        bus: EventBus,
+        reactor: Optional[IoReactor] = None,
+        session_id: Optional[str] = None,
+    ) -> None:
         self.bus = bus
+        self.session_id = session_id
+        # 指定 session_id 时事件发布到 serial.<name>.<session_id>，多会话互不干扰。
+        suffix = f".{session_id}" if session_id else ""
+        self._topics = {name: f"serial.{name}{suffix}" for name in ("rx", "tx", "opened", "closed", "error")}
+        self._reactor = reactor or IoReactor.shared()
         self._ser: Optional[serial.Serial] = None
+        self._rx_fd: Optional[int] = None
         self._rx_thread: Optional[threading.Thread] = None
         self._running = False
         self._lock = threading.RLock()
         self._port: Optional[str] = None
         self._baudrate: Optional[int] = None
+        self._tx = TxQueue(
+            self._reactor,
+            self._write,
+            on_sent=lambda data, t_ns: self.bus.publish(self._topics["tx"], Chunk(data, t_ns, session_id)),
+            on_error=self._on_tx_error,
+            name=f"SerialTx-{session_id or 'default'}",
+        )
+        self._tx_options: Dict[str, Any] = {}
 
     @property
     def port(self) -> Optional[str]:
@@ -35,6 +66,23 @@ class SerialManager:
         with self._lock:
             return bool(self._ser and self._ser.is_open)
 
+    def configure_tx(self, coalesce: bool = True, max_bytes_per_sec: int = 0, frame_gap_sec: float = 0.0) -> None:
+        """设置发送合并/限速/帧间隔；帧间隔按当前波特率估算线路发送时间。"""
+        self._tx_options = {
+            "coalesce": coalesce,
+            "max_bytes_per_sec": max_bytes_per_sec,
+            "frame_gap_sec": frame_gap_sec,
+        }
+        self._tx.configure(line_bytes_per_sec=(self._baudrate or 0) / 10.0, **self._tx_options)
+
+    def tx_stats(self) -> Dict[str, Any]:
+        """发送队列深度与计数。"""
+        return self._tx.stats()
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """等待发送队列写空。"""
+        return self._tx.flush(timeout)
+
     @staticmethod
     def list_ports() -> List[str]:
         """返回系统可用串口列表。"""
@@ -49,20 +97,23 @@ class SerialManager:
             try:
                 self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=0.1)
                 self._running = True
-                self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
-                self._rx_thread.start()
+                self.configure_tx(**self._tx_options)
+                self._start_reader()
                 self._log(f"串口打开: {port} @ {baudrate}")
-                self.bus.publish("serial.opened", port)
+                self.bus.publish(self._topics["opened"], port)
                 return True
             except SerialException as exc:
                 self._log(f"[ERROR] 打开串口失败: {exc}")
-                self.bus.publish("serial.error", str(exc))
+                self.bus.publish(self._topics["error"], str(exc))
                 return False
 
     def close(self) -> None:
-        """关闭串口并停止接收线程。"""
+        """关闭串口并停止接收线程；已入队的数据先尽量写完。"""
+        self._tx.flush(_CLOSE_FLUSH_SEC)
         with self._lock:
             self._running = False
+            self._stop_reader()
+            self._tx.clear()
             if self._rx_thread and self._rx_thread.is_alive():
                 self._rx_thread.join(timeout=1)
             if self._ser:
@@ -72,25 +123,82 @@ class SerialManager:
                     pass
                 self._ser = None
             self._log("串口关闭")
-            self.bus.publish("serial.closed")
+            self.bus.publish(self._topics["closed"])
 
     def send(self, data: bytes) -> None:
-        """发送数据并发布发送事件。"""
+        """入队发送，立即返回；写出后在反应器线程发布发送事件。"""
         with self._lock:
             ser = self._ser
         if not ser or not ser.is_open:
             self._log("[WARN] 串口未打开，发送忽略")
             return
+        if not self._tx.submit(data):
+            self._log(f"[WARN] 发送队列已满，丢弃 {len(data)} bytes")
+            self.bus.publish(self._topics["error"], "tx queue full")
+
+    def _write(self, data: Any) -> Optional[int]:
+        ser = self._ser
+        if ser is None:
+            raise SerialException("串口未打开")
+        return ser.write(data)
+
+    def _on_tx_error(self, exc: Exception) -> None:
+        self._log(f"[ERROR] 发送失败: {exc}")
+        self.bus.publish(self._topics["error"], str(exc))
+
+    def _start_reader(self) -> None:
+        """优先挂到反应器；不支持 select 的串口回退到阻塞读线程。"""
+        ser = self._ser
+        fd = selectable_fileno(ser) if ser is not None else None
+        if fd is not None:
+            # 非阻塞写：只在反应器报告可写时写，写不完的部分留在队列。
+            ser.write_timeout = 0
+            self._rx_fd = fd
+            self._reactor.register(fd, self._on_ready)
+            self._tx.attach(fd)
+            return
+        self._tx.attach(None)
+        if not (self._rx_thread and self._rx_thread.is_alive()):
+            self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+            self._rx_thread.start()
+
+    def _stop_reader(self) -> None:
+        self._tx.detach()
+        fd, self._rx_fd = self._rx_fd, None
+        if fd is not None:
+            self._reactor.unregister(fd)
+
+    def _on_ready(self, mask: int) -> None:
+        """反应器回调：可写时推进发送队列，可读时读取当前可用数据并发布，不阻塞。"""
+        if mask & EVENT_WRITE:
+            self._tx.on_writable()
+        if mask & EVENT_READ:
+            self._on_readable()
+
+    def _on_readable(self) -> None:
+        ser = self._ser
+        if not ser or not self._running:
+            return
         try:
-            ser.write(data)
-            self._log(f"串口发送 {len(data)} bytes")
-            self.bus.publish("serial.tx", data)
-        except SerialException as exc:
-            self._log(f"[ERROR] 发送失败: {exc}")
-            self.bus.publish("serial.error", str(exc))
+            # 可读时 in_waiting > 0；为 0 说明设备挂断，read 会立即抛出 SerialException。
+            data = ser.read(ser.in_waiting or 1)
+            if data:
+                self.bus.publish(self._topics["rx"], Chunk(data, time.perf_counter_ns(), self.session_id))
+        except (SerialException, OSError) as exc:
+            self._log(f"[ERROR] 接收异常: {exc}")
+            self._stop_reader()
+            self.bus.publish(self._topics["error"], str(exc))
+            # 重连包含 sleep，不能占用反应器线程。
+            threading.Thread(target=self._reconnect_and_resume, daemon=True).start()
+
+    def _reconnect_and_resume(self) -> None:
+        self._attempt_reconnect()
+        with self._lock:
+            if self._running and self._ser and self._ser.is_open and self._rx_fd is None:
+                self._start_reader()
 
     def _rx_loop(self) -> None:
-        """接收线程：非阻塞读取，异常时尝试自动重连。"""
+        """回退接收线程：阻塞读（最长 timeout），数据到达立即返回，异常时尝试自动重连。"""
         while self._running:
             ser = self._ser
             if not ser:
@@ -101,23 +209,17 @@ class SerialManager:
                 if not ser.is_open:
                     raise SerialException("串口未打开")
 
-                waiting = ser.in_waiting or 0
-                if waiting == 0:
-                    # 轻量 sleep，避免空转占用 CPU
-                    time.sleep(0.02)
-                    continue
-
-                data = ser.read(waiting)
+                data = ser.read(ser.in_waiting or 1)
                 if data:
-                    self.bus.publish("serial.rx", data)
+                    self.bus.publish(self._topics["rx"], Chunk(data, time.perf_counter_ns(), self.session_id))
             except SerialException as exc:
                 self._log(f"[ERROR] 接收异常: {exc}")
-                self.bus.publish("serial.error", str(exc))
+                self.bus.publish(self._topics["error"], str(exc))
                 self._attempt_reconnect()
             except Exception as exc:
                 # 防止线程崩溃
                 self._log(f"[ERROR] 未知接收异常: {exc}")
-                self.bus.publish("serial.error", str(exc))
+                self.bus.publish(self._topics["error"], str(exc))
                 time.sleep(0.1)
 
     def _attempt_reconnect(self) -> None:
@@ -130,6 +232,14 @@ class SerialManager:
             return
 
         self._log(f"尝试重连串口: {port}")
+        with self._lock:
+            # 出错的句柄 is_open 仍为 True，先关闭，否则下面会误判为已重连。
+            stale = self._ser
+            if stale is not None:
+                try:
+                    stale.close()
+                except Exception:
+                    pass
         while self._running:
             try:
                 with self._lock:
@@ -137,11 +247,11 @@ class SerialManager:
                         return
                     self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=0.1)
                 self._log(f"重连成功: {port}")
-                self.bus.publish("serial.opened", port)
+                self.bus.publish(self._topics["opened"], port)
                 return
             except SerialException as exc:
                 self._log(f"[WARN] 重连失败: {exc}")
-                self.bus.publish("serial.error", f"reconnect failed: {exc}")
+                self.bus.publish(self._topics["error"], f"reconnect failed: {exc}")
                 time.sleep(1)
 
     @staticmethod
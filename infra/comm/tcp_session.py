@@ -1,23 +1,50 @@
-"""TCP 会话：与 SerialManager 接口风格一致，基于 socket 实现。"""
+"""TCP 会话：与 SerialManager 接口风格一致，基于 socket 实现。
+
+接收由共享 IoReactor 监听套接字，数据到达即读取并发布，不再超时轮询。
+发送经 TxQueue 入队即返回，由反应器在套接字可写时写出（可合并、限速、帧间隔）。
+rx/tx 负载为 Chunk（bytes 子类），在读取/写出时刻打上 perf_counter_ns 源时间戳。
+"""
 
 from __future__ import annotations
 
 import socket
 import threading
 import time
-from typing import Optional
+from typing import Any, Dict, Optional
 
+from infra.common.chunk import Chunk
 from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import EVENT_READ, EVENT_WRITE, IoReactor
+from infra.comm.tx_queue import TxQueue
+
+# 关闭前等待发送队列写空的最长时间。
+_CLOSE_FLUSH_SEC = 0.5
 
 
 class TcpSession:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(
+        self,
+        bus: EventBus,
+        reactor: Optional[IoReactor] = None,
+        session_id: Optional[str] = None,
+    ) -> None:
         self.bus = bus
+        self.session_id = session_id
+        # 指定 session_id 时事件发布到 tcp.<name>.<session_id>，多会话互不干扰。
+        suffix = f".{session_id}" if session_id else ""
+        self._topics = {name: f"tcp.{name}{suffix}" for name in ("rx", "tx", "connected", "disconnected", "error")}
+        self._reactor = reactor or IoReactor.shared()
         self._sock: Optional[socket.socket] = None
-        self._rx_thread: Optional[threading.Thread] = None
         self._running = False
         self._lock = threading.RLock()
         self._endpoint: Optional[tuple[str, int]] = None
+        self._tx = TxQueue(
+            self._reactor,
+            self._write,
+            on_sent=lambda data, t_ns: self.bus.publish(self._topics["tx"], Chunk(data, t_ns, session_id)),
+            on_error=self._on_tx_error,
+            name=f"TcpTx-{session_id or 'default'}",
+        )
 
     @property
     def endpoint(self) -> Optional[tuple[str, int]]:
@@ -28,74 +55,106 @@ class TcpSession:
         with self._lock:
             return bool(self._sock) and self._running
 
+    def configure_tx(self, coalesce: bool = True, max_bytes_per_sec: int = 0, frame_gap_sec: float = 0.0) -> None:
+        """设置发送合并/限速/帧间隔。"""
+        self._tx.configure(coalesce=coalesce, max_bytes_per_sec=max_bytes_per_sec, frame_gap_sec=frame_gap_sec)
+
+    def tx_stats(self) -> Dict[str, Any]:
+        """发送队列深度与计数。"""
+        return self._tx.stats()
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """等待发送队列写空。"""
+        return self._tx.flush(timeout)
+
     def connect(self, ip: str, port: int) -> None:
-        """建立 TCP 连接并启动接收线程。"""
+        """建立 TCP 连接并挂到反应器接收。"""
+        # 不在持锁状态下关闭旧连接：反应器回调里的 close() 也需要这把锁。
+        self.close()
         with self._lock:
             self._endpoint = (ip, port)
-            self.close()
-            try:
-                sock = socket.create_connection((ip, port), timeout=3)
-                sock.settimeout(0.1)  # 非阻塞轮询
-                self._sock = sock
-                self._running = True
-                self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
-                self._rx_thread.start()
-                self._log(f"TCP 已连接 {ip}:{port}")
-                self.bus.publish("tcp.connected", f"{ip}:{port}")
-            except OSError as exc:
-                self._log(f"[ERROR] 连接失败: {exc}")
-                self.bus.publish("tcp.error", str(exc))
+        try:
+            sock = socket.create_connection((ip, port), timeout=3)
+            # 连接建立后切换为非阻塞：内核发送缓冲写满时 send 抛 BlockingIOError，
+            # TxQueue 视为部分写出并等待下一次 EVENT_WRITE，不会卡住共享反应器上的其他会话。
+            sock.setblocking(False)
+        except OSError as exc:
+            self._log(f"[ERROR] 连接失败: {exc}")
+            self.bus.publish(self._topics["error"], str(exc))
+            return
+        with self._lock:
+            self._sock = sock
+            self._running = True
+        self._reactor.register(sock, lambda mask: self._on_ready(sock, mask))
+        self._tx.attach(sock.fileno())
+        self._log(f"TCP 已连接 {ip}:{port}")
+        self.bus.publish(self._topics["connected"], f"{ip}:{port}")
 
     def close(self) -> None:
-        """关闭连接并停止接收线程。"""
+        """关闭连接并停止接收；已入队的数据先尽量写完。"""
+        self._tx.flush(_CLOSE_FLUSH_SEC)
         with self._lock:
             self._running = False
-            if self._rx_thread and self._rx_thread.is_alive():
-                self._rx_thread.join(timeout=1)
-            if self._sock:
-                try:
-                    self._sock.close()
-                except Exception:
-                    pass
-                self._sock = None
-        self.bus.publish("tcp.disconnected")
+            sock, self._sock = self._sock, None
+        self._tx.detach()
+        self._tx.clear()
+        if sock:
+            self._reactor.unregister(sock)
+            try:
+                sock.close()
+            except Exception:
+                pass
+        self.bus.publish(self._topics["disconnected"])
 
     def send(self, data: bytes) -> None:
-        """发送数据。"""
+        """入队发送，立即返回；写出后在反应器线程发布发送事件。"""
         with self._lock:
             sock = self._sock
         if not sock:
             self._log("[WARN] TCP 未连接，发送忽略")
             return
+        if not self._tx.submit(data):
+            self._log(f"[WARN] 发送队列已满，丢弃 {len(data)} bytes")
+            self.bus.publish(self._topics["error"], "tx queue full")
+
+    def _write(self, data: Any) -> Optional[int]:
+        sock = self._sock
+        if sock is None:
+            raise OSError("TCP 未连接")
+        return sock.send(data)
+
+    def _on_tx_error(self, exc: Exception) -> None:
+        self._log(f"[ERROR] 发送失败: {exc}")
+        self.bus.publish(self._topics["error"], str(exc))
+
+    def _on_ready(self, sock: socket.socket, mask: int) -> None:
+        """反应器回调：可写时推进发送队列，可读时读取数据。"""
+        if sock is not self._sock:
+            return
+        if mask & EVENT_WRITE:
+            self._tx.on_writable()
+        if mask & EVENT_READ:
+            self._on_readable(sock)
+
+    def _on_readable(self, sock: socket.socket) -> None:
+        """读取可用数据并发布；对端关闭或异常时关闭会话。"""
+        if sock is not self._sock:
+            return
         try:
-            sock.sendall(data)
-            self.bus.publish("tcp.tx", data)
+            chunk = sock.recv(65536)
+            t_ns = time.perf_counter_ns()
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return
         except OSError as exc:
-            self._log(f"[ERROR] 发送失败: {exc}")
-            self.bus.publish("tcp.error", str(exc))
-
-    def _rx_loop(self) -> None:
-        """接收线程：非阻塞读取，异常时退出。"""
-        while self._running:
-            sock = self._sock
-            if not sock:
-                time.sleep(0.05)
-                continue
-            try:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    self._log("对端关闭连接")
-                    self.bus.publish("tcp.disconnected")
-                    self.close()
-                    return
-                self.bus.publish("tcp.rx", chunk)
-            except socket.timeout:
-                continue  # 正常轮询
-            except OSError as exc:
-                self._log(f"[ERROR] 接收异常: {exc}")
-                self.bus.publish("tcp.error", str(exc))
-                self.close()
-                return
+            self._log(f"[ERROR] 接收异常: {exc}")
+            self.bus.publish(self._topics["error"], str(exc))
+            self.close()
+            return
+        if not chunk:
+            self._log("对端关闭连接")
+            self.close()
+            return
+        self.bus.publish(self._topics["rx"], Chunk(chunk, t_ns, self.session_id))
 
     @staticmethod
     def _log(msg: str) -> None:
@@ -0,0 +1,304 @@
+"""发送队列：会话 send() 只入队即返回，由 IoReactor 线程在句柄可写时写出。
+
+- UI 线程、脚本不再阻塞在慢速串口/套接字上，tx 事件也改在反应器线程发布
+- on_sent(frame, t_ns) 携带写出完成时刻（perf_counter_ns），作为 tx 数据块的源时间戳
+- 允许合并时，连续的小块写入合并为一次系统调用；tx 事件仍按原始帧逐条发布
+- 可选字节速率上限与帧间隔（inter-frame gap），由反应器定时器节拍，不占线程
+- 队列按字节数设上限，超出时拒绝入队（丢弃计数），调用方永不阻塞
+- 无可 select 描述符的句柄（如 Windows 串口）回退为独立发送线程，语义一致
+- 反应器模式下写回调必须非阻塞：缓冲已满时抛 BlockingIOError 或返回 0，等待下一次可写事件
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from infra.comm.io_reactor import EVENT_READ, EVENT_WRITE, IoReactor
+
+Buffer = Union[bytes, memoryview]
+
+# 单次写入上限；限速时再按节拍切片，保证速率平滑。
+_MAX_WRITE = 64 * 1024
+_PACE_SLICE_SEC = 0.01
+_MIN_PACE_SLICE = 16
+# 每次可写事件最多连续写入的次数，避免单个会话霸占反应器。
+_MAX_WRITES_PER_WAKE = 16
+DEFAULT_MAX_PENDING_BYTES = 1024 * 1024
+
+# _write_some 的结果：队列已空 / 内核缓冲已满需等待可写 / 已写出可继续；正数为节拍等待秒数。
+_IDLE = -1.0
+_BLOCKED = 0.0
+_AGAIN = -2.0
+
+
+class TxQueue:
+    def __init__(
+        self,
+        reactor: IoReactor,
+        write: Callable[[Buffer], Optional[int]],
+        on_sent: Callable[[bytes, int], None],
+        on_error: Callable[[Exception], None],
+        max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+        name: str = "TxQueue",
+    ) -> None:
+        self._reactor = reactor
+        self._write = write
+        self._on_sent = on_sent
+        self._on_error = on_error
+        self._max_pending_bytes = max(1, int(max_pending_bytes))
+        self._name = name
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._frames: Deque[bytes] = deque()
+        self._head_offset = 0
+        self._pending_bytes = 0
+        self._armed = False
+        self._writing = False
+        self._fd: Optional[int] = None
+        self._attached = False
+        self._generation = 0
+        self._want_write = False
+        self._ready_at = 0.0
+        self._coalesce = True
+        self._max_bytes_per_sec = 0
+        self._frame_gap_sec = 0.0
+        self._line_bytes_per_sec = 0.0
+        self._stats = {"frames": 0, "bytes": 0, "writes": 0, "coalesced": 0, "dropped": 0, "max_depth_bytes": 0}
+
+    def configure(
+        self,
+        coalesce: bool = True,
+        max_bytes_per_sec: int = 0,
+        frame_gap_sec: float = 0.0,
+        line_bytes_per_sec: float = 0.0,
+    ) -> None:
+        """设置合并与节拍；设置帧间隔时逐帧写出（不合并）。
+
+        line_bytes_per_sec 为物理线路速率（串口约 baud/10），用于估算帧在线路上发完的时刻，
+        帧间隔从该时刻起算，而不是从写入内核缓冲起算。
+        """
+        with self._lock:
+            self._coalesce = bool(coalesce)
+            self._max_bytes_per_sec = max(0, int(max_bytes_per_sec or 0))
+            self._frame_gap_sec = max(0.0, float(frame_gap_sec or 0.0))
+            self._line_bytes_per_sec = max(0.0, float(line_bytes_per_sec or 0.0))
+
+    def attach(self, fd: Optional[int]) -> None:
+        """绑定写出目标：fd 已在反应器注册（EVENT_READ）时由反应器驱动，None 时启用发送线程。"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._fd = fd
+            self._attached = True
+            self._want_write = False
+            self._armed = bool(self._frames)
+            armed = self._armed
+        if fd is None:
+            threading.Thread(target=self._thread_loop, args=(generation,), name=self._name, daemon=True).start()
+        elif armed:
+            self._reactor.call_soon(self._resume)
+
+    def detach(self) -> None:
+        """停止写出（如接收注销、重连中）；未发送数据保留，重新 attach 后继续。"""
+        with self._cond:
+            self._generation += 1
+            self._attached = False
+            self._fd = None
+            self._armed = False
+            self._cond.notify_all()
+
+    def submit(self, data: bytes) -> bool:
+        """入队即返回；超出队列上限时拒绝并计入 dropped。"""
+        if not data:
+            return True
+        frame = bytes(data)
+        with self._cond:
+            if self._pending_bytes + len(frame) > self._max_pending_bytes:
+                self._stats["dropped"] += 1
+                return False
+            self._frames.append(frame)
+            self._pending_bytes += len(frame)
+            if self._pending_bytes > self._stats["max_depth_bytes"]:
+                self._stats["max_depth_bytes"] = self._pending_bytes
+            kick = self._attached and not self._armed
+            if kick:
+                self._armed = True
+            threaded = self._fd is None
+            if threaded:
+                self._cond.notify_all()
+        if kick and not threaded:
+            self._reactor.call_soon(self._resume)
+        return True
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """等待队列写空；在反应器线程内调用时立即返回（否则会自锁）。"""
+        if self._reactor.in_reactor_thread():
+            return not self._frames
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while (self._frames or self._writing) and self._attached:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return not self._frames
+
+    def clear(self) -> int:
+        """丢弃未发送数据，返回丢弃的帧数。"""
+        with self._cond:
+            count = len(self._frames)
+            self._frames.clear()
+            self._head_offset = 0
+            self._pending_bytes = 0
+            self._stats["dropped"] += count
+            self._cond.notify_all()
+            return count
+
+    def depth(self) -> int:
+        """当前排队字节数。"""
+        return self._pending_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["depth_frames"] = len(self._frames)
+            data["depth_bytes"] = self._pending_bytes
+            data["max_bytes_per_sec"] = self._max_bytes_per_sec
+            data["frame_gap_sec"] = self._frame_gap_sec
+            return data
+
+    def on_writable(self) -> None:
+        """反应器回调（EVENT_WRITE）：尽量写出，满了等下次可写，需节拍时挂定时器。"""
+        generation = self._generation
+        for _ in range(_MAX_WRITES_PER_WAKE):
+            result = self._write_some()
+            if result == _AGAIN:
+                continue
+            if result == _BLOCKED:
+                return
+            self._set_write_interest(False)
+            if result > 0 and generation == self._generation:
+                self._reactor.call_later(result, self._resume)
+            return
+
+    def _resume(self) -> None:
+        """反应器线程：有待发数据时打开 EVENT_WRITE 监听。"""
+        if self._fd is not None and self._frames:
+            self._set_write_interest(True)
+
+    def _set_write_interest(self, enabled: bool) -> None:
+        fd = self._fd
+        if fd is None or self._want_write == enabled:
+            return
+        self._want_write = enabled
+        self._reactor.modify(fd, EVENT_READ | (EVENT_WRITE if enabled else 0))
+
+    def _thread_loop(self, generation: int) -> None:
+        while True:
+            with self._cond:
+                while self._generation == generation and not self._frames:
+                    self._cond.wait()
+                if self._generation != generation:
+                    return
+            result = self._write_some()
+            if result == _BLOCKED:
+                time.sleep(0.001)
+            elif result > 0:
+                time.sleep(result)
+
+    def _write_some(self) -> float:
+        now = time.perf_counter()
+        with self._cond:
+            if not self._frames or not self._attached:
+                self._armed = False
+                self._cond.notify_all()
+                return _IDLE
+            wait = self._ready_at - now
+            if wait > 0:
+                return wait
+            chunk, merged = self._next_chunk()
+            self._writing = True
+        try:
+            written = self._write(chunk)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            written = 0
+        except Exception as exc:
+            self._fail(exc)
+            return _IDLE
+        t_ns = time.perf_counter_ns()
+        written = int(written or 0)
+        with self._cond:
+            if written <= 0:
+                self._writing = False
+                self._cond.notify_all()
+                return _BLOCKED
+            sent = self._consume(written, now)
+            self._stats["writes"] += 1
+            self._stats["bytes"] += written
+            self._stats["frames"] += len(sent)
+            if written == len(chunk):
+                self._stats["coalesced"] += merged
+        try:
+            for frame in sent:
+                self._on_sent(frame, t_ns)
+        finally:
+            # on_sent 回调完成后才算写完，flush 返回时 tx 事件均已发布。
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+        return _AGAIN if written == len(chunk) else _BLOCKED
+
+    def _next_chunk(self) -> tuple[Buffer, int]:
+        """取下一次写入的数据（持锁调用），返回 (数据, 合并进来的额外帧数)。"""
+        limit = _MAX_WRITE
+        if self._max_bytes_per_sec:
+            limit = min(limit, max(_MIN_PACE_SLICE, int(self._max_bytes_per_sec * _PACE_SLICE_SEC)))
+        head = memoryview(self._frames[0])[self._head_offset:]
+        if len(head) >= limit or len(self._frames) == 1 or not self._coalesce or self._frame_gap_sec:
+            return head[:limit], 0
+        parts: List[Buffer] = [head]
+        size = len(head)
+        for frame in islice(self._frames, 1, None):
+            if size + len(frame) > limit:
+                break
+            parts.append(frame)
+            size += len(frame)
+        if len(parts) == 1:
+            return head, 0
+        return b"".join(parts), len(parts) - 1
+
+    def _consume(self, written: int, now: float) -> List[bytes]:
+        """按写出字节推进队列（持锁调用），返回已完整写出的帧，并更新节拍时刻。"""
+        sent: List[bytes] = []
+        remaining = written
+        while remaining and self._frames:
+            left = len(self._frames[0]) - self._head_offset
+            if remaining < left:
+                self._head_offset += remaining
+                break
+            remaining -= left
+            sent.append(self._frames.popleft())
+            self._head_offset = 0
+        self._pending_bytes -= written
+        if self._max_bytes_per_sec or (self._frame_gap_sec and sent):
+            ready_at = max(self._ready_at, now)
+            if self._max_bytes_per_sec:
+                ready_at += written / self._max_bytes_per_sec
+            if self._frame_gap_sec and sent:
+                if self._line_bytes_per_sec:
+                    ready_at = max(ready_at, now + written / self._line_bytes_per_sec)
+                ready_at += self._frame_gap_sec
+            self._ready_at = ready_at
+        return sent
+
+    def _fail(self, exc: Exception) -> None:
+        with self._cond:
+            self._writing = False
+            self._armed = False
+        self.clear()
+        self._on_error(exc)
@@ -0,0 +1,72 @@
+"""数据块记录：串口/TCP 在读取（或写出）时打上源时间戳，经 EventBus 原样传到订阅者。
+
+- Chunk 是 bytes 子类，现有订阅者（isinstance(payload, bytes)）无需改动
+- t_ns 为 time.perf_counter_ns()：单调、纳秒级，用于帧间隔/响应时延/t3.5 分帧
+- 墙钟时间由进程级时钟锚点换算（wall_time），每块只读一次时钟
+- 实例不可变；可 pickle（跨进程解码时保留时间戳）
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+# 进程级时钟锚点：同一时刻的墙钟与单调时钟读数。
+_ANCHOR_WALL_NS = time.time_ns()
+_ANCHOR_PERF_NS = time.perf_counter_ns()
+
+
+def clock_anchor() -> tuple[int, int]:
+    """返回 (墙钟 ns, perf_counter ns) 锚点，供落盘/跨进程还原时间。"""
+    return _ANCHOR_WALL_NS, _ANCHOR_PERF_NS
+
+
+def perf_to_wall(t_ns: int) -> float:
+    """把 perf_counter_ns 读数换算为墙钟秒（与 time.time() 同基准）。"""
+    return (_ANCHOR_WALL_NS + (t_ns - _ANCHOR_PERF_NS)) / 1e9
+
+
+def wall_to_perf(ts: float) -> int:
+    """perf_to_wall 的逆换算，用于只带墙钟时间戳的旧负载。"""
+    return int(ts * 1e9) - _ANCHOR_WALL_NS + _ANCHOR_PERF_NS
+
+
+class Chunk(bytes):
+    """带源时间戳的只读数据块。
+
+    bytes 是变长类型，不支持非空 __slots__；元数据存放在实例字典中，写入被禁止。
+    切片、拼接等 bytes 运算返回普通 bytes（时间戳只属于整块）。
+    """
+
+    t_ns: int
+    session_id: Optional[str]
+
+    def __new__(cls, data: Any, t_ns: Optional[int] = None, session_id: Optional[str] = None) -> "Chunk":
+        obj = super().__new__(cls, data)
+        fields = obj.__dict__
+        fields["t_ns"] = time.perf_counter_ns() if t_ns is None else int(t_ns)
+        fields["session_id"] = session_id
+        return obj
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Chunk is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Chunk is immutable")
+
+    @property
+    def wall_time(self) -> float:
+        return perf_to_wall(self.t_ns)
+
+    def __reduce__(self) -> tuple:
+        return (Chunk, (bytes(self), self.t_ns, self.session_id))
+
+    def __repr__(self) -> str:
+        return f"Chunk({bytes(self)!r}, t_ns={self.t_ns}, session_id={self.session_id!r})"
+
+
+def chunk_time_ns(payload: Any) -> int:
+    """负载的源时间戳；非 Chunk（旧发布方、脚本注入）取当前时刻。"""
+    if isinstance(payload, Chunk):
+        return payload.t_ns
+    return time.perf_counter_ns()
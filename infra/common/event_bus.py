@@ -2,58 +2,534 @@
 
 特性：
 - 订阅/取消订阅
-- 发布事件时为每个回调启动独立线程，避免阻塞
-- 简易日志输出，便于后续替换成正式日志框架
+- 发布事件只做入队：每个订阅者持有独立 FIFO 队列，由有界线程池按序派发，
+  同一订阅者按发布顺序串行收到事件，不同订阅者之间并行
+- 工作线程按需懒创建且常驻，稳态下发布路径不再创建线程
+- 每个主题或订阅可声明背压策略（有界丢新、丢旧、合并字节、阻塞发布者），
+  慢订阅者在过载时内存保持平稳，丢弃/合并次数可查询
+- 按主题统计发布次数、字节数、订阅者数、队列深度与各回调耗时直方图（stats()）
+- 别名主题（alias）：发布到源主题即直接投递给目标主题的订阅者，
+  路由在订阅/建立别名时预先解析，数据面事件无需二次转发
+- 调试追踪默认关闭（set_trace / PROTOFLOW_EVENT_BUS_TRACE），关闭时发布路径不格式化任何字符串
 """
 
 from __future__ import annotations
 
+import os
+import queue
 import threading
-from collections import defaultdict
-from typing import Any, Callable, DefaultDict, List
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, DefaultDict, Deque, Dict, List, Optional, Tuple
+
+from infra.common.chunk import Chunk
 
 Listener = Callable[[Any], None]
 
+_TRACE_ENV = "PROTOFLOW_EVENT_BUS_TRACE"
+
+# 回调耗时直方图按 2 的幂分桶（微秒）：桶 i 覆盖 [2^(i-1), 2^i)，最后一桶收纳更长耗时。
+_LATENCY_BUCKETS = 24
+
+# 单个订阅者一次最多连续派发的事件数，超过后让出工作线程，避免高频订阅者饿死其它订阅者。
+_DRAIN_BATCH = 64
+
+
+POLICY_UNBOUNDED = "unbounded"
+POLICY_BOUNDED = "bounded"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_COALESCE = "coalesce"
+POLICY_BLOCK = "block"
+
+_POLICY_MODES = {POLICY_UNBOUNDED, POLICY_BOUNDED, POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_BLOCK}
+
+
+@dataclass(frozen=True)
+class BackpressurePolicy:
+    """订阅者队列满载时的处理策略。
+
+    - unbounded: 不限深度（默认，与旧行为一致）
+    - bounded: 深度达到 max_depth 后丢弃新事件
+    - drop_oldest: 深度达到 max_depth 后丢弃最旧事件
+    - coalesce: 连续的 bytes 负载合并为一条（单条不超过 max_bytes），
+      非字节负载照常排队；max_depth > 0 时超限丢弃最旧
+    - block: 深度达到 max_depth 后阻塞发布者，超过 block_timeout 仍满则丢弃新事件
+    """
+
+    mode: str = POLICY_UNBOUNDED
+    max_depth: int = 0
+    max_bytes: int = 64 * 1024
+    block_timeout: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.mode not in _POLICY_MODES:
+            raise ValueError(f"unknown backpressure mode: {self.mode}")
+        if self.mode in {POLICY_BOUNDED, POLICY_DROP_OLDEST, POLICY_BLOCK} and self.max_depth <= 0:
+            raise ValueError(f"backpressure mode {self.mode} requires max_depth > 0")
+
+    @classmethod
+    def bounded(cls, max_depth: int) -> "BackpressurePolicy":
+        return cls(POLICY_BOUNDED, max_depth)
+
+    @classmethod
+    def drop_oldest(cls, max_depth: int) -> "BackpressurePolicy":
+        return cls(POLICY_DROP_OLDEST, max_depth)
+
+    @classmethod
+    def coalesce(cls, max_depth: int = 0, max_bytes: int = 64 * 1024) -> "BackpressurePolicy":
+        return cls(POLICY_COALESCE, max_depth, max_bytes=max(1, max_bytes))
+
+    @classmethod
+    def block(cls, max_depth: int, timeout: float = 1.0) -> "BackpressurePolicy":
+        return cls(POLICY_BLOCK, max_depth, block_timeout=max(0.0, timeout))
+
+
+UNBOUNDED = BackpressurePolicy()
+
+
+class _LatencyHistogram:
+    """单个回调的耗时直方图，仅由当前派发该订阅的工作线程写入。"""
+
+    __slots__ = ("counts", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts = [0] * _LATENCY_BUCKETS
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns: int) -> None:
+        idx = (elapsed_ns // 1000).bit_length()
+        self.counts[idx if idx < _LATENCY_BUCKETS else _LATENCY_BUCKETS - 1] += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile_us(self, pct: float) -> float:
+        """返回分位数所在桶的上界（微秒），粗粒度但无需保存样本。"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        threshold = pct * total
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return float(1 << idx) if idx < _LATENCY_BUCKETS - 1 else self.max_ns / 1000.0
+        return self.max_ns / 1000.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean_us": round(self.total_ns / count / 1000.0, 3) if count else 0.0,
+            "max_us": round(self.max_ns / 1000.0, 3),
+            "p50_us": self.percentile_us(0.50),
+            "p99_us": self.percentile_us(0.99),
+            "buckets_us": {f"<{1 << idx}": n for idx, n in enumerate(self.counts) if n},
+        }
+
+
+class _TopicStats:
+    __slots__ = ("published", "bytes")
 
-class EventBus:
     def __init__(self) -> None:
-        self._subs: DefaultDict[str, List[Listener]] = defaultdict(list)
+        self.published = 0
+        self.bytes = 0
+
+
+class _Coalesced(bytearray):
+    """合并后的字节负载；派发前还原为 bytes，订阅者看到的类型不变。
+
+    首块是 Chunk 时保留其源时间戳与会话，合并结果还原为 Chunk（时间戳为首字节到达时刻）。
+    """
+
+    __slots__ = ("head",)
+
+    def __init__(self, head: Any) -> None:
+        super().__init__(head)
+        self.head = head
+
+    def freeze(self) -> bytes:
+        head = self.head
+        if isinstance(head, Chunk):
+            return Chunk(self, head.t_ns, head.session_id)
+        return bytes(self)
+
+
+def _same_source(tail: Any, data: Any) -> bool:
+    """两块能否合并：都不是 Chunk，或都是 Chunk 且属于同一会话（合并结果沿用首块的会话）。"""
+    head = tail.head if isinstance(tail, _Coalesced) else tail
+    if isinstance(head, Chunk) or isinstance(data, Chunk):
+        return isinstance(head, Chunk) and isinstance(data, Chunk) and head.session_id == data.session_id
+    return True
+
+
+class _Subscription:
+    """单个订阅者的派发状态：待派发 FIFO、调度标记与背压计数。"""
+
+    __slots__ = (
+        "event_name",
+        "callback",
+        "policy",
+        "pending",
+        "scheduled",
+        "active",
+        "waiters",
+        "dropped",
+        "coalesced",
+        "delivered",
+        "errors",
+        "latency",
+    )
+
+    def __init__(self, event_name: str, callback: Listener, policy: Optional[BackpressurePolicy]) -> None:
+        self.event_name = event_name
+        self.callback = callback
+        self.policy = policy
+        self.pending: Deque[Any] = deque()
+        self.scheduled = False
+        self.active = True
+        self.waiters = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.errors = 0
+        self.latency = _LatencyHistogram()
+
+
+_Route = Tuple[Tuple[_Subscription, BackpressurePolicy], ...]
+
+
+class EventBus:
+    def __init__(self, max_workers: Optional[int] = None, trace: Optional[bool] = None) -> None:
+        self._subs: DefaultDict[str, List[_Subscription]] = defaultdict(list)
+        self._aliases: DefaultDict[str, List[str]] = defaultdict(list)
+        # 预解析的投递表：主题 -> (订阅, 生效策略)，含别名目标的订阅；发布时只读。
+        self._routes: Dict[str, _Route] = {}
+        self._route_topics: Dict[str, Tuple[str, ...]] = {}
         self._lock = threading.RLock()
+        self._idle_cond = threading.Condition(self._lock)
+        self._space_cond = threading.Condition(self._lock)
+        self._topic_policies: Dict[str, BackpressurePolicy] = {}
+        self._topic_stats: DefaultDict[str, _TopicStats] = defaultdict(_TopicStats)
+        if trace is None:
+            trace = os.environ.get(_TRACE_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+        self._trace = bool(trace)
+        self._max_workers = max(1, int(max_workers or min(32, (os.cpu_count() or 1) + 4)))
+        self._ready: "queue.SimpleQueue[Optional[_Subscription]]" = queue.SimpleQueue()
+        self._workers: List[threading.Thread] = []
+        self._idle_workers = 0
+        self._busy = 0
+        self._closed = False
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
 
-    def subscribe(self, event_name: str, callback: Listener) -> None:
-        """订阅事件。"""
+    def set_trace(self, enabled: bool) -> None:
+        """开关调试追踪：逐条输出 subscribe/unsubscribe/publish（含负载 repr）。"""
+        self._trace = bool(enabled)
+
+    def subscribe(
+        self,
+        event_name: str,
+        callback: Listener,
+        policy: Optional[BackpressurePolicy] = None,
+    ) -> None:
+        """订阅事件；policy 为空时沿用主题策略（见 set_policy）。"""
+        with self._lock:
+            subs = self._subs[event_name]
+            if not any(sub.callback == callback for sub in subs):
+                subs.append(_Subscription(event_name, callback, policy))
+                self._rebuild_routes()
+        if self._trace:
+            self._log(f"subscribe -> {event_name}: {callback}")
+
+    def set_policy(self, event_name: str, policy: Optional[BackpressurePolicy]) -> None:
+        """设置主题级背压策略，作用于该主题下未显式指定策略的订阅。"""
         with self._lock:
-            if callback not in self._subs[event_name]:
-                self._subs[event_name].append(callback)
-        self._log(f"subscribe -> {event_name}: {callback}")
+            if policy is None:
+                self._topic_policies.pop(event_name, None)
+            else:
+                self._topic_policies[event_name] = policy
+            self._rebuild_routes()
+
+    def alias(self, source: str, target: str) -> None:
+        """把 source 主题并入 target：发布到 source 的事件直接投递给 target 的订阅者。
+
+        用于数据面（如 serial.rx -> comm.rx），取代“订阅后再 publish”的桥接，
+        每个数据块只经历一次入队与派发。source 自身的订阅者照常收到事件。
+        """
+        if source == target:
+            return
+        with self._lock:
+            if target not in self._aliases[source]:
+                self._aliases[source].append(target)
+                self._rebuild_routes()
+
+    def unalias(self, source: str, target: str) -> None:
+        """撤销 alias(source, target)。"""
+        with self._lock:
+            targets = self._aliases.get(source)
+            if targets and target in targets:
+                targets.remove(target)
+                if not targets:
+                    del self._aliases[source]
+                self._rebuild_routes()
+
+    def _resolve_topics(self, topic: str) -> Tuple[str, ...]:
+        """返回 topic 及其（传递）别名目标，保持声明顺序并去环。"""
+        ordered: List[str] = []
+        stack = [topic]
+        while stack:
+            current = stack.pop(0)
+            if current in ordered:
+                continue
+            ordered.append(current)
+            stack.extend(self._aliases.get(current, ()))
+        return tuple(ordered)
+
+    def _rebuild_routes(self) -> None:
+        # 订阅/别名/策略变化都很少见，整表重建即可；须持有 _lock。
+        routes: Dict[str, _Route] = {}
+        route_topics: Dict[str, Tuple[str, ...]] = {}
+        for topic in set(self._subs) | set(self._aliases):
+            topics = self._resolve_topics(topic)
+            entries: List[Tuple[_Subscription, BackpressurePolicy]] = []
+            seen: set = set()
+            for name in topics:
+                topic_policy = self._topic_policies.get(name, UNBOUNDED)
+                for sub in self._subs.get(name, ()):
+                    if id(sub) in seen:
+                        continue
+                    seen.add(id(sub))
+                    entries.append((sub, sub.policy or topic_policy))
+            routes[topic] = tuple(entries)
+            route_topics[topic] = topics
+        self._routes = routes
+        self._route_topics = route_topics
+
+    def subscriptions(self, event_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """返回订阅者队列深度与背压计数快照。"""
+        with self._lock:
+            topics = [event_name] if event_name is not None else list(self._subs.keys())
+            items: List[Dict[str, Any]] = []
+            for topic in topics:
+                topic_policy = self._topic_policies.get(topic, UNBOUNDED)
+                for sub in self._subs.get(topic, ()):
+                    policy = sub.policy or topic_policy
+                    items.append(
+                        {
+                            "event": topic,
+                            "callback": getattr(sub.callback, "__qualname__", repr(sub.callback)),
+                            "policy": policy.mode,
+                            "max_depth": policy.max_depth,
+                            "depth": len(sub.pending),
+                            "dropped": sub.dropped,
+                            "coalesced": sub.coalesced,
+                        }
+                    )
+            return items
+
+    def stats(self, event_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """按主题返回指标快照：发布次数、字节数、订阅者数、队列深度、丢弃/合并数与回调耗时。"""
+        with self._lock:
+            if event_name is not None:
+                topics = [event_name]
+            else:
+                topics = sorted(set(self._topic_stats) | {t for t, subs in self._subs.items() if subs})
+            result: Dict[str, Dict[str, Any]] = {}
+            for topic in topics:
+                counters = self._topic_stats.get(topic) or _TopicStats()
+                subs = self._subs.get(topic, ())
+                result[topic] = {
+                    "published": counters.published,
+                    "bytes": counters.bytes,
+                    "subscribers": len(subs),
+                    "queue_depth": sum(len(sub.pending) for sub in subs),
+                    "dropped": sum(sub.dropped for sub in subs),
+                    "coalesced": sum(sub.coalesced for sub in subs),
+                    "handlers": [
+                        {
+                            "callback": getattr(sub.callback, "__qualname__", repr(sub.callback)),
+                            "delivered": sub.delivered,
+                            "errors": sub.errors,
+                            "depth": len(sub.pending),
+                            "latency": sub.latency.snapshot(),
+                        }
+                        for sub in subs
+                    ],
+                }
+            return result
 
     def unsubscribe(self, event_name: str, callback: Listener) -> None:
-        """取消订阅。"""
+        """取消订阅，尚未派发的事件一并丢弃。"""
         with self._lock:
-            listeners = self._subs.get(event_name, [])
-            if callback in listeners:
-                listeners.remove(callback)
-        self._log(f"unsubscribe -> {event_name}: {callback}")
+            subs = self._subs.get(event_name, [])
+            for sub in subs:
+                if sub.callback == callback:
+                    sub.active = False
+                    sub.pending.clear()
+                    subs.remove(sub)
+                    self._rebuild_routes()
+                    self._space_cond.notify_all()
+                    break
+        if self._trace:
+            self._log(f"unsubscribe -> {event_name}: {callback}")
 
     def publish(self, event_name: str, data: Any = None) -> None:
-        """发布事件，为每个回调启动独立线程，避免阻塞主流程。"""
+        """发布事件：追加到各订阅者队列并唤醒线程池，不阻塞主流程。"""
+        with self._lock:
+            if self._closed:
+                return
+            size = len(data) if isinstance(data, (bytes, bytearray, memoryview)) else 0
+            for topic in self._route_topics.get(event_name) or (event_name,):
+                counters = self._topic_stats[topic]
+                counters.published += 1
+                counters.bytes += size
+            route = self._routes.get(event_name, ())
+            count = len(route)
+            for sub, policy in route:
+                if not self._enqueue(sub, policy, data):
+                    continue
+                if not sub.scheduled:
+                    sub.scheduled = True
+                    self._busy += 1
+                    self._ready.put(sub)
+                    if self._idle_workers == 0 and len(self._workers) < self._max_workers:
+                        self._spawn_worker()
+        if self._trace:
+            self._log(f"publish -> {event_name}, listeners={count}, data={data!r}")
+
+    def _enqueue(self, sub: _Subscription, policy: BackpressurePolicy, data: Any) -> bool:
+        """按策略把事件放入订阅者队列；返回 False 表示事件被丢弃。须持有 _lock。"""
+        pending = sub.pending
+        mode = policy.mode
+        if mode == POLICY_UNBOUNDED:
+            pending.append(data)
+            return True
+        if mode == POLICY_COALESCE:
+            if isinstance(data, (bytes, bytearray)) and pending:
+                tail = pending[-1]
+                if (
+                    isinstance(tail, (bytes, bytearray))
+                    and len(tail) + len(data) <= policy.max_bytes
+                    and _same_source(tail, data)
+                ):
+                    if not isinstance(tail, _Coalesced):
+                        tail = _Coalesced(tail)
+                        pending[-1] = tail
+                    tail.extend(data)
+                    sub.coalesced += 1
+                    return True
+            pending.append(data)
+            if policy.max_depth and len(pending) > policy.max_depth:
+                pending.popleft()
+                sub.dropped += 1
+            return True
+        if len(pending) < policy.max_depth:
+            pending.append(data)
+            return True
+        if mode == POLICY_DROP_OLDEST:
+            pending.popleft()
+            pending.append(data)
+            sub.dropped += 1
+            return True
+        if mode == POLICY_BLOCK:
+            deadline = time.monotonic() + policy.block_timeout
+            sub.waiters += 1
+            try:
+                while sub.active and len(pending) >= policy.max_depth:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._space_cond.wait(remaining)
+            finally:
+                sub.waiters -= 1
+            if sub.active and len(pending) < policy.max_depth:
+                pending.append(data)
+                return True
+        sub.dropped += 1
+        return False
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已发布事件派发完成，返回是否在超时前清空。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle_cond:
+            while self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle_cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 1.0) -> None:
+        """停止接收新事件并回收工作线程，已入队事件尽量派发完。"""
+        self.wait_idle(timeout)
         with self._lock:
-            listeners = list(self._subs.get(event_name, []))
-        self._log(f"publish -> {event_name}, listeners={len(listeners)}, data={data!r}")
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._ready.put(None)
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(timeout=timeout)
+
+    def _spawn_worker(self) -> None:
+        # 仅在冷启动或并发订阅者增多时调用，线程创建后常驻。
+        worker = threading.Thread(
+            target=self._worker_loop,
+            name=f"EventBus-worker-{len(self._workers)}",
+            daemon=True,
+        )
+        self._workers.append(worker)
+        worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                self._idle_workers += 1
+            sub = self._ready.get()
+            with self._lock:
+                self._idle_workers -= 1
+            if sub is None:
+                return
+            self._drain(sub)
 
-        for callback in listeners:
-            thread = threading.Thread(
-                target=self._safe_invoke, args=(event_name, callback, data), daemon=True
-            )
-            thread.start()
+    def _drain(self, sub: _Subscription) -> None:
+        for _ in range(_DRAIN_BATCH):
+            with self._lock:
+                if not sub.active or not sub.pending:
+                    sub.scheduled = False
+                    self._busy -= 1
+                    if not self._busy:
+                        self._idle_cond.notify_all()
+                    return
+                data = sub.pending.popleft()
+                if sub.waiters:
+                    self._space_cond.notify_all()
+            if type(data) is _Coalesced:
+                data = data.freeze()
+            started = time.perf_counter_ns()
+            if not self._safe_invoke(sub.event_name, sub.callback, data):
+                sub.errors += 1
+            sub.latency.record(time.perf_counter_ns() - started)
+            sub.delivered += 1
+        # 批次用尽仍有积压：重新排队，交还工作线程。
+        self._ready.put(sub)
 
-    def _safe_invoke(self, event_name: str, callback: Listener, data: Any) -> None:
+    def _safe_invoke(self, event_name: str, callback: Listener, data: Any) -> bool:
         try:
             callback(data)
+            return True
         except Exception as exc:
             self._log(f"[ERROR] callback failed: {event_name} {callback} exc={exc}")
+            return False
 
     @staticmethod
     def _log(message: str) -> None:
-        # 简易日志；后续可替换成 logging
+        # 仅用于回调异常与显式开启的追踪，热路径不经过这里
         print(f"[EventBus] {message}")
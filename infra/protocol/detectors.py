@@ -0,0 +1,348 @@
+"""协议识别：抓包帧按可插拔的识别器打分归类，再交给胜出者完整解码。
+
+- 识别器提供廉价的 probe(bytes) -> 0..1 得分、只给错误码的 check(bytes) 与完整的 decode(bytes)
+- 抓包列表只需要 check 的结果；decode（摘要/字段树）在界面打开某帧时才调用
+- 内置 Modbus RTU；protocols/ 下的协议包在实现类上提供 probe/decode 即可参与；ProtocolSchema 帧经 SchemaDetector 接入
+- 候选按历史命中次数排序，得分足够高时提前结束；每个通道缓存上次胜出者，稳态下每帧只需一次 probe
+- 注册表由抓包引擎的多个解码分片线程共享：probe 在锁外执行，通道缓存、统计与命中计数在锁内更新，
+  识别器顺序在副本上换位后整体替换，遍历中的 detect 不受影响
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from infra.common.utils.checksum import crc16_modbus, find_crc
+from infra.protocol.schema_runtime import FrameDef, ProtocolSchema
+from infra.protocol.stream_framer import modbus_pdu_length_ok
+
+# 低于该分数视为无法识别。
+MIN_SCORE = 0.2
+# 通道缓存的识别器得分不低于该值即直接采用，不再探测其它识别器。
+STICKY_SCORE = 0.3
+# 全量探测时达到该分数即停止（候选已按命中次数排序）。
+CERTAIN_SCORE = 0.95
+
+Row = Dict[str, str]
+
+
+@dataclass
+class Decoded:
+    name: str
+    summary: str
+    tree: List[Row] = field(default_factory=list)
+    errors: List[Row] = field(default_factory=list)
+
+
+class ProtocolDetector:
+    """识别器基类：id 唯一（同 id 后注册者覆盖），name 为展示名。"""
+
+    id = ""
+    name = ""
+
+    def probe(self, data: bytes) -> float:
+        raise NotImplementedError()
+
+    def decode(self, data: bytes) -> Decoded:
+        raise NotImplementedError()
+
+    def check(self, data: bytes) -> Tuple[str, ...]:
+        """帧错误码（无错误为空元组）；缺省取 decode 结果，子类可给出不构建字段树的快速实现。"""
+        return tuple(e.get("code", "") for e in self.decode(data).errors)
+
+
+_RTU_FUNCTIONS = frozenset({0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x0B, 0x0C, 0x0F, 0x10, 0x11, 0x14, 0x15, 0x16, 0x17, 0x18, 0x2B})
+
+
+class ModbusRtuDetector(ProtocolDetector):
+    """Modbus RTU：CRC 正确最可信；长度符合功能码规则次之；地址/功能码合理时给低分以便报告短帧、CRC 错误。"""
+
+    id = "modbus_rtu"
+    name = "Modbus RTU"
+
+    def probe(self, data: bytes) -> float:
+        if len(data) < 2:
+            return 0.0
+        if len(data) >= 4 and crc16_modbus(data[:-2]) == int.from_bytes(data[-2:], "little"):
+            return 0.95
+        if data[0] > 247 or (data[1] & 0x7F) not in _RTU_FUNCTIONS:
+            return 0.05
+        if len(data) >= 5 and modbus_pdu_length_ok(data[1:-2]):
+            return 0.5
+        return 0.3
+
+    def check(self, data: bytes) -> Tuple[str, ...]:
+        if len(data) < 5:
+            return ("FRAME_TOO_SHORT",)
+        codes: Tuple[str, ...] = ()
+        if crc16_modbus(data[:-2]) != int.from_bytes(data[-2:], "little"):
+            codes += ("CRC_INVALID",)
+        if data[1] & 0x80 and len(data) != 5:
+            codes += ("LENGTH_INVALID",)
+        return codes
+
+    def decode(self, data: bytes) -> Decoded:
+        if len(data) < 2:
+            return Decoded(
+                self.name,
+                "Too short",
+                [],
+                [{"code": "FRAME_TOO_SHORT", "message": "Frame length < 2 bytes"}],
+            )
+        addr = data[0]
+        func = data[1]
+        summary = f"addr=0x{addr:02X} func=0x{func:02X} len={len(data)}"
+        tree = [
+            {"label": "Address", "raw": f"{addr:02X}", "value": str(addr)},
+            {"label": "Function", "raw": f"{func:02X}", "value": f"0x{func:02X}"},
+        ]
+        errors: List[Row] = []
+        if len(data) < 5:
+            errors.append({"code": "FRAME_TOO_SHORT", "message": "Modbus RTU frame length < 5 bytes"})
+            return Decoded(self.name, summary, tree, errors)
+
+        crc_calc = crc16_modbus(data[:-2])
+        crc_expected = int.from_bytes(data[-2:], "little")
+        crc_ok = crc_calc == crc_expected
+        payload_len = len(data) - 4
+        is_exception = bool(func & 0x80)
+        tree.append({"label": "PayloadLength", "raw": f"{payload_len:02X}", "value": str(payload_len)})
+        tree.append(
+            {
+                "label": "CRC16",
+                "raw": " ".join(f"{b:02X}" for b in data[-2:]),
+                "value": "valid" if crc_ok else "invalid",
+            }
+        )
+        tree.append({"label": "CRC16(calc)", "raw": f"{crc_calc:04X}", "value": f"0x{crc_calc:04X}"})
+        if not crc_ok:
+            errors.append({"code": "CRC_INVALID", "message": f"expected=0x{crc_expected:04X} calc=0x{crc_calc:04X}"})
+        if is_exception and payload_len != 1:
+            errors.append(
+                {
+                    "code": "LENGTH_INVALID",
+                    "message": f"exception frame payload length should be 1, got {payload_len}",
+                }
+            )
+        if not is_exception and payload_len <= 0:
+            errors.append({"code": "LENGTH_INVALID", "message": "normal frame payload length should be >= 1"})
+        return Decoded(self.name, summary, tree, errors)
+
+
+class PackageDetector(ProtocolDetector):
+    """协议包识别器：包装实现类上的 probe(bytes)->float 与 decode(bytes)->dict(summary/tree/errors)。"""
+
+    def __init__(self, protocol_id: str, impl: Any, name: Optional[str] = None) -> None:
+        self.id = protocol_id
+        self.name = name or str(getattr(impl, "display_name", "") or protocol_id)
+        self._probe = impl.probe
+        self._decode = impl.decode
+        self._check = getattr(impl, "check", None)
+
+    def probe(self, data: bytes) -> float:
+        try:
+            return float(self._probe(data) or 0.0)
+        except Exception:
+            return 0.0
+
+    def decode(self, data: bytes) -> Decoded:
+        try:
+            out = self._decode(data) or {}
+        except Exception as exc:
+            return Decoded(self.name, f"decode failed: {exc}", [], [{"code": "DECODE_FAILED", "message": str(exc)}])
+        return Decoded(
+            str(out.get("name") or self.name),
+            str(out.get("summary") or ""),
+            list(out.get("tree") or []),
+            list(out.get("errors") or []),
+        )
+
+    def check(self, data: bytes) -> Tuple[str, ...]:
+        if callable(self._check):
+            try:
+                return tuple(self._check(data) or ())
+            except Exception:
+                return ("DECODE_FAILED",)
+        return super().check(data)
+
+    @staticmethod
+    def supports(impl: Any) -> bool:
+        return callable(getattr(impl, "probe", None)) and callable(getattr(impl, "decode", None))
+
+
+class SchemaDetector(ProtocolDetector):
+    """ProtocolSchema 帧识别：帧头/帧尾/定长/CRC 逐项加分，解码用 schema.parse。"""
+
+    def __init__(self, schema: ProtocolSchema, name: str = "Schema", detector_id: Optional[str] = None) -> None:
+        self.id = detector_id or f"schema:{name}"
+        self.name = name
+        self._schema = schema
+        # 没有帧头/帧尾/CRC 的帧无从识别，不参与探测。
+        self._frames: List[Tuple[FrameDef, Optional[int]]] = [
+            (fd, fd.fixed_length()) for fd in schema.frames.values() if fd.header or fd.tail or fd.crc
+        ]
+
+    def probe(self, data: bytes) -> float:
+        best = 0.0
+        for fd, fixed in self._frames:
+            best = max(best, self._score(fd, fixed, data))
+            if best >= CERTAIN_SCORE:
+                break
+        return best
+
+    def decode(self, data: bytes) -> Decoded:
+        scored = sorted(self._frames, key=lambda item: self._score(item[0], item[1], data), reverse=True)
+        if not scored:
+            return Decoded(self.name, "no frames", [], [{"code": "SCHEMA_NO_FRAME", "message": "schema has no frames"}])
+        fd = scored[0][0]
+        try:
+            values = self._schema.parse(fd.name, data)
+        except Exception as exc:
+            return Decoded(self.name, f"{fd.name} len={len(data)}", [], [{"code": "SCHEMA_PARSE_FAILED", "message": str(exc)}])
+        tree = [{"label": "Frame", "raw": "", "value": fd.name}]
+        for key, value in values.items():
+            raw = value.hex(" ").upper() if isinstance(value, (bytes, bytearray)) else ""
+            tree.append({"label": str(key), "raw": raw, "value": str(value)})
+        return Decoded(self.name, f"{fd.name} len={len(data)}", tree, [])
+
+    @staticmethod
+    def _score(fd: FrameDef, fixed: Optional[int], data: bytes) -> float:
+        if fd.header and not data.startswith(fd.header):
+            return 0.0
+        if fd.tail and not data.endswith(fd.tail):
+            return 0.0
+        if fixed is not None and len(data) != fixed:
+            return 0.0
+        score = 0.3 + 0.1 * min(4, len(fd.header) + len(fd.tail)) + (0.1 if fixed is not None else 0.0)
+        crc = find_crc(fd.crc)
+        if crc is None:
+            return min(score, 0.9)
+        start = len(fd.header)
+        end = len(data) - len(fd.tail)
+        if end - crc.size < start:
+            return 0.0
+        if crc.verify(data[start : end - crc.size], data[end - crc.size : end]):
+            return 0.97
+        return min(score, 0.4)
+
+
+class DetectorRegistry:
+    def __init__(self, detectors: Optional[List[ProtocolDetector]] = None) -> None:
+        self._order: List[ProtocolDetector] = []
+        self._hits: Dict[str, int] = {}
+        self._by_channel: Dict[str, ProtocolDetector] = {}
+        self._stats = {"frames": 0, "probes": 0, "cache_hits": 0, "unknown": 0}
+        self._lock = threading.Lock()
+        for detector in detectors or []:
+            self.register(detector)
+
+    @classmethod
+    def with_builtin(cls) -> "DetectorRegistry":
+        return cls([ModbusRtuDetector()])
+
+    def register(self, detector: ProtocolDetector) -> None:
+        """注册识别器；同 id 的已有识别器被替换（保留命中计数）。"""
+        with self._lock:
+            order = [d for d in self._order if d.id != detector.id]
+            order.append(detector)
+            self._hits.setdefault(detector.id, 0)
+            order.sort(key=lambda d: self._hits.get(d.id, 0), reverse=True)
+            self._order = order
+            self._by_channel.clear()
+
+    def register_packages(self, packages: Mapping[str, Any]) -> List[str]:
+        """从已加载的协议包（{id: LoadedProtocolPackage 或实现对象}）注册提供 probe/decode 的包，返回注册的 id。"""
+        added: List[str] = []
+        for protocol_id, pkg in packages.items():
+            impl = getattr(pkg, "impl", pkg)
+            if PackageDetector.supports(impl):
+                self.register(PackageDetector(str(protocol_id), impl))
+                added.append(str(protocol_id))
+        return added
+
+    def unregister(self, detector_id: str) -> None:
+        with self._lock:
+            self._order = [d for d in self._order if d.id != detector_id]
+            self._hits.pop(detector_id, None)
+            self._by_channel.clear()
+
+    def detectors(self) -> List[str]:
+        return [d.id for d in self._order]
+
+    def get(self, detector_id: str) -> Optional[ProtocolDetector]:
+        for detector in self._order:
+            if detector.id == detector_id:
+                return detector
+        return None
+
+    def reset_cache(self, channel: Optional[str] = None) -> None:
+        with self._lock:
+            if channel is None:
+                self._by_channel.clear()
+            else:
+                self._by_channel.pop(channel, None)
+
+    def detect(self, data: bytes, channel: str = "") -> Tuple[Optional[ProtocolDetector], float]:
+        """返回 (胜出识别器, 得分)；无法识别时返回 (None, 最高分)。"""
+        cached = self._by_channel.get(channel)
+        probes = 0
+        if cached is not None:
+            probes += 1
+            score = cached.probe(data)
+            if score >= STICKY_SCORE:
+                self._record(probes, cached, channel, cache_hit=True)
+                return cached, score
+        best: Optional[ProtocolDetector] = None
+        best_score = 0.0
+        for detector in self._order:
+            if detector is cached:
+                continue
+            probes += 1
+            score = detector.probe(data)
+            if score > best_score:
+                best, best_score = detector, score
+                if score >= CERTAIN_SCORE:
+                    break
+        if best is None or best_score < MIN_SCORE:
+            self._record(probes, None, channel)
+            return None, best_score
+        self._record(probes, best, channel)
+        return best, best_score
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self._stats)
+            data["hits"] = {d.id: self._hits.get(d.id, 0) for d in self._order}
+        data["order"] = self.detectors()
+        return data
+
+    def _record(self, probes: int, winner: Optional[ProtocolDetector], channel: str, cache_hit: bool = False) -> None:
+        """一次 detect 的结果：累计统计、更新通道缓存，胜出者计入命中并上移。"""
+        with self._lock:
+            stats = self._stats
+            stats["frames"] += 1
+            stats["probes"] += probes
+            if winner is None:
+                stats["unknown"] += 1
+                return
+            if cache_hit:
+                stats["cache_hits"] += 1
+            order = self._order
+            if winner not in order:
+                # 探测期间已被注销或替换：不再缓存、不计命中。
+                return
+            if not cache_hit:
+                self._by_channel[channel] = winner
+            # 命中后只需与前面的识别器比较并上移，保持按命中次数降序；
+            # 换位在副本上完成再整体替换，其他线程 detect 中的遍历不受影响。
+            self._hits[winner.id] = self._hits.get(winner.id, 0) + 1
+            idx = order.index(winner)
+            if idx == 0 or self._hits[order[idx - 1].id] >= self._hits[winner.id]:
+                return
+            order = list(order)
+            while idx > 0 and self._hits[order[idx - 1].id] < self._hits[winner.id]:
+                order[idx - 1], order[idx] = order[idx], order[idx - 1]
+                idx -= 1
+            self._order = order
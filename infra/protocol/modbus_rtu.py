@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import time
 from typing import Optional
 
 from infra.protocol.modbus_base import ModbusBase
 from infra.protocol.registry import ProtocolRegistry
-from infra.common.utils.crc16 import crc16_modbus
+from infra.common.utils.checksum import crc16_modbus
+from infra.protocol.stream_framer import read_rtu_frame
 
 
 class ModbusRTU(ModbusBase):
@@ -59,35 +59,8 @@ class ModbusRTU(ModbusBase):
         return calc == frame[-2:]
 
     def _read_frame(self, timeout_s: float) -> Optional[bytes]:
-        deadline = time.time() + timeout_s
-        buf = bytearray()
-        while time.time() < deadline:
-            chunk = self.channel.read(256, timeout=max(0.01, deadline - time.time()))
-            if chunk:
-                buf.extend(chunk)
-                expected_len = self._guess_length(buf)
-                if expected_len and len(buf) >= expected_len:
-                    return bytes(buf[:expected_len])
-            else:
-                time.sleep(0.01)
-        return bytes(buf) if buf else None
-
-    @staticmethod
-    def _guess_length(buf: bytearray) -> Optional[int]:
-        if len(buf) < 3:
-            return None
-        func = buf[1]
-        if func in {0x01, 0x02, 0x03, 0x04} and len(buf) >= 3:
-            byte_count = buf[2]
-            return 3 + byte_count + 2
-        if func in {0x05, 0x06, 0x0F, 0x10}:
-            return 8  # 固定长度：addr(1)+func(1)+address(2)+qty/value(2)+CRC(2)
-        if func == 0x11 and len(buf) >= 3:
-            byte_count = buf[2]
-            return 3 + byte_count + 2
-        if func & 0x80:
-            return 5  # 异常响应：addr+func+code+CRC
-        return None
+        # 按 t3.5 静默与功能码长度规则分帧，收齐即返回。
+        return read_rtu_frame(self.channel, timeout_s)
 
 
 ProtocolRegistry.register("modbus_rtu", ModbusRTU)
@@ -7,42 +7,18 @@ CRC 计算范围：cmd + length + payload
 
 from __future__ import annotations
 
-import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import yaml
 
-from infra.common.event_bus import EventBus
+from infra.common.chunk import chunk_time_ns, perf_to_wall
+from infra.common.event_bus import BackpressurePolicy, EventBus
+# crc8/crc16_modbus 保留在本模块命名空间，兼容旧的 from protocol_loader import 引用。
+from infra.common.utils.checksum import Crc, crc8, crc16_modbus, find_crc
 from infra.common.utils.path_utils import resolve_resource_path
 
 
-def crc16_modbus(data: bytes) -> int:
-    """标准 CRC16-Modbus，多项式 0xA001，初值 0xFFFF。"""
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
-
-
-def crc8(data: bytes, poly: int = 0x07, init: int = 0x00) -> int:
-    """简单 CRC8 实现，缺省多项式 0x07。"""
-    crc = init
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = ((crc << 1) ^ poly) & 0xFF
-            else:
-                crc = (crc << 1) & 0xFF
-    return crc & 0xFF
-
-
 class ProtocolLoader:
     def __init__(self, bus: EventBus, config_path: str | Path = "config/protocol.yaml") -> None:
         self.bus = bus
@@ -52,13 +28,14 @@ class ProtocolLoader:
         self._header = b""
         self._tail: bytes | None = None
         self._crc_kind: Optional[str] = None
+        self._crc: Optional[Crc] = None
         self._max_length: int = 1024
         self._cmd_map: Dict[int, str] = {}
         self._enabled = False
         self.load_config()
-        # 订阅串口接收事件
+        # 订阅串口接收事件；parse 是增量字节流解析，积压时合并连续分片不影响结果
         if self._enabled:
-            self.bus.subscribe("comm.rx", self.parse)
+            self.bus.subscribe("comm.rx", self.parse, policy=BackpressurePolicy.coalesce(max_depth=256))
 
     def load_config(self) -> None:
         """加载 YAML 配置，并缓存关键字段。"""
@@ -74,6 +51,7 @@ class ProtocolLoader:
         tail_hex = frame_cfg.get("tail")
         self._tail = self._hex_to_bytes(tail_hex) if tail_hex else None
         self._crc_kind = frame_cfg.get("crc")
+        self._crc = find_crc(self._crc_kind)
         self._max_length = int(frame_cfg.get("max_length", 1024))
 
         self._cmd_map = {int(v.get("cmd", 0)): k for k, v in commands.items()}
@@ -84,6 +62,8 @@ class ProtocolLoader:
             return
         if not data:
             return
+        # 帧在本块内收齐：以该块的源时间戳作为帧时间。
+        timestamp = perf_to_wall(chunk_time_ns(data))
         self._buffer.extend(data)
 
         while True:
@@ -102,7 +82,7 @@ class ProtocolLoader:
             cmd = self._buffer[header_len]
             length = int.from_bytes(self._buffer[header_len + 1 : header_len + 3], "big")
 
-            crc_len = 2 if self._crc_kind == "crc16_modbus" else 1 if self._crc_kind == "crc8" else 0
+            crc_len = self._crc.size if self._crc else 0
             tail_len = len(self._tail) if self._tail else 0
 
             frame_len = header_len + 1 + 2 + length + crc_len + tail_len
@@ -134,29 +114,26 @@ class ProtocolLoader:
                 "cmd": cmd_name,
                 "raw_cmd": cmd,
                 "payload": payload,
-                "timestamp": time.time(),
+                "timestamp": timestamp,
             }
             self.bus.publish("protocol.frame", frame_dict)
 
-    def send(self, cmd_name: str, payload: bytes = b"") -> bytes:
+    def send(self, cmd_name: str, payload: bytes | memoryview = b"") -> bytes:
         """根据配置构造帧并发布发送事件。"""
         commands = self.config.get("commands", {}) or {}
         if cmd_name not in commands:
             raise KeyError(f"未知命令: {cmd_name}")
         raw_cmd = int(commands[cmd_name].get("cmd", 0))
 
-        header = self._header
-        length_bytes = len(payload).to_bytes(2, "big")
-        body = bytes([raw_cmd]) + length_bytes + payload
-
+        head = bytes([raw_cmd]) + len(payload).to_bytes(2, "big")
         crc_bytes = b""
-        if self._crc_kind == "crc16_modbus":
-            crc_bytes = crc16_modbus(body).to_bytes(2, "little")
-        elif self._crc_kind == "crc8":
-            crc_bytes = bytes([crc8(body)])
+        if self._crc:
+            # CRC 覆盖 cmd + length + payload：分段累加，payload 可为 memoryview，不先拼接 body。
+            crc = self._crc.new(head)
+            crc.update(payload)
+            crc_bytes = crc.digest()
 
-        tail = self._tail or b""
-        frame = header + body + crc_bytes + tail
+        frame = b"".join((self._header, head, payload, crc_bytes, self._tail or b""))
 
         self.bus.publish("protocol.tx", frame)
         return frame
@@ -176,13 +153,9 @@ class ProtocolLoader:
             return True
         body = frame[header_len : header_len + 1 + 2 + length]
         crc_bytes = frame[header_len + 1 + 2 + length : header_len + 1 + 2 + length + crc_len]
-        if self._crc_kind == "crc16_modbus":
-            expected = crc16_modbus(body).to_bytes(2, "little")
-        elif self._crc_kind == "crc8":
-            expected = bytes([crc8(body)])
-        else:
+        if not self._crc:
             return True
-        return expected == crc_bytes
+        return self._crc.digest(body) == crc_bytes
 
     @staticmethod
     def _hex_to_bytes(hex_str: str) -> bytes:
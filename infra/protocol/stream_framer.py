@@ -0,0 +1,370 @@
+"""字节流重组：把按读取边界到达的数据块还原为协议帧。
+
+- 一次 read 可能只含半帧，也可能含多帧；抓包/嗅探需要按帧而不是按块展示
+- 先按协议自身的长度规则切帧（FrameRule），规则无法判定时按字符间隔（由波特率推算）切帧
+- 缓冲区只追加、用读偏移推进，已消费部分成批压缩；每个字节只被规则检查常数次，总体 O(字节数)
+- 帧时间戳取帧首字节所在数据块的源时间戳（Chunk.t_ns）
+- RtuFramer 按 Modbus RTU 规范的 t1.5/t3.5 静默间隔分帧；read_rtu_frame 供协议层接收路径复用
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Protocol, Tuple
+
+from infra.common.utils.checksum import crc16_modbus
+
+# 帧长度规则的返回值：需要更多字节 / 无法判定（交给时间间隔切分）。
+NEED_MORE = 0
+UNKNOWN = -1
+
+# 串口每字符位数：1 起始位 + 8 数据位 + 校验/停止共 2 位。
+_BITS_PER_CHAR = 11
+# 操作系统调度与 USB 转串口会让读取时刻抖动，间隔阈值不低于该值，避免把一帧误切成两帧。
+_MIN_GAP_NS = 5_000_000
+# 没有波特率（TCP 等）时的缺省间隔。
+_DEFAULT_GAP_NS = 20_000_000
+# 规则判定“帧未收全”时最多再等多久；超时后把已收字节作为残帧输出。
+_MIN_STALE_NS = 50_000_000
+# 已消费字节超过该值且超过缓冲一半时压缩缓冲区。
+_COMPACT_BYTES = 4096
+
+Frame = Tuple[bytes, int]
+
+
+class FrameRule(Protocol):
+    """协议长度规则：在 buf[start:] 处判断第一帧的长度。
+
+    返回正数为帧长（已确认完整，如校验通过），NEED_MORE 表示需要更多字节，UNKNOWN 表示无法按规则切分。
+    只应读取帧头与候选帧本身，不得扫描整个缓冲。
+    """
+
+    max_frame: int
+
+    def frame_length(self, buf: bytearray, start: int, direction: str) -> int: ...
+
+
+def char_gap_ns(baud: Optional[int], chars: float = 3.5) -> int:
+    """按波特率换算 chars 个字符时间（纳秒），并施加调度抖动下限。"""
+    try:
+        rate = int(baud or 0)
+    except (TypeError, ValueError):
+        rate = 0
+    if rate <= 0:
+        return _DEFAULT_GAP_NS
+    return max(_MIN_GAP_NS, int(chars * _BITS_PER_CHAR * 1e9 / rate))
+
+
+class StreamReassembler:
+    """单个通道、单个方向的增量分帧器（非线程安全，由调用方的工作线程独占）。
+
+    feed() 返回本次可确定的完整帧；poll() 在空闲时按超时输出残留字节；flush() 无条件输出残留字节。
+    """
+
+    def __init__(
+        self,
+        rule: Optional[FrameRule],
+        direction: str,
+        gap_ns: int = _DEFAULT_GAP_NS,
+        max_frame: Optional[int] = None,
+    ) -> None:
+        self._rule = rule
+        self._direction = direction
+        self._gap_ns = max(1, int(gap_ns))
+        self._stale_ns = max(_MIN_STALE_NS, self._gap_ns * 4)
+        self._max_frame = int(max_frame or (rule.max_frame if rule is not None else 4096))
+        self._buf = bytearray()
+        self._pos = 0
+        self._base = 0
+        # 缓冲内各数据块的 (结束绝对偏移, 源时间戳)，用于取帧首字节时间。
+        self._marks: Deque[Tuple[int, int]] = deque()
+        self._last_ns = 0
+        # 规则已判定当前帧首无法切分；在间隔切分或溢出前不再重复检查同一位置。
+        self._stuck = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._buf) - self._pos
+
+    @property
+    def gap_ns(self) -> int:
+        return self._gap_ns
+
+    def feed(self, data: bytes, t_ns: int) -> List[Frame]:
+        out: List[Frame] = []
+        if self.pending and self._is_boundary(len(data), t_ns):
+            self._cut(self.pending, out)
+        self._buf += data
+        self._marks.append((self._base + len(self._buf), t_ns))
+        self._last_ns = t_ns
+        self._scan(out)
+        return out
+
+    def poll(self, now_ns: int) -> List[Frame]:
+        """空闲检查：残留字节超过间隔（或等待超时）仍无后续数据时输出。"""
+        out: List[Frame] = []
+        if self.pending and now_ns - self._last_ns >= self._timeout_ns():
+            self._cut(self.pending, out)
+        return out
+
+    def flush(self) -> List[Frame]:
+        out: List[Frame] = []
+        if self.pending:
+            self._cut(self.pending, out)
+        return out
+
+    def _is_boundary(self, size: int, t_ns: int) -> bool:
+        """新数据块到达前的停顿是否足以结束缓冲中的帧。"""
+        return t_ns - self._last_ns >= self._timeout_ns()
+
+    def _timeout_ns(self) -> int:
+        # 规则认为帧尚未收全时给更长的等待；无规则或规则无法判定时按字符间隔切。
+        if self._rule is None or self._stuck:
+            return self._gap_ns
+        return self._stale_ns
+
+    def _scan(self, out: List[Frame]) -> None:
+        rule = self._rule
+        while self.pending:
+            if rule is not None and not self._stuck:
+                length = rule.frame_length(self._buf, self._pos, self._direction)
+                if length > 0:
+                    self._cut(min(length, self.pending), out)
+                    continue
+                if length == UNKNOWN:
+                    self._stuck = True
+            if self.pending <= self._max_frame:
+                return
+            # 连续数据中规则始终无法切分：按最大帧长截断，避免缓冲无限增长，随后重新按规则同步。
+            self._cut(self._max_frame, out)
+
+    def _cut(self, size: int, out: List[Frame]) -> None:
+        start = self._base + self._pos
+        marks = self._marks
+        while marks and marks[0][0] <= start:
+            marks.popleft()
+        t_ns = marks[0][1] if marks else self._last_ns
+        end = self._pos + size
+        out.append((bytes(self._buf[self._pos : end]), t_ns))
+        self._pos = end
+        self._stuck = False
+        if self._pos == len(self._buf):
+            self._base += self._pos
+            self._buf.clear()
+            self._pos = 0
+        elif self._pos >= _COMPACT_BYTES and self._pos * 2 >= len(self._buf):
+            del self._buf[: self._pos]
+            self._base += self._pos
+            self._pos = 0
+
+
+# Modbus RTU 请求（主站 -> 从站）按功能码的固定长度；None 表示含字节计数的变长帧。
+_RTU_REQUEST_FIXED = {
+    0x01: 8, 0x02: 8, 0x03: 8, 0x04: 8, 0x05: 8, 0x06: 8,
+    0x07: 4, 0x08: 8, 0x0B: 4, 0x0C: 4, 0x11: 4, 0x16: 10, 0x18: 6,
+}
+# 变长请求：字节计数所在偏移，帧长 = 偏移 + 1 + 计数 + 2（CRC）。
+_RTU_REQUEST_COUNT_AT = {0x0F: 6, 0x10: 6, 0x17: 10}
+# 响应的固定长度。
+_RTU_RESPONSE_FIXED = {0x05: 8, 0x06: 8, 0x07: 5, 0x08: 8, 0x0B: 8, 0x0F: 8, 0x10: 8, 0x16: 10}
+# 变长响应：第 3 字节为字节计数。
+_RTU_RESPONSE_COUNTED = {0x01, 0x02, 0x03, 0x04, 0x0C, 0x11, 0x17}
+
+
+def _rtu_request_length(buf: bytearray, start: int, avail: int) -> Optional[int]:
+    func = buf[start + 1]
+    fixed = _RTU_REQUEST_FIXED.get(func)
+    if fixed is not None:
+        return fixed
+    at = _RTU_REQUEST_COUNT_AT.get(func)
+    if at is None:
+        return None
+    if avail <= at:
+        return NEED_MORE
+    return at + 1 + buf[start + at] + 2
+
+
+def _rtu_response_length(buf: bytearray, start: int, avail: int) -> Optional[int]:
+    func = buf[start + 1]
+    if func & 0x80:
+        return 5
+    fixed = _RTU_RESPONSE_FIXED.get(func)
+    if fixed is not None:
+        return fixed
+    if func == 0x18:
+        if avail < 4:
+            return NEED_MORE
+        return 4 + int.from_bytes(buf[start + 2 : start + 4], "big") + 2
+    if func in _RTU_RESPONSE_COUNTED:
+        if avail < 3:
+            return NEED_MORE
+        return 3 + buf[start + 2] + 2
+    return None
+
+
+def modbus_pdu_length_ok(pdu: bytes) -> bool:
+    """PDU（功能码 + 数据）长度是否符合该功能码的请求或响应格式；供 Modbus TCP/RTU 识别复用。"""
+    if not pdu:
+        return False
+    buf = bytearray(1) + pdu + bytes(2)
+    size = len(buf)
+    for guess in (_rtu_request_length, _rtu_response_length):
+        if guess(buf, 0, size) == size:
+            return True
+    return False
+
+
+class ModbusRtuRule:
+    """Modbus RTU 长度规则：按功能码推算请求/响应长度，并用 CRC 确认。
+
+    同一功能码的请求与响应长度不同，先按方向尝试（TX 视为请求、RX 视为响应），CRC 不符再试另一种，
+    因此本机作为从站（或嗅探双向总线）时同样适用。
+    """
+
+    max_frame = 256
+
+    def frame_length(self, buf: bytearray, start: int, direction: str) -> int:
+        avail = len(buf) - start
+        if avail < 2:
+            return NEED_MORE
+        order = (_rtu_response_length, _rtu_request_length)
+        if direction == "TX":
+            order = (_rtu_request_length, _rtu_response_length)
+        waiting = False
+        for guess in order:
+            length = guess(buf, start, avail)
+            if length is None:
+                continue
+            if length > self.max_frame:
+                continue
+            if length == NEED_MORE or length > avail:
+                waiting = True
+                continue
+            if self._crc_ok(buf, start, length):
+                return length
+        return NEED_MORE if waiting else UNKNOWN
+
+    @staticmethod
+    def _crc_ok(buf: bytearray, start: int, length: int) -> bool:
+        with memoryview(buf) as view:
+            body = view[start : start + length - 2]
+            try:
+                crc = crc16_modbus(body)
+            finally:
+                body.release()
+        return crc == buf[start + length - 2] | (buf[start + length - 1] << 8)
+
+
+class ModbusTcpRule:
+    """Modbus TCP（MBAP）长度规则：协议号为 0 时帧长为 6 + 长度字段；不符合 MBAP 头则无法切分。"""
+
+    max_frame = 260
+
+    def frame_length(self, buf: bytearray, start: int, direction: str) -> int:
+        avail = len(buf) - start
+        if avail < 6:
+            return NEED_MORE
+        if buf[start + 2] or buf[start + 3]:
+            return UNKNOWN
+        length = (buf[start + 4] << 8) | buf[start + 5]
+        if length < 2 or 6 + length > self.max_frame:
+            return UNKNOWN
+        if 6 + length > avail:
+            return NEED_MORE
+        return 6 + length
+
+
+# Modbus RTU 规范：波特率高于 19200 时 t1.5/t3.5 固定为 750 µs / 1.75 ms。
+_RTU_FIXED_BAUD = 19200
+_RTU_T15_FIXED_NS = 750_000
+_RTU_T35_FIXED_NS = 1_750_000
+# 读取时间戳相对线路时刻的抖动容限（调度、驱动缓冲）；停顿需超过 t3.5 + 容限才判定为帧边界。
+_RTU_JITTER_NS = 2_000_000
+
+
+def rtu_char_times_ns(baud: Optional[int]) -> Tuple[int, int, int]:
+    """返回 (单字符时间, t1.5, t3.5)，单位纳秒；未知波特率按 19200 以上处理。"""
+    try:
+        rate = int(baud or 0)
+    except (TypeError, ValueError):
+        rate = 0
+    if rate <= 0:
+        rate = _RTU_FIXED_BAUD * 6
+    char_ns = int(_BITS_PER_CHAR * 1e9 / rate)
+    if rate > _RTU_FIXED_BAUD:
+        return char_ns, _RTU_T15_FIXED_NS, _RTU_T35_FIXED_NS
+    return char_ns, int(1.5 * char_ns), int(3.5 * char_ns)
+
+
+class RtuFramer(StreamReassembler):
+    """Modbus RTU 分帧：数据块之间的线路静默 >= t3.5 即帧边界，同一数据块内再按长度规则拆分。
+
+    数据块时间戳是末字节的读取时刻，线路静默 = 本块时间戳 - 本块字节数 x 字符时间 - 上一块时间戳；
+    高波特率下连续到达的数据块因此会被合并而不是误切，一次读到的多帧由长度规则 + CRC 拆开。
+    静默介于 t1.5 与 t3.5 之间按规范属于帧内字符间超时，计入 stats()["t15_violations"]。
+    """
+
+    def __init__(self, baud: Optional[int], direction: str = "RX", jitter_ns: int = _RTU_JITTER_NS) -> None:
+        self._char_ns, self._t15_ns, self._t35_ns = rtu_char_times_ns(baud)
+        self._jitter_ns = max(0, int(jitter_ns))
+        super().__init__(ModbusRtuRule(), direction, gap_ns=self._t35_ns + self._jitter_ns)
+        self._t15_violations = 0
+        self._gap_cuts = 0
+
+    @property
+    def t15_ns(self) -> int:
+        return self._t15_ns
+
+    @property
+    def t35_ns(self) -> int:
+        return self._t35_ns
+
+    def stats(self) -> Dict[str, int]:
+        return {"t15_violations": self._t15_violations, "gap_cuts": self._gap_cuts, "pending": self.pending}
+
+    def _is_boundary(self, size: int, t_ns: int) -> bool:
+        silence = t_ns - size * self._char_ns - self._last_ns
+        if silence >= self._t35_ns + self._jitter_ns:
+            self._gap_cuts += 1
+            return True
+        if silence > self._t15_ns + self._jitter_ns:
+            self._t15_violations += 1
+        return super()._is_boundary(size, t_ns)
+
+
+# read_rtu_frame 的单次读取等待；空读时短暂让出 CPU。
+_RTU_READ_POLL_SEC = 0.001
+
+
+def channel_baud(channel: Any) -> Optional[int]:
+    """尽量从通道对象取波特率（SerialChannel.ser.baudrate、pyserial 对象等），取不到返回 None。"""
+    for obj in (channel, getattr(channel, "ser", None)):
+        baud = getattr(obj, "baudrate", None) if obj is not None else None
+        if isinstance(baud, int) and baud > 0:
+            return baud
+    return None
+
+
+def read_rtu_frame(
+    channel: Any,
+    timeout_s: float,
+    baud: Optional[int] = None,
+    read_size: int = 256,
+) -> Optional[bytes]:
+    """从 channel.read 接收一帧 Modbus RTU：长度规则确认或 t3.5 静默即返回，不必等到超时。
+
+    超时仍未成帧时返回已收字节（交给调用方报长度/CRC 错误），什么也没收到返回 None。
+    """
+    framer = RtuFramer(baud if baud is not None else channel_baud(channel))
+    deadline = time.monotonic() + max(0.0, timeout_s)
+    while time.monotonic() < deadline:
+        chunk = channel.read(read_size, timeout=_RTU_READ_POLL_SEC)
+        now_ns = time.perf_counter_ns()
+        frames = framer.feed(chunk, now_ns) if chunk else framer.poll(now_ns)
+        if frames:
+            return frames[0][0]
+        if not chunk:
+            time.sleep(_RTU_READ_POLL_SEC)
+    frames = framer.flush()
+    return frames[0][0] if frames else None
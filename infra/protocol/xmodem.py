@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
+from typing import Union
 
 from infra.protocol.base import BaseProtocol
 from infra.protocol.registry import ProtocolRegistry
-from infra.common.utils.crc16 import crc16_xmodem
+from infra.common.utils.checksum import crc16_xmodem, new as new_crc
 
 
 SOH = 0x01
@@ -20,23 +21,33 @@ class XModem(BaseProtocol):
     """XMODEM 固件发送（128 字节帧，CRC/XOR 校验）。"""
 
     def execute(self, file_path: str, retries: int = 10, start_timeout: float = 10.0):
-        data = Path(file_path).read_bytes()
         crc_mode = self._wait_start(start_timeout)
         block_no = 1
-        offset = 0
-
-        while offset < len(data):
-            chunk = data[offset : offset + 128]
-            packet = self._make_packet(block_no, chunk, crc_mode)
-            if not self._send_with_ack(packet, retries):
-                raise TimeoutError(f"XMODEM 数据块 {block_no} 重试耗尽")
-            offset += len(chunk)
-            block_no = (block_no % 255) + 1
+        blocks = 0
+        total = 0
+        # 边读边发：复用同一块缓冲，整包 CRC32 增量累加，内存占用与固件大小无关。
+        image_crc = new_crc("crc32")
+        buf = bytearray(128)
+        view = memoryview(buf)
+
+        with Path(file_path).open("rb") as fp:
+            while True:
+                n = fp.readinto(buf)
+                if not n:
+                    break
+                chunk = view[:n]
+                image_crc.update(chunk)
+                packet = self._make_packet(block_no, chunk, crc_mode)
+                if not self._send_with_ack(packet, retries):
+                    raise TimeoutError(f"XMODEM 数据块 {block_no} 重试耗尽")
+                total += n
+                blocks += 1
+                block_no = (block_no % 255) + 1
 
         if not self._finish(retries):
             raise TimeoutError("XMODEM 结束握手失败")
 
-        return {"blocks": block_no - 1, "bytes": len(data)}
+        return {"blocks": blocks, "bytes": total, "crc32": image_crc.value}
 
     def _wait_start(self, timeout: float) -> bool:
         """等待接收端发出 'C' 或 NAK，返回是否使用 CRC 模式。"""
@@ -72,14 +83,14 @@ class XModem(BaseProtocol):
         return False
 
     @staticmethod
-    def _make_packet(block_no: int, chunk: bytes, crc_mode: bool) -> bytes:
-        data = chunk + b"\x1A" * (128 - len(chunk)) if len(chunk) < 128 else chunk[:128]
+    def _make_packet(block_no: int, chunk: Union[bytes, memoryview], crc_mode: bool) -> bytes:
+        data = bytes(chunk) + b"\x1A" * (128 - len(chunk)) if len(chunk) < 128 else chunk[:128]
         header = bytes([SOH, block_no & 0xFF, 0xFF - (block_no & 0xFF)])
         if crc_mode:
             crc = crc16_xmodem(data).to_bytes(2, "big")
-            return header + data + crc
-        checksum = sum(data) & 0xFF
-        return header + data + bytes([checksum])
+        else:
+            crc = bytes([sum(data) & 0xFF])
+        return b"".join((header, data, crc))
 
 
 ProtocolRegistry.register("xmodem", XModem)
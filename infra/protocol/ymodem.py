@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
+from typing import Union
 
 from infra.protocol.base import BaseProtocol
 from infra.protocol.registry import ProtocolRegistry
-from infra.common.utils.crc16 import crc16_xmodem
+from infra.common.utils.checksum import crc16_xmodem, new as new_crc
 
 
 SOH = 0x01
@@ -22,9 +23,8 @@ class YModem(BaseProtocol):
 
     def execute(self, file_path: str, retries: int = 10, start_timeout: float = 10.0):
         path = Path(file_path)
-        data = path.read_bytes()
         file_name = path.name
-        file_size = len(data)
+        file_size = path.stat().st_size
 
         self._wait_start(start_timeout)
 
@@ -37,14 +37,25 @@ class YModem(BaseProtocol):
         _ = self.channel.read(1, timeout=1.0)
 
         block_no = 1
-        offset = 0
-        while offset < len(data):
-            chunk = data[offset : offset + 1024]
-            packet = self._make_packet(block_no, chunk, use_1k=True)
-            if not self._send_with_ack(packet, retries):
-                raise TimeoutError(f"YMODEM 数据块 {block_no} 发送失败")
-            offset += len(chunk)
-            block_no = (block_no % 255) + 1
+        blocks = 0
+        total = 0
+        # 边读边发：复用同一块缓冲，整包 CRC32 增量累加，内存占用与固件大小无关。
+        image_crc = new_crc("crc32")
+        buf = bytearray(1024)
+        view = memoryview(buf)
+        with path.open("rb") as fp:
+            while True:
+                n = fp.readinto(buf)
+                if not n:
+                    break
+                chunk = view[:n]
+                image_crc.update(chunk)
+                packet = self._make_packet(block_no, chunk, use_1k=True)
+                if not self._send_with_ack(packet, retries):
+                    raise TimeoutError(f"YMODEM 数据块 {block_no} 发送失败")
+                total += n
+                blocks += 1
+                block_no = (block_no % 255) + 1
 
         if not self._finish(retries):
             raise TimeoutError("YMODEM 结束握手失败")
@@ -53,7 +64,7 @@ class YModem(BaseProtocol):
         tail_block = self._make_packet(0, b"", use_1k=True)
         self._send_with_ack(tail_block, retries)
 
-        return {"blocks": block_no - 1, "bytes": len(data)}
+        return {"blocks": blocks, "bytes": total, "crc32": image_crc.value}
 
     def _wait_start(self, timeout: float) -> None:
         deadline = time.time() + timeout
@@ -88,15 +99,15 @@ class YModem(BaseProtocol):
         return False
 
     @staticmethod
-    def _make_packet(block_no: int, chunk: bytes, use_1k: bool) -> bytes:
+    def _make_packet(block_no: int, chunk: Union[bytes, memoryview], use_1k: bool) -> bytes:
         size = 1024 if use_1k else 128
         data = chunk[:size]
         if len(data) < size:
             pad_byte = b"\x00" if block_no == 0 else b"\x1A"
-            data = data + pad_byte * (size - len(data))
+            data = bytes(data) + pad_byte * (size - len(data))
         header = bytes([STX if use_1k else SOH, block_no & 0xFF, 0xFF - (block_no & 0xFF)])
         crc = crc16_xmodem(data).to_bytes(2, "big")
-        return header + data + crc
+        return b"".join((header, data, crc))
 
 
 ProtocolRegistry.register("ymodem", YModem)
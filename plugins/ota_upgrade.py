@@ -1,10 +1,15 @@
-"""固件升级插件：通过 ProtocolLoader 发送 ERASE / WRITE / FINISH 流程。"""
+"""固件升级插件：通过 ProtocolLoader 发送 ERASE / WRITE / FINISH 流程。
+
+写块时以 memoryview 切片传给协议层（不复制），整包 CRC32 随块增量累加，完成时随状态上报。
+"""
 
 from __future__ import annotations
 
 import time
 from pathlib import Path
 
+from infra.common.utils.checksum import CrcHash, new as new_crc
+
 PLUGIN_NAME = "ota_upgrade"
 
 
@@ -20,6 +25,8 @@ class _OtaContext:
         self.protocol = protocol
         self.current_state = "idle"
         self.firmware_data: bytes = b""
+        self._firmware_view = memoryview(b"")
+        self.image_crc: CrcHash = new_crc("crc32")
         self.write_offset = 0
         self.block_size = self._load_block_size()
 
@@ -44,6 +51,8 @@ class _OtaContext:
             self.bus.publish("ota.error", f"读取固件失败: {exc}")
             return
 
+        self._firmware_view = memoryview(self.firmware_data)
+        self.image_crc = new_crc("crc32")
         self.write_offset = 0
         self.current_state = "erase"
         self.bus.publish("ota.status", "ERASE START")
@@ -72,18 +81,19 @@ class _OtaContext:
     def _write_next_block(self) -> None:
         if self.write_offset >= len(self.firmware_data):
             self.current_state = "finish"
-            self.bus.publish("ota.status", "FINISH SEND")
+            self.bus.publish("ota.status", f"FINISH SEND crc32={self.image_crc.value:08X}")
             self._send_cmd("finish")
             return
 
         end = min(self.write_offset + self.block_size, len(self.firmware_data))
-        chunk = self.firmware_data[self.write_offset : end]
+        chunk = self._firmware_view[self.write_offset : end]
+        self.image_crc.update(chunk)
         self._send_cmd("write", chunk)
         self.write_offset = end
         progress = f"WRITE {self.write_offset}/{len(self.firmware_data)}"
         self.bus.publish("ota.status", progress)
 
-    def _send_cmd(self, cmd_name: str, payload: bytes = b"") -> None:
+    def _send_cmd(self, cmd_name: str, payload: bytes | memoryview = b"") -> None:
         try:
             frame = self.protocol.send(cmd_name, payload)
             # ProtocolLoader.publish("protocol.tx", frame) 已包含在 send 内
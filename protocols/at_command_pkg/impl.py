@@ -54,7 +54,47 @@ def _assert_expect(lines: List[str], status: str, expect: Dict[str, Any]) -> Non
             raise ValueError(f"AT_EXPECT_FAILED: regex not matched: {pattern}")
 
 
+_TEXT_BYTES = frozenset(range(0x20, 0x7F)) | {0x09, 0x0A, 0x0D}
+_FINAL_PREFIXES = ("OK", "ERROR", "+CME ERROR", "+CMS ERROR", "CONNECT", "NO CARRIER", "BUSY", "NO ANSWER", "RING")
+
+
+def _is_text(raw: bytes) -> bool:
+    return bool(raw) and all(b in _TEXT_BYTES for b in raw)
+
+
 class ProtocolPackage:
+    display_name = "AT"
+
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: AT command lines, final result codes, +XXX: info lines."""
+        if not _is_text(data):
+            return 0.0
+        if data.lstrip()[:2].upper() == b"AT":
+            return 0.95 if data.endswith((b"\r", b"\n")) else 0.7
+        lines = _decode_lines(data)
+        if not lines:
+            return 0.0
+        upper = [line.upper() for line in lines]
+        if any(line.startswith(_FINAL_PREFIXES) for line in upper):
+            return 0.85
+        if upper[0].startswith("+") and ":" in upper[0]:
+            return 0.8
+        return 0.0
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        lines = _decode_lines(data)
+        is_cmd = data.lstrip()[:2].upper() == b"AT"
+        status = "command" if is_cmd else _status_from_lines(lines)
+        tree = [{"label": "Kind", "raw": "", "value": "command" if is_cmd else "response"}]
+        tree += [{"label": f"Line[{i}]", "raw": "", "value": line} for i, line in enumerate(lines)]
+        if not is_cmd:
+            tree.append({"label": "Status", "raw": "", "value": status})
+        errors = []
+        if status == "error":
+            errors.append({"code": "AT_ERROR", "message": next((x for x in lines if "ERROR" in x.upper()), "ERROR")})
+        head = lines[0] if lines else ""
+        return {"summary": head if is_cmd else f"{head} ({len(lines)} lines)", "tree": tree, "errors": errors}
+
     def send(self, ctx, request: Dict[str, Any]) -> Dict[str, Any]:
         cmd = str(request.get("cmd", request.get("text", ""))).strip()
         if not cmd:
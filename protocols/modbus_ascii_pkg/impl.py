@@ -34,7 +34,40 @@ def _parse_ascii_frame(frame: bytes) -> Dict[str, Any]:
     return {"unit_id": int(body[0]), "pdu": body[1:], "rx_hex": raw.hex().upper(), "rx_text": text}
 
 
+_HEX_DIGITS = frozenset(b"0123456789ABCDEFabcdef")
+
+
 class ProtocolPackage:
+    display_name = "Modbus ASCII"
+
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: ':' + hex digits + CRLF; a matching LRC makes it near certain."""
+        if len(data) < 9 or data[:1] != b":" or not data.endswith(b"\r\n"):
+            return 0.0
+        body = data[1:-2]
+        if len(body) % 2 or any(b not in _HEX_DIGITS for b in body):
+            return 0.0
+        raw = bytes.fromhex(body.decode("ascii"))
+        return 0.98 if _calc_lrc(raw[:-1]) == raw[-1] else 0.6
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        text = data.decode("ascii", errors="ignore").strip()
+        raw = bytes.fromhex(text[1:]) if len(text) > 1 and len(text) % 2 else b""
+        if len(raw) < 3:
+            return {"summary": text, "errors": [{"code": "MODBUS_FRAME_INVALID", "message": "invalid ascii hex length"}]}
+        body, lrc = raw[:-1], raw[-1]
+        lrc_calc = _calc_lrc(body)
+        tree = [
+            {"label": "Address", "raw": f"{body[0]:02X}", "value": str(body[0])},
+            {"label": "Function", "raw": f"{body[1]:02X}", "value": f"0x{body[1]:02X}"},
+            {"label": "Data", "raw": body[2:].hex(" ").upper(), "value": str(len(body) - 2)},
+            {"label": "LRC", "raw": f"{lrc:02X}", "value": "valid" if lrc == lrc_calc else "invalid"},
+        ]
+        errors = []
+        if lrc != lrc_calc:
+            errors.append({"code": "MODBUS_LRC_INVALID", "message": f"expected=0x{lrc:02X} calc=0x{lrc_calc:02X}"})
+        return {"summary": f"addr=0x{body[0]:02X} func=0x{body[1]:02X} len={len(data)}", "tree": tree, "errors": errors}
+
     def send(self, ctx, request: Dict[str, Any]) -> Dict[str, Any]:
         unit = int(request.get("unit_id", request.get("unit", 1)))
         pdu = encode_request_pdu(request)
@@ -3,23 +3,13 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from dsl_runtime.protocol_package.modbus_codec import decode_response_pdu, encode_request_pdu, operation_to_fc
-
-
-def _crc16_modbus(data: bytes) -> int:
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
+from infra.common.utils.checksum import crc16_modbus
+from infra.protocol.stream_framer import read_rtu_frame
 
 
 def _build_frame(unit: int, pdu: bytes) -> bytes:
     body = bytes([unit & 0xFF]) + pdu
-    crc = _crc16_modbus(body)
+    crc = crc16_modbus(body)
     return body + bytes([crc & 0xFF, (crc >> 8) & 0xFF])
 
 
@@ -28,7 +18,7 @@ def _parse_rtu_frame(frame: bytes) -> Dict[str, Any]:
         raise ValueError("MODBUS_FRAME_INVALID: frame too short")
     body = frame[:-2]
     crc_rx = int.from_bytes(frame[-2:], "little")
-    crc_calc = _crc16_modbus(body)
+    crc_calc = crc16_modbus(body)
     if crc_calc != crc_rx:
         raise ValueError("MODBUS_CRC_INVALID: crc mismatch")
     return {"unit_id": int(frame[0]), "pdu": frame[1:-2], "rx_hex": frame.hex().upper()}
@@ -50,7 +40,13 @@ class ProtocolPackage:
 
     def recv(self, ctx, expect: Dict[str, Any]) -> Dict[str, Any]:
         expected_size = int(expect.get("size", 256))
-        rx = ctx.channel.read(expected_size, timeout=max(0.01, ctx.timeout_ms / 1000.0))
+        # 按 t3.5 静默/长度规则分帧，帧收齐即返回；baud 缺省时从串口通道读取。
+        rx = read_rtu_frame(
+            ctx.channel,
+            max(0.01, ctx.timeout_ms / 1000.0),
+            baud=expect.get("baud"),
+            read_size=expected_size,
+        )
         if not rx:
             raise TimeoutError("MODBUS_TIMEOUT: no response bytes")
         parsed = _parse_rtu_frame(rx)
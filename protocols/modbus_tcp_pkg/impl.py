@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from dsl_runtime.protocol_package.modbus_codec import decode_response_pdu, encode_request_pdu, operation_to_fc
+from infra.protocol.stream_framer import modbus_pdu_length_ok
 
 
 def _build_mbap(transaction_id: int, unit_id: int, pdu_len: int) -> bytes:
@@ -34,9 +35,40 @@ def _parse_mbap(frame: bytes) -> Dict[str, Any]:
 
 
 class ProtocolPackage:
+    display_name = "Modbus TCP"
+
     def __init__(self) -> None:
         self._next_tid = 1
 
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: MBAP protocol id 0 and length field matching the frame, PDU shaped by its function code."""
+        if len(data) < 8 or data[2:4] != b"\x00\x00":
+            return 0.0
+        if int.from_bytes(data[4:6], "big") != len(data) - 6:
+            return 0.0
+        pdu = data[7:]
+        if pdu[0] & 0x80:
+            return 0.9 if len(pdu) == 2 else 0.2
+        return 0.9 if modbus_pdu_length_ok(pdu) else 0.4
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        parsed = _parse_mbap(data)
+        pdu = parsed["pdu"]
+        func = int(pdu[0])
+        tree = [
+            {"label": "TransactionId", "raw": data[0:2].hex().upper(), "value": str(parsed["transaction_id"])},
+            {"label": "ProtocolId", "raw": data[2:4].hex().upper(), "value": "0"},
+            {"label": "Length", "raw": data[4:6].hex().upper(), "value": str(len(pdu) + 1)},
+            {"label": "Unit", "raw": f"{parsed['unit_id']:02X}", "value": str(parsed["unit_id"])},
+            {"label": "Function", "raw": f"{func:02X}", "value": f"0x{func:02X}"},
+        ]
+        errors = []
+        if func & 0x80 and len(pdu) >= 2:
+            tree.append({"label": "ExceptionCode", "raw": f"{pdu[1]:02X}", "value": str(pdu[1])})
+            errors.append({"code": "MODBUS_EXCEPTION_RESPONSE", "message": f"function=0x{func & 0x7F:02X} code={pdu[1]}"})
+        summary = f"tid={parsed['transaction_id']} unit={parsed['unit_id']} func=0x{func:02X} len={len(data)}"
+        return {"summary": summary, "tree": tree, "errors": errors}
+
     def _alloc_tid(self, request: Dict[str, Any]) -> int:
         if "transaction_id" in request:
             return int(request.get("transaction_id")) & 0xFFFF
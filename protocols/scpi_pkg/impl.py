@@ -6,6 +6,8 @@ from typing import Any, Dict, List
 
 _NUM_UNIT_RE = re.compile(r"^\s*([+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s*([A-Za-z%]+)?\s*$")
 _SCPI_ERR_RE = re.compile(r"^\s*-\d+\s*,")
+_SCPI_HEADER_RE = re.compile(r"^:?[A-Za-z]{3,}\d*(:[A-Za-z]+\d*)*\??(\s|$)")
+_TEXT_BYTES = frozenset(range(0x20, 0x7F)) | {0x09, 0x0A, 0x0D}
 
 
 def _normalize_eol(name: str) -> str:
@@ -70,6 +72,40 @@ def _assert_expect(text: str, lines: List[str], status: str, expect: Dict[str, A
 
 
 class ProtocolPackage:
+    display_name = "SCPI"
+
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: common commands (*IDN?), error queue replies, command headers, numeric replies."""
+        if not data or not data.endswith(b"\n") or any(b not in _TEXT_BYTES for b in data):
+            return 0.0
+        lines = _split_lines(_decode_text(data))
+        if not lines:
+            return 0.0
+        first = lines[0]
+        if first.startswith("*") and first[1:2].isalpha():
+            return 0.9
+        if _SCPI_ERR_RE.match(first):
+            return 0.8
+        if _SCPI_HEADER_RE.match(first):
+            return 0.6
+        if all("value" in item for item in _parse_csv(first)):
+            return 0.4
+        return 0.0
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        lines = _split_lines(_decode_text(data))
+        first = lines[0] if lines else ""
+        is_cmd = first.startswith(("*", ":")) or bool(_SCPI_HEADER_RE.match(first))
+        kind = ("query" if first.split(" ")[0].endswith("?") else "command") if is_cmd else "response"
+        tree = [{"label": "Kind", "raw": "", "value": kind}]
+        tree += [{"label": f"Line[{i}]", "raw": "", "value": line} for i, line in enumerate(lines)]
+        errors = [{"code": "SCPI_ERROR", "message": line} for line in lines if _SCPI_ERR_RE.match(line)]
+        if kind == "response" and not errors:
+            for i, item in enumerate(_parse_csv(first)):
+                if "value" in item:
+                    tree.append({"label": f"Value[{i}]", "raw": item["raw"], "value": f"{item['value']}{item['unit']}"})
+        return {"summary": f"{kind} {first}", "tree": tree, "errors": errors}
+
     def send(self, ctx, request: Dict[str, Any]) -> Dict[str, Any]:
         cmd = str(request.get("cmd", request.get("command", ""))).strip()
         if not cmd:
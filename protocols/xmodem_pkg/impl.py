@@ -7,6 +7,8 @@ SOH = 0x01
 EOT = 0x04
 ACK = 0x06
 NAK = 0x15
+CAN = 0x18
+_CONTROL_NAMES = {ACK: "ACK", NAK: "NAK", EOT: "EOT", CAN: "CAN"}
 
 
 def _checksum(payload: bytes) -> int:
@@ -23,6 +25,29 @@ def _build_block(seq: int, data: bytes) -> bytes:
 
 
 class ProtocolPackage:
+    display_name = "XMODEM"
+
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: 132-byte SOH blocks (checksum verified) or lone control bytes."""
+        if len(data) == 1:
+            return 0.3 if data[0] in _CONTROL_NAMES else 0.0
+        if len(data) != 132 or data[0] != SOH or data[2] != 0xFF - data[1]:
+            return 0.0
+        return 0.95 if _checksum(data[3:131]) == data[131] else 0.5
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if len(data) == 1:
+            name = _CONTROL_NAMES.get(data[0], f"0x{data[0]:02X}")
+            return {"summary": name, "tree": [{"label": "Control", "raw": f"{data[0]:02X}", "value": name}]}
+        ok = _checksum(data[3:131]) == data[131]
+        tree = [
+            {"label": "Seq", "raw": f"{data[1]:02X}", "value": str(data[1])},
+            {"label": "Data", "raw": "", "value": "128 bytes"},
+            {"label": "Checksum", "raw": f"{data[131]:02X}", "value": "valid" if ok else "invalid"},
+        ]
+        errors = [] if ok else [{"code": "XMODEM_CHECKSUM_INVALID", "message": "block checksum mismatch"}]
+        return {"summary": f"block seq={data[1]}", "tree": tree, "errors": errors}
+
     def send(self, ctx, request: Dict[str, Any]) -> Dict[str, Any]:
         kind = str(request.get("kind", "block")).strip().lower()
         if kind == "eot":
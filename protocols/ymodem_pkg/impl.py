@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, Tuple, Union
+
+from infra.common.utils.checksum import crc16_xmodem
 
 
 SOH = 0x01
@@ -13,33 +15,30 @@ CAN = 0x18
 CRC_REQ = 0x43  # 'C'
 
 
-def _crc16_xmodem(data: bytes) -> int:
-    crc = 0
-    for byte in data:
-        crc ^= byte << 8
-        for _ in range(8):
-            if crc & 0x8000:
-                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
-            else:
-                crc = (crc << 1) & 0xFFFF
-    return crc & 0xFFFF
+def _block_count(size: int, block_size: int) -> int:
+    return max(1, -(-size // block_size))
 
 
-def _split_blocks(data: bytes, block_size: int) -> List[bytes]:
+def _iter_blocks(data: bytes, block_size: int) -> Iterator[Union[bytes, memoryview]]:
+    """按块切分待发数据：整块为 memoryview 切片（不复制），仅末块补齐 0x1A。"""
+    # 参数在调用时立即校验（而不是首次迭代时），握手前即可报错。
     if block_size not in {128, 1024}:
         raise ValueError("YMODEM_VALUE_INVALID: block_size must be 128 or 1024")
-    out: List[bytes] = []
-    for i in range(0, len(data), block_size):
-        chunk = data[i : i + block_size]
-        if len(chunk) < block_size:
-            chunk = chunk + bytes([0x1A]) * (block_size - len(chunk))
-        out.append(chunk)
-    if not out:
-        out.append(bytes([0x1A]) * block_size)
-    return out
-
-
-def _make_packet(seq: int, payload: bytes) -> bytes:
+    return _slice_blocks(memoryview(data), block_size)
+
+
+def _slice_blocks(view: memoryview, block_size: int) -> Iterator[Union[bytes, memoryview]]:
+    for i in range(0, len(view), block_size):
+        block = view[i : i + block_size]
+        if len(block) < block_size:
+            yield bytes(block) + bytes([0x1A]) * (block_size - len(block))
+        else:
+            yield block
+    if not view:
+        yield bytes([0x1A]) * block_size
+
+
+def _make_packet(seq: int, payload: Union[bytes, memoryview]) -> bytes:
     size = len(payload)
     if size == 128:
         head = SOH
@@ -48,8 +47,8 @@ def _make_packet(seq: int, payload: bytes) -> bytes:
     else:
         raise ValueError("YMODEM_VALUE_INVALID: payload size must be 128 or 1024")
     seq_b = seq & 0xFF
-    crc = _crc16_xmodem(payload)
-    return bytes([head, seq_b, 0xFF - seq_b]) + payload + bytes([(crc >> 8) & 0xFF, crc & 0xFF])
+    crc = crc16_xmodem(payload)
+    return b"".join((bytes([head, seq_b, 0xFF - seq_b]), payload, crc.to_bytes(2, "big")))
 
 
 def _make_header_packet(filename: str, total_size: int) -> bytes:
@@ -123,7 +122,46 @@ def _symbol_name(sym: int) -> str:
     return f"0x{sym:02X}"
 
 
+_CONTROL_BYTES = frozenset({ACK, NAK, CAN, CRC_REQ, EOT})
+
+
 class ProtocolPackage:
+    display_name = "YMODEM"
+
+    def probe(self, data: bytes) -> float:
+        """Capture detection score: SOH/STX blocks with CRC16 (133/1029 bytes) or lone control bytes."""
+        if len(data) == 1:
+            return 0.35 if data[0] in _CONTROL_BYTES else 0.0
+        size = {SOH: 128, STX: 1024}.get(data[0]) if data else None
+        if size is None or len(data) != size + 5 or data[2] != 0xFF - data[1]:
+            return 0.0
+        return 0.97 if crc16_xmodem(data[3:-2]) == int.from_bytes(data[-2:], "big") else 0.5
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if len(data) == 1:
+            name = _symbol_name(data[0])
+            return {"summary": name, "tree": [{"label": "Control", "raw": f"{data[0]:02X}", "value": name}]}
+        seq = data[1]
+        payload = data[3:-2]
+        ok = crc16_xmodem(payload) == int.from_bytes(data[-2:], "big")
+        tree = [
+            {"label": "Seq", "raw": f"{seq:02X}", "value": str(seq)},
+            {"label": "Data", "raw": "", "value": f"{len(payload)} bytes"},
+            {"label": "CRC16", "raw": data[-2:].hex(" ").upper(), "value": "valid" if ok else "invalid"},
+        ]
+        summary = f"block seq={seq} size={len(payload)}"
+        if seq == 0:
+            name, _, rest = payload.partition(b"\0")
+            size_text = rest.split(b"\0", 1)[0].split(b" ", 1)[0].decode("ascii", errors="ignore")
+            if name:
+                tree.append({"label": "Filename", "raw": "", "value": name.decode("utf-8", errors="ignore")})
+                tree.append({"label": "FileSize", "raw": "", "value": size_text})
+                summary = f"header {name.decode('utf-8', errors='ignore')} size={size_text}"
+            else:
+                summary = "end of batch"
+        errors = [] if ok else [{"code": "YMODEM_CRC_INVALID", "message": "block CRC16 mismatch"}]
+        return {"summary": summary, "tree": tree, "errors": errors}
+
     def send(self, ctx, request: Dict[str, Any]) -> Dict[str, Any]:
         op = str(request.get("op", "send_data")).strip().lower()
         if op not in {"send_data", "send_file"}:
@@ -136,7 +174,7 @@ class ProtocolPackage:
             raise ValueError("YMODEM_VALUE_INVALID: max_retry must be >= 0")
 
         filename, data = _load_transfer_data(request)
-        blocks = _split_blocks(data, block_size)
+        blocks = _iter_blocks(data, block_size)
         retries = 0
 
         _wait_symbol(ctx, (CRC_REQ,), timeout_ms)
@@ -162,7 +200,7 @@ class ProtocolPackage:
             "status": "done",
             "filename": filename,
             "bytes_total": len(data),
-            "blocks_total": len(blocks),
+            "blocks_total": _block_count(len(data), block_size),
             "retries": retries,
             "block_size": block_size,
         }
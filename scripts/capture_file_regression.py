@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from pathlib import Path
+import shutil
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_file import CaptureFileError, CaptureFileReader, CaptureFileWriter
+from app.capture_store import CaptureStore
+from app.packet_engine import PacketAnalysisEngine
+from infra.common.chunk import Chunk, clock_anchor
+from infra.common.event_bus import EventBus
+from infra.protocol.detectors import DetectorRegistry
+
+_ANCHOR_WALL, _ANCHOR_PERF = clock_anchor()
+
+
+def _wall(t_ns: int) -> int:
+    return t_ns - _ANCHOR_PERF + _ANCHOR_WALL
+
+
+def _payload(i: int) -> bytes:
+    return i.to_bytes(4, "little") * 4
+
+
+def _wait_written(writer: CaptureFileWriter, count: int, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while writer.written < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 空闲后写线程会 flush，给它一个周期。
+    time.sleep(0.5)
+    return writer.written == count
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+    work = ROOT_DIR / "tmp" / "capture_file_regression"
+    shutil.rmtree(work, ignore_errors=True)
+    work.mkdir(parents=True)
+
+    # 写入：三通道交错，后台线程落盘，关闭时写入完整索引与尾部。
+    path = work / "basic.pfcap"
+    writer = CaptureFileWriter(path, index_every=64)
+    total = 5000
+    for i in range(total):
+        writer.append(1_000_000 + i * 1000, f"COM{i % 3}", "TX" if i % 2 else "RX", _payload(i))
+    writer.close()
+    checks.append(("write.all_records", writer.written == total and writer.dropped == 0 and writer.error is None))
+    with CaptureFileReader(path) as reader:
+        entries = list(reader.records())
+        checks.append(("read.complete", reader.complete and len(reader) == total))
+        checks.append(("read.channels", reader.channels == ["COM0", "COM1", "COM2"]))
+        checks.append(("read.roundtrip", [e.data for e in entries] == [_payload(i) for i in range(total)]))
+        checks.append(("read.fields", entries[7].channel == "COM1" and entries[7].direction == "TX" and entries[7].t_ns == _wall(1_000_000 + 7000)))
+        start, end = _wall(1_000_000 + 1234 * 1000), _wall(1_000_000 + 1300 * 1000)
+        window = list(reader.records(start_ns=start, end_ns=end))
+        checks.append(("read.time_range", [e.data for e in window] == [_payload(i) for i in range(1234, 1300)]))
+        com2 = list(reader.records(start_ns=start, end_ns=end, channel="COM2"))
+        checks.append(("read.channel_filter", [e.data for e in com2] == [_payload(i) for i in range(1234, 1300) if i % 3 == 2]))
+        checks.append(("read.seek", reader.seek(start) <= reader.seek(end) and reader.seek(_wall(10**12)) == path.stat().st_size))
+        checks.append(("read.bounds", reader.first_ns == _wall(1_000_000) and reader.last_ns == _wall(1_000_000 + (total - 1) * 1000)))
+
+    # 乱序时间戳（不同通道交错）：区间边界仍精确。
+    path = work / "unordered.pfcap"
+    writer = CaptureFileWriter(path, index_every=2)
+    for i, t in enumerate([100, 300, 200, 250, 400, 150, 500]):
+        writer.append(t, "A", "RX", bytes([i]))
+    writer.close()
+    with CaptureFileReader(path) as reader:
+        got = sorted(e.t_ns - _wall(0) for e in reader.records(start_ns=_wall(150), end_ns=_wall(300)))
+        checks.append(("read.out_of_order_range", got == [150, 200, 250]))
+
+    # 未正常关闭：无尾部 + 半条记录，沿索引链恢复并扫描尾部。
+    path = work / "crash.pfcap"
+    writer = CaptureFileWriter(path, index_every=100)
+    for i in range(1050):
+        writer.append(i * 1000, "COM1", "RX", _payload(i))
+    flushed = _wait_written(writer, 1050)
+    crashed = work / "crash_copy.pfcap"
+    crashed.write_bytes(path.read_bytes() + b"\x01\x00\x00\x00\xff")
+    writer.close()
+    with CaptureFileReader(crashed) as reader:
+        entries = list(reader.records())
+        checks.append(("recover.no_trailer", flushed and not reader.complete and len(reader) == 1050))
+        checks.append(("recover.records", [e.data for e in entries] == [_payload(i) for i in range(1050)]))
+        checks.append(("recover.channels", reader.channels == ["COM1"]))
+    bad = work / "bad.pfcap"
+    bad.write_bytes(b"not a capture file at all")
+    try:
+        CaptureFileReader(bad)
+        checks.append(("read.bad_magic", False))
+    except CaptureFileError:
+        checks.append(("read.bad_magic", True))
+
+    # 大文件：打开只读索引，定位到时间点不随文件大小增长。
+    path = work / "large.pfcap"
+    writer = CaptureFileWriter(path)
+    count = 200_000
+    for i in range(count):
+        writer.append(i * 1_000_000, f"ch{i % 4}", "RX", _payload(i))
+    writer.close()
+    started = time.perf_counter()
+    with CaptureFileReader(path) as reader:
+        target = _wall(150_000 * 1_000_000)
+        first = next(reader.records(start_ns=target))
+        elapsed = time.perf_counter() - started
+        checks.append(("large.open_and_seek", len(reader) == count and first.data == _payload(150_000) and elapsed < 0.2))
+
+    # 引擎：capture.control 带 record_path 时发布的帧同时落盘，停止后文件完整。
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), store=CaptureStore(byte_budget=1 << 20))
+    path = work / "engine.pfcap"
+    bus.publish("capture.control", {"action": "start", "record_path": str(path)})
+    bus.wait_idle(2.0)
+    frame = bytes.fromhex("01 03 00 00 00 02 C4 0B")
+    t0 = time.perf_counter_ns()
+    for i in range(3):
+        bus.publish("comm.rx", Chunk(frame, t_ns=t0 + i * 50_000_000))
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    checks.append(("engine.recorder_closed", engine.recorder is None))
+    with CaptureFileReader(path) as reader:
+        entries = list(reader.records())
+        checks.append(("engine.recorded", reader.complete and [e.data for e in entries] == [frame] * 3))
+        checks.append(("engine.timestamps", [e.t_ns for e in entries] == [_wall(t0 + i * 50_000_000) for i in range(3)]))
+
+    shutil.rmtree(work, ignore_errors=True)
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
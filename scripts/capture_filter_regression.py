@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_filter import CaptureFilter, CaptureFilterError, compile_filter
+from app.capture_record import CaptureRecord
+from app.capture_store import CaptureStore
+from app.packet_engine import PacketAnalysisEngine
+from infra.common.chunk import Chunk
+from infra.common.event_bus import EventBus
+from infra.protocol.detectors import DetectorRegistry
+from infra.protocol.protocol_loader import crc16_modbus
+
+
+def _rtu(body: bytes) -> bytes:
+    return body + crc16_modbus(body).to_bytes(2, "little")
+
+
+def _record(data: bytes, protocol: str = "modbus_rtu", name: str = "Modbus RTU", direction: str = "RX", errors=()) -> CaptureRecord:
+    return CaptureRecord("f", 0, direction, "COM1", data, protocol, name, 0.95, tuple(errors))
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+
+    read = _rtu(bytes.fromhex("01 03 04 00 0A 00 0B"))
+    bad = _record(read[:-1] + b"\x00", errors=("CRC_INVALID",))
+    good = _record(read)
+    write = _record(_rtu(bytes.fromhex("01 06 00 01 00 03")), direction="TX")
+    tcp = _record(bytes.fromhex("0001 0000 0006 01 04 0000 0002"), protocol="modbus_tcp", name="Modbus TCP")
+    at = _record(b"AT+CSQ\r\n", protocol="at_command", name="AT Command")
+    noise = _record(b"\xfe\xfd", protocol="", name="Unknown")
+
+    example = CaptureFilter('proto == "modbus" && func in (3,4) && !crc_ok && len > 8')
+    checks.append(("eval.example", [example(r) for r in (bad, good, write, tcp, at)] == [True, False, False, False, False]))
+    cases = {
+        'proto == "modbus"': [True, True, True, True, False, False],
+        'proto == "Modbus TCP"': [False, False, False, True, False, False],
+        "func == 3 || func == 4": [True, True, False, True, False, False],
+        'dir == "tx"': [False, False, True, False, False, False],
+        "unknown": [False, False, False, False, False, True],
+        "error": [True, False, False, False, False, False],
+        'error == "CRC_INVALID"': [True, False, False, False, False, False],
+        "not (len >= 8) or data[0] == 0xFE": [False, False, False, False, False, True],
+        "8 < len": [True, True, False, True, False, False],
+        "data[-1] == 0x0A and data[0] == 0x41": [False, False, False, False, True, False],
+        'channel in ("COM1", "COM2") && errors == 0': [False, True, True, True, True, True],
+        "func not in (3, 6)": [False, False, False, True, True, True],
+        "func != 3": [False, False, True, True, False, False],
+        "data[6] != 0x0B": [False, False, True, True, True, False],
+        "data[99] > 0": [False] * 6,
+        "crc_ok == false": [True, False, False, False, False, False],
+    }
+    records = (bad, good, write, tcp, at, noise)
+    results = {expr: [CaptureFilter(expr)(r) for r in records] for expr in cases}
+    mismatched = [expr for expr, expected in cases.items() if results[expr] != expected]
+    checks.append(("eval.fields", not mismatched))
+    if mismatched:
+        print("mismatched:", mismatched)
+
+    errors_ok = True
+    rejected = ["len >", "foo == 1", "(len > 1", 'len > "a"', "len # 3", "3 == 4", 'error > "x"', "data[x] == 1", ""]
+    # 字段类型不符在编译期拒绝，避免生成的 lambda 在解码线程里抛 TypeError。
+    rejected += ["name > 3", "channel >= 1", 'dir < "TX"', 'len == "8"', "crc_ok == 1", "func == true", 'channel in ("COM1", 2)', "proto == 3"]
+    for expr in rejected:
+        try:
+            CaptureFilter(expr)
+            errors_ok = False
+            print("accepted:", expr)
+        except CaptureFilterError:
+            pass
+    checks.append(("compile.errors", errors_ok and compile_filter("  ") is None))
+    checks.append(("compile.source", example.source.startswith("lambda r: ") and "_func(r) in (3, 4)" in example.source))
+
+    # 编译一次，逐帧只是一次函数调用。
+    frames = [bad, good, write, tcp, at, noise] * 20_000
+    started = time.perf_counter()
+    hits = sum(1 for r in frames if example.match(r))
+    elapsed = time.perf_counter() - started
+    print(f"filter eval: {len(frames) / elapsed:,.0f} frames/s")
+    checks.append(("perf.compiled", hits == 20_000 and elapsed < 1.0))
+
+    # 引擎：过滤掉的帧不发布到总线，但仍进入存储。
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), store=CaptureStore(byte_budget=1 << 20))
+    published: list[CaptureRecord] = []
+    bus.subscribe("capture.frame", published.append)
+    bus.publish("capture.control", {"action": "start", "filter": "!crc_ok"})
+    bus.wait_idle(2.0)
+    t0 = time.perf_counter_ns()
+    for i in range(6):
+        frame = read if i % 3 else read[:-1] + b"\x00"
+        bus.publish("comm.rx", Chunk(frame, t_ns=t0 + i * 50_000_000))
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("engine.published_only_matches", len(published) == 2 and all(r.error_codes == ("CRC_INVALID",) for r in published)))
+    checks.append(("engine.stored_all", len(engine.store) == 6 and engine.filtered_frames == 4))
+    page = engine.query_frames(where="crc_ok && func == 3")
+    checks.append(("engine.query_where", page["total"] == 4 and len(page["frames"]) == 4))
+    bus.publish("capture.control", {"action": "filter", "expr": "len >"})
+    bus.wait_idle(2.0)
+    checks.append(("engine.bad_filter_keeps_previous", engine.filter_expression == "!crc_ok"))
+    # 过滤器运行时抛异常：该帧按已过滤计数，解码线程继续工作。
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    broken = engine.set_filter("len > 0")
+    broken.match = lambda _r: 1 > "x"  # type: ignore[assignment, operator]
+    before = engine.filtered_frames
+    bus.publish("comm.rx", Chunk(read, t_ns=time.perf_counter_ns()))
+    bus.wait_idle(2.0)
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    idle = engine.wait_idle(2.0)
+    checks.append(("engine.raising_filter", idle and engine.filtered_frames == before + 1 and len(engine.store) == 7))
+    engine.set_filter("")
+    checks.append(("engine.clear_filter", engine.filter_expression == ""))
+    bus.close()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from pathlib import Path
+import shutil
+import sys
+import threading
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_file import CaptureFileWriter
+from app.capture_replay import CaptureReplayer, ReplayEntry, ReplaySource, open_replay_source
+from app.capture_store import CaptureStore
+from app.packet_engine import PacketAnalysisEngine
+from dsl_runtime.engine.experiment_recorder import ExperimentRecorder
+from infra.common.event_bus import EventBus
+from infra.protocol.detectors import DetectorRegistry
+from infra.protocol.protocol_loader import crc16_modbus
+
+
+def _rtu(body: bytes) -> bytes:
+    return body + crc16_modbus(body).to_bytes(2, "little")
+
+
+_REQUEST = _rtu(bytes.fromhex("01 03 00 00 00 02"))
+_RESPONSE = _rtu(bytes.fromhex("01 03 04 00 0A 00 0B"))
+
+
+def _engine(bus: EventBus) -> PacketAnalysisEngine:
+    return PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), store=CaptureStore(byte_budget=1 << 26))
+
+
+def _transactions(count: int, spacing_ns: int, channels=("COM1", "COM2")) -> list[ReplayEntry]:
+    entries = []
+    for i in range(count):
+        channel = channels[i % len(channels)]
+        t = i * spacing_ns
+        entries.append(ReplayEntry(t, channel, "TX", _REQUEST))
+        entries.append(ReplayEntry(t + spacing_ns // 2, channel, "RX", _RESPONSE))
+    return entries
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+    work = ROOT_DIR / "tmp" / "capture_replay_regression"
+    shutil.rmtree(work, ignore_errors=True)
+    work.mkdir(parents=True)
+
+    # 抓包文件 → proxy.data（多通道），全速回放，引擎逐帧识别。
+    path = work / "two_channels.pfcap"
+    writer = CaptureFileWriter(path)
+    for entry in _transactions(50, 10_000_000):
+        writer.append(entry.t_ns, entry.channel, entry.direction, entry.data)
+    writer.close()
+    bus = EventBus()
+    engine = _engine(bus)
+    report = CaptureReplayer(bus, open_replay_source(path), engine=engine, source=str(path)).run()
+    store = engine.store
+    checks.append(("file.all_chunks", report.chunks == 100 and report.frames == 100 and report.dropped_chunks == 0))
+    checks.append(("file.channels", store.channels() == ["COM1", "COM2"] and store.count(channel="COM1", direction="TX") == 25))
+    checks.append(("file.classified", store.count(protocol="modbus_rtu") == 100 and store.count(error="*") == 0))
+    spacing = [r.t_ns for r in store.query(channel="COM1", direction="TX", limit=2)]
+    checks.append(("file.recorded_spacing", len(spacing) == 2 and spacing[1] - spacing[0] == 20_000_000))
+    checks.append(("file.recorded_span", abs(report.recorded_s - (49 * 10_000_000 + 5_000_000) / 1e9) < 1e-9))
+    bus.close()
+
+    # 流式回放：通道集合取自文件索引，条目边读边发，不预先读入整个文件。
+    source = open_replay_source(path)
+    published: list[int] = []
+    ahead: list[int] = []
+    bus = EventBus()
+    publish = bus.publish
+
+    def _counting_publish(topic: str, payload=None) -> None:
+        if topic == "proxy.data":
+            published.append(1)
+        publish(topic, payload)
+
+    bus.publish = _counting_publish  # type: ignore[method-assign]
+
+    def _tracked():
+        for i, entry in enumerate(source):
+            ahead.append(i - len(published))
+            yield entry
+
+    report = CaptureReplayer(bus, ReplaySource(_tracked, source.channels), engine=_engine(bus)).run()
+    checks.append(("file.index_channels", source.channels() == ["COM1", "COM2"]))
+    checks.append(("file.streamed", report.chunks == 100 and len(published) == 100 and max(ahead) <= 1))
+    bus.close()
+
+    # 1x / 4x：按录制间隔限速。
+    entries = _transactions(10, 30_000_000, channels=("COM1",))
+    bus = EventBus()
+    engine = _engine(bus)
+    report = CaptureReplayer(bus, entries, speed=1.0, engine=engine).run()
+    checks.append(("speed.1x", 0.27 <= report.elapsed_s < 0.8 and report.frames == 20 and report.max_lag_ms < 50))
+    report = CaptureReplayer(bus, entries, speed=4.0, engine=engine).run()
+    checks.append(("speed.4x", 0.06 <= report.elapsed_s < 0.4 and report.frames == 20))
+    checks.append(("topic.comm_channel", {(r.channel, r.baud) for r in engine.store.query()} == {("COM1", None)}))
+    # 单通道 → comm.rx/comm.tx，ProtocolLoader 等 comm.rx 订阅者同样收到。
+    received: list[bytes] = []
+    bus.subscribe("comm.rx", received.append)
+    before = engine.store.count()
+    CaptureReplayer(bus, entries, engine=engine, baud=115200).run()
+    bus.wait_idle(2.0)
+    checks.append(("topic.comm_rx", received == [_RESPONSE] * 10))
+    # 带波特率回放：帧归入录制的通道并带波特率（会话 id 随 comm.connected 宣告）。
+    replayed = engine.store.query(where=lambda r: r.baud == 115200)
+    checks.append(("topic.comm_session", len(replayed) == 20 == engine.store.count() - before and {r.channel for r in replayed} == {"COM1"}))
+    # 中途停止。
+    slow = _transactions(50, 100_000_000, channels=("COM1",))
+    replayer = CaptureReplayer(bus, slow, speed=1.0, engine=engine)
+    threading.Timer(0.2, replayer.stop).start()
+    started = time.perf_counter()
+    report = replayer.run()
+    checks.append(("speed.stop", report.stopped and report.chunks < 10 and time.perf_counter() - started < 2.0))
+    bus.close()
+
+    # LoggingChannel 日志与实验 events.jsonl。
+    log = work / "channel.log"
+    log.write_text(
+        "".join(f"{1700000000 + i * 0.01:.3f} {'TX' if i % 2 == 0 else 'RX'} {(_REQUEST if i % 2 == 0 else _RESPONSE).hex().upper()}\n" for i in range(6))
+        + "garbage line\n",
+        encoding="utf-8",
+    )
+    log_entries = list(open_replay_source(log))
+    checks.append(("source.logging_channel", [e.direction for e in log_entries] == ["TX", "RX"] * 3 and log_entries[1].data == _RESPONSE and log_entries[0].channel == "channel"))
+    recorder = ExperimentRecorder(base_dir=work, name="replay")
+    recorder.start()
+    recorder.record_event(name="rx", payload={"text": "", "hex": _RESPONSE.hex().upper()}, source="channel")
+    recorder.record_event(name="tick", payload=None, source="bus")
+    recorder.record_event(name="raw", payload=_REQUEST, source="bus")
+    recorder.close()
+    jsonl_entries = list(open_replay_source(recorder.paths.events_jsonl, channel="COM7"))
+    checks.append(("source.events_jsonl", [e.data for e in jsonl_entries] == [_RESPONSE, _REQUEST] and jsonl_entries[0].channel == "COM7"))
+
+    # 负载基准：全速回放 2 万帧，报告流水线吞吐。
+    bus = EventBus()
+    engine = _engine(bus)
+    load = _transactions(10_000, 2_000_000, channels=("COM1", "COM2", "COM3", "COM4"))
+    report = CaptureReplayer(bus, load, engine=engine).run()
+    print(f"replay max speed: {report.frames} frames in {report.elapsed_s:.3f}s = {report.frames_per_sec:.0f} frames/s")
+    checks.append(("load.max_speed", report.frames == 20_000 and report.dropped_chunks == 0 and report.frames_per_sec > 1000))
+    bus.close()
+
+    shutil.rmtree(work, ignore_errors=True)
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
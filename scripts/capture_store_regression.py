@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_record import CaptureRecord
+from app.capture_store import RECORD_OVERHEAD, CaptureStore
+from app.packet_engine import PacketAnalysisEngine
+from infra.common.chunk import Chunk
+from infra.common.event_bus import EventBus
+from infra.protocol.detectors import DetectorRegistry
+
+
+def _record(i: int, t_ns: int, channel: str = "COM1", direction: str = "RX", protocol: str = "modbus_rtu", errors=()) -> CaptureRecord:
+    return CaptureRecord(
+        f"{direction.lower()}-{t_ns}-{i}",
+        t_ns,
+        direction,
+        channel,
+        bytes([i & 0xFF]) * 8,
+        protocol_id=protocol,
+        error_codes=tuple(errors),
+    )
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+
+    # 时间区间 + 通道/方向/协议/错误码索引。
+    store = CaptureStore(byte_budget=1 << 30)
+    for i in range(1000):
+        channel = "COM1" if i % 2 == 0 else "COM2"
+        direction = "TX" if i % 4 < 2 else "RX"
+        errors = ("CRC_INVALID",) if i % 10 == 0 else ()
+        protocol = "modbus_rtu" if i % 3 else ""
+        store.append(_record(i, 1_000 + i * 10, channel, direction, protocol, errors))
+    window = store.query(start_ns=1_000 + 100 * 10, end_ns=1_000 + 200 * 10)
+    checks.append(("query.time_range", [r.t_ns for r in window] == [1_000 + i * 10 for i in range(100, 200)]))
+    com2_tx = store.query(channel="COM2", direction="tx")
+    checks.append(("query.channel_direction", len(com2_tx) == 250 and all(r.channel == "COM2" and r.direction == "TX" for r in com2_tx)))
+    checks.append(("query.error_code", store.count(error="CRC_INVALID") == 100 and store.count(error="*") == 100))
+    checks.append(("query.unknown_protocol", store.count(protocol="") == len([i for i in range(1000) if i % 3 == 0])))
+    page = store.query(channel="COM1", offset=10, limit=5)
+    checks.append(("query.page", [r.t_ns for r in page] == [1_000 + i * 10 for i in range(20, 30, 2)]))
+    checks.append(("query.missing_key", store.query(channel="COM9") == [] and store.count(channel="COM9") == 0))
+    checks.append(("query.get_by_id", store.get(window[0].id) is window[0] and store.get("nope") is None))
+
+    # 乱序到达（不同通道交错）：结果仍按时间排序。
+    store = CaptureStore(byte_budget=1 << 30)
+    for i, t in enumerate([100, 300, 200, 250, 400, 150]):
+        store.append(_record(i, t, channel="A" if i % 2 else "B"))
+    checks.append(("query.out_of_order_sorted", [r.t_ns for r in store.query()] == [100, 150, 200, 250, 300, 400]))
+    checks.append(("query.out_of_order_range", [r.t_ns for r in store.query(start_ns=150, end_ns=300)] == [150, 200, 250]))
+
+    # 字节预算：超过预算淘汰最旧记录，索引随之失效。
+    per_record = 8 + RECORD_OVERHEAD
+    store = CaptureStore(byte_budget=per_record * 100)
+    for i in range(1000):
+        store.append(_record(i, i, channel=f"ch{i // 500}", errors=("CRC_INVALID",) if i < 10 else ()))
+    stats = store.stats()
+    checks.append(("budget.bounded", len(store) == 100 and stats["bytes"] <= store.byte_budget and stats["evicted"] == 900))
+    checks.append(("budget.oldest_evicted", stats["first_ns"] == 900 and [r.t_ns for r in store.query(limit=3)] == [900, 901, 902]))
+    checks.append(("budget.index_evicted", store.count(error="*") == 0 and store.count(channel="ch0") == 0 and store.channels() == ["ch1"]))
+    checks.append(("budget.count_after_compact", store.count() == 100 and store.count(channel="ch1", start_ns=950) == 50))
+    checks.append(("budget.get_evicted", store.get(_record(0, 0).id) is None))
+    store.clear()
+    checks.append(("clear.empty", len(store) == 0 and store.query() == [] and store.stats()["first_ns"] is None))
+
+    # 大量记录下区间查询不随总量线性增长。
+    store = CaptureStore(byte_budget=1 << 31)
+    for i in range(200_000):
+        store.append(_record(i, i * 1_000, channel=f"ch{i % 8}"))
+    start = time.perf_counter()
+    for k in range(1000):
+        store.query(start_ns=k * 100_000, end_ns=k * 100_000 + 10_000, channel="ch3")
+    elapsed = time.perf_counter() - start
+    checks.append(("perf.range_query", elapsed < 0.5))
+
+    # 引擎：发布的帧进入存储，可按通道分页查询。
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), store=CaptureStore(byte_budget=1 << 20))
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    t0 = time.perf_counter_ns()
+    frame = bytes.fromhex("01 03 00 00 00 02 C4 0B")
+    for i in range(5):
+        bus.publish("comm.rx", Chunk(frame, t_ns=t0 + i * 50_000_000))
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    result = engine.query_frames(offset=1, limit=2, protocol="modbus_rtu")
+    checks.append(("engine.stored", len(engine.store) == 5 and result["total"] == 5))
+    checks.append(("engine.page", [f["timestamp_ns"] for f in result["frames"]] == [t0 + 50_000_000, t0 + 100_000_000]))
+    checks.append(("engine.detail_from_store", engine.frame_detail(result["frames"][0]["id"]) is not None if result["frames"] else False))
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from pathlib import Path
+import random
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_record import CaptureRecord
+from app.capture_store import CaptureStore
+from app.capture_transactions import LatencyHistogram, TransactionMatcher
+from app.packet_engine import PacketAnalysisEngine
+from infra.common.chunk import Chunk
+from infra.common.event_bus import EventBus
+from infra.protocol.detectors import DetectorRegistry
+from infra.protocol.protocol_loader import crc16_modbus
+
+_MS = 1_000_000
+
+
+def _rtu(body: bytes) -> bytes:
+    return body + crc16_modbus(body).to_bytes(2, "little")
+
+
+def _record(rid: str, t_ms: float, direction: str, data: bytes, protocol: str, channel: str = "COM1") -> CaptureRecord:
+    return CaptureRecord(rid, int(t_ms * _MS), direction, channel, data, protocol, protocol, 0.9, ())
+
+
+def _group(snapshot: dict, **labels) -> dict:
+    for row in snapshot["groups"]:
+        if all(row.get(k) == v for k, v in labels.items()):
+            return row
+    return {}
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+
+    # Modbus RTU：按 从站+功能码 配对，异常响应计为错误。
+    m = TransactionMatcher(timeout_ns=500 * _MS)
+    req1 = _rtu(bytes.fromhex("01 03 00 00 00 02"))
+    req2 = _rtu(bytes.fromhex("02 03 00 00 00 02"))
+    rsp1 = _rtu(bytes.fromhex("01 03 04 00 0A 00 0B"))
+    exc2 = _rtu(bytes.fromhex("02 83 02"))
+    m.observe(_record("a", 0, "TX", req1, "modbus_rtu"))
+    m.observe(_record("b", 1, "TX", req2, "modbus_rtu"))
+    done = m.observe(_record("c", 12, "RX", rsp1, "modbus_rtu"))
+    done += m.observe(_record("d", 21, "RX", exc2, "modbus_rtu"))
+    checks.append(("rtu.pairs", [(t.request_id, t.response_id, t.ok) for t in done] == [("a", "c", True), ("b", "d", False)]))
+    checks.append(("rtu.latency", [t.latency_ns for t in done] == [12 * _MS, 20 * _MS]))
+    snap = m.snapshot()
+    checks.append(("rtu.groups", _group(snap, device="2", function="0x03").get("errors") == 1 and _group(snap, device="1").get("p50_ms") == 12.0))
+    m.observe(_record("e", 30, "TX", _rtu(bytes.fromhex("00 06 00 01 00 03")), "modbus_rtu"))
+    checks.append(("rtu.broadcast_skipped", m.pending() == 0))
+    m.observe(_record("f", 40, "RX", rsp1, "modbus_rtu"))
+    checks.append(("rtu.unmatched", m.snapshot()["unmatched_responses"] == 1))
+
+    # Modbus TCP：按事务号配对，乱序响应也能对上。
+    m = TransactionMatcher()
+    m.observe(_record("t1", 0, "TX", bytes.fromhex("0001 0000 0006 05 04 0000 0002"), "modbus_tcp", "tcp"))
+    m.observe(_record("t2", 1, "TX", bytes.fromhex("0002 0000 0006 05 03 0000 0001"), "modbus_tcp", "tcp"))
+    done = m.observe(_record("r2", 3, "RX", bytes.fromhex("0002 0000 0005 05 03 02 0000"), "modbus_tcp", "tcp"))
+    done += m.observe(_record("r1", 5, "RX", bytes.fromhex("0001 0000 0007 05 04 04 00000000"), "modbus_tcp", "tcp"))
+    checks.append(("tcp.tid", [(t.request_id, t.function, t.latency_ns) for t in done] == [("t2", "0x03", 2 * _MS), ("t1", "0x04", 5 * _MS)]))
+
+    # AT：回显与中间行跳过，最终结果行结束事务。
+    m = TransactionMatcher()
+    m.observe(_record("q", 0, "TX", b"AT+CSQ\r\n", "at_command"))
+    first = m.observe(_record("echo", 2, "RX", b"AT+CSQ\r\n", "at_command"))
+    first += m.observe(_record("mid", 4, "RX", b"+CSQ: 20,99\r\n", ""))
+    done = m.observe(_record("ok", 6, "RX", b"OK\r\n", ""))
+    m.observe(_record("q2", 10, "TX", b"AT+CPIN?\r\n", "at_command"))
+    done += m.observe(_record("err", 13, "RX", b"\r\n+CME ERROR: 10\r\n", ""))
+    checks.append(("at.final_line", not first and [(t.function, t.response_id, t.ok) for t in done] == [("AT+CSQ", "ok", True), ("AT+CPIN", "err", False)]))
+
+    # SCPI：只有查询（?）等待响应。
+    m = TransactionMatcher()
+    m.observe(_record("s0", 0, "TX", b"CONF:VOLT:DC 10\n", "scpi", "gpib"))
+    m.observe(_record("s1", 1, "TX", b"MEAS:VOLT:DC?\n", "scpi", "gpib"))
+    done = m.observe(_record("s2", 9, "RX", b"+1.2345E+00\n", "", "gpib"))
+    checks.append(("scpi.query", m.pending() == 0 and [(t.function, t.latency_ns) for t in done] == [("MEAS:VOLT:DC?", 8 * _MS)]))
+
+    # 超时：后续帧时间戳或 expire(now) 判定。
+    m = TransactionMatcher(timeout_ns=100 * _MS)
+    m.observe(_record("x1", 0, "TX", req1, "modbus_rtu"))
+    m.observe(_record("x2", 50, "TX", req2, "modbus_rtu"))
+    late = m.observe(_record("y", 120, "RX", rsp1, "modbus_rtu"))
+    expired = m.expire(200 * _MS)
+    snap = m.snapshot()
+    checks.append(("timeout.expire", [t.request_id for t in late] == ["x1"] and [t.request_id for t in expired] == ["x2"] and all(t.timed_out for t in late + expired)))
+    checks.append(("timeout.counted", snap["total"]["timeouts"] == 2 and snap["unmatched_responses"] == 1 and snap["pending"] == 0))
+
+    # 直方图分位数：与排序后的精确值相差不超过一个桶（约 4%）。
+    rng = random.Random(7)
+    samples = [int(rng.lognormvariate(16, 0.8)) for _ in range(50_000)]
+    hist = LatencyHistogram()
+    for value in samples:
+        hist.add(value)
+    ordered = sorted(samples)
+    worst = 0.0
+    for q in (50, 95, 99):
+        exact = ordered[max(0, -(-q * len(ordered) // 100) - 1)]
+        worst = max(worst, abs(hist.percentile(q) - exact) / exact)
+    print(f"histogram: {len(hist.buckets)} buckets, worst percentile error {worst * 100:.2f}%")
+    checks.append(("hist.percentiles", worst < 0.05 and len(hist.buckets) < 200))
+    merged = LatencyHistogram()
+    merged.merge(hist)
+    merged.merge(LatencyHistogram())
+    checks.append(("hist.merge", merged.count == hist.count and merged.percentile(99) == hist.percentile(99) and merged.min_ns == min(samples)))
+
+    # 汇总：按通道 / 设备 / 功能码。
+    m = TransactionMatcher()
+    t = 0.0
+    for i in range(300):
+        channel = "COM1" if i % 3 else "COM2"
+        unit = 1 + i % 2
+        body = _rtu(bytes([unit, 3, 0, 0, 0, 1]))
+        m.observe(_record(f"q{i}", t, "TX", body, "modbus_rtu", channel))
+        m.observe(_record(f"r{i}", t + 5 + unit, "RX", _rtu(bytes([unit, 3, 2, 0, 1])), "modbus_rtu", channel))
+        t += 20
+    snap = m.snapshot()
+    channels = {row["channel"]: row["count"] for row in snap["by_channel"]}
+    devices = {(row["channel"], row["device"]): row["p50_ms"] for row in snap["by_device"]}
+    checks.append(("rollup.channel", channels == {"COM1": 200, "COM2": 100} and snap["transactions"] == 300))
+    checks.append(("rollup.device", devices[("COM1", "1")] == 6.0 and devices[("COM1", "2")] == 7.0 and snap["by_function"][0]["count"] == 300))
+
+    # 引擎：代理流量经识别后配对，停止时发布 capture.stats。
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), store=CaptureStore(byte_budget=1 << 20))
+    stats: list[dict] = []
+    bus.subscribe("capture.stats", stats.append)
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    t0 = time.perf_counter_ns()
+    for i in range(10):
+        for direction, frame, offset in (("host", req1, 0), ("device", rsp1, 8 * _MS)):
+            t_ns = t0 + i * 50 * _MS + offset
+            bus.publish(
+                "proxy.data",
+                {"pair_id": "p", "src": "COM1", "dst": "COM2", "src_role": direction, "data": Chunk(frame, t_ns=t_ns), "t_ns": t_ns},
+            )
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    final = stats[-1] if stats else {}
+    checks.append(("engine.stats_event", final.get("transactions") == 10 and final["total"]["p50_ms"] == 8.0))
+    checks.append(("engine.query", engine.transaction_stats()["transactions"] == 10))
+    bus.close()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
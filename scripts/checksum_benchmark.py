@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from infra.common.utils.checksum import CATALOGUE, Crc, crc_file, get_crc
+
+
+def _legacy_crc16_modbus(data: bytes) -> int:
+    """Previous bit-by-bit implementation (8 branch iterations per byte)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc & 0xFFFF
+
+
+def _legacy_crc16_xmodem(data: bytes) -> int:
+    crc = 0x0000
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc & 0xFFFF
+
+
+def _legacy_crc8(data: bytes, poly: int = 0x07, init: int = 0x00) -> int:
+    crc = init
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ poly) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+    return crc & 0xFF
+
+
+_LEGACY: Dict[str, Callable[[bytes], int]] = {
+    "crc16_modbus": _legacy_crc16_modbus,
+    "crc16_xmodem": _legacy_crc16_xmodem,
+    "crc8": _legacy_crc8,
+}
+
+
+def _throughput(fn: Callable[[bytes], int], data: bytes, min_sec: float) -> float:
+    """Bytes per second, repeating the call until min_sec has elapsed."""
+    rounds = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_sec or rounds == 0:
+        fn(data)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+    return len(data) * rounds / elapsed
+
+
+def _table_only(name: str) -> Crc:
+    crc = Crc(CATALOGUE[name])
+    crc._update = crc._update_table  # type: ignore[attr-defined]
+    return crc
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Checksum throughput: table-driven CRCs vs previous bit-by-bit code.")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="buffer size per call")
+    parser.add_argument("--min-sec", type=float, default=0.2, help="minimum timing window per algorithm")
+    parser.add_argument("--json", type=str, default="", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    data = os.urandom(max(16, args.size))
+    rows: List[Dict[str, Any]] = []
+    for name in CATALOGUE:
+        crc = get_crc(name)
+        row: Dict[str, Any] = {
+            "name": name,
+            "path": "table" if crc._update == crc._update_table else "binascii",  # type: ignore[attr-defined]
+            "bytes_per_sec": round(_throughput(crc, data, args.min_sec)),
+        }
+        legacy = _LEGACY.get(name)
+        if legacy:
+            row["legacy_bytes_per_sec"] = round(_throughput(legacy, data, args.min_sec))
+            row["speedup"] = round(row["bytes_per_sec"] / max(1, row["legacy_bytes_per_sec"]), 1)
+        if row["path"] != "table":
+            row["table_bytes_per_sec"] = round(_throughput(_table_only(name), data, args.min_sec))
+        rows.append(row)
+
+    for row in rows:
+        extra = ""
+        if "legacy_bytes_per_sec" in row:
+            extra += f" legacy={row['legacy_bytes_per_sec'] / 1e6:8.2f} MB/s x{row['speedup']}"
+        if "table_bytes_per_sec" in row:
+            extra += f" table={row['table_bytes_per_sec'] / 1e6:8.2f} MB/s"
+        print(f"{row['name']:<18} {row['path']:<8} {row['bytes_per_sec'] / 1e6:10.2f} MB/s{extra}")
+    if args.json:
+        report = {"suite": "checksum.benchmark", "size": len(data), "results": rows}
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    checks = []
+    for name, spec in CATALOGUE.items():
+        checks.append((f"check.{name}", get_crc(name)(b"123456789") == spec.check))
+        checks.append((f"table.{name}", _table_only(name)(b"123456789") == spec.check))
+    for name, legacy in _LEGACY.items():
+        checks.append((f"legacy_equal.{name}", get_crc(name)(data) == legacy(data)))
+    view = memoryview(data)
+    for name in CATALOGUE:
+        crc = get_crc(name)
+        h = crc.new()
+        for offset in range(0, len(view), 1000):
+            h.update(view[offset : offset + 1000])
+        prefix = crc.new(view[:100])
+        forked = prefix.copy()
+        forked.update(view[100:])
+        streamed = h.value == crc(data) and forked.value == crc(data) and prefix.value == crc(view[:100])
+        checks.append((f"stream.{name}", streamed))
+    image = ROOT_DIR / "tmp" / "checksum_benchmark.bin"
+    image.parent.mkdir(parents=True, exist_ok=True)
+    image.write_bytes(data * 4)
+    checks.append(("stream.file", crc_file(image, "crc32", chunk_size=4096).value == get_crc("crc32")(data * 4)))
+    image.unlink()
+    by_name = {row["name"]: row for row in rows}
+    checks.append(("faster.crc16_modbus", by_name["crc16_modbus"]["speedup"] > 2))
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
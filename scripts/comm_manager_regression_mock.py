@@ -14,28 +14,39 @@ import infra.comm.communication_manager as cm
 
 
 class _FakeSerialManager:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(self, bus: EventBus, reactor=None, session_id: str | None = None) -> None:
         self._bus = bus
+        self._suffix = f".{session_id}" if session_id else ""
         self._open = False
         self.port = None
         self.baudrate = None
+        self.sent: list[bytes] = []
 
     def open(self, port: str, baudrate: int) -> bool:
         self.port = port
         self.baudrate = baudrate
         self._open = True
-        self._bus.publish("serial.opened", port)
+        self._bus.publish(f"serial.opened{self._suffix}", port)
         return True
 
     def close(self) -> None:
         self._open = False
-        self._bus.publish("serial.closed")
+        self._bus.publish(f"serial.closed{self._suffix}")
 
     def is_open(self) -> bool:
         return self._open
 
-    def send(self, _data: bytes) -> None:
-        pass
+    def send(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    def configure_tx(self, **options) -> None:
+        self.tx_options = options
+
+    def tx_stats(self) -> dict:
+        return {"depth_bytes": 0}
+
+    def inject_rx(self, data: bytes) -> None:
+        self._bus.publish(f"serial.rx{self._suffix}", data)
 
     @staticmethod
     def list_ports() -> list[str]:
@@ -43,8 +54,9 @@ class _FakeSerialManager:
 
 
 class _FakeTcpSession:
-    def __init__(self, bus: EventBus) -> None:
+    def __init__(self, bus: EventBus, reactor=None, session_id: str | None = None) -> None:
         self._bus = bus
+        self._suffix = f".{session_id}" if session_id else ""
         self._connected = False
         self.endpoint = None
 
@@ -57,11 +69,17 @@ class _FakeTcpSession:
 
     def close(self) -> None:
         self._connected = False
-        self._bus.publish("tcp.disconnected")
+        self._bus.publish(f"tcp.disconnected{self._suffix}")
 
     def send(self, _data: bytes) -> None:
         pass
 
+    def configure_tx(self, **options) -> None:
+        self.tx_options = options
+
+    def tx_stats(self) -> dict:
+        return {"depth_bytes": 0}
+
 
 def _wait_event(q: "queue.Queue[dict]", kind: str, timeout: float = 2.0) -> bool:
     end = time.time() + timeout
@@ -100,11 +118,42 @@ def main() -> int:
     mgr.close(notify=True)
     tcp_disconnected = _wait_event(events, "disconnected")
 
+    rx_all: "queue.Queue[bytes]" = queue.Queue()
+    rx_b: "queue.Queue[bytes]" = queue.Queue()
+    bus.subscribe("comm.rx", rx_all.put)
+    sid_a = mgr.open_serial("COM1", 115200)
+    sid_b = mgr.open_serial("COM2", 9600)
+    bus.subscribe(f"comm.rx.{sid_b}", rx_b.put)
+    sessions = {item["session_id"]: item for item in mgr.list_sessions()}
+    multi_open = bool(sid_a and sid_b) and set(sessions) == {sid_a, sid_b}
+    mgr.send(b"to-b", session_id=sid_b)
+    mgr.send(b"to-current")
+    fake_a = mgr._sessions[sid_a]  # type: ignore[attr-defined]
+    fake_b = mgr._sessions[sid_b]  # type: ignore[attr-defined]
+    routed = fake_b.sent == [b"to-b"] and fake_a.sent == [b"to-current"]
+    fake_a.inject_rx(b"A")
+    fake_b.inject_rx(b"B")
+    bus.wait_idle(2.0)
+    got_all = sorted([rx_all.get_nowait() for _ in range(rx_all.qsize())])
+    got_b = [rx_b.get_nowait() for _ in range(rx_b.qsize())]
+    per_session_rx = got_all == [b"A", b"B"] and got_b == [b"B"]
+    mgr.configure_tx(sid_b, frame_gap_sec=0.004)
+    tx_configured = getattr(fake_b, "tx_options", {}).get("frame_gap_sec") == 0.004
+    tx_configured = tx_configured and not hasattr(fake_a, "tx_options")
+    mgr.close_session(sid_a)
+    only_b_left = [item["session_id"] for item in mgr.list_sessions()] == [sid_b]
+    mgr.close_all()
+
     checks = [
         ("serial_connected", serial_connected),
         ("serial_disconnected", serial_disconnected),
         ("tcp_connected", tcp_connected),
         ("tcp_disconnected", tcp_disconnected),
+        ("multi.concurrent_sessions", multi_open),
+        ("multi.send_routing", routed),
+        ("multi.per_session_rx", per_session_rx),
+        ("multi.close_one", only_b_left),
+        ("multi.configure_tx", tx_configured),
     ]
     ok = True
     for name, passed in checks:
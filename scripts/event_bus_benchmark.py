@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from infra.common.event_bus import EventBus
+
+
+class _ThreadPerCallbackBus(EventBus):
+    """Previous dispatch model: one new thread per subscriber per publish."""
+
+    def publish(self, event_name: str, data: Any = None) -> None:
+        with self._lock:
+            listeners = [sub.callback for sub in self._subs.get(event_name, [])]
+        for callback in listeners:
+            thread = threading.Thread(
+                target=self._safe_invoke, args=(event_name, callback, data), daemon=True
+            )
+            thread.start()
+
+
+class _Collector:
+    def __init__(self, expected: int) -> None:
+        self.expected = expected
+        self.latencies_us: List[float] = []
+        self.out_of_order = 0
+        self._last_seq = -1
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+
+    def __call__(self, payload: Any) -> None:
+        seq, sent_ns = payload
+        latency_us = (time.perf_counter_ns() - sent_ns) / 1000.0
+        with self._lock:
+            if seq < self._last_seq:
+                self.out_of_order += 1
+            self._last_seq = max(self._last_seq, seq)
+            self.latencies_us.append(latency_us)
+            if len(self.latencies_us) >= self.expected:
+                self.done.set()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(len(ordered) * pct)) - 1))
+    return float(ordered[idx])
+
+
+def _run(bus: EventBus, events: int, subscribers: int, timeout: float, gap_us: float) -> Dict[str, Any]:
+    """Publish ``events`` to ``subscribers`` listeners; ``gap_us`` > 0 paces the publisher."""
+    topic = f"bench.rx.{gap_us}"
+    collectors = [_Collector(events) for _ in range(subscribers)]
+    for collector in collectors:
+        bus.subscribe(topic, collector)
+    gap_sec = gap_us / 1_000_000.0
+    t0 = time.perf_counter()
+    for seq in range(events):
+        if gap_sec:
+            # Sleep rather than spin: real producers block in read() and release the GIL.
+            time.sleep(gap_sec)
+        bus.publish(topic, (seq, time.perf_counter_ns()))
+    complete = all(c.done.wait(max(0.0, timeout - (time.perf_counter() - t0))) for c in collectors)
+    elapsed = time.perf_counter() - t0
+    latencies = [lat for c in collectors for lat in c.latencies_us]
+    delivered = len(latencies)
+    return {
+        "complete": complete,
+        "delivered": delivered,
+        "elapsed_sec": round(elapsed, 4),
+        "events_per_sec": round(delivered / max(elapsed, 1e-9), 1),
+        "latency_us": {
+            "p50": round(_percentile(latencies, 0.50), 1),
+            "p99": round(_percentile(latencies, 0.99), 1),
+            "max": round(max(latencies) if latencies else 0.0, 1),
+            "mean": round(statistics.mean(latencies) if latencies else 0.0, 1),
+        },
+        "out_of_order": sum(c.out_of_order for c in collectors),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare EventBus dispatch throughput and latency.")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--subscribers", type=int, default=4)
+    parser.add_argument("--paced-gap-us", type=float, default=500.0, help="publish gap for the latency run")
+    parser.add_argument("--timeout-sec", type=float, default=60.0)
+    parser.add_argument("--json", type=str, default="", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    EventBus._log = staticmethod(lambda _message: None)  # type: ignore[method-assign]
+    events = max(1, args.events)
+    subscribers = max(1, args.subscribers)
+
+    gap_us = max(0.0, args.paced_gap_us)
+
+    report: Dict[str, Any] = {
+        "suite": "event_bus.benchmark",
+        "events": events,
+        "subscribers": subscribers,
+        "paced_gap_us": gap_us,
+    }
+    for name, factory in (("thread_per_callback", _ThreadPerCallbackBus), ("worker_pool", EventBus)):
+        bus = factory()
+        report[name] = {
+            "burst": _run(bus, events, subscribers, args.timeout_sec, 0.0),
+            "paced": _run(bus, events, subscribers, args.timeout_sec, gap_us),
+        }
+        bus.close()
+    legacy = report["thread_per_callback"]
+    pooled = report["worker_pool"]
+    report["burst_speedup"] = round(
+        pooled["burst"]["events_per_sec"] / max(legacy["burst"]["events_per_sec"], 1e-9), 2
+    )
+    for name in ("thread_per_callback", "worker_pool"):
+        burst = report[name]["burst"]
+        paced = report[name]["paced"]
+        print(
+            f"{name:<20} burst events/s={burst['events_per_sec']:>10} "
+            f"paced p99={paced['latency_us']['p99']:>9}us "
+            f"out_of_order={burst['out_of_order'] + paced['out_of_order']}"
+        )
+    print(f"burst speedup={report['burst_speedup']}x")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    checks = [
+        ("pool.complete", pooled["burst"]["complete"] and pooled["paced"]["complete"]),
+        ("pool.ordered", pooled["burst"]["out_of_order"] + pooled["paced"]["out_of_order"] == 0),
+    ]
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
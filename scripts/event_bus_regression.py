@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+import sys
+from typing import Any, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from infra.common.chunk import Chunk
+from infra.common.event_bus import BackpressurePolicy, EventBus
+
+
+class _Gate:
+    """Subscriber that blocks until released, to build up a backlog."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.received: List[Any] = []
+
+    def __call__(self, payload: Any) -> None:
+        self.release.wait(5.0)
+        self.received.append(payload)
+
+
+def _stats(bus: EventBus, event_name: str) -> dict:
+    items = bus.subscriptions(event_name)
+    return items[0] if items else {}
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+
+    bus = EventBus(max_workers=4)
+    ordered: List[int] = []
+    bus.subscribe("t.order", ordered.append)
+    for i in range(2000):
+        bus.publish("t.order", i)
+    checks.append(("order.idle", bus.wait_idle(5.0)))
+    checks.append(("order.fifo", ordered == list(range(2000))))
+
+    gate = _Gate()
+    bus.subscribe("t.bounded", gate, policy=BackpressurePolicy.bounded(4))
+    for i in range(20):
+        bus.publish("t.bounded", i)
+    time.sleep(0.05)
+    stats = _stats(bus, "t.bounded")
+    gate.release.set()
+    bus.wait_idle(5.0)
+    # One item may already be in flight (popped) before the queue fills.
+    checks.append(("bounded.depth_capped", stats.get("depth", 99) <= 4))
+    checks.append(("bounded.keeps_oldest", gate.received[:4] == [0, 1, 2, 3]))
+    checks.append(("bounded.dropped_counted", stats.get("dropped", 0) >= 15))
+
+    gate = _Gate()
+    bus.subscribe("t.drop_oldest", gate, policy=BackpressurePolicy.drop_oldest(4))
+    for i in range(20):
+        bus.publish("t.drop_oldest", i)
+    time.sleep(0.05)
+    stats = _stats(bus, "t.drop_oldest")
+    gate.release.set()
+    bus.wait_idle(5.0)
+    checks.append(("drop_oldest.keeps_newest", gate.received[-4:] == [16, 17, 18, 19]))
+    checks.append(("drop_oldest.dropped_counted", stats.get("dropped", 0) >= 15))
+
+    gate = _Gate()
+    bus.set_policy("t.coalesce", BackpressurePolicy.coalesce(max_depth=8))
+    bus.subscribe("t.coalesce", gate)
+    bus.publish("t.coalesce", b"\x00")
+    time.sleep(0.05)
+    for i in range(1, 100):
+        bus.publish("t.coalesce", bytes([i]))
+    stats = _stats(bus, "t.coalesce")
+    gate.release.set()
+    bus.wait_idle(5.0)
+    merged = b"".join(gate.received)
+    checks.append(("coalesce.bytes_preserved", merged == bytes(range(100))))
+    checks.append(("coalesce.type_bytes", all(type(x) is bytes for x in gate.received)))
+    checks.append(("coalesce.merged", len(gate.received) < 10 and stats.get("coalesced", 0) >= 90))
+
+    gate = _Gate()
+    bus.subscribe("t.chunk", gate, policy=BackpressurePolicy.coalesce(max_depth=8))
+    bus.publish("t.chunk", Chunk(b"\x00", t_ns=1))
+    time.sleep(0.05)
+    for i in range(1, 10):
+        bus.publish("t.chunk", Chunk(bytes([i]), t_ns=1000 + i, session_id="s1"))
+    gate.release.set()
+    bus.wait_idle(5.0)
+    tail = gate.received[-1] if gate.received else b""
+    checks.append(("coalesce.chunk_kept", isinstance(tail, Chunk) and tail == bytes(range(1, 10))))
+    checks.append(("coalesce.chunk_first_ts", getattr(tail, "t_ns", None) == 1001 and tail.session_id == "s1"))
+
+    # 不同会话（或 Chunk 与普通 bytes）的数据块不合并，各自保留会话与时间戳。
+    gate = _Gate()
+    bus.subscribe("t.mixed", gate, policy=BackpressurePolicy.coalesce(max_depth=16))
+    bus.publish("t.mixed", Chunk(b"\x00", t_ns=1))
+    time.sleep(0.05)
+    for i, sid in enumerate(["a", "a", "b", "b", "a", None], start=1):
+        bus.publish("t.mixed", Chunk(bytes([i]), t_ns=1000 + i, session_id=sid) if sid else bytes([i]))
+    gate.release.set()
+    bus.wait_idle(5.0)
+    runs = [(getattr(x, "session_id", "-"), bytes(x), getattr(x, "t_ns", None)) for x in gate.received[1:]]
+    checks.append(
+        (
+            "coalesce.per_session",
+            runs
+            == [
+                ("a", b"\x01\x02", 1001),
+                ("b", b"\x03\x04", 1003),
+                ("a", b"\x05", 1005),
+                ("-", b"\x06", None),
+            ],
+        )
+    )
+
+    gate = _Gate()
+    bus.subscribe("t.block", gate, policy=BackpressurePolicy.block(2, timeout=0.05))
+    t0 = time.perf_counter()
+    for i in range(6):
+        bus.publish("t.block", i)
+    blocked_for = time.perf_counter() - t0
+    stats = _stats(bus, "t.block")
+    gate.release.set()
+    bus.wait_idle(5.0)
+    checks.append(("block.publisher_waited", blocked_for >= 0.05))
+    checks.append(("block.dropped_after_timeout", stats.get("dropped", 0) >= 1))
+
+    got: List[Any] = []
+    bus.subscribe("t.block_ok", got.append, policy=BackpressurePolicy.block(2, timeout=2.0))
+    for i in range(500):
+        bus.publish("t.block_ok", i)
+    bus.wait_idle(5.0)
+    checks.append(("block.lossless_with_fast_consumer", got == list(range(500))))
+
+    direct: List[Any] = []
+    bus.alias("t.serial.rx", "t.comm.rx")
+    bus.alias("t.tcp.rx", "t.comm.rx")
+    bus.subscribe("t.comm.rx", direct.append)
+    bus.publish("t.serial.rx", b"a")
+    bus.publish("t.tcp.rx", b"b")
+    bus.publish("t.comm.rx", b"c")
+    bus.wait_idle(5.0)
+    checks.append(("alias.single_hop", direct == [b"a", b"b", b"c"]))
+    comm_stats = bus.stats("t.comm.rx")["t.comm.rx"]
+    checks.append(("alias.stats_counted", comm_stats["published"] == 3 and comm_stats["bytes"] == 3))
+
+    traced: List[str] = []
+    bus.subscribe("t.stats", lambda _p: time.sleep(0.002))
+    EventBus._log = staticmethod(traced.append)  # type: ignore[method-assign]
+    for _ in range(5):
+        bus.publish("t.stats", b"\x01\x02\x03")
+    bus.wait_idle(5.0)
+    checks.append(("trace.off_by_default", not traced))
+    bus.set_trace(True)
+    bus.publish("t.stats", b"\x04")
+    bus.set_trace(False)
+    bus.wait_idle(5.0)
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks.append(("trace.opt_in", any("t.stats" in line for line in traced)))
+    topic = bus.stats("t.stats").get("t.stats", {})
+    handler = (topic.get("handlers") or [{}])[0]
+    latency = handler.get("latency", {})
+    checks.append(("stats.published", topic.get("published") == 6))
+    checks.append(("stats.bytes", topic.get("bytes") == 16))
+    checks.append(("stats.subscribers", topic.get("subscribers") == 1))
+    checks.append(("stats.delivered", handler.get("delivered") == 6))
+    checks.append(("stats.latency", latency.get("count") == 6 and latency.get("p50_us", 0) >= 1000))
+
+    bus.close()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from serial import SerialException
+
+from infra.common.event_bus import EventBus
+from infra.comm.serial_manager import SerialManager
+
+
+class _PollingSerialManager(SerialManager):
+    """Previous receive model: one thread per port polling in_waiting with a 20 ms idle sleep."""
+
+    def _start_reader(self) -> None:
+        self._rx_thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._rx_thread.start()
+
+    def _stop_reader(self) -> None:
+        pass
+
+    def _poll_loop(self) -> None:
+        while self._running:
+            ser = self._ser
+            if not ser:
+                time.sleep(0.1)
+                continue
+            try:
+                waiting = ser.in_waiting or 0
+                if waiting == 0:
+                    time.sleep(0.02)
+                    continue
+                data = ser.read(waiting)
+                if data:
+                    self.bus.publish("serial.rx", data)
+            except (SerialException, OSError):
+                time.sleep(0.1)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(len(ordered) * pct)) - 1))
+    return float(ordered[idx])
+
+
+def _open_ports(factory, bus: EventBus, count: int) -> tuple[list, list[int]]:
+    managers = []
+    masters: list[int] = []
+    for _ in range(count):
+        master, slave = os.openpty()
+        port = os.ttyname(slave)
+        mgr = factory(bus)
+        if not mgr.open(port, 115200):
+            raise RuntimeError(f"failed to open {port}")
+        os.close(slave)
+        managers.append(mgr)
+        masters.append(master)
+    return managers, masters
+
+
+def _run(name: str, factory, ports: int, iterations: int, idle_sec: float) -> Dict[str, Any]:
+    bus = EventBus()
+    received: "queue.Queue[int]" = queue.Queue()
+    bus.subscribe("serial.rx", lambda data: received.put(time.perf_counter_ns()))
+    managers, masters = _open_ports(factory, bus, ports)
+    time.sleep(0.2)
+    while not received.empty():
+        received.get_nowait()
+
+    cpu0 = time.process_time()
+    time.sleep(idle_sec)
+    idle_cpu = time.process_time() - cpu0
+
+    latencies_us: List[float] = []
+    timeouts = 0
+    for i in range(iterations):
+        master = masters[i % len(masters)]
+        t0 = time.perf_counter_ns()
+        os.write(master, b"\x01\x03\x00\x00\x00\x01\x84\x0A")
+        try:
+            t1 = received.get(timeout=1.0)
+        except queue.Empty:
+            timeouts += 1
+            continue
+        latencies_us.append((t1 - t0) / 1000.0)
+        time.sleep(0.002)
+
+    threads = threading.active_count()
+    for mgr in managers:
+        mgr.close()
+    for master in masters:
+        os.close(master)
+    bus.close()
+    return {
+        "name": name,
+        "ports": ports,
+        "samples": len(latencies_us),
+        "timeouts": timeouts,
+        "threads": threads,
+        "idle_cpu_sec": round(idle_cpu, 4),
+        "latency_us": {
+            "p50": round(_percentile(latencies_us, 0.50), 1),
+            "p99": round(_percentile(latencies_us, 0.99), 1),
+            "mean": round(statistics.mean(latencies_us) if latencies_us else 0.0, 1),
+            "max": round(max(latencies_us) if latencies_us else 0.0, 1),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare serial RX latency: polling loop vs IoReactor (pty pairs).")
+    parser.add_argument("--ports", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--idle-sec", type=float, default=1.0)
+    parser.add_argument("--json", type=str, default="", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    if not hasattr(os, "openpty"):
+        print("[SKIP] os.openpty not available on this platform")
+        print("RESULT: PASSED")
+        return 0
+
+    SerialManager._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    ports = max(1, args.ports)
+    iterations = max(1, args.iterations)
+    polling = _run("polling", _PollingSerialManager, ports, iterations, args.idle_sec)
+    reactor = _run("reactor", SerialManager, ports, iterations, args.idle_sec)
+
+    report = {"suite": "io_reactor.benchmark", "polling": polling, "reactor": reactor}
+    for item in (polling, reactor):
+        lat = item["latency_us"]
+        print(
+            f"{item['name']:<8} p50={lat['p50']:>9}us p99={lat['p99']:>9}us "
+            f"idle_cpu={item['idle_cpu_sec']}s threads={item['threads']} timeouts={item['timeouts']}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    checks = [
+        ("reactor.no_timeouts", reactor["timeouts"] == 0),
+        ("reactor.lower_p50", reactor["latency_us"]["p50"] < polling["latency_us"]["p50"]),
+    ]
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
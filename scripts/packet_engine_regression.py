@@ -2,14 +2,25 @@ from __future__ import annotations
 
 from pathlib import Path
 import sys
+import threading
+import time
+import tracemalloc
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from app.capture_file import CaptureFileReader
+from app.capture_record import CaptureRecord
 from app.packet_engine import PacketAnalysisEngine
+from dsl_runtime.protocol_package import load_protocol_packages
+from infra.common.chunk import Chunk, perf_to_wall
 from infra.common.event_bus import EventBus
+from infra.common.utils.checksum import crc16_xmodem
+from infra.protocol.detectors import DetectorRegistry, SchemaDetector
 from infra.protocol.protocol_loader import crc16_modbus
+from infra.protocol.schema_runtime import FieldDef, FrameDef, ProtocolSchema
+from infra.protocol.stream_framer import ModbusRtuRule, RtuFramer, StreamReassembler, char_gap_ns, read_rtu_frame, rtu_char_times_ns
 
 
 def _build_modbus_frame(body: bytes) -> bytes:
@@ -24,32 +35,393 @@ def main() -> int:
 
     checks: list[tuple[str, bool]] = []
 
+    # 帧的识别与解码由注册表完成：detect 选出识别器，decode 给出名称与错误。
+    registry = engine.detectors
+
+    def _decode(data: bytes):
+        detector, _score = registry.detect(data)
+        return detector, detector.decode(data) if detector is not None else None
+
     valid = _build_modbus_frame(bytes.fromhex("01 03 00 00 00 02"))
-    p_name, p_unknown, _summary, _tree, errors = engine._parse_protocol(valid)
-    checks.append(("valid.modbus_name", p_name == "Modbus RTU"))
-    checks.append(("valid.not_unknown", p_unknown is False))
-    checks.append(("valid.no_errors", len(errors) == 0))
+    detector, decoded = _decode(valid)
+    checks.append(("valid.modbus_name", decoded is not None and decoded.name == "Modbus RTU"))
+    checks.append(("valid.not_unknown", detector is not None))
+    checks.append(("valid.no_errors", decoded is not None and len(decoded.errors) == 0))
 
     bad_crc = valid[:-1] + bytes([valid[-1] ^ 0xFF])
-    p_name, p_unknown, _summary, _tree, errors = engine._parse_protocol(bad_crc)
-    has_crc_error = any(e.get("code") == "CRC_INVALID" for e in errors)
-    checks.append(("bad_crc.modbus_name", p_name == "Modbus RTU"))
-    checks.append(("bad_crc.not_unknown", p_unknown is False))
-    checks.append(("bad_crc.has_crc_error", has_crc_error))
+    detector, decoded = _decode(bad_crc)
+    checks.append(("bad_crc.modbus_name", decoded is not None and decoded.name == "Modbus RTU"))
+    checks.append(("bad_crc.not_unknown", detector is not None))
+    checks.append(("bad_crc.has_crc_error", decoded is not None and any(e.get("code") == "CRC_INVALID" for e in decoded.errors)))
 
     too_short = bytes.fromhex("01 03 00")
-    p_name, p_unknown, _summary, _tree, errors = engine._parse_protocol(too_short)
-    has_short_error = any(e.get("code") == "FRAME_TOO_SHORT" for e in errors)
-    checks.append(("short.modbus_name", p_name == "Modbus RTU"))
-    checks.append(("short.not_unknown", p_unknown is False))
-    checks.append(("short.has_short_error", has_short_error))
+    detector, decoded = _decode(too_short)
+    checks.append(("short.modbus_name", decoded is not None and decoded.name == "Modbus RTU"))
+    checks.append(("short.not_unknown", detector is not None))
+    checks.append(("short.has_short_error", decoded is not None and any(e.get("code") == "FRAME_TOO_SHORT" for e in decoded.errors)))
 
     exc_invalid_len = _build_modbus_frame(bytes.fromhex("01 83 02 01"))
-    p_name, p_unknown, _summary, _tree, errors = engine._parse_protocol(exc_invalid_len)
-    has_len_error = any(e.get("code") == "LENGTH_INVALID" for e in errors)
-    checks.append(("exception_len.modbus_name", p_name == "Modbus RTU"))
-    checks.append(("exception_len.not_unknown", p_unknown is False))
-    checks.append(("exception_len.has_len_error", has_len_error))
+    detector, decoded = _decode(exc_invalid_len)
+    checks.append(("exception_len.modbus_name", decoded is not None and decoded.name == "Modbus RTU"))
+    checks.append(("exception_len.not_unknown", detector is not None))
+    checks.append(("exception_len.has_len_error", decoded is not None and any(e.get("code") == "LENGTH_INVALID" for e in decoded.errors)))
+
+    frames: list[CaptureRecord] = []
+    bus.subscribe("capture.frame", frames.append)
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    stamped = Chunk(valid, t_ns=123_456_789_000)
+    bus.publish("comm.rx", stamped)
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    frame = frames[0] if frames else None
+    checks.append(("timestamp.source_ns", frame is not None and frame.t_ns == stamped.t_ns))
+    checks.append(("timestamp.wall_anchor", frame is not None and frame.timestamp == perf_to_wall(stamped.t_ns)))
+
+    # 惰性渲染：发布的是紧凑记录，打开帧时才生成 hex dump / 协议树。
+    checks.append(("lazy.compact_record", frame is not None and not hasattr(frame, "__dict__") and frame.protocol_id == "modbus_rtu"))
+    detail = engine.frame_detail(frame.id) if frame is not None else None
+    checks.append(
+        (
+            "lazy.detail_on_demand",
+            detail is not None
+            and detail["detail"] is True
+            and detail["hex_dump"]["bytes"] == [f"{b:02X}" for b in valid]
+            and detail["protocol"]["name"] == "Modbus RTU"
+            and bool(detail["tree"])
+            and not detail["errors"],
+        )
+    )
+    listed = frame.to_dict() if frame is not None else {}
+    checks.append(("lazy.list_form", listed.get("raw_hex") == valid.hex(" ").upper() and "tree" not in listed and "hex_dump" not in listed))
+    checks.append(("lazy.unknown_id", engine.frame_detail("rx-0-0") is None))
+
+    # 分帧：半帧分两次读到时只输出一帧，时间戳取首字节所在块。
+    frames.clear()
+    reply = _build_modbus_frame(bytes.fromhex("01 03 04 00 0A 00 0B"))
+    # 引擎按当前时钟判断残帧超时，这里用真实时钟打戳。
+    t0 = time.perf_counter_ns()
+    bus.publish("comm.rx", Chunk(reply[:3], t_ns=t0))
+    bus.publish("comm.rx", Chunk(reply[3:], t_ns=t0 + 500_000))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("reassembly.split_one_frame", len(frames) == 1 and frames[0].length == len(reply)))
+    checks.append(("reassembly.split_valid", bool(frames) and not frames[0].has_errors))
+    checks.append(("reassembly.split_first_byte_ts", bool(frames) and frames[0].t_ns == t0))
+
+    # 三帧合并在一次读取中：拆成三帧。
+    frames.clear()
+    write_req = _build_modbus_frame(bytes.fromhex("01 10 00 01 00 02 04 00 0A 01 02"))
+    exc = _build_modbus_frame(bytes.fromhex("01 83 02"))
+    bus.publish("comm.tx", Chunk(valid + write_req + exc))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    lengths = [f.length for f in frames]
+    checks.append(("reassembly.coalesced_split", lengths == [len(valid), len(write_req), len(exc)]))
+    checks.append(("reassembly.coalesced_valid", all(not f.has_errors for f in frames)))
+
+    # 无法按规则切分的数据：停止后把残留字节作为一帧输出。
+    frames.clear()
+    bus.publish("comm.rx", Chunk(b"\x7f\x7f\x7f"))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("reassembly.flush_on_stop", [f.length for f in frames] == [3]))
+
+    # 多会话：两台设备的半帧交错到达，按会话各自拼帧；一个会话重连/断开只冲刷它自己的残帧。
+    frames.clear()
+    bus.publish("capture.control", {"action": "start"})
+    for port in ("COM1", "COM2"):
+        bus.publish("comm.connected", {"type": "serial", "port": port, "baud": 9600, "session_id": f"serial:{port}"})
+    bus.wait_idle(2.0)
+    other = _build_modbus_frame(bytes.fromhex("01 03 04 00 02 03 04"))
+    char_ns = rtu_char_times_ns(9600)[0]
+    t_ns = time.perf_counter_ns() + 3_600_000_000_000
+    for part_a, part_b in ((reply[:3], other[:3]), (reply[3:], other[3:])):
+        t_ns += len(part_a) * char_ns
+        bus.publish("comm.rx", Chunk(part_a, t_ns=t_ns, session_id="serial:COM1"))
+        bus.publish("comm.rx", Chunk(part_b, t_ns=t_ns, session_id="serial:COM2"))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    per_session = sorted((f.channel, f.data, f.baud, f.has_errors) for f in frames)
+    checks.append(("sessions.interleaved_halves", per_session == [("COM1", reply, 9600, False), ("COM2", other, 9600, False)]))
+    frames.clear()
+    t_ns += 1_000_000_000
+    bus.publish("comm.rx", Chunk(other[:3], t_ns=t_ns, session_id="serial:COM2"))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.publish("comm.connected", {"type": "serial", "port": "COM1", "baud": 9600, "session_id": "serial:COM1"})
+    bus.publish("comm.disconnected.serial:COM1", None)
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.publish("comm.rx", Chunk(other[3:], t_ns=t_ns + len(other[3:]) * char_ns, session_id="serial:COM2"))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("sessions.other_partial_kept", [(f.channel, f.data) for f in frames] == [("COM2", other)]))
+    checks.append(("sessions.disconnect_per_session", "serial:COM1" not in engine._sessions and "serial:COM2" in engine._sessions))
+
+    # 代理串口通道：proxy.data 带线路波特率时按 t3.5 静默分帧（噪声与随后的帧分开），记录带波特率。
+    frames.clear()
+    t_ns += 1_000_000_000
+    proxy_route = {"src": "COM7", "dst": "COM8", "src_role": "device", "host_port": "COM8", "baud": 9600}
+    bus.publish("proxy.data", {**proxy_route, "data": b"\x7f\x7f", "t_ns": t_ns})
+    bus.publish("proxy.data", {**proxy_route, "data": reply, "t_ns": t_ns + 10_000_000 + len(reply) * char_ns})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("proxy.serial_t35_cut", [(f.channel, f.data, f.baud) for f in frames] == [("COM8", b"\x7f\x7f", 9600), ("COM8", reply, 9600)]))
+
+    # 分帧规则取自配置的协议而非地址前缀：TCP 通道上转发的 RTU 按 RTU 长度拆开，网关的 Modbus TCP 侧按 MBAP 拆开。
+    frames.clear()
+    mbap = [bytes.fromhex("0001 0000 0006 01 03 0000 0002"), bytes.fromhex("0002 0000 0006 01 03 0010 0001")]
+    t_ns += 1_000_000_000
+    bus.publish("proxy.data", {"src": "tcp://10.0.0.5:4001", "src_role": "device", "data": reply + other, "t_ns": t_ns})
+    bus.publish("proxy.data", {"src": "tcp-listen://0.0.0.0:502", "src_role": "host", "framing": "modbus_tcp", "data": b"".join(mbap), "t_ns": t_ns})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    by_rule = {(f.channel, f.data) for f in frames}
+    checks.append(("framing.rtu_over_tcp", {("tcp://10.0.0.5:4001", reply), ("tcp://10.0.0.5:4001", other)} <= by_rule))
+    checks.append(("framing.gateway_mbap", {("tcp-listen://0.0.0.0:502", m) for m in mbap} <= by_rule and len(frames) == 4))
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    # capture.control start 的 framing 作用于未配置波特率的通道（如 Modbus TCP 客户端会话）。
+    frames.clear()
+    bus.publish("capture.control", {"action": "start", "framing": "modbus_tcp"})
+    bus.publish("comm.connected", {"type": "tcp", "host": "10.0.0.9", "port": 502, "address": "10.0.0.9:502", "session_id": "tcp:10.0.0.9:502"})
+    bus.wait_idle(2.0)
+    bus.publish("comm.tx", Chunk(b"".join(mbap), t_ns=t_ns + 1_000_000_000, session_id="tcp:10.0.0.9:502"))
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    checks.append(("framing.capture_config", [(f.channel, f.data) for f in frames] == [("10.0.0.9:502", m) for m in mbap]))
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine.wait_idle(5.0)
+    bus.wait_idle(2.0)
+
+    # 记录与渲染结果的内存对比：1000 帧记录应比同样数量的完整渲染小一个数量级。
+    records = [engine._build_frame("RX", reply, t0 + i, "mem") for i in range(1000)]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [engine._build_frame("RX", reply, t0 + i, "mem") for i in range(1000)]
+    record_bytes = tracemalloc.get_traced_memory()[0] - base
+    base = tracemalloc.get_traced_memory()[0]
+    details = [engine.render_detail(r) for r in records]
+    detail_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    checks.append(("lazy.memory_ratio", len(kept) == len(details) and detail_bytes >= 10 * record_bytes))
+    checks.append(("lazy.bad_crc_codes", engine._build_frame("RX", bad_crc, t0, "mem").error_codes == ("CRC_INVALID",)))
+
+    # 分帧器本身：字符间隔切分、逐字节喂入、垃圾后重新同步。
+    framer = StreamReassembler(None, "RX", gap_ns=char_gap_ns(9600))
+    out = framer.feed(b"AT\r", 1_000_000) + framer.feed(b"\n", 2_000_000) + framer.feed(b"OK\r\n", 50_000_000)
+    out += framer.poll(100_000_000)
+    checks.append(("framer.gap_cut", [data for data, _ in out] == [b"AT\r\n", b"OK\r\n"]))
+    framer = StreamReassembler(ModbusRtuRule(), "RX", gap_ns=char_gap_ns(115200))
+    stream = (reply + valid) * 50
+    out = []
+    for i, byte in enumerate(stream):
+        out += framer.feed(bytes([byte]), i * 100_000)
+    checks.append(("framer.bytewise", [data for data, _ in out] == [reply, valid] * 50 and framer.pending == 0))
+    out = framer.feed(b"\xff\xee\xdd", 10_000_000_000) + framer.feed(reply, 20_000_000_000)
+    checks.append(("framer.resync_after_gap", [data for data, _ in out] == [b"\xff\xee\xdd", reply]))
+    checks.append(("framer.gap_from_baud", char_gap_ns(1200) == int(3.5 * 11 * 1e9 / 1200) and char_gap_ns(115200) == 5_000_000))
+
+    # RTU 静默间隔：9600 baud 下 t3.5 约 4 ms；数据块间静默按块传输时间修正。
+    char_ns, t15_ns, t35_ns = rtu_char_times_ns(9600)
+    checks.append(("rtu.times_low_baud", t35_ns == int(3.5 * char_ns) and t15_ns == int(1.5 * char_ns)))
+    checks.append(("rtu.times_high_baud", rtu_char_times_ns(115200)[1:] == (750_000, 1_750_000)))
+    framer = RtuFramer(9600, "RX", jitter_ns=0)
+    unknown = b"\x01\x2b\x0e\x01\x00"
+    t = 1_000_000_000
+    out = framer.feed(unknown, t)
+    # 下一块在上一块结束后 10 ms 开始：t3.5 边界，未知功能码的帧按静默切出。
+    t += 10_000_000 + len(valid) * char_ns
+    out += framer.feed(valid, t)
+    checks.append(("rtu.t35_cut", [data for data, _ in out] == [unknown, valid]))
+    # 115200 baud 下半帧紧随到达（时间戳差约等于第二块传输时间）：合并而不是切开。
+    framer = RtuFramer(115200, "RX")
+    char_hi = rtu_char_times_ns(115200)[0]
+    t = 2_000_000_000
+    out = framer.feed(reply[:4], t)
+    out += framer.feed(reply[4:] + valid, t + (len(reply) - 4 + len(valid)) * char_hi)
+    checks.append(("rtu.merge_high_baud", [data for data, _ in out] == [reply, valid]))
+    # 帧内停顿介于 t1.5 与 t3.5 之间：不切帧，计入违规。
+    framer = RtuFramer(9600, "RX", jitter_ns=0)
+    t = 3_000_000_000
+    out = framer.feed(reply[:4], t)
+    out += framer.feed(reply[4:], t + (t15_ns + t35_ns) // 2 + (len(reply) - 4) * char_ns)
+    checks.append(("rtu.t15_violation", [data for data, _ in out] == [reply] and framer.stats()["t15_violations"] == 1))
+
+    class _DribbleChannel:
+        """Serves the reply a few bytes per read, then nothing."""
+
+        baudrate = 115200
+
+        def __init__(self, data: bytes) -> None:
+            self._data = bytearray(data)
+
+        def read(self, size: int = 1, timeout: float = 1.0) -> bytes:
+            out = bytes(self._data[:3])
+            del self._data[:3]
+            return out
+
+    t_start = time.perf_counter()
+    got = read_rtu_frame(_DribbleChannel(reply + b"\x01"), timeout_s=2.0)
+    checks.append(("rtu.read_returns_on_frame", got == reply and time.perf_counter() - t_start < 0.5))
+    t_start = time.perf_counter()
+    got = read_rtu_frame(_DribbleChannel(b"\x01\x2b\x0e\x01"), timeout_s=2.0)
+    checks.append(("rtu.read_returns_on_silence", got == b"\x01\x2b\x0e\x01" and time.perf_counter() - t_start < 0.5))
+
+    # 协议识别：内置 Modbus RTU + 协议包 probe/decode + schema 帧。
+    registry = DetectorRegistry.with_builtin()
+    registry.register_packages(load_protocol_packages(ROOT_DIR / "protocols").packages)
+    schema = ProtocolSchema(
+        {
+            "status": FrameDef(
+                name="status",
+                header=b"\xAA\x55",
+                tail=b"",
+                crc="crc16_modbus",
+                fields=[FieldDef(name="cmd", ftype="u8"), FieldDef(name="value", ftype="u16")],
+            )
+        }
+    )
+    registry.register(SchemaDetector(schema, name="Demo"))
+    ymodem_payload = b"fw.bin\x0012\x00".ljust(128, b"\x00")
+    xmodem_payload = bytes(range(128))
+    samples = {
+        "modbus_rtu": valid,
+        "at_command": b"AT+CSQ\r\n",
+        "scpi": b"*IDN?\n",
+        "modbus_tcp": bytes.fromhex("0001 0000 0006 01 03 0000 0002"),
+        "modbus_ascii": b":010300000002FA\r\n",
+        "ymodem": b"\x01\x00\xff" + ymodem_payload + crc16_xmodem(ymodem_payload).to_bytes(2, "big"),
+        "xmodem": b"\x01\x01\xfe" + xmodem_payload + bytes([sum(xmodem_payload) & 0xFF]),
+        "schema:Demo": schema.build("status", {"cmd": 1, "value": 300}),
+    }
+    detected = {}
+    for expected_id, sample in samples.items():
+        detector, _score = registry.detect(sample, channel=f"ch-{expected_id}")
+        detected[expected_id] = detector.id if detector else None
+    checks.append(("detect.mixed_protocols", all(detected[k] == k for k in samples)))
+    at_reply = registry.detect(b"+CSQ: 20,99\r\n\r\nOK\r\n", channel="ch-at_command")[0]
+    scpi_err = registry.detect(b'-113,"Undefined header"\n', channel="ch-scpi")[0]
+    checks.append(("detect.replies", at_reply is not None and at_reply.id == "at_command" and scpi_err is not None and scpi_err.id == "scpi"))
+    decoded = registry.detect(samples["schema:Demo"])[0].decode(samples["schema:Demo"])  # type: ignore[union-attr]
+    checks.append(("detect.schema_decode", any(row["label"] == "value" and row["value"] == "300" for row in decoded.tree)))
+    tcp_decoded = registry.detect(samples["modbus_tcp"], channel="ch-modbus_tcp")[0].decode(samples["modbus_tcp"])  # type: ignore[union-attr]
+    checks.append(("detect.package_decode", tcp_decoded.name == "Modbus TCP" and not tcp_decoded.errors))
+    # 稳态：同一通道同一协议，每帧只探测一次（缓存命中）。
+    before = registry.stats()
+    for _ in range(100):
+        registry.detect(samples["at_command"], channel="steady")
+    after = registry.stats()
+    checks.append(("detect.one_probe_steady_state", after["probes"] - before["probes"] <= 100 + len(samples) and after["cache_hits"] - before["cache_hits"] >= 99))
+    checks.append(("detect.hit_rate_order", after["order"][0] == "at_command"))
+    checks.append(("detect.unknown", registry.detect(b"\xfe\xfd\xfc\xfb\xfa", channel="noise")[0] is None))
+    # 解码分片共享注册表：并发 detect/reset_cache 时统计与命中计数不丢。
+    shared = DetectorRegistry.with_builtin()
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def _detect_loop(index: int) -> None:
+        for i in range(5000):
+            shared.detect(valid, channel=f"shard{index}")
+            if i % 100 == 0:
+                shared.reset_cache(f"shard{index}")
+
+    workers = [threading.Thread(target=_detect_loop, args=(i,)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    sys.setswitchinterval(switch_interval)
+    shared_stats = shared.stats()
+    checks.append(("detect.shared_stats", shared_stats["frames"] == 20000 and shared_stats["hits"]["modbus_rtu"] == 20000 and shared_stats["cache_hits"] == 20000 - 4 * 51))
+
+    # 多解码分片：通道固定到分片，同一通道内帧序不变，各分片报告队列深度与解码耗时。
+    bus.close()
+    record_path = ROOT_DIR / "tmp" / "packet_engine_shards.pfcap"
+    record_path.parent.mkdir(parents=True, exist_ok=True)
+    for workers in (1, 4):
+        bus = EventBus()
+        engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), workers=workers)
+        by_channel: dict[str, list[CaptureRecord]] = {}
+        bus.subscribe("capture.frame", lambda r: by_channel.setdefault(r.channel, []).append(r))
+        bus.publish("capture.control", {"action": "start", "record_path": str(record_path)})
+        bus.wait_idle(2.0)
+        channels = [f"COM{i}" for i in range(1, 9)]
+        started = time.perf_counter()
+        # 源时间戳取在墙钟之后：发布线程被抢占时，空闲轮询不会把半帧按间隔切开。
+        t_ns = time.perf_counter_ns() + 3_600_000_000_000
+        for seq in range(200):
+            frame = _build_modbus_frame(bytes([1, 3, 2]) + seq.to_bytes(2, "big"))
+            for channel in channels:
+                # 半帧分两次到达，由所在分片的分帧器拼回。
+                for part in (frame[:3], frame[3:]):
+                    t_ns += 1_000
+                    bus.publish("proxy.data", {"src": channel, "src_role": "device", "data": Chunk(part, t_ns=t_ns), "t_ns": t_ns})
+        bus.wait_idle(5.0)
+        engine.wait_idle(10.0)
+        bus.publish("capture.control", {"action": "stop"})
+        bus.wait_idle(5.0)
+        engine.wait_idle(10.0)
+        bus.wait_idle(5.0)
+        elapsed = time.perf_counter() - started
+        stats = engine.decode_stats()
+        print(f"decode workers={workers}: 1600 frames in {elapsed:.3f}s; shards " + ", ".join(f"#{s['shard']} {s['frames']}f {s['decode_us_mean']}us" for s in stats["shards"]))
+        ordered = all(
+            [int.from_bytes(r.data[3:5], "big") for r in by_channel.get(channel, [])] == list(range(200)) for channel in channels
+        )
+        checks.append((f"shards{workers}.per_channel_order", ordered and sum(len(v) for v in by_channel.values()) == 1600))
+        checks.append((f"shards{workers}.stats", stats["workers"] == workers and sum(s["frames"] for s in stats["shards"]) == 1600 and sum(s["chunks"] for s in stats["shards"]) == 3200))
+        checks.append((f"shards{workers}.balanced", all(len(s["channels"]) == 8 // workers and s["max_queue_depth"] >= 1 and s["queue_depth"] == 0 for s in stats["shards"])))
+        with CaptureFileReader(record_path) as reader:
+            checks.append((f"shards{workers}.recording_closed_after_all_shards", reader.complete and len(reader) == 1600))
+        checks.append((f"shards{workers}.stats_event", engine.capture_stats()["decode"]["workers"] == workers))
+        bus.close()
+    record_path.unlink(missing_ok=True)
+
+    # 单个数据块处理抛异常只丢这一帧：分片线程继续解码，wait_idle 不被挂住。
+    bus = EventBus()
+    engine = PacketAnalysisEngine(bus, detectors=DetectorRegistry.with_builtin(), workers=1)
+    survived: list[CaptureRecord] = []
+    bus.subscribe("capture.frame", survived.append)
+    observe = engine._transactions.observe
+    failures = [RuntimeError("matcher exploded")]
+
+    def _failing_observe(record: CaptureRecord) -> None:
+        if failures:
+            raise failures.pop()
+        observe(record)
+
+    engine._transactions.observe = _failing_observe  # type: ignore[method-assign]
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    t_ns = time.perf_counter_ns()
+    for seq in range(3):
+        frame = _build_modbus_frame(bytes([1, 3, 2]) + seq.to_bytes(2, "big"))
+        t_ns += 50_000_000
+        bus.publish("proxy.data", {"src": "COM1", "src_role": "device", "data": Chunk(frame, t_ns=t_ns), "t_ns": t_ns})
+    bus.wait_idle(5.0)
+    idle = engine.wait_idle(5.0)
+    bus.wait_idle(5.0)
+    checks.append(("shards.survive_bad_chunk", idle and [int.from_bytes(r.data[3:5], "big") for r in survived] == [1, 2] and engine.decode_stats()["shards"][0]["queue_depth"] == 0))
+    bus.close()
 
     ok = True
     for name, passed in checks:
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import os
+import select
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from infra.common.event_bus import EventBus
+from infra.comm.proxy_forward_manager import ENGINE_LOOP, ProxyForwardManager
+
+_PAIRS = 24
+
+
+def _read_exact(fd: int, size: int, timeout: float) -> bytes:
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while len(buf) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            break
+        buf.extend(os.read(fd, size - len(buf)))
+    return bytes(buf)
+
+
+class _PtyPair:
+    """两对 pty：代理打开从端，测试在主端扮演上位机与设备。"""
+
+    def __init__(self) -> None:
+        self.host_master, self._host_slave = os.openpty()
+        self.device_master, self._device_slave = os.openpty()
+        self.config = {
+            "hostPort": os.ttyname(self._host_slave),
+            "devicePort": os.ttyname(self._device_slave),
+            "baud": 115200,
+        }
+
+    def opened(self) -> None:
+        # 代理已打开从端后关闭本进程持有的从端描述符，设备端挂断才能被代理感知。
+        for fd in (self._host_slave, self._device_slave):
+            os.close(fd)
+
+    def close(self) -> None:
+        for fd in (self.host_master, self.device_master):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _round_trip(pair: _PtyPair, tag: bytes) -> bool:
+    os.write(pair.host_master, b"REQ" + tag)
+    os.write(pair.device_master, b"RSP" + tag)
+    return (
+        _read_exact(pair.device_master, 3 + len(tag), 1.0) == b"REQ" + tag
+        and _read_exact(pair.host_master, 3 + len(tag), 1.0) == b"RSP" + tag
+    )
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _relay_threads() -> List[str]:
+    return [t.name for t in threading.enumerate() if t.name.startswith("ProxyLoop")]
+
+
+def main() -> int:
+    if not hasattr(os, "openpty"):
+        print("[SKIP] os.openpty not available on this platform")
+        print("RESULT: PASSED")
+        return 0
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: List[Tuple[str, bool]] = []
+
+    # 24 对端口由同一个事件循环服务。
+    bus = EventBus()
+    statuses: List[Dict[str, Any]] = []
+    data_events: List[Dict[str, Any]] = []
+    bus.subscribe("proxy.status", statuses.append)
+    bus.subscribe("proxy.data", data_events.append)
+    threads_before = threading.active_count()
+    manager = ProxyForwardManager(bus, engine=ENGINE_LOOP)
+    pairs = [_PtyPair() for _ in range(_PAIRS)]
+    started = [manager.start_pair(f"p{i}", pair.config).ok for i, pair in enumerate(pairs)]
+    for pair in pairs:
+        pair.opened()
+    checks.append(("loop.start_all", all(started)))
+    checks.append(("loop.one_relay_thread", _relay_threads() == ["ProxyLoop-0"]))
+    forwarded = all(_round_trip(pair, f"{i:02d}".encode()) for i, pair in enumerate(pairs))
+    checks.append(("loop.forward_all_pairs", forwarded))
+    _wait_for(lambda: len(data_events) >= 2 * _PAIRS and bus.wait_idle(0.1))
+    # 每对只多出一个 tap 发布线程，不再有逐对的转发线程。
+    print(f"{_PAIRS} pairs: {threading.active_count() - threads_before} new threads, relay threads {_relay_threads()}")
+    checks.append(("loop.thread_budget", threading.active_count() - threads_before <= _PAIRS + 1 + 8))
+    checks.append(("loop.proxy_data", len(data_events) == 2 * _PAIRS and {e["src_role"] for e in data_events} == {"host", "device"}))
+
+    stats = manager.pair_stats()
+    p0 = stats.get("p0", {})
+    checks.append(
+        (
+            "loop.pair_stats",
+            len(stats) == _PAIRS
+            and p0.get("engine") == ENGINE_LOOP
+            and p0["host_to_device"]["bytes"] == 5
+            and p0["device_to_host"]["bytes"] == 5
+            and p0["host_to_device"]["bytes_per_sec"] > 0
+            and set(p0["host_to_device"]) >= {"max_gap_ms", "write_stalls", "write_stall_ms"},
+        )
+    )
+
+    # 设备端不读：对端写不完时暂停读上位机端并计 write stall，同一循环中的其他会话照常转发。
+    slow = pairs[1]
+    payload = bytes(range(256)) * 1024
+    writer_done = threading.Event()
+
+    def _writer() -> None:
+        view = memoryview(payload)
+        while view:
+            _r, writable, _x = select.select([], [slow.host_master], [], 15.0)
+            if not writable:
+                break
+            view = view[os.write(slow.host_master, view[:4096]):]
+        writer_done.set()
+
+    writer = threading.Thread(target=_writer, daemon=True)
+    writer.start()
+    # pty 缓冲写满后转发字节数不再增长，此时设备端积压、上位机端暂停读取。
+    last = -1
+    for _ in range(50):
+        time.sleep(0.2)
+        current = manager.pair_stats("p1")["p1"]["host_to_device"]["bytes"]
+        if current == last:
+            break
+        last = current
+    others_ok = all(_round_trip(pairs[i], b"x") for i in (0, 2, _PAIRS - 1))
+    checks.append(("stall.other_pairs_not_blocked", others_ok))
+    received = _read_exact(slow.device_master, len(payload), 10.0)
+    writer.join(timeout=5.0)
+    h2d = manager.pair_stats("p1")["p1"]["host_to_device"]
+    print(f"stalled pair: {h2d}")
+    checks.append(("stall.bytes_in_order", writer_done.is_set() and received == payload))
+    checks.append(("stall.counted", last > 0 and h2d["write_stalls"] >= 1 and h2d["write_stall_ms"] > 0 and h2d["max_gap_ms"] > 0))
+
+    # stop_pair 只注销该会话，其余会话继续由同一循环转发。
+    manager.stop_pair("p3")
+    checks.append(("stop_pair.removed", "p3" not in manager.pair_stats() and len(manager.pair_stats()) == _PAIRS - 1))
+    checks.append(("stop_pair.others_forward", _round_trip(pairs[4], b"after") and _relay_threads() == ["ProxyLoop-0"]))
+    restarted = _PtyPair()
+    checks.append(("stop_pair.restart", manager.start_pair("p3", restarted.config).ok))
+    restarted.opened()
+    checks.append(("stop_pair.restarted_forwards", _round_trip(restarted, b"again")))
+
+    # 设备端挂断：该会话报错，其余会话不受影响。
+    os.close(pairs[5].device_master)
+    hung_up = _wait_for(lambda: any(s.get("pair_id") == "p5" and s.get("status") == "error" for s in statuses))
+    checks.append(("hangup.error_status", hung_up))
+    checks.append(("hangup.others_forward", _round_trip(pairs[6], b"still")))
+
+    manager.stop_all()
+    bus.wait_idle(2.0)
+    checks.append(("stop_all.status", sum(1 for s in statuses if s.get("status") == "stopped") == _PAIRS + 1))
+    for pair in pairs + [restarted]:
+        pair.close()
+    bus.close()
+
+    # loops=N：会话分散到 N 个循环，按负载均衡。
+    bus = EventBus()
+    manager = ProxyForwardManager(bus, engine="LOOP", loops=3)
+    pairs = [_PtyPair() for _ in range(6)]
+    ok = all(manager.start_pair(f"q{i}", pair.config).ok for i, pair in enumerate(pairs))
+    for pair in pairs:
+        pair.opened()
+    ok = ok and all(_round_trip(pair, b"n") for pair in pairs)
+    checks.append(("loops.balanced", ok and sorted(_relay_threads()) == ["ProxyLoop-0", "ProxyLoop-1", "ProxyLoop-2"]))
+    manager.stop_all()
+    for pair in pairs:
+        pair.close()
+    bus.close()
+
+    # 未知引擎回退到线程模式。
+    bus = EventBus()
+    checks.append(("engine.unknown_falls_back", ProxyForwardManager(bus, engine="fibers").engine == "threads"))
+    bus.close()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
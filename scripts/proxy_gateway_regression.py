@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.capture_record import CaptureRecord
+from app.packet_engine import PacketAnalysisEngine
+from dsl_runtime.protocol_package import load_protocol_packages
+from infra.common.event_bus import EventBus
+from infra.common.utils.checksum import crc16_modbus
+from infra.comm.modbus_gateway import ModbusTcpRtuGateway
+from infra.comm.proxy_endpoints import parse_address
+from infra.comm.proxy_forward_manager import ENGINE_LOOP, ENGINE_THREADS, ProxyForwardManager
+from infra.protocol.detectors import DetectorRegistry
+
+
+def _rtu(body: bytes) -> bytes:
+    return body + crc16_modbus(body).to_bytes(2, "little")
+
+
+def _read_exact(fd: int, size: int, timeout: float = 1.0) -> bytes:
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while len(buf) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            break
+        buf.extend(os.read(fd, size - len(buf)))
+    return bytes(buf)
+
+
+def _recv_exact(sock: socket.socket, size: int, timeout: float = 1.0) -> bytes:
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while len(buf) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+            break
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            break
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _connect(manager: ProxyForwardManager, pair_id: str) -> socket.socket:
+    host, port = parse_address("tcp://" + manager.pair_stats(pair_id)[pair_id]["host"]["address"], "tcp://")
+    return socket.create_connection(("127.0.0.1" if host == "0.0.0.0" else host, port), timeout=2.0)
+
+
+class _Pty:
+    def __init__(self) -> None:
+        self.master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+
+    def opened(self) -> None:
+        os.close(self._slave)
+
+    def close(self) -> None:
+        os.close(self.master)
+
+
+class _Server:
+    """被拦截的 TCP 服务端：原样回显。"""
+
+    def __init__(self) -> None:
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.conn: List[socket.socket] = []
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        try:
+            conn, _addr = self.listener.accept()
+        except OSError:
+            return
+        self.conn.append(conn)
+        while True:
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            conn.sendall(data)
+
+    def close(self) -> None:
+        for sock in self.conn:
+            # 先 shutdown 再 close：服务线程仍阻塞在 recv 上时也能发出 FIN。
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self.listener.close()
+
+
+def _serial_over_tcp(engine: str, checks: List[Tuple[str, bool]]) -> None:
+    # 串口设备暴露为本地 TCP 端口：客户端连接监听端，数据经代理到串口。
+    bus = EventBus()
+    statuses: List[Dict[str, Any]] = []
+    data_events: List[Dict[str, Any]] = []
+    bus.subscribe("proxy.status", statuses.append)
+    bus.subscribe("proxy.data", data_events.append)
+    manager = ProxyForwardManager(bus, engine=engine)
+    device = _Pty()
+    result = manager.start_pair("gw", {"hostPort": "tcp-listen://127.0.0.1:0", "devicePort": device.port, "baud": 115200})
+    device.opened()
+    checks.append((f"{engine}.serial_tcp.start", result.ok))
+    client = _connect(manager, "gw")
+    connected = _wait_for(lambda: manager.pair_stats("gw")["gw"]["host"]["peer"] is not None)
+    client.sendall(b"hello device")
+    to_device = _read_exact(device.master, 12)
+    os.write(device.master, b"hello client")
+    to_client = _recv_exact(client, 12)
+    checks.append((f"{engine}.serial_tcp.both_ways", connected and to_device == b"hello device" and to_client == b"hello client"))
+    checks.append((f"{engine}.serial_tcp.proxy_data", _wait_for(lambda: {e["src_role"] for e in data_events} == {"host", "device"})))
+    checks.append((f"{engine}.serial_tcp.line_baud", all(e.get("baud") == 115200 for e in data_events)))
+    checks.append((f"{engine}.serial_tcp.peer_status", any((s.get("peer") or {}).get("address") for s in statuses)))
+
+    # 客户端断开不算会话错误：设备数据在无客户端期间丢弃，新客户端继续转发。
+    client.close()
+    _wait_for(lambda: manager.pair_stats("gw")["gw"]["host"]["peer"] is None)
+    os.write(device.master, b"nobody")
+    dropped = _wait_for(lambda: manager.pair_stats("gw")["gw"]["device_to_host"]["discarded_bytes"] == 6)
+    client = _connect(manager, "gw")
+    _wait_for(lambda: manager.pair_stats("gw")["gw"]["host"]["peer"] is not None)
+    client.sendall(b"again")
+    os.write(device.master, b"back")
+    reconnected = _read_exact(device.master, 5) == b"again" and _recv_exact(client, 4) == b"back"
+    checks.append((f"{engine}.serial_tcp.reconnect", dropped and reconnected and manager.pair_stats("gw")["gw"]["running"]))
+    checks.append((f"{engine}.serial_tcp.no_error", not any(s.get("status") == "error" for s in statuses)))
+    client.close()
+    manager.stop_all()
+    device.close()
+    bus.close()
+
+
+def _tcp_intercept(engine: str, checks: List[Tuple[str, bool]]) -> None:
+    # 拦截客户端与服务端之间的 TCP：客户端连代理监听端，代理连真实服务端。
+    bus = EventBus()
+    statuses: List[Dict[str, Any]] = []
+    data_events: List[Dict[str, Any]] = []
+    bus.subscribe("proxy.status", statuses.append)
+    bus.subscribe("proxy.data", data_events.append)
+    server = _Server()
+    manager = ProxyForwardManager(bus, engine=engine)
+    result = manager.start_pair("mitm", {"hostPort": "tcp-listen://127.0.0.1:0", "devicePort": f"tcp://127.0.0.1:{server.port}"})
+    checks.append((f"{engine}.tcp_tcp.start", result.ok))
+    client = _connect(manager, "mitm")
+    client.sendall(b"GET")
+    reply = _recv_exact(client, 3)
+    payload = bytes(range(256)) * 256
+    client.sendall(payload)
+    echoed = _recv_exact(client, len(payload), timeout=5.0)
+    checks.append((f"{engine}.tcp_tcp.round_trip", reply == b"GET" and echoed == payload))
+    sniffed = _wait_for(lambda: sum(len(e["data"]) for e in data_events if e["src_role"] == "host") == 3 + len(payload))
+    checks.append((f"{engine}.tcp_tcp.sniffed", sniffed and data_events[0]["dst"].startswith("tcp://") and "baud" not in data_events[0]))
+    stats = manager.pair_stats("mitm")["mitm"]
+    checks.append((f"{engine}.tcp_tcp.stats", stats["host_to_device"]["bytes"] == 3 + len(payload) and stats["device"]["kind"] == "tcp"))
+    # 服务端断开：会话报错。
+    server.close()
+    checks.append((f"{engine}.tcp_tcp.server_closed", _wait_for(lambda: any(s.get("status") == "error" for s in statuses))))
+    client.close()
+    manager.stop_all()
+    bus.close()
+
+
+def _modbus_gateway(engine: str, checks: List[Tuple[str, bool]]) -> None:
+    # Modbus TCP -> RTU 网关：TCP 主站经代理访问串口从站，抓包引擎在两侧各自识别协议。
+    bus = EventBus()
+    registry = DetectorRegistry.with_builtin()
+    registry.register_packages(load_protocol_packages(ROOT_DIR / "protocols").packages)
+    engine_capture = PacketAnalysisEngine(bus, detectors=registry)
+    frames: List[CaptureRecord] = []
+    bus.subscribe("capture.frame", frames.append)
+    bus.publish("capture.control", {"action": "start"})
+    bus.wait_idle(2.0)
+    manager = ProxyForwardManager(bus, engine=engine)
+    device = _Pty()
+    config = {"hostPort": "tcp-listen://127.0.0.1:0", "devicePort": device.port, "baud": 115200, "gateway": "modbus_tcp_rtu"}
+    result = manager.start_pair("mb", config)
+    device.opened()
+    client = _connect(manager, "mb")
+    _wait_for(lambda: manager.pair_stats("mb")["mb"]["host"]["peer"] is not None)
+    client.sendall(bytes.fromhex("12 34 0000 0006 01 03 0000 0002"))
+    request = _read_exact(device.master, 8)
+    response = _rtu(bytes.fromhex("01 03 04 000A 000B"))
+    # 设备侧抓包按 t3.5 静默分帧，响应需一次写出（分段到达的响应由 _gateway_unit 覆盖）。
+    os.write(device.master, response)
+    reply = _recv_exact(client, 13)
+    checks.append((f"{engine}.modbus.start", result.ok))
+    checks.append((f"{engine}.modbus.request_rtu", request == _rtu(bytes.fromhex("01 03 0000 0002"))))
+    checks.append((f"{engine}.modbus.reply_mbap", reply == bytes.fromhex("12 34 0000 0007 01 03 04 000A 000B")))
+    # 异常响应同样补回事务号。
+    client.sendall(bytes.fromhex("00 07 0000 0006 01 06 0001 0003"))
+    _read_exact(device.master, 8)
+    os.write(device.master, _rtu(bytes.fromhex("01 86 02")))
+    checks.append((f"{engine}.modbus.exception", _recv_exact(client, 9) == bytes.fromhex("00 07 0000 0003 01 86 02")))
+    gateway = manager.pair_stats("mb")["mb"]["gateway"]
+    checks.append((f"{engine}.modbus.stats", gateway["requests"] == 2 and gateway["responses"] == 2 and gateway["outstanding"] == 0))
+    # 设备未响应时客户端断开：网关复位，待响应事务不留给下一个客户端。
+    client.sendall(bytes.fromhex("00 08 0000 0006 01 03 0000 0001"))
+    _read_exact(device.master, 8)
+    waiting = _wait_for(lambda: manager.pair_stats("mb")["mb"]["gateway"]["outstanding"] == 1)
+    client.close()
+    reset = _wait_for(lambda: manager.pair_stats("mb")["mb"]["gateway"]["outstanding"] == 0)
+    checks.append((f"{engine}.modbus.reset_on_client_drop", waiting and reset))
+    manager.stop_all()
+    bus.wait_idle(2.0)
+    bus.publish("capture.control", {"action": "stop"})
+    bus.wait_idle(2.0)
+    engine_capture.wait_idle(5.0)
+    bus.wait_idle(2.0)
+    # 每侧三问两答，各按本侧协议分帧识别。
+    protocols = {(r.channel.split(":")[0], r.protocol_id) for r in frames}
+    checks.append((f"{engine}.modbus.captured_both_sides", len(frames) == 10 and protocols == {("tcp-listen", "modbus_tcp"), (device.port, "modbus_rtu")}))
+    device.close()
+    bus.close()
+
+
+def _gateway_unit(checks: List[Tuple[str, bool]]) -> None:
+    gateway = ModbusTcpRtuGateway()
+    # 两个请求分多段到达，一次写出；广播不等待响应。
+    stream = bytes.fromhex("0002 0000 0006 00 06 0001 0003") + bytes.fromhex("0001 0000 0006 11 03 006B 0003")
+    out = gateway.to_device(stream[:5]) + gateway.to_device(stream[5:])
+    expected = _rtu(bytes.fromhex("00 06 0001 0003")) + _rtu(bytes.fromhex("11 03 006B 0003"))
+    checks.append(("gateway.to_device", out == expected and gateway.stats()["outstanding"] == 1))
+    # 响应前的噪声与 CRC 错误的帧被跳过。
+    good = _rtu(bytes.fromhex("11 03 06 AE41 5652 4340"))
+    bad = good[:-1] + bytes([good[-1] ^ 0xFF])
+    reply = gateway.to_host(b"\xff" + bad[:3]) + gateway.to_host(bad[3:] + good)
+    checks.append(("gateway.to_host", reply == bytes.fromhex("0001 0000 0009 11 03 06 AE41 5652 4340") and gateway.errors > 0))
+    # MBAP 协议号非 0：丢弃缓冲，不生成 RTU 帧。
+    checks.append(("gateway.bad_mbap", gateway.to_device(bytes.fromhex("0003 0001 0006 01 03 0000 0001")) == b""))
+    # 设备对 tid=1 无响应（主站超时后发 tid=2）：tid=2 的响应带回 tid=2，不与作废的事务错配。
+    gateway = ModbusTcpRtuGateway()
+    gateway.to_device(bytes.fromhex("0001 0000 0006 05 03 0000 0001"))
+    gateway.to_device(bytes.fromhex("0002 0000 0006 01 03 0000 0001"))
+    first = gateway.to_host(_rtu(bytes.fromhex("01 03 02 0007")))
+    gateway.to_device(bytes.fromhex("0003 0000 0006 01 03 0000 0001"))
+    second = gateway.to_host(_rtu(bytes.fromhex("01 03 02 0008")))
+    checks.append(
+        (
+            "gateway.timed_out_request",
+            first == bytes.fromhex("0002 0000 0005 01 03 02 0007")
+            and second == bytes.fromhex("0003 0000 0005 01 03 02 0008")
+            and gateway.stats()["outstanding"] == 0,
+        )
+    )
+    # 客户端断开：半截请求、残留响应与待响应事务一并清空。
+    gateway.to_device(bytes.fromhex("0004 0000 0006 01 03 0000 0001") + bytes.fromhex("0005 0000"))
+    gateway.to_host(_rtu(bytes.fromhex("01 03 02 0009"))[:3])
+    gateway.reset()
+    fresh = gateway.to_device(bytes.fromhex("0006 0000 0006 01 03 0000 0001"))
+    reply = gateway.to_host(_rtu(bytes.fromhex("01 03 02 000A")))
+    checks.append(
+        (
+            "gateway.reset",
+            fresh == _rtu(bytes.fromhex("01 03 0000 0001")) and reply == bytes.fromhex("0006 0000 0005 01 03 02 000A"),
+        )
+    )
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: List[Tuple[str, bool]] = []
+    _gateway_unit(checks)
+    if hasattr(os, "openpty"):
+        for engine in (ENGINE_THREADS, ENGINE_LOOP):
+            _serial_over_tcp(engine, checks)
+            _modbus_gateway(engine, checks)
+    else:
+        print("[SKIP] os.openpty not available: serial gateway checks")
+    for engine in (ENGINE_THREADS, ENGINE_LOOP):
+        _tcp_intercept(engine, checks)
+
+    bus = EventBus()
+    manager = ProxyForwardManager(bus)
+    bad = manager.start_pair("bad", {"hostPort": "tcp-listen://127.0.0.1", "devicePort": "tcp://127.0.0.1:1"})
+    unsupported = manager.start_pair("gw", {"hostPort": "tcp-listen://127.0.0.1:0", "devicePort": "COM1", "gateway": "bacnet"})
+    checks.append(("config.errors", not bad.ok and "host:port" in bad.error and not unsupported.ok))
+    bus.close()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -15,8 +15,9 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from infra.common.event_bus import EventBus
+from infra.common.event_bus import BackpressurePolicy, EventBus
 import infra.comm.proxy_forward_manager as pfm
+from infra.comm.proxy_tap import ProxyTap, SpscRing
 
 
 @dataclass
@@ -33,16 +34,18 @@ class _Endpoint:
         self.peer: Optional["_Endpoint"] = None
         self.rx = queue.Queue()
         self.is_open = True
+        self.timeout = 0.1
 
     @property
     def in_waiting(self) -> int:
         return self.rx.qsize()
 
     def read(self, size: int) -> bytes:
+        # 与 pyserial 一致：首字节最多等待 timeout，其余只取已到达的。
         data = bytearray()
-        for _ in range(max(0, size)):
+        for i in range(max(0, size)):
             try:
-                data.extend(self.rx.get_nowait())
+                data.extend(self.rx.get(timeout=self.timeout) if i == 0 else self.rx.get_nowait())
             except queue.Empty:
                 break
         return bytes(data)
@@ -66,6 +69,10 @@ _pairs = {
     "VCOM12": "VCOM11",
     "VCOM13": "VCOM14",
     "VCOM14": "VCOM13",
+    "VCOM15": "VCOM16",
+    "VCOM16": "VCOM15",
+    "VCOM17": "VCOM18",
+    "VCOM18": "VCOM17",
 }
 _lock = threading.Lock()
 
@@ -139,6 +146,67 @@ def _wait_data_event(q: "queue.Queue[Dict[str, Any]]", pair_id: str, timeout_sec
     return False
 
 
+def _tap_checks(timeout_sec: float) -> List[TestResult]:
+    """抓包旁路：慢速抓包链路不影响转发时延，溢出计入 tap_dropped。"""
+    results: List[TestResult] = []
+    ring = SpscRing(3)
+    pushed = [ring.push(i) for i in range(4)]
+    popped = [ring.pop() for _ in range(4)]
+    results.append(TestResult("tap.spsc_ring", pushed == [True, True, True, False] and popped == [0, 1, 2, None] and len(ring) == 0))
+
+    # 线程模式两个方向各自 push：每个方向独占一个环形缓冲与计数，tap 线程按时间戳合并发布。
+    bus = EventBus()
+    merged: List[int] = []
+    bus.subscribe("proxy.data", lambda payload: merged.append(payload["t_ns"]))
+    tap = ProxyTap(bus, [{"src": "A"}, {"src": "B"}], capacity=1 << 16, name="ProxyTap-producers", producers=2)
+
+    def _produce(producer: int) -> None:
+        for i in range(20_000):
+            tap.push(producer, i * 2 + producer, b"\x00", producer=producer)
+
+    producers = [threading.Thread(target=_produce, args=(i,)) for i in range(2)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    tap.close(timeout=timeout_sec)
+    bus.wait_idle(timeout_sec)
+    per_producer = tap._pushed == [20_000, 20_000] and tap._dropped == [0, 0]
+    results.append(TestResult("tap.producer_rings", per_producer and tap.published == 40_000 and len(merged) == 40_000, str(tap.stats())))
+    bus.close()
+
+    bus = EventBus()
+    manager = pfm.ProxyForwardManager(bus)
+    release = threading.Event()
+    taps: List[bytes] = []
+
+    def _slow_capture(payload: Dict[str, Any]) -> None:
+        release.wait(timeout_sec * 2)
+        taps.append(payload["data"])
+
+    # 满队列阻塞发布者：tap 线程被卡住，转发线程不受影响。
+    bus.subscribe("proxy.data", _slow_capture, policy=BackpressurePolicy.block(1, timeout=timeout_sec * 2))
+    cfg = {"hostPort": "VCOM15", "devicePort": "VCOM17", "baud": "115200", "tapCapacity": 8}
+    start = manager.start_pair("tap-pair", cfg)
+    t_host = _fake_serial_ctor("VCOM16")
+    t_device = _fake_serial_ctor("VCOM18")
+    samples: List[float] = []
+    forwarded = start.ok
+    for i in range(40):
+        ok, lat = _roundtrip(t_host, t_device, bytes([0x01, 0x03, i]), timeout_sec)
+        forwarded = forwarded and ok
+        samples.append(lat)
+    stats = manager.pair_stats("tap-pair").get("tap-pair", {})
+    results.append(TestResult("tap.forwarding_not_stalled", forwarded and max(samples) < 200.0, f"max={max(samples):.1f}ms", samples))
+    results.append(TestResult("tap.overrun_counted", stats.get("tap_dropped", 0) > 0 and stats.get("tap_pushed", 0) + stats["tap_dropped"] >= 40, str(stats)))
+    release.set()
+    manager.stop_pair("tap-pair")
+    bus.wait_idle(timeout_sec)
+    results.append(TestResult("tap.published_after_release", len(taps) == stats.get("tap_pushed"), f"published={len(taps)}"))
+    bus.close()
+    return results
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Mock proxy regression without serial driver.")
     parser.add_argument("--iterations", type=int, default=20)
@@ -257,6 +325,8 @@ def main() -> int:
     stopped_ok = _wait_status(status_events, pair_id, "stopped", args.timeout_sec)
     results.append(TestResult("status.stopped", stopped_ok, "" if stopped_ok else "no stopped event"))
 
+    results.extend(_tap_checks(args.timeout_sec))
+
     passed = all(r.passed for r in results)
     for r in results:
         line = f"[{'PASS' if r.passed else 'FAIL'}] {r.name}"
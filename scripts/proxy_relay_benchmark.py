@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import select
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from serial import SerialException
+
+from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import IoReactor
+import infra.comm.proxy_endpoints as endpoints
+import infra.comm.proxy_forward_manager as pfm
+
+
+class _PollingProxySession(pfm._ProxySession):
+    """Previous relay: one thread per direction polling in_waiting with a 10 ms idle sleep."""
+
+    def _relay_loop(self, src, dst, index) -> None:
+        while self._running.is_set():
+            try:
+                ser = src.ser
+                waiting = ser.in_waiting if ser is not None and ser.is_open else 0
+                if waiting <= 0:
+                    time.sleep(0.01)
+                    continue
+                data = ser.read(waiting)
+            except (SerialException, OSError) as exc:
+                self._fail(exc)
+                return
+            if not self._forward(data, dst, index):
+                return
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(len(ordered) * pct)) - 1))
+    return float(ordered[idx])
+
+
+def _read_exact(fd: int, size: int, timeout: float) -> bytes:
+    buf = bytearray()
+    deadline = time.monotonic() + timeout
+    while len(buf) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            break
+        buf.extend(os.read(fd, size - len(buf)))
+    return bytes(buf)
+
+
+def _pty_baseline_us(iterations: int) -> float:
+    """One pty hop (master write -> slave read), used to subtract the pty cost from the relay path."""
+    master, slave = os.openpty()
+    try:
+        import tty
+
+        tty.setraw(slave)
+        samples = []
+        for _ in range(iterations):
+            t0 = time.perf_counter_ns()
+            os.write(master, b"\x01\x03\x00\x00\x00\x01\x84\x0A")
+            _read_exact(slave, 8, 1.0)
+            samples.append((time.perf_counter_ns() - t0) / 1000.0)
+        return _percentile(samples, 0.50)
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def _open_pair(cls, bus: EventBus, pair_id: str, reactor: IoReactor | None = None):
+    host_master, host_slave = os.openpty()
+    device_master, device_slave = os.openpty()
+    session = cls(bus, pair_id, {"hostPort": os.ttyname(host_slave), "devicePort": os.ttyname(device_slave), "baud": 115200})
+    result = session.start(reactor)
+    os.close(host_slave)
+    os.close(device_slave)
+    if not result.ok:
+        raise RuntimeError(result.error)
+    return session, host_master, device_master
+
+
+def _latency(src: int, dst: int, iterations: int) -> tuple[List[float], int]:
+    payload = b"\x01\x03\x00\x00\x00\x01\x84\x0A"
+    samples: List[float] = []
+    timeouts = 0
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        os.write(src, payload)
+        if _read_exact(dst, len(payload), 1.0) != payload:
+            timeouts += 1
+            continue
+        samples.append((time.perf_counter_ns() - t0) / 1000.0)
+        time.sleep(0.001)
+    return samples, timeouts
+
+
+def _throughput(src: int, dst: int, total: int) -> float:
+    """MB/s pushed host -> device through the relay (writer and reader run concurrently)."""
+    block = bytes(range(256)) * 16
+    received = 0
+
+    def _writer() -> None:
+        sent = 0
+        while sent < total:
+            sent += os.write(src, block[: min(len(block), total - sent)])
+
+    writer = threading.Thread(target=_writer, daemon=True)
+    t0 = time.perf_counter()
+    writer.start()
+    deadline = time.monotonic() + 30.0
+    while received < total and time.monotonic() < deadline:
+        if select.select([dst], [], [], 1.0)[0]:
+            received += len(os.read(dst, 65536))
+    elapsed = time.perf_counter() - t0
+    writer.join(timeout=1.0)
+    return round(received / elapsed / 1e6, 3) if received >= total else 0.0
+
+
+def _run(name: str, cls, pairs: int, iterations: int, total_bytes: int, baseline_us: float, loop: bool = False) -> Dict[str, Any]:
+    bus = EventBus()
+    bus.subscribe("proxy.data", lambda _p: None)
+    # loop：所有会话共用一个事件循环，与 ProxyForwardManager(engine="loop") 相同。
+    reactor = IoReactor(name=f"ProxyLoop-{name}") if loop else None
+    before = set(threading.enumerate())
+    opened = [_open_pair(cls, bus, f"{name}-{i}", reactor) for i in range(pairs)]
+    time.sleep(0.1)
+    results = []
+    for session, host_master, device_master in opened:
+        h2d, t1 = _latency(host_master, device_master, iterations)
+        d2h, t2 = _latency(device_master, host_master, iterations)
+        samples = h2d + d2h
+        results.append(
+            {
+                "pair": session.pair_id,
+                "samples": len(samples),
+                "timeouts": t1 + t2,
+                "latency_us": {
+                    "p50": round(_percentile(samples, 0.50), 1),
+                    "p99": round(_percentile(samples, 0.99), 1),
+                    "mean": round(statistics.mean(samples) if samples else 0.0, 1),
+                },
+                # Relay path crosses two pty hops; the baseline is one hop.
+                "added_us_p50": round(_percentile(samples, 0.50) - 2 * baseline_us, 1),
+                "throughput_mb_s": _throughput(host_master, device_master, total_bytes),
+            }
+        )
+    # 转发线程数：新增线程中除去 tap 发布线程与总线工作线程。
+    threads = sum(
+        1
+        for thread in threading.enumerate()
+        if thread not in before and not thread.name.startswith(("ProxyTap", "EventBus-worker"))
+    )
+    for session, host_master, device_master in opened:
+        session.stop()
+        os.close(host_master)
+        os.close(device_master)
+    if reactor is not None:
+        reactor.stop()
+    bus.close()
+    return {"name": name, "pairs": results, "threads": threads}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Proxy relay latency/throughput: polling loop vs selector relay vs shared event loop (pty pairs).")
+    parser.add_argument("--pairs", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--mbytes", type=float, default=2.0, help="payload per pair for the throughput run")
+    parser.add_argument("--json", type=str, default="", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    if not hasattr(os, "openpty"):
+        print("[SKIP] os.openpty not available on this platform")
+        print("RESULT: PASSED")
+        return 0
+
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    pairs = max(1, args.pairs)
+    iterations = max(1, args.iterations)
+    total = max(4096, int(args.mbytes * 1e6))
+    baseline = _pty_baseline_us(iterations)
+    selectable = endpoints.selectable_fileno
+    endpoints.selectable_fileno = lambda _obj: None  # type: ignore[assignment]
+    try:
+        polling = _run("polling", _PollingProxySession, pairs, iterations, total, baseline)
+        blocking = _run("blocking", pfm._ProxySession, pairs, iterations, total, baseline)
+    finally:
+        endpoints.selectable_fileno = selectable  # type: ignore[assignment]
+    selector = _run("selector", pfm._ProxySession, pairs, iterations, total, baseline)
+    loop = _run("loop", pfm._ProxySession, pairs, iterations, total, baseline, loop=True)
+
+    report = {"suite": "proxy_relay.benchmark", "pty_hop_us": baseline, "runs": [polling, blocking, selector, loop]}
+    print(f"pty hop p50={baseline:.1f}us")
+    for run in report["runs"]:
+        for item in run["pairs"]:
+            lat = item["latency_us"]
+            print(
+                f"{run['name']:<8} {item['pair']:<12} p50={lat['p50']:>9}us p99={lat['p99']:>9}us "
+                f"added={item['added_us_p50']:>9}us throughput={item['throughput_mb_s']} MB/s "
+                f"relay_threads={run['threads']} timeouts={item['timeouts']}"
+            )
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    sel, poll = selector["pairs"], polling["pairs"]
+    checks = [
+        ("selector.no_timeouts", all(item["timeouts"] == 0 for item in sel)),
+        ("selector.sub_ms_p50", all(item["latency_us"]["p50"] < 1000 for item in sel)),
+        ("selector.lower_p50", all(s["latency_us"]["p50"] < p["latency_us"]["p50"] for s, p in zip(sel, poll))),
+        ("selector.throughput", all(item["throughput_mb_s"] > 0 for item in sel)),
+        ("blocking.no_timeouts", all(item["timeouts"] == 0 for item in blocking["pairs"])),
+        ("loop.no_timeouts", all(item["timeouts"] == 0 for item in loop["pairs"])),
+        ("loop.sub_ms_p50", all(item["latency_us"]["p50"] < 1000 for item in loop["pairs"])),
+        ("loop.throughput", all(item["throughput_mb_s"] > 0 for item in loop["pairs"])),
+        ("loop.one_relay_thread", loop["threads"] == 1),
+    ]
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
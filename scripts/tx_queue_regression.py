@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+import sys
+from typing import List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from infra.common.chunk import Chunk
+from infra.common.event_bus import EventBus
+from infra.comm.io_reactor import EVENT_WRITE, IoReactor
+from infra.comm.tcp_session import TcpSession
+from infra.comm.tx_queue import TxQueue
+
+
+def _read_exactly(sock: socket.socket, size: int, timeout: float = 5.0) -> bytes:
+    sock.settimeout(timeout)
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            break
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _queue_pair(reactor: IoReactor, max_pending_bytes: int = 1024 * 1024):
+    """TxQueue writing into one end of a socketpair; the other end is the 'device'."""
+    local, peer = socket.socketpair()
+    local.setblocking(False)
+    sent: List[bytes] = []
+    errors: List[Exception] = []
+    tx = TxQueue(reactor, local.send, on_sent=lambda frame, _t_ns: sent.append(frame), on_error=errors.append, max_pending_bytes=max_pending_bytes)
+    reactor.register(local, lambda mask: tx.on_writable() if mask & EVENT_WRITE else None)
+    tx.attach(local.fileno())
+    return tx, local, peer, sent, errors
+
+
+def main() -> int:
+    EventBus._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    TcpSession._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+    checks: list[tuple[str, bool]] = []
+    reactor = IoReactor(name="TxQueueRegression")
+
+    # 合并：大量小帧突发写入，系统调用次数远小于帧数，字节顺序不变，tx 事件逐帧。
+    tx, local, peer, sent, _errors = _queue_pair(reactor)
+    frames = [bytes([i % 256]) * 8 for i in range(500)]
+    for frame in frames:
+        tx.submit(frame)
+    data = _read_exactly(peer, 8 * 500)
+    tx.flush(2.0)
+    stats = tx.stats()
+    checks.append(("coalesce.bytes_in_order", data == b"".join(frames)))
+    checks.append(("coalesce.events_per_frame", sent == frames))
+    checks.append(("coalesce.fewer_writes", stats["writes"] < 100 and stats["coalesced"] >= 400))
+    reactor.unregister(local)
+    local.close()
+    peer.close()
+
+    # 帧间隔：逐帧写出，相邻帧到达间隔不小于设定值。
+    tx, local, peer, sent, _errors = _queue_pair(reactor)
+    tx.configure(frame_gap_sec=0.02)
+    for i in range(5):
+        tx.submit(bytes([i]) * 4)
+    stamps = []
+    for _ in range(5):
+        _read_exactly(peer, 4)
+        stamps.append(time.perf_counter())
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    checks.append(("gap.frames_separated", min(gaps) >= 0.015 and tx.stats()["coalesced"] == 0))
+    reactor.unregister(local)
+    local.close()
+    peer.close()
+
+    # 限速：4 KiB @ 20 KiB/s 约 0.2 s。
+    tx, local, peer, sent, _errors = _queue_pair(reactor)
+    tx.configure(max_bytes_per_sec=20 * 1024)
+    t0 = time.perf_counter()
+    tx.submit(b"\x55" * 4096)
+    received = _read_exactly(peer, 4096)
+    elapsed = time.perf_counter() - t0
+    checks.append(("rate.bytes_complete", len(received) == 4096))
+    checks.append(("rate.paced", 0.15 <= elapsed <= 1.0))
+    reactor.unregister(local)
+    local.close()
+    peer.close()
+
+    # 慢设备：对端不读，send 入队立即返回；超出上限拒绝并计数。
+    tx, local, peer, sent, _errors = _queue_pair(reactor, max_pending_bytes=256 * 1024)
+    t0 = time.perf_counter()
+    accepted = sum(1 for _ in range(200) if tx.submit(b"\xAA" * 4096))
+    submit_elapsed = time.perf_counter() - t0
+    checks.append(("slow.submit_never_blocks", submit_elapsed < 0.2))
+    checks.append(("slow.bounded", accepted < 200 and tx.stats()["dropped"] == 200 - accepted))
+    reactor.unregister(local)
+    local.close()
+    peer.close()
+
+    # TcpSession 集成：UI 线程 send 立即返回，tx 事件在写出后发布。
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    bus = EventBus()
+    tx_events: List[bytes] = []
+    rx_events: List[bytes] = []
+    bus.subscribe("tcp.tx", tx_events.append)
+    bus.subscribe("tcp.rx", rx_events.append)
+    session = TcpSession(bus, reactor=reactor)
+    accepted_conn: List[socket.socket] = []
+    acceptor = threading.Thread(target=lambda: accepted_conn.append(server.accept()[0]))
+    acceptor.start()
+    session.connect("127.0.0.1", server.getsockname()[1])
+    acceptor.join(2.0)
+    conn = accepted_conn[0]
+    for i in range(50):
+        session.send(bytes([i]) * 3)
+    session.flush(2.0)
+    got = _read_exactly(conn, 150)
+    bus.wait_idle(2.0)
+    checks.append(("tcp.bytes", got == b"".join(bytes([i]) * 3 for i in range(50))))
+    checks.append(("tcp.tx_events", len(tx_events) == 50 and session.tx_stats()["depth_bytes"] == 0))
+    checks.append(("tcp.tx_stamped", all(isinstance(item, Chunk) for item in tx_events)))
+    before_ns = time.perf_counter_ns()
+    conn.sendall(b"ping")
+    deadline = time.time() + 2.0
+    while not rx_events and time.time() < deadline:
+        time.sleep(0.005)
+    rx = rx_events[0] if rx_events else b""
+    checks.append(("tcp.rx_stamped", isinstance(rx, Chunk) and rx == b"ping" and rx.t_ns >= before_ns))
+    # 对端不读、内核发送缓冲写满：send 不得阻塞反应器线程（其他会话照常收发）。
+    non_blocking = session._sock.gettimeout() == 0.0
+    session._sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8192)
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    for _ in range(128):
+        session.send(b"\x77" * 4096)
+    time.sleep(0.1)
+    lags = []
+    for _ in range(5):
+        ran = threading.Event()
+        t0 = time.perf_counter()
+        reactor.call_soon(ran.set)
+        ran.wait(2.0)
+        lags.append(time.perf_counter() - t0)
+    checks.append(("tcp.full_buffer_not_blocking", non_blocking and max(lags) < 0.2 and session.tx_stats()["depth_bytes"] > 0))
+    session.close()
+    conn.close()
+    server.close()
+    bus.close()
+
+    if hasattr(os, "openpty"):
+        from infra.comm.serial_manager import SerialManager
+
+        SerialManager._log = staticmethod(lambda _m: None)  # type: ignore[method-assign]
+        master, slave = os.openpty()
+        bus = EventBus()
+        mgr = SerialManager(bus, reactor=reactor)
+        opened = mgr.open(os.ttyname(slave), 115200)
+        os.close(slave)
+        # 主端不读：pty 缓冲写满后 send 仍立即返回，数据留在队列。
+        t0 = time.perf_counter()
+        for _ in range(64):
+            mgr.send(b"\x33" * 1024)
+        send_elapsed = time.perf_counter() - t0
+        time.sleep(0.1)
+        queued = mgr.tx_stats()["depth_bytes"]
+        checks.append(("serial.send_non_blocking", opened and send_elapsed < 0.2 and queued > 0))
+        drained = bytearray()
+        deadline = time.time() + 5.0
+        while len(drained) < 64 * 1024 and time.time() < deadline:
+            drained.extend(os.read(master, 65536))
+        checks.append(("serial.drained_after_reader", len(drained) == 64 * 1024))
+        mgr.close()
+        os.close(master)
+        bus.close()
+
+    reactor.stop()
+
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
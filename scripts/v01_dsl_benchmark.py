@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from dsl_runtime.engine import v01_executor
+from dsl_runtime.engine.context import RuntimeContext
+from dsl_runtime.engine.v01_executor import compile_v01, execute_v01
+from dsl_runtime.lang.ast_nodes import DefaultsConfig, RetryPolicy, ScriptAST, SessionConfig
+
+
+class _NullChannel:
+    def __init__(self) -> None:
+        self.writes = 0
+
+    def write(self, data) -> None:
+        self.writes += 1
+
+    def read(self, size: int = 1, timeout: float = 1.0) -> bytes:
+        return b""
+
+    def read_event(self, timeout: float = 0.1):
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+def _loop_ast(rounds: int) -> ScriptAST:
+    body = [
+        {"name": "send", "text": "AT+PING=${last_loop_round}"},
+        {"name": "parse", "format": "kv", "source": "round=${last_loop_round};state=ok", "save_as": "reply"},
+        {"name": "path", "source": "${reply}", "path": "round", "save_as": "reply_round"},
+        {"name": "capture", "source": "state=${reply.state}", "regex": r"state=(\w+)", "var": "state"},
+        {"name": "assert", "all": [{"expr": "${state} == 'ok'"}, {"expr": "${last_loop_round} >= 0"}]},
+        {"name": "assert_range", "value": "${reply_round}", "min": 0, "max": rounds},
+    ]
+    return ScriptAST(
+        version="0.2",
+        vars={"last_loop_round": 0},
+        session=SessionConfig(transport="serial", port="BENCH", encoding="ascii", eol="crlf", read_timeout_ms=10),
+        defaults=DefaultsConfig(timeout_ms=200, retry=RetryPolicy(count=0, backoff_ms=0, strategy="fixed")),
+        steps=[{"id": "bench_loop", "name": "loop", "times": rounds, "steps": body}],
+    )
+
+
+def _interpreted(ast: ScriptAST):
+    """Previous execution model: every executed step re-reads and re-validates its raw dict."""
+    compiled_run = v01_executor._run_step_with_reliability
+
+    def run(step, ctx):
+        return compiled_run(v01_executor._compile_step(step.raw, ast), ctx)
+
+    return run
+
+
+def _run(ast: ScriptAST, interpreted: bool) -> Dict[str, Any]:
+    channel = _NullChannel()
+    ctx = RuntimeContext({"default": channel}, "default", vars_init=dict(ast.vars), params_init=dict(ast.params))
+    original = v01_executor._run_step_with_reliability
+    if interpreted:
+        v01_executor._run_step_with_reliability = _interpreted(ast)  # type: ignore[assignment]
+    try:
+        t0 = time.perf_counter()
+        plan = compile_v01(ast)
+        compile_ms = (time.perf_counter() - t0) * 1000.0
+        summary = execute_v01(ast, ctx, plan)
+        elapsed = time.perf_counter() - t0
+    finally:
+        v01_executor._run_step_with_reliability = original  # type: ignore[assignment]
+        ctx.close()
+    steps = channel.writes * len(ast.steps[0]["steps"])
+    return {
+        "ok": bool(summary.get("ok")),
+        "error": summary.get("error"),
+        "rounds": channel.writes,
+        "compile_ms": round(compile_ms, 3),
+        "elapsed_sec": round(elapsed, 4),
+        "steps_per_sec": round(steps / max(elapsed, 1e-9), 1),
+        "us_per_step": round(elapsed * 1_000_000.0 / max(steps, 1), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare compiled and per-execution interpreted v0.1 step dispatch.")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3, help="best-of runs per mode")
+    parser.add_argument("--json", type=str, default="", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    rounds = max(1, args.rounds)
+    ast = _loop_ast(rounds)
+    report: Dict[str, Any] = {"suite": "v01_dsl.benchmark", "rounds": rounds, "body_steps": len(ast.steps[0]["steps"])}
+    for name, interpreted in (("interpreted", True), ("compiled", False)):
+        runs = [_run(ast, interpreted) for _ in range(max(1, args.repeat))]
+        report[name] = min(runs, key=lambda item: item["elapsed_sec"])
+        report[name]["all_ok"] = all(item["ok"] for item in runs)
+    legacy = report["interpreted"]
+    compiled = report["compiled"]
+    report["speedup"] = round(compiled["steps_per_sec"] / max(legacy["steps_per_sec"], 1e-9), 2)
+    for name in ("interpreted", "compiled"):
+        item = report[name]
+        print(
+            f"{name:<12} steps/s={item['steps_per_sec']:>10} us/step={item['us_per_step']:>8} "
+            f"compile_ms={item['compile_ms']:>7}"
+        )
+    print(f"speedup={report['speedup']}x")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    checks = [
+        ("interpreted.ok", legacy["all_ok"] and legacy["rounds"] == rounds),
+        ("compiled.ok", compiled["all_ok"] and compiled["rounds"] == rounds),
+        ("compiled.faster", report["speedup"] > 1.0),
+    ]
+    ok = True
+    for name, passed in checks:
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}")
+        ok = ok and passed
+    print(f"RESULT: {'PASSED' if ok else 'FAILED'}")
+    return 0 if ok else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
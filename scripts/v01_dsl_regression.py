@@ -11,7 +11,7 @@ if str(ROOT_DIR) not in sys.path:
 
 from dsl_runtime.engine.context import RuntimeContext
 from dsl_runtime.engine.v01_artifacts import export_v01_artifacts
-from dsl_runtime.engine.v01_executor import execute_v01
+from dsl_runtime.engine.v01_executor import compile_v01, execute_v01
 from dsl_runtime.lang.ast_nodes import ArtifactsConfig, DefaultsConfig, RetryPolicy, ScriptAST, SessionConfig
 
 
@@ -210,6 +210,52 @@ def main() -> int:
         summary_switch, _ = _run_ast(ast_switch, FakeChannel([]))
         checks.append(("switch.summary_true", bool(summary_switch.get("ok"))))
 
+        # Case 9: compiled plan is reusable; step errors still surface at the failing step
+        steps_plan = [
+            {
+                "id": "loop_tpl",
+                "name": "loop",
+                "times": 3,
+                "steps": [{"name": "send", "text": "R${last_loop_round}"}],
+            },
+            {"id": "branch", "name": "if", "when": "${last_loop_round} == 3", "then": [], "else": "not-a-list"},
+            {"id": "tail", "name": "send", "hex": "AA 55"},
+        ]
+        ast_plan = _base_ast(steps_plan, str(tmp_root / "plan_${now}"))
+        ast_plan.version = "0.2"
+        ast_plan.vars["last_loop_round"] = 0
+        plan = compile_v01(ast_plan)
+        plan_writes = []
+        for _ in range(2):
+            ch_plan = FakeChannel([])
+            ctx_plan = RuntimeContext({"default": ch_plan}, "default", vars_init=dict(ast_plan.vars))
+            summary_plan = execute_v01(ast_plan, ctx_plan, plan)
+            ctx_plan.close()
+            plan_writes.append((bool(summary_plan.get("ok")), ch_plan.writes))
+        expected_writes = [b"R0\r\n", b"R1\r\n", b"R2\r\n", bytes.fromhex("AA55")]
+        checks.append(("plan.reused", all(ok and writes == expected_writes for ok, writes in plan_writes)))
+
+        steps_bad = [
+            {"id": "first", "name": "send", "text": "BEFORE"},
+            {"id": "bad", "name": "bogus"},
+            {"id": "never", "name": "send", "text": "AFTER"},
+        ]
+        summary_bad, ch_bad = _run_ast(_base_ast(steps_bad, str(tmp_root / "bad_${now}")), FakeChannel([]))
+        bad_error = summary_bad.get("error") or {}
+        checks.append(("plan.error_at_step", bad_error.get("step_id") == "bad" and bad_error.get("code") == "STEP_NOT_IMPLEMENTED"))
+        checks.append(("plan.ran_until_error", ch_bad.writes == [b"BEFORE\r\n"]))
+
+        # assert all/any short-circuit like the interpreter: an ill-formed clause fails only when reached.
+        steps_any = [{"id": "any_ok", "name": "assert", "any": [{"expr": "1 == 1"}, "oops"]}]
+        summary_any, _ = _run_ast(_base_ast(steps_any, str(tmp_root / "any_${now}")), FakeChannel([]))
+        checks.append(("assert.any_short_circuit", bool(summary_any.get("ok"))))
+        steps_all = [{"id": "all_fail", "name": "assert", "all": [{"expr": "1 == 2"}, {"nope": 1}]}]
+        summary_all, _ = _run_ast(_base_ast(steps_all, str(tmp_root / "all_${now}")), FakeChannel([]))
+        checks.append(("assert.all_short_circuit", (summary_all.get("error") or {}).get("code") == "ASSERT_FAILED"))
+        steps_reached = [{"id": "all_bad", "name": "assert", "all": [{"expr": "1 == 1"}, {"nope": 1}]}]
+        summary_reached, _ = _run_ast(_base_ast(steps_reached, str(tmp_root / "reached_${now}")), FakeChannel([]))
+        checks.append(("assert.bad_clause_reached", (summary_reached.get("error") or {}).get("code") == "VALIDATION_FAILED"))
+
     finally:
         shutil.rmtree(tmp_root, ignore_errors=True)
 
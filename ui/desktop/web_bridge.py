@@ -23,6 +23,8 @@ except ImportError:  # pragma: no cover
 
 from dsl_runtime.protocol_package import ProtocolPackageGateway, load_protocol_packages
 from dsl_runtime.protocol_package.runtime import ProtocolCallContext
+from infra.common.chunk import Chunk
+from infra.common.event_bus import BackpressurePolicy
 from infra.common.utils.path_utils import resolve_resource_path
 from ui.desktop.script_runner_qt import ScriptRunnerQt
 
@@ -54,6 +56,7 @@ class WebBridge(QObject):
     comm_status = Signal(object)
     protocol_frame = Signal(object)
     capture_frame = Signal(object)
+    capture_stats = Signal(object)
     comm_batch = Signal(str)
     script_log = Signal(str)
     script_state = Signal(str)
@@ -69,6 +72,7 @@ class WebBridge(QObject):
         window=None,
         proxy_manager=None,
         proxy_monitor_enabled: bool = True,
+        packet_engine=None,
     ) -> None:
         super().__init__()
         self._logger = logging.getLogger("web_bridge")
@@ -78,6 +82,7 @@ class WebBridge(QObject):
         self._window = window
         self._proxy_manager = proxy_manager
         self._proxy_monitor_enabled = bool(proxy_monitor_enabled)
+        self._packet_engine = packet_engine
         self._proxy_disabled_logged = False
         self._script_runner: Optional[ScriptRunnerQt] = None
         self._buffer: List[Dict[str, Any]] = []
@@ -112,14 +117,18 @@ class WebBridge(QObject):
         self._flush_timer.timeout.connect(self._flush_buffers)
         self._flush_timer.start()
         if self._bus:
-            self._bus.subscribe("comm.rx", self._on_comm_rx)
-            self._bus.subscribe("comm.tx", self._on_comm_tx)
+            # Raw traffic is only rendered/appended to the protocol buffer, so under load
+            # consecutive chunks are merged instead of queueing one UI update per read.
+            traffic_policy = BackpressurePolicy.coalesce(max_depth=256)
+            self._bus.subscribe("comm.rx", self._on_comm_rx, policy=traffic_policy)
+            self._bus.subscribe("comm.tx", self._on_comm_tx, policy=traffic_policy)
             self._bus.subscribe("comm.connected", self._on_comm_status)
             self._bus.subscribe("comm.disconnected", self._on_comm_status)
             self._bus.subscribe("comm.error", self._on_comm_status)
             self._bus.subscribe("protocol.frame", self._on_protocol_frame)
             if self._proxy_monitor_enabled:
                 self._bus.subscribe("capture.frame", self._on_capture_frame)
+                self._bus.subscribe("capture.stats", self._on_capture_stats)
                 self._bus.subscribe("proxy.status", self._on_proxy_status)
         if self._proxy_monitor_enabled:
             self._restore_proxy_sessions()
@@ -377,6 +386,12 @@ class WebBridge(QObject):
             "proxyMonitorEnabled": self._proxy_monitor_enabled,
         }
 
+    @Slot(result="QVariant")
+    def get_bus_stats(self) -> Dict[str, Any]:
+        if not self._bus or not hasattr(self._bus, "stats"):
+            return {}
+        return self._bus.stats()
+
     def _proxy_feature_disabled(self) -> bool:
         if self._proxy_monitor_enabled:
             return False
@@ -415,6 +430,7 @@ class WebBridge(QObject):
             "stopBits": payload.get("stopBits") or "1",
             "parity": payload.get("parity") or "none",
             "flowControl": payload.get("flowControl") or "none",
+            "gateway": payload.get("gateway") or "",
             "desiredActive": bool(payload.get("desiredActive", False)),
             "error": payload.get("error") or None,
         }
@@ -450,6 +466,7 @@ class WebBridge(QObject):
                             "stopBits",
                             "parity",
                             "flowControl",
+                            "gateway",
                         }
                     },
                 }
@@ -483,6 +500,12 @@ class WebBridge(QObject):
             return True
         return False
 
+    @Slot(result="QVariant")
+    def proxy_pair_stats(self) -> Dict[str, Any]:
+        if self._proxy_feature_disabled() or not self._proxy_manager:
+            return {}
+        return self._proxy_manager.pair_stats()
+
     @Slot(str, bool, result="QVariant")
     def set_proxy_pair_status(self, pair_id: str, active: bool) -> Dict[str, Any]:
         if self._proxy_feature_disabled():
@@ -530,6 +553,7 @@ class WebBridge(QObject):
                 "action": "start",
                 "channel": channel,
                 "pair_id": pair_id,
+                "record_path": payload.get("recordPath") or payload.get("record_path"),
             },
         )
         return True
@@ -541,6 +565,51 @@ class WebBridge(QObject):
         self._bus.publish("capture.control", {"action": "stop"})
         return True
 
+    @Slot(str, result="QVariant")
+    def capture_frame_detail(self, frame_id: str) -> Dict[str, Any]:
+        if self._proxy_feature_disabled() or not self._packet_engine or not frame_id:
+            return {}
+        return self._packet_engine.frame_detail(frame_id) or {}
+
+    @Slot("QVariant", result="QVariant")
+    def query_capture_frames(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._proxy_feature_disabled() or not self._packet_engine:
+            return {"total": 0, "offset": 0, "frames": []}
+        payload = payload if isinstance(payload, dict) else {}
+        filters: Dict[str, Any] = {}
+        for key in ("start_ns", "end_ns"):
+            if payload.get(key) is not None:
+                filters[key] = int(payload[key])
+        for key in ("channel", "direction", "protocol", "error"):
+            if payload.get(key) is not None:
+                filters[key] = str(payload[key])
+        limit = payload.get("limit")
+        try:
+            return self._packet_engine.query_frames(
+                offset=int(payload.get("offset") or 0),
+                limit=int(limit) if limit is not None else 200,
+                where=payload.get("filter") or None,
+                **filters,
+            )
+        except (ValueError, TypeError) as exc:
+            return {"total": 0, "offset": 0, "frames": [], "error": str(exc)}
+
+    @Slot(result="QVariant")
+    def capture_transaction_stats(self) -> Dict[str, Any]:
+        if self._proxy_feature_disabled() or not self._packet_engine:
+            return {}
+        return self._packet_engine.capture_stats()
+
+    @Slot(str, result="QVariant")
+    def set_capture_filter(self, expression: str) -> Dict[str, Any]:
+        if self._proxy_feature_disabled() or not self._packet_engine:
+            return {"ok": False, "error": "capture engine unavailable"}
+        try:
+            self._packet_engine.set_filter(expression)
+        except ValueError as exc:
+            return {"ok": False, "error": str(exc)}
+        return {"ok": True, "error": None, "expr": self._packet_engine.filter_expression}
+
     @Slot(str, str, result=str)
     def select_directory(self, title: str, start_dir: str) -> str:
         return QFileDialog.getExistingDirectory(None, title or "Select directory", start_dir or "")
@@ -778,6 +847,8 @@ class WebBridge(QObject):
         else:
             text = str(payload)
             hex_text = text.encode().hex().upper()
+        if isinstance(payload, Chunk):
+            return {"text": text, "hex": hex_text, "ts": payload.wall_time, "t_ns": payload.t_ns}
         return {"text": text, "hex": hex_text, "ts": time.time()}
 
     def _build_channel_list(self) -> List[Dict[str, Any]]:
@@ -804,6 +875,7 @@ class WebBridge(QObject):
                 "error": info.get("error") or "",
                 "tx_bytes": self._traffic.get("tx", 0),
                 "rx_bytes": self._traffic.get("rx", 0),
+                "tx_queue_bytes": (info.get("tx") or {}).get("depth_bytes", 0),
             }
         ]
 
@@ -840,6 +912,10 @@ class WebBridge(QObject):
     def _emit_capture_frame_signal(self, payload: Any) -> None:
         self.capture_frame.emit(payload)
 
+    @Slot("QVariant")
+    def _emit_capture_stats_signal(self, payload: Any) -> None:
+        self.capture_stats.emit(payload)
+
     def _on_comm_rx(self, payload: Any) -> None:
         if isinstance(payload, (bytes, bytearray)):
             self._traffic["rx"] += len(payload)
@@ -927,6 +1003,9 @@ class WebBridge(QObject):
     def _on_capture_frame(self, payload: Any) -> None:
         if not self._proxy_monitor_enabled:
             return
+        # Records are converted once; hex dump / tree are fetched via capture_frame_detail.
+        if hasattr(payload, "to_dict"):
+            payload = payload.to_dict()
         self._append_buffer({"kind": "CAPTURE", "payload": payload, "ts": time.time()})
         QMetaObject.invokeMethod(
             self,
@@ -935,6 +1014,16 @@ class WebBridge(QObject):
             Q_ARG(object, payload),
         )
 
+    def _on_capture_stats(self, payload: Any) -> None:
+        if not self._proxy_monitor_enabled:
+            return
+        QMetaObject.invokeMethod(
+            self,
+            "_emit_capture_stats_signal",
+            Qt.QueuedConnection,
+            Q_ARG(object, payload),
+        )
+
     def _on_proxy_status(self, payload: Any) -> None:
         if not self._proxy_monitor_enabled:
             return
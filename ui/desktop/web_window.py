@@ -68,6 +68,7 @@ class WebWindow(QMainWindow):
         plugin_manager=None,
         proxy_manager=None,
         proxy_monitor_enabled: bool = True,
+        packet_engine=None,
     ) -> None:
         super().__init__()
         self.setWindowTitle("ProtoFlow Web UI")
@@ -101,6 +102,7 @@ class WebWindow(QMainWindow):
             window=self,
             proxy_manager=proxy_manager,
             proxy_monitor_enabled=proxy_monitor_enabled,
+            packet_engine=packet_engine,
         )
         channel.registerObject("bridge", self.bridge)
         view.page().setWebChannel(channel)
@@ -1,6 +1,6 @@
 import { describe, expect, it } from 'vitest'
 import { ref } from 'vue'
-import { formatCaptureTime, mapCaptureFrame, useCaptureFrames } from './useCaptureFrames'
+import { applyCaptureFrameDetail, formatCaptureTime, mapCaptureFrame, useCaptureFrames } from './useCaptureFrames'
 
 describe('useCaptureFrames', () => {
   it('formats capture time and maps frame payload', () => {
@@ -23,6 +23,37 @@ describe('useCaptureFrames', () => {
     expect(mapped?.protocolType).toBe('modbus')
   })
 
+  it('maps compact frames and merges on-demand detail', () => {
+    const frame = mapCaptureFrame({
+      id: 'rx-1-1',
+      direction: 'RX',
+      timestamp: 1,
+      length: 8,
+      raw_hex: '01 03 00 00 00 02 C4 0B',
+      protocol: { id: 'modbus_rtu', name: 'Modbus RTU', unknown: false },
+      error_codes: ['CRC_INVALID'],
+      detail: false,
+    })
+    expect(frame?.warn).toBe(true)
+    expect(frame?.detailLoaded).toBe(false)
+    expect(frame?.hexDump).toBeNull()
+
+    applyCaptureFrameDetail(frame, {
+      id: 'rx-1-1',
+      direction: 'RX',
+      summary: 'Read Holding Registers',
+      hex_dump: { bytes: ['01', '03'], ascii_lines: ['..'], size: 2 },
+      tree: [{ label: 'Slave ID', raw: '01', value: '1' }],
+      protocol: { id: 'modbus_rtu', name: 'Modbus RTU', unknown: false },
+      errors: [],
+      detail: true,
+    })
+    expect(frame?.detailLoaded).toBe(true)
+    expect(frame?.summaryText).toBe('Read Holding Registers')
+    expect(frame?.hexDump?.size).toBe(2)
+    expect(frame?.tree).toHaveLength(1)
+  })
+
   it('ingests frame list and caps by max size', () => {
     const captureFrames = ref<any[]>([])
     const captureMeta = ref({
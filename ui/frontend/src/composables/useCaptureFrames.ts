@@ -19,7 +19,9 @@ export function mapCaptureFrame(payload: any) {
   if (!payload || typeof payload !== 'object') return null
   const protocol = payload.protocol || {}
   const unknown = Boolean(protocol.unknown)
-  const hasErrors = Array.isArray(payload.errors) && payload.errors.length > 0
+  const hasErrors =
+    (Array.isArray(payload.errors) && payload.errors.length > 0) ||
+    (Array.isArray(payload.error_codes) && payload.error_codes.length > 0)
   const direction = payload.direction || 'RX'
   const tone = unknown || hasErrors ? 'red' : direction === 'TX' ? 'blue' : 'green'
   return {
@@ -43,9 +45,26 @@ export function mapCaptureFrame(payload: any) {
     protocolTooltip: protocol.name ? `${protocol.name}${protocol.version ? ` ${protocol.version}` : ''}` : '',
     hexDump: payload.hex_dump || null,
     tree: payload.tree || [],
+    detailLoaded: Boolean(payload.detail),
   }
 }
 
+// Capture frames arrive without hex dump / tree; they are fetched per frame id when opened.
+export function applyCaptureFrameDetail(frame: any, detail: any) {
+  if (!frame || !detail || typeof detail !== 'object') return frame
+  const mapped = mapCaptureFrame(detail)
+  if (!mapped) return frame
+  frame.summary = mapped.summary
+  frame.summaryText = mapped.summaryText
+  frame.hexDump = mapped.hexDump
+  frame.tree = mapped.tree
+  frame.tone = mapped.tone
+  frame.warn = mapped.warn
+  frame.protocolLabel = mapped.protocolLabel
+  frame.detailLoaded = true
+  return frame
+}
+
 export function useCaptureFrames(options: UseCaptureFramesOptions) {
   function ingestCaptureFrame(payload: any) {
     const frame = mapCaptureFrame(payload)